@@ -1,23 +1,620 @@
+import os
+from contextlib import contextmanager
+
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+
+from framework import (a11y, auth, cassette, commands, contexts, flaky, history, impact, load, matrix, network,
+                       partitions, perf, profiler, profiles, seeding, stress, visual, waits)
+from framework.browsers import bind_factories
+from framework.drivers import DEFAULT_CACHE_DIR, DriverResolver, parse_driver_paths
+from framework.http_backend import StoreClient, make_adapter
+from framework.instrumentation import instrument
+from framework.model import execute, generate_paths
+from framework.parallel import ShardingPlugin
+from framework.pool import DriverPools
+from framework.standin import StandInServer
+
+LIVE_STORE_URL = "https://tutorialsninja.com/demo/"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("opencart", "OpenCart suite options")
+    group.addoption("--pool-size", type=int, default=1,
+                    help="Warm browsers kept per browser type for the whole session (default: 1)")
+    group.addoption("--max-driver-uses", type=int, default=25,
+                    help="Leases a browser serves before it is recycled (default: 25)")
+    group.addoption("--driver-cache", default=DEFAULT_CACHE_DIR,
+                    help="Directory holding the driver lockfile (default: ~/.cache/opencart-suite)")
+    group.addoption("--driver-path", action="append", default=[], metavar="BROWSER=PATH",
+                    help="Use a pre-provisioned driver binary, e.g. chrome=/opt/chromedriver (repeatable)")
+    group.addoption("--offline-drivers", action="store_true",
+                    help="Never download drivers; use --driver-path or the lockfile only")
+    group.addoption("--execution-profile", choices=tuple(profiles.PROFILES), default=profiles.DEFAULT_PROFILE,
+                    help="Browser flag set: fast-headless (default), headed-debug (visible window) or "
+                         "visual-fidelity (headless, deterministic rendering)")
+    group.addoption("--benchmark-profiles", action="store_true",
+                    help="Run the execution-profile startup benchmark (launches fresh browsers per profile)")
+    group.addoption("--benchmark-rounds", type=int, default=3,
+                    help="Fresh browsers launched per profile and browser by the benchmark (default: 3)")
+    group.addoption("--store", choices=("live", "local"), default="live",
+                    help="live: tutorialsninja.com demo (default); local: bundled in-process stand-in")
+    group.addoption("--browsers", default="chrome",
+                    help="Comma-separated browsers for matrix tests: chrome,firefox,edge (default: chrome)")
+    group.addoption("--config-coverage", choices=tuple(matrix.COVERAGE), default="pairwise",
+                    help="Combinations of browser, device, orientation, locale and zoom the "
+                         "configuration matrix covers (default: pairwise)")
+    group.addoption("--locales", default="en-GB,de-DE,ja-JP",
+                    help="Comma-separated locales for matrix tests (default: en-GB,de-DE,ja-JP)")
+    group.addoption("--zoom-levels", default="100,125",
+                    help="Comma-separated zoom percentages for matrix tests (default: 100,125)")
+    group.addoption("--model-coverage", choices=("all-states", "all-transitions", "1-switch"),
+                    default="all-transitions",
+                    help="Coverage criterion for generated state-model paths (default: all-transitions)")
+    group.addoption("--perf", choices=("off", "report", "enforce"), default="report",
+                    help="Page performance capture: report budget violations (default), "
+                         "enforce them as failures, or turn capture off")
+    group.addoption("--perf-output", default=None, metavar="PATH",
+                    help="Write page performance samples and p50/p95/p99 aggregates as JSON")
+    group.addoption("--a11y", choices=("off", "report", "enforce"), default="report",
+                    help="Accessibility audit of every page browser tests visit: report violations "
+                         "(default), enforce them as failures, or turn the audit off")
+    group.addoption("--visual", choices=("off", "check", "update"), default="check",
+                    help="Layout tests: compare screenshots and landmark boxes with their baselines, "
+                         "recording missing ones (default); update: re-record every baseline; "
+                         "off: check the layout for overflow only")
+    group.addoption("--visual-baselines", default=None, metavar="DIR",
+                    help="Visual baseline directory (default: in the pytest cache directory)")
+    group.addoption("--live-submissions", action="store_true",
+                    help="Also submit the valid register and contact cases to the live store, creating real "
+                         "accounts and enquiries (default: only the invalid cases; all of them with --store=local)")
+    group.addoption("--load-users", type=int, default=None,
+                    help="Peak virtual users for the load test (10 against --store=local; "
+                         "required to run it against the live store)")
+    group.addoption("--load-profile", default="2,5,2", metavar="RAMP_UP,HOLD,RAMP_DOWN",
+                    help="Load test ramp-up, hold and ramp-down in seconds (default: 2,5,2)")
+    group.addoption("--load-output", default=None, metavar="PATH",
+                    help="Write load test throughput and latency histograms as JSON")
+    group.addoption("--stress-users", default=None, metavar="START,STEP,MAX",
+                    help="Stress test user steps (20,20,200 against --store=local; "
+                         "required to run it against the live store)")
+    group.addoption("--stress-step-seconds", type=float, default=3.0,
+                    help="How long each stress step holds its user count (default: 3)")
+    group.addoption("--stress-limits", default="0.05,1.0", metavar="ERROR_RATE,P95_SECONDS",
+                    help="Error rate and p95 latency that mark the breaking point (default: 0.05,1.0)")
+    group.addoption("--network", choices=("off", "cache", "stub-images"), default="cache",
+                    help="cache: serve static assets from the local asset cache and block third-party "
+                         "domains (default); stub-images: also answer catalogue images with a 1x1 "
+                         "placeholder outside visual tests; off: no interception")
+    group.addoption("--block-domains", default=",".join(network.DEFAULT_BLOCKED_DOMAINS), metavar="DOMAINS",
+                    help="Comma-separated third-party domains (and their subdomains) to block "
+                         "(default: analytics, ad and share-widget domains)")
+    group.addoption("--network-output", default=None, metavar="PATH",
+                    help="Write every intercepted request with its action and timing as JSON")
+    group.addoption("--cassette", choices=("off", "record", "replay"), default="off",
+                    help="record: store every response from the store in the cassette; replay: serve them "
+                         "from it without contacting the store (default: off)")
+    group.addoption("--cassette-dir", default=os.path.join(os.path.dirname(__file__), "cassettes"), metavar="DIR",
+                    help="Cassette directory, one cassette per --store (default: tests/cassettes)")
+    group.addoption("--latency-profile", choices=tuple(cassette.LATENCY_PROFILES), default="none",
+                    help="Simulated latency of replayed responses: none (default), dc, 4g or 3g")
+    group.addoption("--command-trace", default=None, metavar="PATH",
+                    help="Write every WebDriver command and wait as Chrome trace-event JSON "
+                         "(chrome://tracing, Perfetto, speedscope)")
+    group.addoption("--impact", choices=("off", "record", "select"), default="off",
+                    help="record: index the pages and locators each browser test uses; "
+                         "select: also skip tests whose recorded pages are unchanged (default: off)")
+    group.addoption("--impact-index", default=None, metavar="PATH",
+                    help="Test-impact index file (default: in the pytest cache directory)")
+    group.addoption("--history", default=None, metavar="PATH",
+                    help="SQLite test duration history (default: in the pytest cache directory)")
+    group.addoption("--schedule", choices=("history", "file"), default="history",
+                    help="history: recently failed tests first, then longest first (default); "
+                         "file: collection order")
+    group.addoption("--reruns", type=int, default=2,
+                    help="Reruns of a failed test, each in a fresh browser, before it counts as failed "
+                         "(default: 2; 0 turns reruns off)")
+    group.addoption("--retry-budget", type=int, default=None,
+                    help="Reruns allowed in the whole run (default: estimated from the tests' flake scores)")
+    group.addoption("--quarantine-threshold", type=float, default=0.3,
+                    help="Flake score from which a test is quarantined: its failures are reported as xfail "
+                         "(default: 0.3; above 1 turns quarantine off)")
+    group.addoption("--contexts", type=int, default=0,
+                    help="Run read_only tests N at a time on isolated browsing contexts of one Chromium "
+                         "browser (default: 0, one test per browser)")
+    group.addoption("--workers", type=int, default=0,
+                    help="Run the suite in N worker processes, sharded by test duration")
+    # Internal: set by the controller on the worker command line
+    group.addoption("--worker-nodes", default=None, help="(internal) node ids for this worker")
+    group.addoption("--worker-results", default=None, help="(internal) report stream for this worker")
+    group.addoption("--worker-flakes", default=None, help="(internal) quarantine and retry budget for this worker")
+    group.addoption("--worker-auth", default=None, help="(internal) session snapshots shared with the controller")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    config.addinivalue_line("markers", "viewports(*names): restrict browser_config to these viewports")
+    config.addinivalue_line("markers", "precondition(name): state seeded_driver starts from (framework.seeding)")
+    config.addinivalue_line("markers", "visual: needs real images; exempt from --network=stub-images")
+    config.addinivalue_line("markers", "read_only: only reads pages; may share a browser with other tests "
+                                       "(--contexts)")
+    config._history = history.HistoryPlugin(config)
+    config.pluginmanager.register(config._history, "opencart-history")
+    config._flaky = flaky.FlakePlugin(config)
+    config.pluginmanager.register(config._flaky, "opencart-flaky")
+    config._contexts = contexts.ContextPlugin(config)
+    config.pluginmanager.register(config._contexts, "opencart-contexts")
+    config.pluginmanager.register(ShardingPlugin(config), "opencart-sharding")
+    if config.getoption("--impact") != "off":
+        plugin = impact.ImpactPlugin(config, lambda: fingerprint_store(config), __file__)
+        config._impact = plugin
+        config.pluginmanager.register(plugin, "opencart-impact")
+
+
+@contextmanager
+def fingerprint_store(config):
+    """The store whose pages the impact index fingerprints over HTTP."""
+    if config.getoption("--store") == "local":
+        with StandInServer() as server:
+            yield server.base_url
+    else:
+        yield LIVE_STORE_URL
+
+
+def pytest_generate_tests(metafunc):
+    if "browser_config" in metafunc.fixturenames:
+        marker = metafunc.definition.get_closest_marker("viewports")
+        browsers = [name.strip() for name in metafunc.config.getoption("--browsers").split(",")]
+        config = metafunc.config
+        try:
+            plan = matrix.plan_matrix(
+                browsers,
+                marker.args if marker else None,
+                locales=[name.strip() for name in config.getoption("--locales").split(",")],
+                zooms=[int(zoom) for zoom in config.getoption("--zoom-levels").split(",")],
+                coverage=config.getoption("--config-coverage"),
+            )
+        except ValueError as error:
+            raise pytest.UsageError(str(error))
+        config.__dict__.setdefault("_matrix_plans", {})[metafunc.definition.name] = plan
+        metafunc.parametrize("browser_config", plan.configs, ids=str)
+
+
+@pytest.fixture(scope="session")
+def driver_resolver(request):
+    config = request.config
+    try:
+        provisioned = parse_driver_paths(config.getoption("--driver-path"))
+    except ValueError as error:
+        raise pytest.UsageError(str(error))
+    resolver = DriverResolver(
+        cache_dir=config.getoption("--driver-cache"),
+        offline=config.getoption("--offline-drivers"),
+        provisioned=provisioned,
+    )
+    config._driver_resolver = resolver
+    return resolver
+
+
+@pytest.fixture(scope="session")
+def network_layer(request):
+    """Asset cache and third-party blocking in front of every pooled browser (None with --network=off)."""
+    config = request.config
+    if config.getoption("--network") == "off":
+        yield None
+        return
+    domains = [domain.strip() for domain in config.getoption("--block-domains").split(",") if domain.strip()]
+    layer = network.NetworkLayer(config.getoption("--driver-cache"), mode=config.getoption("--network"),
+                                 blocked_domains=domains)
+    config._network = layer
+    yield layer
+    layer.close()
+
+
+@pytest.fixture(scope="session")
+def driver_pools(request, driver_resolver, network_layer):
+    profile = profiles.PROFILES[request.config.getoption("--execution-profile")]
+    pools = DriverPools(
+        bind_factories(driver_resolver, network_layer, profile),
+        size=request.config.getoption("--pool-size"),
+        max_uses=request.config.getoption("--max-driver-uses"),
+    )
+    request.config._driver_pools = pools
+    yield pools
+    pools.close()
+
+
+def visual_engine(config):
+    """The layout checker; baselines live in the pytest cache unless --visual-baselines says otherwise."""
+    return visual.VisualEngine(visual.baseline_directory(config), config.getoption("--visual"))
+
+
+@pytest.fixture(scope="session")
+def context_batch(request):
+    """Runs every --contexts test on browsing contexts, before the first of them starts."""
+    config = request.config
+    engine = visual_engine(config)
+    url = session_base_url(request)
+
+    def arguments(item, test_request, driver):
+        values = {"driver": driver, "matrix_driver": driver, "base_url": url}
+        browser_config = item.callspec.params.get("browser_config") if hasattr(item, "callspec") else None
+        if browser_config is not None:
+            unsupported = matrix.apply_config(driver, browser_config)
+            if unsupported:
+                pytest.skip(f"{browser_config.browser} cannot emulate {', '.join(unsupported)}")
+            key = (config.getoption("--execution-profile"), str(browser_config))
+            values["visual_check"] = lambda page: engine.check(test_request, driver, key, page)
+        return values
+
+    config._contexts.run(request.session, request.getfixturevalue("driver_pools").lease, arguments)
+
 
 @pytest.fixture(scope="function")
-def driver():
-    options = Options()
-    # Basic Chrome options for stability
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    # options.add_argument("--headless") # Uncomment to run headless
-    
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-    driver.set_window_size(1920, 1080) # Default desktop size
-    yield driver
-    driver.quit()
-
-@pytest.fixture
-def base_url():
-    return "https://tutorialsninja.com/demo/"
+def driver(request, driver_pools):
+    if contexts.ran(request):
+        # The test already ran on a browsing context; only its outcome is reported
+        yield None
+        return
+    # Leased from the session pool; reset to 1920x1080 on about:blank; reruns get a fresh browser
+    with driver_pools.lease("chrome", fresh=flaky.is_rerun(request)) as driver, instrument(request, driver, "chrome"):
+        yield driver
+
+@pytest.fixture
+def matrix_driver(request, driver_pools, browser_config):
+    """A browser from the matrix, sized to the viewport with the locale and zoom emulated."""
+    if contexts.ran(request):
+        yield None
+        return
+    with driver_pools.lease(browser_config.browser, fresh=flaky.is_rerun(request)) as driver:
+        try:
+            unsupported = matrix.apply_config(driver, browser_config)
+            if unsupported:
+                pytest.skip(f"{browser_config.browser} cannot emulate {', '.join(unsupported)}")
+            with instrument(request, driver, browser_config.browser, browser_config.viewport):
+                yield driver
+        finally:
+            matrix.clear_config(driver, browser_config)
+
+@pytest.fixture
+def perf_probe(request, driver):
+    """The page performance probe attached to ``driver`` for this test."""
+    probe = request.node.stash.get(perf.PROBE_KEY, None)
+    if probe is None:
+        pytest.skip("page performance capture is off (--perf=off)")
+    return probe
+
+@pytest.fixture
+def a11y_audit(request, driver):
+    """Audits the page ``driver`` is on now; the result is also reported with the test's other audits."""
+    a11y_probe = request.node.stash.get(a11y.PROBE_KEY, None)
+    if a11y_probe is not None:
+        return a11y_probe.audit
+    return lambda: a11y.AUDITOR.audit(driver)
+
+
+@pytest.fixture
+def visual_check(request, matrix_driver, browser_config):
+    """Captures a page object's layout at this configuration and compares it with its baseline."""
+    config = request.config
+    engine = visual_engine(config)
+    key = (config.getoption("--execution-profile"), str(browser_config))
+    return lambda page: engine.check(request, matrix_driver, key, page)
+
+@pytest.fixture
+def form_matrix(request):
+    """
+    Runs a generated BVA/EP matrix on a loaded form; returns the verdict report.
+    Valid cases of forms that create records go to the live store only with
+    --live-submissions (a replayed cassette has them only if it was recorded so).
+    """
+    config = request.config
+    invalid_only = config.getoption("--store") != "local" and not config.getoption("--live-submissions")
+
+    def run(page, form_name, select=None):
+        form = partitions.FORMS[form_name]
+        cases = [case for case in partitions.generate_cases(form)
+                 if (select is None or select(case)) and not (invalid_only and form.creates and case.valid)]
+        report = partitions.run_matrix(page, form, cases)
+        request.node.user_properties.append((partitions.PROPERTY, report.as_property()))
+        return report
+
+    return run
+
+@pytest.fixture(scope="session")
+def standin_server():
+    """The bundled stand-in store, started once per session (and per worker)."""
+    with StandInServer() as server:
+        yield server
+
+def store_url(request):
+    """The store itself, never the cassette: the stand-in or the live demo."""
+    if request.config.getoption("--store") == "local":
+        return request.getfixturevalue("standin_server").base_url
+    return LIVE_STORE_URL
+
+@pytest.fixture(scope="session")
+def cassette_proxy(request):
+    """Record/replay proxy in front of the store (None with --cassette=off)."""
+    config = request.config
+    mode = config.getoption("--cassette")
+    if mode == "off":
+        yield None
+        return
+    directory = os.path.join(config.getoption("--cassette-dir"), config.getoption("--store"))
+    proxy = cassette.CassetteProxy(store_url(request), cassette.Cassette(directory), mode=mode,
+                                   latency=config.getoption("--latency-profile"))
+    config._cassette = proxy
+    yield proxy
+    proxy.close()
+
+@pytest.fixture
+def base_url(request, cassette_proxy):
+    if cassette_proxy is None:
+        yield store_url(request)
+        return
+    with cassette_proxy.record(request):
+        yield cassette_proxy.base_url
+
+
+@pytest.fixture(scope="session")
+def http_adapter():
+    """Keep-alive connection pool shared by every StoreClient in the session."""
+    adapter = make_adapter()
+    yield adapter
+    adapter.close()
+
+@pytest.fixture
+def store_client(base_url, http_adapter):
+    """HTTP backend with its own OpenCart session (cookie jar)."""
+    client = StoreClient(base_url, adapter=http_adapter)
+    yield client
+    client.close()
+
+def session_base_url(request):
+    """``base_url`` for session-scoped fixtures."""
+    proxy = request.getfixturevalue("cassette_proxy")
+    return proxy.base_url if proxy is not None else store_url(request)
+
+@pytest.fixture(scope="session")
+def auth_sessions(request, http_adapter):
+    """The shared logged-in account; snapshots are cached between runs against the live store."""
+    # Stand-in accounts live only as long as its process; cassette sessions only as long as the proxy
+    reusable = request.config.getoption("--store") != "local" and request.config.getoption("--cassette") == "off"
+    cache = getattr(request.config, "cache", None)
+    if cache is None and request.config.getoption("--worker-auth"):
+        # A --workers subprocess has no cache provider: the controller shares its snapshots
+        cache = auth.FileCache(request.config.getoption("--worker-auth"))
+    sessions = auth.AuthSessions(session_base_url(request), adapter=http_adapter, cache=cache if reusable else None)
+    request.config._auth_sessions = sessions
+    return sessions
+
+@pytest.fixture
+def logged_in_driver(driver, auth_sessions):
+    """A pooled browser logged in by injecting the session snapshot (no login UI)."""
+    auth_sessions.login_driver(driver)
+    return driver
+
+@pytest.fixture(scope="session")
+def seeder(request, http_adapter, auth_sessions):
+    seeder = seeding.Seeder(session_base_url(request), adapter=http_adapter, auth=auth_sessions)
+    request.config._seeder = seeder
+    return seeder
+
+@pytest.fixture
+def seeded_driver(request, driver, seeder):
+    """A pooled browser already in the ``@pytest.mark.precondition(...)`` state, on its page."""
+    marker = request.node.get_closest_marker("precondition")
+    if marker is None:
+        raise pytest.UsageError(f"{request.node.nodeid} uses seeded_driver without a precondition marker")
+    return seeder.seed_driver(driver, marker.args[0])
+
+@pytest.fixture
+def logged_in_client(store_client, auth_sessions):
+    """An HTTP client on the shared logged-in session."""
+    auth_sessions.login_client(store_client)
+    return store_client
+
+@pytest.fixture
+def model_runner(request, base_url, http_adapter):
+    """Runs a StateMachine's generated paths over StoreClients; returns the report."""
+    criterion = request.config.getoption("--model-coverage")
+    reports = request.config.__dict__.setdefault("_model_reports", [])
+    clients = []
+
+    def factory():
+        client = StoreClient(base_url, adapter=http_adapter)
+        clients.append(client)
+        return client
+
+    def run(model):
+        report = execute(model, generate_paths(model, criterion), factory)
+        reports.append(report)
+        return report
+
+    yield run
+    for client in clients:
+        client.close()
+
+@pytest.fixture
+def load_runner(request):
+    """Runs the virtual-user load profile from the command line; returns the report."""
+    users = request.config.getoption("--load-users")
+    if users is None:
+        if request.config.getoption("--store") != "local":
+            pytest.skip("load test against the live store needs an explicit --load-users")
+        users = 10
+    profile = load.LoadProfile.parse(users, request.config.getoption("--load-profile"))
+    reports = request.config.__dict__.setdefault("_load_reports", [])
+
+    def run(scenarios=None):
+        # Load and stress measure the store, so they never go through the cassette
+        report = load.run_load(store_url(request), profile, scenarios)
+        reports.append(report)
+        return report
+
+    return run
+
+@pytest.fixture
+def profile_benchmark(request, driver_resolver, base_url):
+    """Times fresh browsers of one execution profile for every --browsers entry; returns the results."""
+    config = request.config
+    if not config.getoption("--benchmark-profiles"):
+        pytest.skip("the execution-profile benchmark launches fresh browsers; run it with --benchmark-profiles")
+    results = config.__dict__.setdefault("_profile_results", [])
+    browsers = [name.strip() for name in config.getoption("--browsers").split(",")]
+
+    def run(name):
+        factories = bind_factories(driver_resolver, profile=profiles.PROFILES[name])
+        measured = [profiles.benchmark(name, browser, factories[browser], base_url,
+                                       rounds=config.getoption("--benchmark-rounds"))
+                    for browser in browsers]
+        results.extend(measured)
+        return measured
+
+    return run
+
+@pytest.fixture
+def stress_products(request):
+    """Product ids for TC-006 cart sizes; only the stand-in has 100+ products."""
+    if request.config.getoption("--store") != "local":
+        pytest.skip("the demo store has too few products for TC-006; use --store=local")
+    return stress.STRESS_PRODUCT_IDS
+
+@pytest.fixture
+def stress_runner(request):
+    """
+    Runs the stepped stress test; returns the report. Faults are injected
+    through the stand-in, so against the live store only the steps run.
+    """
+    spec = request.config.getoption("--stress-users")
+    local = request.config.getoption("--store") == "local"
+    if spec is None and not local:
+        pytest.skip("stress test against the live store needs an explicit --stress-users")
+    try:
+        start, step, most = (int(part) for part in (spec or "20,20,200").split(","))
+        max_error_rate, max_p95 = (float(part) for part in request.config.getoption("--stress-limits").split(","))
+    except ValueError:
+        raise pytest.UsageError("--stress-users is START,STEP,MAX and --stress-limits is ERROR_RATE,P95_SECONDS")
+    reports = request.config.__dict__.setdefault("_stress_reports", [])
+
+    def run(faults=None):
+        inject = None
+        if local:
+            store = request.getfixturevalue("standin_server").store
+
+            def set_faults(active):
+                store.faults = active
+            inject = set_faults
+        report = stress.run_stress(
+            store_url(request), start, step, most, request.config.getoption("--stress-step-seconds"),
+            stress.StressLimits(max_error_rate, max_p95), faults=faults, inject=inject,
+        )
+        reports.append(report)
+        return report
+
+    return run
+
 
+def pytest_terminal_summary(terminalreporter, config):
+    resolver = getattr(config, "_driver_resolver", None)
+    if resolver is not None and resolver.summary_lines():
+        terminalreporter.section("driver resolution")
+        for line in resolver.summary_lines():
+            terminalreporter.write_line(line)
+    pools = getattr(config, "_driver_pools", None)
+    if pools is not None and pools.summary_lines():
+        terminalreporter.section("driver pool")
+        for line in pools.summary_lines():
+            terminalreporter.write_line(line)
+    sessions = getattr(config, "_auth_sessions", None)
+    if sessions is not None and sessions.summary_lines():
+        terminalreporter.section("logged-in sessions")
+        for line in sessions.summary_lines():
+            terminalreporter.write_line(line)
+    seeder = getattr(config, "_seeder", None)
+    if seeder is not None and seeder.summary_lines():
+        terminalreporter.section("seeded preconditions")
+        for line in seeder.summary_lines():
+            terminalreporter.write_line(line)
+    # Teardown reports carry the counts; passed teardowns are filed under ""
+    reports = [report for reports in terminalreporter.stats.values() for report in reports]
+    samples = perf.collect(reports)
+    if samples and config.getoption("--perf-output"):
+        perf.write_report(config.getoption("--perf-output"), samples)
+    profiles_by_test = profiler.collect(reports)
+    if profiles_by_test and config.getoption("--command-trace"):
+        profiler.write_trace(config.getoption("--command-trace"), profiles_by_test)
+    audits = a11y.collect(reports)
+    layouts = visual.collect(reports)
+    entries = network.collect(reports)
+    exchanges = cassette.collect(reports)
+    if entries and config.getoption("--network-output"):
+        network.write_report(config.getoption("--network-output"), entries)
+    for title, lines in (("webdriver commands", commands.summary_lines(reports)),
+                         ("command profile", profiler.summary_lines(profiles_by_test, config.getoption("verbose") > 0)),
+                         ("waits", waits.summary_lines(reports)),
+                         ("input matrices", partitions.summary_lines(reports, config.getoption("verbose") > 0)),
+                         ("performance", perf.summary_lines(samples)),
+                         ("accessibility", a11y.summary_lines(audits, config.getoption("verbose") > 0)),
+                         ("visual layout", visual.summary_lines(layouts)),
+                         ("network", network.summary_lines(entries)),
+                         ("cassette", cassette.summary_lines(exchanges, config.getoption("--latency-profile")))):
+        if lines:
+            terminalreporter.section(title)
+            for line in lines:
+                terminalreporter.write_line(line)
+    plugin = getattr(config, "_history", None)
+    if plugin is not None and plugin.summary_lines():
+        terminalreporter.section("duration regressions")
+        for line in plugin.summary_lines():
+            terminalreporter.write_line(line)
+    plugin = getattr(config, "_flaky", None)
+    if plugin is not None and plugin.summary_lines():
+        terminalreporter.section("flaky tests")
+        for line in plugin.summary_lines():
+            terminalreporter.write_line(line)
+    plugin = getattr(config, "_contexts", None)
+    if plugin is not None and plugin.summary_lines(reports):
+        terminalreporter.section("browsing contexts")
+        for line in plugin.summary_lines(reports):
+            terminalreporter.write_line(line)
+    plugin = getattr(config, "_impact", None)
+    if plugin is not None and plugin.summary_lines():
+        terminalreporter.section("test impact")
+        for line in plugin.summary_lines():
+            terminalreporter.write_line(line)
+    plans = getattr(config, "_matrix_plans", None)
+    if plans:
+        terminalreporter.section("configuration matrix")
+        for name, plan in plans.items():
+            terminalreporter.write_line(plan.summary_line(name, config.getoption("--max-driver-uses")))
+    reports = getattr(config, "_model_reports", None)
+    if reports:
+        terminalreporter.section("state model coverage")
+        for report in reports:
+            for line in report.summary_lines():
+                terminalreporter.write_line(line)
+    reports = getattr(config, "_load_reports", None)
+    if reports:
+        terminalreporter.section("load")
+        for report in reports:
+            for line in report.summary_lines():
+                terminalreporter.write_line(line)
+            if config.getoption("verbose") > 0:
+                for name in sorted(report.histograms):
+                    terminalreporter.write_line(f"{name} latency histogram")
+                    for line in report.histogram_lines(name):
+                        terminalreporter.write_line(line)
+        if config.getoption("--load-output"):
+            load.write_report(config.getoption("--load-output"), reports)
+    results = getattr(config, "_profile_results", None)
+    if results:
+        terminalreporter.section("execution profiles")
+        for line in profiles.summary_lines(results):
+            terminalreporter.write_line(line)
+    reports = getattr(config, "_stress_reports", None)
+    if reports:
+        terminalreporter.section("stress")
+        for report in reports:
+            for line in report.summary_lines():
+                terminalreporter.write_line(line)
@@ -0,0 +1,6 @@
+"""
+Shared test infrastructure for the OpenCart automation suite.
+
+The modules in this package are used by ``tests/conftest.py`` and the test
+files; they hold no tests themselves.
+"""
@@ -0,0 +1,321 @@
+"""
+In-page accessibility audits.
+
+TC-020 used to read the first 5 images and 10 links back over WebDriver,
+which is too slow to scale to a whole page. ``AUDIT_SCRIPT`` evaluates
+``RULES`` over the whole DOM in one ``execute_script`` call and returns a
+compact result. It covers alt text, link and button names, heading order,
+label association, colour contrast, the document title and language.
+Contrast is computed from the computed foreground colour and the blended
+backgrounds behind it. Text over a background image cannot be judged this
+way and is counted as incomplete, not as a violation.
+
+The script first hashes the serialised DOM. Hashes already audited in this
+process are passed in with the call, so an unchanged page answers with just
+its hash and the cached result is reused. Only a page that has changed pays
+for the rules.
+
+``A11yProbe`` audits every page a browser test visits. It audits the current
+page before each ``driver.get`` and once more when the test ends. The script
+goes past the command counter, like the perf probe's, so audits do not show
+up as test commands. Results are attached as the ``a11y`` user property and
+summarised in the "accessibility" section. ``--a11y=enforce`` fails tests
+whose pages violate a rule.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+
+from .commands import raw_execute, restore_execute
+from .perf import route_of
+
+PROPERTY = "a11y"
+
+# rule -> (WCAG 2.1 success criterion, what it checks)
+RULES = {
+    "document-title": ("2.4.2", "the page has a title"),
+    "html-has-lang": ("3.1.1", "<html> declares its language"),
+    "image-alt": ("1.1.1", "images have alternative text"),
+    "link-name": ("2.4.4", "links have an accessible name"),
+    "button-name": ("4.1.2", "buttons have an accessible name"),
+    "heading-order": ("1.3.1", "heading levels only increase one at a time"),
+    "label": ("1.3.1", "form fields have a label"),
+    "color-contrast": ("1.4.3", "text contrast is at least 4.5:1 (3:1 for large text)"),
+}
+
+MAX_DETAILS = 10    # violations detailed per rule and page; the counts are always exact
+
+AUDIT_SCRIPT = """
+var known = arguments[0] || [], maxDetails = arguments[1];
+if (!/^https?:/.test(location.href) || !document.body) return null;
+var html = document.documentElement.outerHTML, h = 0x811c9dc5;
+for (var i = 0; i < html.length; i++) { h ^= html.charCodeAt(i); h = Math.imul(h, 16777619); }
+var hash = (h >>> 0).toString(16) + ':' + html.length;
+if (known.indexOf(hash) !== -1) return {hash: hash, url: location.href, cached: true};
+
+var checked = {}, failed = {}, violations = [], incomplete = 0, styles = new Map(), backgrounds = new Map();
+function style(el) {
+  if (!styles.has(el)) styles.set(el, getComputedStyle(el));
+  return styles.get(el);
+}
+function describe(el) {
+  var out = el.tagName.toLowerCase();
+  if (el.id) return out + '#' + el.id;
+  if (typeof el.className === 'string' && el.className.trim())
+    out += '.' + el.className.trim().split(/\\s+/).slice(0, 2).join('.');
+  var parent = el.parentElement;
+  if (parent) {
+    var same = Array.prototype.filter.call(parent.children, function (c) { return c.tagName === el.tagName; });
+    if (same.length > 1) out += ':nth-of-type(' + (same.indexOf(el) + 1) + ')';
+  }
+  return out;
+}
+function check(rule, el, ok, detail) {
+  checked[rule] = (checked[rule] || 0) + 1;
+  if (ok) return;
+  failed[rule] = (failed[rule] || 0) + 1;
+  if (failed[rule] <= maxDetails) violations.push([rule, describe(el), String(detail || '').slice(0, 80)]);
+}
+function hidden(el) {
+  if (el.closest('[aria-hidden="true"]')) return true;
+  var s = style(el);
+  return s.display === 'none' || s.visibility === 'hidden' || !el.getClientRects().length;
+}
+function text(el) { return (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim(); }
+function labelledBy(el) {
+  return (el.getAttribute('aria-labelledby') || '').split(/\\s+/).map(function (id) {
+    var target = id && document.getElementById(id);
+    return target ? text(target) : '';
+  }).join(' ').trim();
+}
+function accessibleName(el) {
+  return (el.getAttribute('aria-label') || '').trim() || labelledBy(el) || text(el) ||
+    Array.prototype.map.call(el.querySelectorAll('img[alt]'), function (img) { return img.alt; }).join(' ').trim() ||
+    (el.getAttribute('title') || '').trim();
+}
+function each(selector, fn) {
+  Array.prototype.forEach.call(document.querySelectorAll(selector), function (el) { if (!hidden(el)) fn(el); });
+}
+
+check('document-title', document.documentElement, document.title.trim(), '');
+check('html-has-lang', document.documentElement, document.documentElement.getAttribute('lang'), '');
+each('img', function (img) {
+  var role = img.getAttribute('role');
+  if (role === 'presentation' || role === 'none') return;
+  check('image-alt', img, img.hasAttribute('alt') || img.getAttribute('aria-label') || labelledBy(img),
+        img.getAttribute('src'));
+});
+each('a[href]', function (a) { check('link-name', a, accessibleName(a), a.getAttribute('href')); });
+each('button, input[type=submit], input[type=button], input[type=reset]', function (button) {
+  check('button-name', button, accessibleName(button) || (button.value || '').trim(), button.outerHTML);
+});
+var previous = 0;
+each('h1, h2, h3, h4, h5, h6, [role=heading]', function (heading) {
+  var level = /^H[1-6]$/.test(heading.tagName) ? +heading.tagName[1] : +(heading.getAttribute('aria-level') || 2);
+  check('heading-order', heading, !previous || level <= previous + 1, 'h' + previous + ' -> h' + level);
+  previous = level;
+});
+each('input, select, textarea', function (field) {
+  var type = (field.getAttribute('type') || '').toLowerCase();
+  if (['hidden', 'submit', 'button', 'reset', 'image'].indexOf(type) !== -1) return;
+  var labels = Array.prototype.some.call(field.labels || [], function (label) { return text(label); });
+  check('label', field, labels || (field.getAttribute('aria-label') || '').trim() || labelledBy(field) ||
+        (field.getAttribute('title') || '').trim() || (field.getAttribute('placeholder') || '').trim(),
+        field.name || type);
+});
+
+function rgba(value) {
+  var parts = (value || '').match(/[\\d.]+/g);
+  return parts ? [+parts[0], +parts[1], +parts[2], parts.length > 3 ? +parts[3] : 1] : null;
+}
+function blend(top, bottom) {
+  var a = top[3];
+  return [top[0] * a + bottom[0] * (1 - a), top[1] * a + bottom[1] * (1 - a), top[2] * a + bottom[2] * (1 - a), 1];
+}
+function background(el) {
+  // Opaque colour behind el, or null when an image or gradient is in the way
+  if (!el || el.nodeType !== 1) return [255, 255, 255, 1];
+  if (backgrounds.has(el)) return backgrounds.get(el);
+  var s = style(el), result;
+  if (s.backgroundImage !== 'none') {
+    result = null;
+  } else {
+    var color = rgba(s.backgroundColor), behind = color && color[3] >= 1 ? null : background(el.parentElement);
+    result = color && color[3] >= 1 ? color : (behind && color && color[3] > 0 ? blend(color, behind) : behind);
+  }
+  backgrounds.set(el, result);
+  return result;
+}
+function luminance(c) {
+  var v = c.slice(0, 3).map(function (x) {
+    x /= 255;
+    return x <= 0.03928 ? x / 12.92 : Math.pow((x + 0.055) / 1.055, 2.4);
+  });
+  return 0.2126 * v[0] + 0.7152 * v[1] + 0.0722 * v[2];
+}
+var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT), seen = new Set(), node;
+while ((node = walker.nextNode())) {
+  var el = node.parentElement;
+  if (!el || seen.has(el) || !node.nodeValue.trim()) continue;
+  seen.add(el);
+  if (/^(SCRIPT|STYLE|NOSCRIPT|OPTION)$/.test(el.tagName) || hidden(el) || +style(el).opacity === 0) continue;
+  var bg = background(el);
+  if (!bg) { incomplete++; continue; }
+  var fg = blend(rgba(style(el).color), bg), l1 = luminance(fg), l2 = luminance(bg);
+  var ratio = (Math.max(l1, l2) + 0.05) / (Math.min(l1, l2) + 0.05);
+  var size = parseFloat(style(el).fontSize), bold = parseInt(style(el).fontWeight, 10) >= 700;
+  check('color-contrast', el, ratio >= (size >= 24 || (bold && size >= 18.66) ? 3 : 4.5), ratio.toFixed(2) + ':1');
+}
+return {hash: hash, url: location.href, cached: false, checked: checked, failed: failed, violations: violations,
+        incomplete: incomplete};
+"""
+
+
+class AuditResult(namedtuple("AuditResult", "url hash checked failed violations incomplete cached")):
+    """
+    ``checked``/``failed``: rule -> elements checked / violating it.
+    ``violations``: (rule, element, detail), the first ``MAX_DETAILS`` per rule.
+    """
+
+    @property
+    def total(self):
+        return sum(self.failed.values())
+
+    def violations_of(self, rule):
+        return [violation for violation in self.violations if violation[0] == rule]
+
+    def as_property(self):
+        return {"url": self.url, "route": route_of(self.url), "hash": self.hash, "checked": self.checked,
+                "failed": self.failed, "violations": [list(violation) for violation in self.violations],
+                "incomplete": self.incomplete, "cached": self.cached}
+
+
+class Auditor:
+    """Runs ``AUDIT_SCRIPT`` and keeps the results per DOM hash for the whole process."""
+
+    def __init__(self):
+        self.results = {}
+        self.audits = 0
+        self.cache_hits = 0
+
+    def audit(self, driver):
+        """Audit the current page; None for non-http pages or a page that is going away."""
+        try:
+            raw = raw_execute(driver, Command.W3C_EXECUTE_SCRIPT,
+                              {"script": AUDIT_SCRIPT, "args": [list(self.results), MAX_DETAILS]})["value"]
+        except WebDriverException:
+            return None
+        if raw is None:
+            return None
+        if raw["cached"] and raw["hash"] in self.results:
+            self.cache_hits += 1
+            return self.results[raw["hash"]]._replace(url=raw["url"], cached=True)
+        self.audits += 1
+        result = AuditResult(raw["url"], raw["hash"], raw["checked"], raw["failed"],
+                             [tuple(item) for item in raw["violations"]], raw["incomplete"], False)
+        self.results[result.hash] = result
+        return result
+
+
+AUDITOR = Auditor()
+
+
+class A11yProbe:
+    """Audits the page a browser is on before every ``get`` and at the end of the test."""
+
+    def __init__(self, driver, auditor=AUDITOR):
+        self.driver = driver
+        self.auditor = auditor
+        self.results = []
+        self._previous = None
+        self._wrapped = False
+
+    def audit(self):
+        result = self.auditor.audit(self.driver)
+        if result is not None and not any(seen.hash == result.hash and seen.url == result.url
+                                          for seen in self.results):
+            self.results.append(result)
+        return result
+
+    def start(self):
+        self._previous = self.driver.__dict__.get("execute")
+        forward = self.driver.execute
+
+        def execute(command, params=None):
+            if command == Command.GET:
+                self.audit()
+            return forward(command, params)
+
+        self.driver.execute = execute
+        self._wrapped = True
+
+    def stop(self):
+        if self._wrapped:
+            restore_execute(self.driver, self._previous)
+            self._wrapped = False
+        self.audit()
+        return self.results
+
+
+PROBE_KEY = pytest.StashKey()
+
+
+@contextmanager
+def probe(request, driver):
+    """Audit every page ``driver`` visits during the test (unless ``--a11y=off``)."""
+    mode = request.config.getoption("--a11y")
+    if mode == "off":
+        yield None
+        return
+    a11y_probe = A11yProbe(driver)
+    a11y_probe.start()
+    request.node.stash[PROBE_KEY] = a11y_probe
+    try:
+        yield a11y_probe
+    finally:
+        results = a11y_probe.stop()
+        request.node.user_properties.append((PROPERTY, [result.as_property() for result in results]))
+    problems = [f"{result.url}: {rule} {element} {detail}".rstrip()
+                for result in results for rule, element, detail in result.violations]
+    if problems and mode == "enforce":
+        pytest.fail("Accessibility violations: " + "; ".join(problems[:10]), pytrace=False)
+
+
+def collect(reports):
+    return [
+        entry
+        for report in reports
+        for name, value in getattr(report, "user_properties", ())
+        if name == PROPERTY
+        for entry in value
+    ]
+
+
+def summary_lines(entries, verbose=False):
+    if not entries:
+        return []
+    pages = {}
+    for entry in entries:
+        pages.setdefault(entry["hash"], entry)
+    cached = sum(1 for entry in entries if entry["cached"])
+    failing = [entry for entry in pages.values() if entry["failed"]]
+    lines = [f"{len(entries)} page audits, {len(pages)} distinct DOMs ({cached} answered from the DOM-hash cache); "
+             f"{len(failing)} with violations"]
+    per_rule = {}
+    for entry in pages.values():
+        for rule, count in entry["failed"].items():
+            counts = per_rule.setdefault(rule, [0, set()])
+            counts[0] += count
+            counts[1].add(entry["route"])
+    for rule, (count, routes) in sorted(per_rule.items()):
+        criterion, description = RULES[rule]
+        lines.append(f"  {rule} (WCAG {criterion}, {description}): {count} on {', '.join(sorted(routes))}")
+    if verbose:
+        for entry in failing:
+            lines.append(f"{entry['url']} ({sum(entry['failed'].values())} violations, "
+                         f"{entry['incomplete']} contrast checks incomplete):")
+            lines.extend(f"    {rule}  {element}  {detail}" for rule, element, detail in entry["violations"])
+    return lines
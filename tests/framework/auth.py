@@ -0,0 +1,264 @@
+"""
+Authenticated-session snapshots.
+
+Logged-in scenarios used to be skipped because reaching them meant
+registering and logging in through the UI every time. ``AuthSessions``
+logs in once per session over HTTP (``StoreClient``). It registers an
+account the first time, and afterwards reuses the one cached in the pytest
+cache. It captures the result as a ``SessionSnapshot``: cookies, plus
+local/session storage when the snapshot is taken from a browser.
+
+``login_driver`` puts a snapshot into a leased browser in one step. On
+Chromium that is a single CDP ``Network.setCookies`` call with no page
+load; other browsers need one request on the store's origin before
+``add_cookie``. ``login_client`` does the same for a ``StoreClient`` cookie
+jar.
+
+``--workers`` subprocesses run without the pytest cache. The controller
+copies its snapshots into a ``FileCache`` it hands to every worker
+(``--worker-auth``) and takes the file back when they are done, so workers
+log in with the cached account instead of registering new ones.
+
+Before every injection the snapshot is checked: an expired cookie or an
+account page that redirects to login (the session timed out or a test
+logged out) triggers a fresh login. Every lease shares the one server-side
+session, so logged-in tests must not assume an empty cart or wish list.
+"""
+import json
+import os
+import secrets
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+from .http_backend import StoreClient
+
+CACHE_KEY = "opencart/auth"
+
+Account = namedtuple("Account", "email password firstname lastname telephone")
+
+STORAGE_SCRIPT = """
+function dump(storage) {
+  var out = {};
+  for (var i = 0; i < storage.length; i++) out[storage.key(i)] = storage.getItem(storage.key(i));
+  return out;
+}
+return [dump(window.localStorage), dump(window.sessionStorage)];
+"""
+
+RESTORE_STORAGE_SCRIPT = """
+var local = arguments[0], session = arguments[1];
+Object.keys(local).forEach(function (key) { window.localStorage.setItem(key, local[key]); });
+Object.keys(session).forEach(function (key) { window.sessionStorage.setItem(key, session[key]); });
+"""
+
+
+def new_account():
+    token = secrets.token_hex(6)
+    return Account(f"suite-{token}@example.com", f"Pw-{token}", "Suite", "Tester", "0123456789")
+
+
+class FileCache:
+    """The ``get``/``set`` half of pytest's cache, over one JSON file shared by processes."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, default):
+        return self._read().get(key, default)
+
+    def set(self, key, value):
+        data = self._read()
+        data[key] = value
+        # Replaced in one step: another worker never reads a half-written file
+        partial = f"{self.path}.{os.getpid()}"
+        with open(partial, "w") as handle:
+            json.dump(data, handle)
+        os.replace(partial, self.path)
+
+
+class SessionSnapshot:
+    """Cookies (WebDriver cookie dicts) and storage of one logged-in session."""
+
+    def __init__(self, account, cookies, local_storage=None, session_storage=None, captured=None):
+        self.account = account
+        self.cookies = cookies
+        self.local_storage = local_storage or {}
+        self.session_storage = session_storage or {}
+        self.captured = captured or time.time()
+
+    def expired(self, now=None):
+        """A cookie's own expiry has passed (server-side timeouts are caught by ``AuthSessions``)."""
+        now = now or time.time()
+        return any(cookie.get("expiry") is not None and cookie["expiry"] <= now for cookie in self.cookies)
+
+    def as_dict(self):
+        return {"account": self.account._asdict(), "cookies": self.cookies, "local_storage": self.local_storage,
+                "session_storage": self.session_storage, "captured": self.captured}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(Account(**data["account"]), data["cookies"], data.get("local_storage"),
+                   data.get("session_storage"), data.get("captured"))
+
+
+def capture_client(client, account):
+    cookies = []
+    for cookie in client.session.cookies:
+        entry = {"name": cookie.name, "value": cookie.value, "domain": cookie.domain,
+                 "path": cookie.path or "/", "secure": bool(cookie.secure),
+                 "httpOnly": cookie.has_nonstandard_attr("HttpOnly")}
+        if cookie.expires is not None:
+            entry["expiry"] = int(cookie.expires)
+        cookies.append(entry)
+    return SessionSnapshot(account, cookies)
+
+
+def capture_driver(driver, account):
+    """Snapshot a browser that is logged in and on the store's origin."""
+    local_storage, session_storage = driver.execute_script(STORAGE_SCRIPT)
+    return SessionSnapshot(account, driver.get_cookies(), local_storage, session_storage)
+
+
+def inject_client(client, snapshot):
+    for cookie in snapshot.cookies:
+        client.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                                   path=cookie.get("path", "/"), expires=cookie.get("expiry"),
+                                   secure=cookie.get("secure", False))
+
+
+def inject_driver(driver, snapshot, base_url):
+    """
+    Put ``snapshot`` into ``driver``. Returns the number of page loads it
+    took: 0 over CDP, 1 where cookies can only be set on the origin.
+    """
+    storage = snapshot.local_storage or snapshot.session_storage
+    if not storage and hasattr(driver, "execute_cdp_cmd"):
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": [_cdp_cookie(cookie, base_url)
+                                                                      for cookie in snapshot.cookies]})
+            return 0
+        except WebDriverException:
+            pass
+    # add_cookie only works for the domain of the current document
+    parts = urlsplit(base_url)
+    driver.get(f"{parts.scheme}://{parts.netloc}/robots.txt")
+    for cookie in snapshot.cookies:
+        driver.add_cookie({key: value for key, value in cookie.items()
+                           if key in ("name", "value", "path", "secure", "httpOnly", "expiry", "sameSite")})
+    if storage:
+        driver.execute_script(RESTORE_STORAGE_SCRIPT, snapshot.local_storage, snapshot.session_storage)
+    return 1
+
+
+def _cdp_cookie(cookie, base_url):
+    entry = {"name": cookie["name"], "value": cookie["value"], "path": cookie.get("path", "/"),
+             "secure": cookie.get("secure", False), "httpOnly": cookie.get("httpOnly", False)}
+    domain = cookie.get("domain")
+    if domain and domain.startswith("."):
+        entry["domain"] = domain
+    else:
+        entry["url"] = base_url
+    if cookie.get("expiry") is not None:
+        entry["expires"] = cookie["expiry"]
+    return entry
+
+
+class AuthSessions:
+    """One logged-in account shared by every browser lease and HTTP client that asks for it."""
+
+    def __init__(self, base_url, adapter=None, cache=None):
+        self.base_url = base_url
+        self.adapter = adapter
+        self.cache = cache
+        self.snapshot = None
+        self.registrations = 0
+        self.logins = 0
+        self.refreshes = 0
+        self.injections = 0
+        self.page_loads = 0
+        self._load_cached()
+
+    def _load_cached(self):
+        if self.cache is None:
+            return
+        entry = self.cache.get(CACHE_KEY, {}).get(self.base_url)
+        if entry:
+            self.snapshot = SessionSnapshot.from_dict(entry)
+
+    def _save_cached(self):
+        if self.cache is None:
+            return
+        entries = self.cache.get(CACHE_KEY, {})
+        entries[self.base_url] = self.snapshot.as_dict()
+        self.cache.set(CACHE_KEY, entries)
+
+    def _client(self):
+        return StoreClient(self.base_url, adapter=self.adapter)
+
+    def _logged_in(self, snapshot):
+        client = self._client()
+        try:
+            inject_client(client, snapshot)
+            return client.is_logged_in()
+        finally:
+            client.close()
+
+    def _login(self):
+        """Log the cached account in again, or register a new one."""
+        account = self.snapshot.account if self.snapshot is not None else None
+        client = self._client()
+        try:
+            if account is not None:
+                client.login(account.email, account.password)
+                self.logins += 1
+            if account is None or not client.is_logged_in():
+                account = new_account()
+                client.clear_cookies()
+                client.register(account.firstname, account.lastname, account.email, account.telephone,
+                                account.password)
+                self.registrations += 1
+                if not client.is_logged_in():
+                    raise RuntimeError(f"Could not register a test account on {self.base_url}: "
+                                       f"{client.last_alerts or client.last_page.title}")
+            self.snapshot = capture_client(client, account)
+        finally:
+            client.close()
+        self._save_cached()
+
+    def current(self):
+        """A snapshot that is logged in right now, refreshed if it expired."""
+        if self.snapshot is None:
+            self._login()
+        elif self.snapshot.expired() or not self._logged_in(self.snapshot):
+            self.refreshes += 1
+            self._login()
+        return self.snapshot
+
+    def login_driver(self, driver):
+        snapshot = self.current()
+        self.page_loads += inject_driver(driver, snapshot, self.base_url)
+        self.injections += 1
+        return snapshot.account
+
+    def login_client(self, client):
+        snapshot = self.current()
+        inject_client(client, snapshot)
+        self.injections += 1
+        return snapshot.account
+
+    def summary_lines(self):
+        if not self.injections:
+            return []
+        return [f"{self.injections} logged-in session(s) from {self.registrations} registration(s) and "
+                f"{self.logins} login(s) ({self.refreshes} refreshed after expiry); "
+                f"{self.page_loads} page loads spent injecting"]
@@ -0,0 +1,52 @@
+"""
+Browser factories used by the driver pool.
+
+Each factory starts one browser with the flags of an execution profile
+(see profiles.py; ``fast-headless`` unless ``--execution-profile`` says
+otherwise). Keeping them here means the Chrome fixture in conftest.py and the
+Firefox/Edge fixtures in test_06 build their browsers the same way. Driver
+binaries come from a ``DriverResolver`` (see drivers.py). With a
+``NetworkLayer`` (see network.py), Chromium browsers are intercepted over
+CDP once launched and Firefox is started behind its proxy.
+"""
+from functools import partial
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.firefox.service import Service as FirefoxService
+
+from .profiles import DEFAULT_PROFILE, PROFILES, configure_chromium, configure_firefox
+
+
+def create_chrome(resolver, network=None, profile=PROFILES[DEFAULT_PROFILE]):
+    options = configure_chromium(ChromeOptions(), profile)
+    driver = webdriver.Chrome(service=ChromeService(resolver.resolve("chrome")), options=options)
+    return network.attach(driver) if network is not None else driver
+
+
+def create_firefox(resolver, network=None, profile=PROFILES[DEFAULT_PROFILE]):
+    options = configure_firefox(webdriver.FirefoxOptions(), profile)
+    if network is not None:
+        for name, value in network.firefox_preferences().items():
+            options.set_preference(name, value)
+    return webdriver.Firefox(service=FirefoxService(resolver.resolve("firefox")), options=options)
+
+
+def create_edge(resolver, network=None, profile=PROFILES[DEFAULT_PROFILE]):
+    options = configure_chromium(webdriver.EdgeOptions(), profile)
+    driver = webdriver.Edge(service=EdgeService(resolver.resolve("edge")), options=options)
+    return network.attach(driver) if network is not None else driver
+
+
+BROWSER_FACTORIES = {
+    "chrome": create_chrome,
+    "firefox": create_firefox,
+    "edge": create_edge,
+}
+
+
+def bind_factories(resolver, network=None, profile=PROFILES[DEFAULT_PROFILE]):
+    """Zero-argument factories for ``DriverPools``."""
+    return {name: partial(factory, resolver, network, profile) for name, factory in BROWSER_FACTORIES.items()}
@@ -0,0 +1,434 @@
+"""
+Record and replay of the store's HTTP traffic.
+
+Against the live demo every run pays the network round-trips and sees
+whatever content the store serves that day. With ``--cassette`` the
+browsers and the ``StoreClient`` backend talk to ``CassetteProxy``, a local
+reverse proxy that becomes ``base_url``:
+
+- ``record`` forwards every request to the store and stores the response;
+- ``replay`` answers from the cassette and never contacts the store. A
+  request that was not recorded gets a 502, so a hermetic run cannot
+  quietly go back to the network. A latency profile (``LATENCY_PROFILES``)
+  can add a simulated round-trip and bandwidth to every response.
+
+A cassette is a directory: ``index.json`` maps each request key to the
+recorded status, headers, upstream time and body digest, and the bodies are
+stored once per SHA-256 under ``bodies/``. The key is the normalised
+request: method, path, sorted query without cache busters, and form fields
+sorted with account details (``VOLATILE_FIELDS``) masked, since every run
+registers a fresh account. A request repeated in the same session and
+state is numbered (``#1``, ``#2``...): a flash message makes the first cart
+page after an update differ from the next one.
+
+Cart, wish list, checkout and login responses depend on the session.
+Those keys also carry the session's state: a digest of the state-changing
+requests (POSTs, ``STATE_CHANGING_ROUTES``) made in it so far. A cart page
+after "add MacBook" replays the response recorded after the same add,
+whichever test or session id it came from. The proxy hands out its own
+``OCSESSID`` values and, when recording, maps them to the store's, so a
+digest means the same state in both modes. Static assets are keyed without
+a session.
+
+Absolute URLs and redirects to the store's origin are stored with
+``PORTABLE_ORIGIN`` in its place and served with the proxy's origin, so a
+cassette depends neither on the proxy's port nor on the stand-in's. Every exchange is attached to the
+test that was running as the ``cassette`` user property. The "cassette"
+summary section gives the hit rate, the recorded upstream time the replay
+avoided, and the requests missing from the cassette.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.cookies import CookieError, SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from .http_backend import SESSION_COOKIE
+from .network import EXTENSION_TYPES, HOP_BY_HOP
+
+PROPERTY = "cassette"
+
+# name -> (round-trip ms, downstream kbit/s); None: no bandwidth limit
+LATENCY_PROFILES = {
+    "none": (0.0, None),
+    "dc": (0.5, 1_000_000),
+    "4g": (40.0, 9_000),
+    "3g": (562.5, 1_440),       # Chrome DevTools "Fast 3G"
+}
+
+IGNORED_PARAMS = {"_"}
+VOLATILE_FIELDS = {"email", "password", "confirm", "firstname", "lastname", "telephone"}
+STATE_CHANGING_ROUTES = {"account/logout"}
+TEXT_TYPES = ("text/", "javascript", "json", "xml")
+PORTABLE_ORIGIN = "http://store.cassette.invalid"
+
+
+def is_static(path):
+    return os.path.splitext(urlsplit(path).path)[1].lower() in EXTENSION_TYPES
+
+
+def normalize(method, target, body=b"", content_type=None):
+    """``METHOD path?query [body]`` with the query sorted and cache busters dropped."""
+    parts = urlsplit(target)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in IGNORED_PARAMS)
+    key = f"{method} {parts.path}" + (f"?{urlencode(query, safe='/*')}" if query else "")
+    if body:
+        if (content_type or "").startswith("application/x-www-form-urlencoded"):
+            fields = sorted((name, "*" if name in VOLATILE_FIELDS else value)
+                            for name, value in parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True))
+            key += f" {urlencode(fields, safe='/*[]')}"
+        else:
+            key += f" sha256:{hashlib.sha256(body).hexdigest()[:16]}"
+    return key
+
+
+def changes_state(method, target):
+    route = dict(parse_qsl(urlsplit(target).query)).get("route")
+    return method == "POST" or route in STATE_CHANGING_ROUTES
+
+
+def rewrite(data, old_origin, new_origin):
+    """Point absolute URLs (plain or JSON-escaped) at ``new_origin``."""
+    for old, new in ((old_origin, new_origin), (old_origin.replace("/", "\\/"), new_origin.replace("/", "\\/"))):
+        data = data.replace(old.encode(), new.encode())
+    return data
+
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def local_cookie(header, session_id=None):
+    """A ``Set-Cookie`` value the browser keeps on the proxy's plain-HTTP origin."""
+    name_value, *attributes = [part.strip() for part in header.split(";")]
+    if session_id is not None:
+        name_value = f"{SESSION_COOKIE}={session_id}"
+    kept = [attribute for attribute in attributes
+            if attribute.split("=")[0].strip().lower() not in ("domain", "secure", "samesite")]
+    return "; ".join([name_value] + kept)
+
+
+def portable(headers, data, old_origin, new_origin):
+    """Redirects and text bodies with ``old_origin`` replaced by ``new_origin``."""
+    out = []
+    for name, value in headers:
+        lower = name.lower()
+        if lower == "location":
+            value = value.replace(old_origin, new_origin)
+        elif lower == "content-type" and any(kind in value for kind in TEXT_TYPES):
+            data = rewrite(data, old_origin, new_origin)
+        out.append((name, value))
+    return out, data
+
+
+class Cassette:
+    """Request key -> recorded response; bodies are stored once per SHA-256 under ``bodies/``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self.entries = self._read_index()
+        self._added = {}
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, "bodies", digest[:2], digest)
+
+    def get(self, key):
+        """(status, headers, body, upstream ms) or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            with open(self._body_path(entry["body"]), "rb") as handle:
+                body = handle.read()
+        except OSError:
+            return None
+        return entry["status"], [tuple(header) for header in entry["headers"]], body, entry["ms"]
+
+    def put(self, key, status, headers, body, ms):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._body_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as handle:
+                handle.write(body)
+            os.replace(temporary, path)
+        entry = {"status": status, "headers": [list(header) for header in headers], "body": digest,
+                 "ms": round(ms, 1), "recorded": time.time()}
+        with self._lock:
+            self.entries[key] = self._added[key] = entry
+
+    def save(self):
+        """Merge this process's recordings into the index on disk (workers share it)."""
+        with self._lock:
+            added, self._added = self._added, {}
+        if not added:
+            return
+        index = self._read_index()
+        index.update(added)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(index, handle, indent=0, sort_keys=True)
+        os.replace(temporary, self.index_path)
+
+
+class Session:
+    """One client session: the proxy's id, the store's id (recording) and the state digest."""
+
+    def __init__(self, session_id, upstream=None, digest=""):
+        self.id = session_id
+        self.upstream = upstream
+        self.digest = digest
+        self.seen = {}      # key -> times requested: flash messages make repeats differ
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OpenCartCassette"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._exchange()
+
+    def do_HEAD(self):
+        self._exchange()
+
+    def do_POST(self):
+        self._exchange()
+
+    def _exchange(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, headers, body = self.server.exchange(self.command, self.path, self.headers, body)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+class CassetteProxy(ThreadingHTTPServer):
+    """
+    Reverse proxy in front of ``upstream`` (the store's base URL). ``mode`` is
+    ``record`` or ``replay``; ``latency`` names a ``LATENCY_PROFILES`` entry
+    applied to replayed responses.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, upstream, cassette, mode="replay", latency="none"):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.upstream = upstream
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.upstream_origin = origin_of(upstream)
+        self.origin = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self.base_url = self.origin + urlsplit(upstream).path
+        self.sessions = {}
+        self.log = []                   # [action, key, upstream ms, served ms] per exchange
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self.serve_forever, name="cassette-proxy", daemon=True)
+        self._thread.start()
+
+    def _session_of(self, headers):
+        try:
+            cookie = SimpleCookie(headers.get("Cookie", ""))
+        except CookieError:
+            return None
+        if SESSION_COOKIE not in cookie:
+            return None
+        with self._lock:
+            return self.sessions.get(cookie[SESSION_COOKIE].value)
+
+    def _http(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+            self._local.session.trust_env = False
+        return self._local.session
+
+    def _fetch(self, method, target, headers, body, session):
+        """(status, headers, body, ms) from the store, sent with the store's session id; None if unreachable."""
+        forward = {}
+        for name, value in headers.items():
+            lower = name.lower()
+            if lower in HOP_BY_HOP or lower in ("host", "accept-encoding", "cookie"):
+                continue
+            forward[name] = value.replace(self.origin, self.upstream_origin)
+        cookie = SimpleCookie()
+        try:
+            cookie.load(headers.get("Cookie", ""))
+        except CookieError:
+            pass
+        pairs = [(name, morsel.value) for name, morsel in cookie.items() if name != SESSION_COOKIE]
+        if session is not None and session.upstream is not None:
+            pairs.append((SESSION_COOKIE, session.upstream))
+        if pairs:
+            forward["Cookie"] = "; ".join(f"{name}={value}" for name, value in pairs)
+        http = self._http()
+        started = time.perf_counter()
+        try:
+            response = http.request(method, self.upstream_origin + target, headers=forward, data=body or None,
+                                    allow_redirects=False, timeout=30)
+            content = response.content
+        except requests.RequestException:
+            return None
+        finally:
+            http.cookies.clear()
+        headers = [(name, value) for name, value in response.raw.headers.items() if name.lower() not in HOP_BY_HOP]
+        return response.status_code, headers, content, (time.perf_counter() - started) * 1000
+
+    def _join(self, session, headers):
+        """The session the response belongs to: a new one when it sets a session cookie on a request without."""
+        for name, value in headers:
+            if name.lower() == "set-cookie" and value.split("=", 1)[0].strip() == SESSION_COOKIE:
+                with self._lock:
+                    if session is None:
+                        session = Session(os.urandom(13).hex())
+                        self.sessions[session.id] = session
+                    if self.mode == "record":
+                        session.upstream = value.split("=", 1)[1].split(";", 1)[0]
+        return session
+
+    @staticmethod
+    def _cookie(value, session):
+        """A recorded ``Set-Cookie``, with the proxy's id in place of the store's session id."""
+        is_session = value.split("=", 1)[0].strip() == SESSION_COOKIE
+        return local_cookie(value, session.id if is_session else None)
+
+    def _log(self, action, key, upstream_ms, started):
+        with self._lock:
+            self.log.append([action, key, round(upstream_ms, 1), round((time.perf_counter() - started) * 1000, 3)])
+
+    def exchange(self, method, target, headers, body):
+        """(status, headers, body) to send back for one request."""
+        started = time.perf_counter()
+        session = self._session_of(headers)
+        request_key = normalize(method, target, body, headers.get("Content-Type"))
+        static = is_static(target)
+        key, repeat = request_key, 0
+        if not static:
+            key = f"{request_key} @{session.digest if session else ''}"
+            if session is not None:
+                with self._lock:
+                    repeat = session.seen[key] = session.seen.get(key, 0) + 1
+                repeat -= 1
+        if self.mode == "record":
+            key += f" #{repeat}" if repeat else ""
+            recorded = self._fetch(method, target, headers, body, session)
+            if recorded is None:
+                self._log("error", key, 0.0, started)
+                return 502, [("Content-Type", "text/plain")], f"Store unreachable: {key}".encode()
+            status, stored, data, upstream_ms = recorded
+            recorded = (status, *portable(stored, data, self.upstream_origin, PORTABLE_ORIGIN), upstream_ms)
+            self.cassette.put(key, *recorded)
+            action = "record"
+        else:
+            # A request repeated more often than when recording gets the last recorded repeat
+            for candidate in [key + (f" #{n}" if n else "") for n in range(repeat, -1, -1)]:
+                recorded = self.cassette.get(candidate)
+                if recorded is not None:
+                    key = candidate
+                    break
+            if recorded is None:
+                self._log("miss", key, 0.0, started)
+                return 502, [("Content-Type", "text/plain"), ("X-Cassette", "miss")], \
+                    f"Not in the cassette: {key}".encode()
+            action = "hit"
+        status, stored, data, upstream_ms = recorded
+        session = self._join(session, stored)
+        stored, data = portable(stored, data, PORTABLE_ORIGIN, self.origin)
+        served = [(name, self._cookie(value, session) if name.lower() == "set-cookie" else value)
+                  for name, value in stored]
+        if session is not None and not static and changes_state(method, target):
+            with self._lock:
+                session.digest = hashlib.sha256(f"{session.digest}\n{request_key}".encode()).hexdigest()[:16]
+        if action == "hit":
+            rtt, kbps = LATENCY_PROFILES[self.latency]
+            delay = rtt / 1000 + (len(data) * 8 / (kbps * 1000) if kbps else 0.0)
+            remaining = delay - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+        self._log(action, key, upstream_ms, started)
+        return status, served, data
+
+    @contextmanager
+    def record(self, request):
+        """Attach the exchanges made while the test runs as its ``cassette`` user property."""
+        with self._lock:
+            first = len(self.log)
+        try:
+            yield
+        finally:
+            with self._lock:
+                entries = self.log[first:]
+            if entries:
+                request.node.user_properties.append((PROPERTY, entries))
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        self.cassette.save()
+
+
+def collect(reports):
+    return [
+        entry
+        for report in reports
+        for name, value in getattr(report, "user_properties", ())
+        if name == PROPERTY
+        for entry in value
+    ]
+
+
+def summary_lines(entries, latency="none", top=5):
+    if not entries:
+        return []
+    counts = {}
+    for action, _, _, _ in entries:
+        counts[action] = counts.get(action, 0) + 1
+    hits, misses = counts.get("hit", 0), counts.get("miss", 0)
+    lines = [f"{len(entries)} store requests through the cassette: {hits} replayed, {misses} missed, "
+             f"{counts.get('record', 0)} recorded, {counts.get('error', 0)} upstream errors"]
+    if hits or misses:
+        upstream = sum(ms for action, _, ms, _ in entries if action == "hit") / 1000
+        served = sum(ms for action, _, _, ms in entries if action == "hit") / 1000
+        saved = (f"{upstream - served:.2f}s saved" if upstream >= served
+                 else f"{served - upstream:.2f}s added by the latency profile")
+        lines.append(f"hit rate {hits / (hits + misses):.1%}; replayed in {served:.2f}s ({latency} latency profile) "
+                     f"what took {upstream:.2f}s to record: {saved}")
+    else:
+        upstream = sum(ms for action, _, ms, _ in entries if action == "record") / 1000
+        lines.append(f"{upstream:.2f}s of upstream time recorded; a replay skips it")
+    missing = {}
+    for action, key, _, _ in entries:
+        if action == "miss":
+            missing[key] = missing.get(key, 0) + 1
+    if missing:
+        lines.append("missing from the cassette (re-record with --cassette=record):")
+        lines.extend(f"  {count:3d}x {key}" for key, count in sorted(missing.items(), key=lambda item: -item[1])[:top])
+    return lines
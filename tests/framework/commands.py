@@ -0,0 +1,84 @@
+"""
+WebDriver command counting.
+
+Every WebDriver round-trip (``find_element``, ``is_displayed``, ``.text``,
+``execute_script``, ...) goes through ``driver.execute``. ``CommandCounter``
+wraps that method on one driver instance for the length of a test, so the
+cost of a test can be read as a number of commands rather than guessed from
+wall-clock time.
+
+Counts are attached to the test's reports as the ``webdriver_commands`` user
+property, which survives the trip back from ``--workers`` processes.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+PROPERTY = "webdriver_commands"
+
+
+class CommandCounter:
+    def __init__(self, driver):
+        self.driver = driver
+        self.commands = Counter()
+        self._original = None
+        self._previous = None
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+    def attach(self):
+        # Another wrapper may already sit on the instance; it is put back on detach
+        self._previous = self.driver.__dict__.get("execute")
+        original = self._original = self.driver.execute
+
+        def execute(command, params=None):
+            self.commands[command] += 1
+            return original(command, params)
+
+        self.driver.execute = execute
+
+    def detach(self):
+        if self._original is not None:
+            restore_execute(self.driver, self._previous)
+            self._original = None
+
+
+def restore_execute(driver, previous):
+    """Put back ``previous`` (an instance-level wrapper) or the class method."""
+    if previous is not None:
+        driver.execute = previous
+    else:
+        driver.__dict__.pop("execute", None)
+
+
+def raw_execute(driver, command, params=None):
+    """Send a command past any instance-level wrappers (counters, probes)."""
+    return type(driver).execute(driver, command, params)
+
+
+@contextmanager
+def count_commands(request, driver):
+    """Count ``driver``'s commands while the test runs and report the total."""
+    counter = CommandCounter(driver)
+    counter.attach()
+    try:
+        yield counter
+    finally:
+        counter.detach()
+        request.node.user_properties.append((PROPERTY, counter.total))
+
+
+def summary_lines(reports, top=5):
+    counts = {}
+    for report in reports:
+        for name, value in getattr(report, "user_properties", ()):
+            if name == PROPERTY:
+                counts[report.nodeid] = counts.get(report.nodeid, 0) + value
+    if not counts:
+        return []
+    total = sum(counts.values())
+    lines = [f"{total} commands over {len(counts)} browser tests ({total / len(counts):.1f} per test)"]
+    for nodeid, value in sorted(counts.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {value:5d}  {nodeid}")
+    return lines
@@ -0,0 +1,795 @@
+"""
+Read-only browser tests side by side on browsing contexts of one browser.
+
+A leased browser runs one test at a time, and most of that test's wall time
+is spent waiting: for the store to answer, for a page to load, for a wait
+condition to hold. Tests that only read pages (``@pytest.mark.read_only``)
+share nothing with each other but the browser, so with ``--contexts N``
+they run N at a time in one browser instead:
+
+* ``SharedBrowser`` connects to a pooled Chromium browser's DevTools
+  endpoint over one websocket (``websocket-client``, like ``network``'s
+  interceptor) and multiplexes every context's commands and events over it
+  (``CdpBrowser``) on an event loop thread;
+* every test gets a new ``BrowsingContext``: an isolated browser context
+  (``Target.createBrowserContext``, its own cookies, cache and storage)
+  with one page, disposed with everything in it after the test;
+* the test still drives a Selenium ``WebDriver``: ``ContextExecutor``
+  translates its W3C commands into DevTools calls on the context, so page
+  objects, waits and the ``instrumentation`` probes work unchanged;
+* ``ContextPlugin`` picks the tests and runs them all on a thread pool of N
+  workers before the first of them starts; each one then reports the
+  outcome and properties of its run.
+
+Only read-only tests whose browser fixtures this module can stand in for
+(``CONTEXT_FIXTURES``) are picked, and only for Chromium browsers; Firefox
+would need WebDriver BiDi's ``browsingContext`` module and keeps running
+its tests one per browser. Pages and locators (``impact``) and intercepted
+requests (``network``) are recorded process-wide, so tests on contexts
+report neither. A failed test is rerun (``flaky``) the usual way, alone in a
+fresh browser.
+
+Every test reports its browser, the contexts it shared the browser with and
+the batch's wall time; the "browsing contexts" summary compares that wall
+time with what the same tests took one per browser.
+"""
+import asyncio
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+import requests
+import websocket
+from selenium.webdriver import ChromeOptions
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from . import network
+from .instrumentation import instrument
+from .pool import DEFAULT_WINDOW_SIZE
+
+PROPERTY = "contexts"
+MARKER = "read_only"
+CHROMIUM = ("chrome", "edge")
+# Fixtures a test on a context may use: everything else keeps it on a leased browser
+CONTEXT_FIXTURES = {"driver", "matrix_driver", "base_url", "browser_config", "visual_check"}
+BROWSER_FIXTURES = {"driver", "matrix_driver"}
+SELECTED_KEY = pytest.StashKey[bool]()
+RESULT_KEY = pytest.StashKey["ContextResult"]()
+
+COMMAND_TIMEOUT = 30       # seconds, one DevTools command
+PAGE_LOAD_TIMEOUT = 30
+SCRIPT_TIMEOUT = 30        # asynchronous scripts, as Selenium's default
+CLICK_GRACE = 0.05         # a click or Enter that navigates starts loading within this
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+ContextResult = namedtuple("ContextResult", "error properties")
+
+
+class ContextsUnsupported(Exception):
+    """The browser cannot host browsing contexts; its tests run one per browser."""
+
+
+class CdpError(Exception):
+    pass
+
+
+class ScriptError(Exception):
+    pass
+
+
+class StaleElement(Exception):
+    pass
+
+
+class ElementNotInteractable(Exception):
+    pass
+
+
+class NoSuchElement(Exception):
+    pass
+
+
+class UnknownCommand(Exception):
+    pass
+
+
+# -- devtools -----------------------------------------------------------------
+
+class CdpBrowser:
+    """
+    A browser's DevTools connection. Commands of every context share it and
+    are matched to their answers by id; events go to the queues listening
+    for their (session, method).
+
+    The websocket is ``websocket-client``'s, as for ``network.CdpConnection``.
+    Its reader thread hands every message to the event loop; ``closed``
+    resolves once the connection is gone.
+    """
+
+    def __init__(self, socket, loop):
+        self.socket = socket
+        self.loop = loop
+        self.closed = loop.create_future()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = defaultdict(list)
+        self._reader = threading.Thread(target=self._read, name="cdp-contexts", daemon=True)
+        self._reader.start()
+
+    @classmethod
+    async def connect(cls, url, timeout=10):
+        loop = asyncio.get_running_loop()
+        # No Origin header: DevTools only accepts origins it was told to
+        socket = await loop.run_in_executor(None, lambda: websocket.create_connection(
+            url, timeout=timeout, suppress_origin=True, enable_multithread=True))
+        socket.settimeout(None)
+        return cls(socket, loop)
+
+    async def send(self, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT):
+        if self.closed.done():
+            raise CdpError("DevTools connection closed")
+        message = {"id": next(self._ids), "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        answer = self.loop.create_future()
+        self._pending[message["id"]] = answer
+        try:
+            try:
+                self.socket.send(json.dumps(message))
+            except (websocket.WebSocketException, OSError) as error:
+                raise CdpError(f"DevTools connection closed ({error})") from error
+            return await asyncio.wait_for(answer, timeout)
+        finally:
+            self._pending.pop(message["id"], None)
+
+    @contextmanager
+    def events(self, session_id, method):
+        """A queue of ``method``'s event parameters in ``session_id`` while the block runs."""
+        queue = asyncio.Queue()
+        self._listeners[(session_id, method)].append(queue)
+        try:
+            yield queue
+        finally:
+            self._listeners[(session_id, method)].remove(queue)
+
+    def _read(self):
+        # Reader thread: pings are answered and fragments joined by websocket-client
+        while True:
+            try:
+                raw = self.socket.recv()
+            except (websocket.WebSocketException, OSError):
+                break
+            if not raw:
+                break
+            self._call(self._dispatch, json.loads(raw))
+        self._call(self._close_pending)
+
+    def _call(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass                # the loop is already closed
+
+    def _dispatch(self, message):
+        if "id" in message:
+            answer = self._pending.get(message["id"])
+            if answer is None or answer.done():
+                return
+            if "error" in message:
+                answer.set_exception(CdpError(message["error"].get("message", "DevTools error")))
+            else:
+                answer.set_result(message.get("result", {}))
+        else:
+            for queue in self._listeners.get((message.get("sessionId"), message.get("method")), ()):
+                queue.put_nowait(message.get("params", {}))
+
+    def _close_pending(self):
+        for answer in self._pending.values():
+            if not answer.done():
+                answer.set_exception(CdpError("DevTools connection closed"))
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    async def close(self):
+        try:
+            self.socket.close()
+        except (websocket.WebSocketException, OSError):
+            pass
+        await self.loop.run_in_executor(None, self._reader.join, 5)
+
+
+# Runs a WebDriver script in the page: element references in the arguments are
+# looked up in the document's registry, elements in the result are registered.
+CALL_SCRIPT = """
+(function (fn, args, asynchronous) {
+  var KEY = '%(key)s';
+  var registry = window.__ocElements || (window.__ocElements =
+    {token: Math.random().toString(36).slice(2), next: 0, byId: {}});
+  function decode(value) {
+    if (Array.isArray(value)) return value.map(decode);
+    if (value && typeof value === 'object') {
+      if (KEY in value) {
+        var element = registry.byId[value[KEY]];
+        if (!element || !element.isConnected) throw {stale: 'element is not attached to the page document'};
+        return element;
+      }
+      var decoded = {};
+      for (var name in value) decoded[name] = decode(value[name]);
+      return decoded;
+    }
+    return value;
+  }
+  function encode(value, depth) {
+    if (value === undefined || value === null || typeof value === 'function' || depth > 32) return null;
+    if (value instanceof Element) {
+      if (!value.__ocId || registry.byId[value.__ocId] !== value) {
+        value.__ocId = registry.token + '.' + (registry.next++);
+        registry.byId[value.__ocId] = value;
+      }
+      var reference = {};
+      reference[KEY] = value.__ocId;
+      return reference;
+    }
+    if (typeof value !== 'object') return value;
+    if (Array.isArray(value) || value instanceof NodeList || value instanceof HTMLCollection) {
+      return Array.prototype.map.call(value, function (item) { return encode(item, depth + 1); });
+    }
+    var encoded = {};
+    for (var key in value) encoded[key] = encode(value[key], depth + 1);
+    return encoded;
+  }
+  function failed(error) { return {error: String(error && error.stack || error)}; }
+  try { args = decode(args); } catch (e) { if (e && e.stale) return {stale: e.stale}; return failed(e); }
+  if (!asynchronous) {
+    try { return {value: encode(fn.apply(null, args), 0)}; } catch (e) { return failed(e); }
+  }
+  return new Promise(function (resolve) {
+    try {
+      fn.apply(null, args.concat([function (result) { resolve({value: encode(result, 0)}); }]));
+    } catch (e) { resolve(failed(e)); }
+  });
+})
+""" % {"key": ELEMENT_KEY}
+
+FIND_SCRIPT = """
+var using = arguments[0], selector = arguments[1], root = arguments[2] || document;
+if (using === 'xpath') {
+  var result = document.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  var nodes = [];
+  for (var i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+  return nodes;
+}
+if (using === 'link text' || using === 'partial link text') {
+  return Array.prototype.filter.call(root.getElementsByTagName('a'), function (a) {
+    var text = a.innerText.trim();
+    return using === 'link text' ? text === selector : text.indexOf(selector) !== -1;
+  });
+}
+if (using === 'tag name') return root.getElementsByTagName(selector);
+return root.querySelectorAll(selector);
+"""
+
+# Scrolls the element into view; its centre in viewport pixels, or null if it has no box
+CLICK_POINT_SCRIPT = """
+var box = arguments[0].getBoundingClientRect();
+if (box.top < 0 || box.left < 0 || box.bottom > innerHeight || box.right > innerWidth) {
+  arguments[0].scrollIntoView({block: 'center', inline: 'center'});
+  box = arguments[0].getBoundingClientRect();
+}
+return box.width && box.height ? [box.left + box.width / 2, box.top + box.height / 2] : null;
+"""
+
+ELEMENT_SCRIPTS = {
+    Command.GET_ELEMENT_TEXT: "return arguments[0].innerText;",
+    Command.GET_ELEMENT_TAG_NAME: "return arguments[0].tagName.toLowerCase();",
+    Command.GET_ELEMENT_PROPERTY: "var value = arguments[0][arguments[1]]; return value === undefined ? null : value;",
+    Command.GET_ELEMENT_ATTRIBUTE: "return arguments[0].getAttribute(arguments[1]);",
+    Command.GET_ELEMENT_VALUE_OF_CSS_PROPERTY: "return getComputedStyle(arguments[0]).getPropertyValue(arguments[1]);",
+    Command.IS_ELEMENT_ENABLED: "return !arguments[0].disabled;",
+    Command.IS_ELEMENT_SELECTED: "return !!(arguments[0].checked || arguments[0].selected);",
+    Command.GET_ELEMENT_RECT: (
+        "var box = arguments[0].getBoundingClientRect();"
+        "return {x: box.left + scrollX, y: box.top + scrollY, width: box.width, height: box.height};"
+    ),
+    Command.CLEAR_ELEMENT: (
+        "arguments[0].value = '';"
+        "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));"
+        "arguments[0].dispatchEvent(new Event('change', {bubbles: true}));"
+    ),
+}
+
+# WebDriver special keys (U+E000 block) typed as key events; the rest is inserted as text
+SPECIAL_KEYS = {"\ue004": ("Tab", 9, ""), "\ue006": ("Enter", 13, "\r"), "\ue007": ("Enter", 13, "\r")}
+
+
+class BrowsingContext:
+    """An isolated browser context with one page, driven over a flat DevTools session."""
+
+    def __init__(self, browser, context_id, target_id, session_id):
+        self.browser = browser
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+        self.frame_id = target_id
+        self.window_id = None
+
+    @classmethod
+    async def open(cls, browser, window_size=DEFAULT_WINDOW_SIZE):
+        context_id = (await browser.send("Target.createBrowserContext", {"disposeOnDetach": True}))[
+            "browserContextId"]
+        # A window of its own: pages in background tabs are throttled
+        target_id = (await browser.send("Target.createTarget", {
+            "url": "about:blank", "browserContextId": context_id, "newWindow": True}))["targetId"]
+        session_id = (await browser.send("Target.attachToTarget", {"targetId": target_id, "flatten": True}))[
+            "sessionId"]
+        context = cls(browser, context_id, target_id, session_id)
+        await context.command("Page.enable")
+        context.frame_id = (await context.command("Page.getFrameTree"))["frameTree"]["frame"]["id"]
+        context.window_id = (await browser.send("Browser.getWindowForTarget", {"targetId": target_id}))["windowId"]
+        await context.set_window_rect(width=window_size[0], height=window_size[1])
+        return context
+
+    async def close(self):
+        await self.browser.send("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+
+    async def command(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        return await self.browser.send(method, params, self.session_id, timeout)
+
+    # -- scripts ---------------------------------------------------------
+
+    async def call(self, script, args=(), asynchronous=False, timeout=SCRIPT_TIMEOUT):
+        """Run WebDriver ``script`` (its ``arguments``, a callback last when ``asynchronous``)."""
+        expression = f"{CALL_SCRIPT}(function () {{\n{script}\n}}, {json.dumps(list(args))}, " \
+                     f"{json.dumps(asynchronous)})"
+        result = await self.command("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": True, "userGesture": True,
+        }, timeout=timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise ScriptError(details.get("exception", {}).get("description") or details.get("text"))
+        outcome = result["result"].get("value") or {}
+        if "stale" in outcome:
+            raise StaleElement(outcome["stale"])
+        if "error" in outcome:
+            raise ScriptError(outcome["error"])
+        return outcome.get("value")
+
+    # -- navigation ------------------------------------------------------
+
+    async def _main_frame(self, queue, timeout):
+        """True once ``queue`` has an event of the main frame, False after ``timeout``."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                params = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return False
+            if params.get("frameId") == self.frame_id:
+                return True
+
+    async def loading(self, action, grace=None, timeout=PAGE_LOAD_TIMEOUT):
+        """
+        Run ``action`` and wait until the main frame has loaded the document
+        it started loading. ``action`` returning False means nothing loads;
+        with ``grace``, nothing loads unless it starts within ``grace``.
+        """
+        with self.browser.events(self.session_id, "Page.frameStartedLoading") as started, \
+                self.browser.events(self.session_id, "Page.frameStoppedLoading") as stopped:
+            if await action() is False:
+                return
+            if grace is not None and not await self._main_frame(started, grace):
+                return
+            if not await self._main_frame(stopped, timeout):
+                # Pages restored from the back/forward cache finish without a loading cycle
+                if await self.call("return document.readyState;") != "complete":
+                    raise asyncio.TimeoutError(f"page did not finish loading within {timeout}s")
+
+    async def navigate(self, url):
+        async def action():
+            result = await self.command("Page.navigate", {"url": url})
+            if result.get("errorText"):
+                raise CdpError(f"{result['errorText']} ({url})")
+            # Same-document navigations (fragments) have no loader
+            return "loaderId" in result
+
+        await self.loading(action)
+
+    async def traverse(self, delta):
+        """Go ``delta`` entries back (-1) or forward (1) in the session history."""
+        history = await self.command("Page.getNavigationHistory")
+        index = history["currentIndex"] + delta
+
+        async def action():
+            if not 0 <= index < len(history["entries"]):
+                return False
+            await self.command("Page.navigateToHistoryEntry", {"entryId": history["entries"][index]["id"]})
+
+        await self.loading(action)
+
+    async def reload(self):
+        await self.loading(lambda: self.command("Page.reload"))
+
+    # -- input -----------------------------------------------------------
+
+    async def click(self, element):
+        point = await self.call(CLICK_POINT_SCRIPT, [element])
+        if point is None:
+            raise ElementNotInteractable("element has no size and location")
+        x, y = point
+
+        async def action():
+            await self.command("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": x, "y": y})
+            for kind in ("mousePressed", "mouseReleased"):
+                await self.command("Input.dispatchMouseEvent", {
+                    "type": kind, "x": x, "y": y, "button": "left", "buttons": 1, "clickCount": 1})
+
+        await self.loading(action, grace=CLICK_GRACE)
+
+    async def send_keys(self, element, text):
+        await self.call("arguments[0].focus();", [element])
+
+        async def action():
+            for chunk in re.split("([\ue000-\uf8ff])", text):
+                if chunk in SPECIAL_KEYS:
+                    key, code, typed = SPECIAL_KEYS[chunk]
+                    event = {"key": key, "code": key, "windowsVirtualKeyCode": code}
+                    await self.command("Input.dispatchKeyEvent", dict(event, type="keyDown", text=typed))
+                    await self.command("Input.dispatchKeyEvent", dict(event, type="keyUp"))
+                elif chunk and not "\ue000" <= chunk[0] <= "\uf8ff":
+                    await self.command("Input.insertText", {"text": chunk})
+
+        await self.loading(action, grace=CLICK_GRACE)
+
+    # -- window and cookies ----------------------------------------------
+
+    async def window_rect(self):
+        bounds = (await self.browser.send("Browser.getWindowBounds", {"windowId": self.window_id}))["bounds"]
+        return {"x": bounds.get("left", 0), "y": bounds.get("top", 0),
+                "width": bounds["width"], "height": bounds["height"]}
+
+    async def set_window_rect(self, x=None, y=None, width=None, height=None):
+        bounds = {key: value for key, value in (("left", x), ("top", y), ("width", width), ("height", height))
+                  if value is not None}
+        await self.browser.send("Browser.setWindowBounds", {"windowId": self.window_id,
+                                                            "bounds": dict(bounds, windowState="normal")})
+        return await self.window_rect()
+
+    async def cookies(self):
+        found = await self.browser.send("Storage.getCookies", {"browserContextId": self.context_id})
+        return [dict({"name": cookie["name"], "value": cookie["value"], "domain": cookie["domain"],
+                      "path": cookie["path"], "secure": cookie["secure"], "httpOnly": cookie["httpOnly"]},
+                     **({"expiry": int(cookie["expires"])} if cookie.get("expires", -1) > 0 else {}),
+                     **({"sameSite": cookie["sameSite"]} if cookie.get("sameSite") else {}))
+                for cookie in found["cookies"]]
+
+    async def add_cookie(self, cookie):
+        param = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+                 if key in cookie}
+        if "expiry" in cookie:
+            param["expires"] = cookie["expiry"]
+        if "domain" not in param:
+            param["url"] = await self.call("return location.href;")
+        await self.browser.send("Storage.setCookies", {"cookies": [param], "browserContextId": self.context_id})
+
+    async def clear_cookies(self):
+        await self.browser.send("Storage.clearCookies", {"browserContextId": self.context_id})
+
+
+# -- webdriver ----------------------------------------------------------------
+
+# Exceptions of a translated command -> W3C error code (Selenium raises the matching exception)
+ERROR_CODES = (
+    (StaleElement, "stale element reference"),
+    (NoSuchElement, "no such element"),
+    (ElementNotInteractable, "element not interactable"),
+    (ScriptError, "javascript error"),
+    (UnknownCommand, "unknown command"),
+    (asyncio.TimeoutError, "timeout"),
+    (FutureTimeoutError, "timeout"),
+    (CdpError, "unknown error"),
+    (ConnectionError, "unknown error"),
+)
+
+
+class ContextExecutor:
+    """
+    Selenium's command executor for one ``BrowsingContext``: each W3C
+    command becomes DevTools calls, run on the shared browser's event loop
+    while the calling test thread waits for the answer.
+    """
+
+    def __init__(self, shared, context):
+        self.shared = shared
+        self.context = context
+        self.script_timeout = SCRIPT_TIMEOUT
+        self.page_load_timeout = PAGE_LOAD_TIMEOUT
+
+    def execute(self, command, params):
+        try:
+            value = self.shared.run(self.dispatch(command, dict(params or {})),
+                                    max(self.script_timeout, self.page_load_timeout) + COMMAND_TIMEOUT)
+        except Exception as error:
+            for kind, code in ERROR_CODES:
+                if isinstance(error, kind):
+                    return {"status": code, "value": {"message": str(error) or code}}
+            raise
+        return {"value": value}
+
+    async def find(self, params, root=None, single=True):
+        found = await self.context.call(FIND_SCRIPT, [params["using"], params["value"], root])
+        if not single:
+            return found
+        if not found:
+            raise NoSuchElement(f"no element for {params['using']} {params['value']!r}")
+        return found[0]
+
+    async def dispatch(self, command, params):
+        context = self.context
+        element = {ELEMENT_KEY: params["id"]} if "id" in params else None
+        if command == Command.NEW_SESSION:
+            return {"sessionId": context.context_id,
+                    "capabilities": {"browserName": self.shared.name, "browserVersion": self.shared.version}}
+        if command in (Command.QUIT, Command.CLOSE, Command.SET_TIMEOUTS):
+            if command == Command.SET_TIMEOUTS:
+                self.script_timeout = params.get("script", self.script_timeout * 1000) / 1000
+                self.page_load_timeout = params.get("pageLoad", self.page_load_timeout * 1000) / 1000
+            return None
+        if command == Command.GET:
+            return await context.navigate(params["url"])
+        if command in (Command.GO_BACK, Command.GO_FORWARD):
+            return await context.traverse(-1 if command == Command.GO_BACK else 1)
+        if command == Command.REFRESH:
+            return await context.reload()
+        if command == Command.GET_CURRENT_URL:
+            return await context.call("return location.href;")
+        if command == Command.GET_TITLE:
+            return await context.call("return document.title;")
+        if command == Command.GET_PAGE_SOURCE:
+            return await context.call("return document.documentElement.outerHTML;")
+        if command in (Command.W3C_EXECUTE_SCRIPT, Command.W3C_EXECUTE_SCRIPT_ASYNC):
+            asynchronous = command == Command.W3C_EXECUTE_SCRIPT_ASYNC
+            return await context.call(params["script"], params.get("args", []), asynchronous,
+                                      timeout=self.script_timeout if asynchronous else COMMAND_TIMEOUT)
+        if command in (Command.FIND_ELEMENT, Command.FIND_ELEMENTS):
+            return await self.find(params, single=command == Command.FIND_ELEMENT)
+        if command in (Command.FIND_CHILD_ELEMENT, Command.FIND_CHILD_ELEMENTS):
+            return await self.find(params, element, single=command == Command.FIND_CHILD_ELEMENT)
+        if command == Command.CLICK_ELEMENT:
+            return await context.click(element)
+        if command == Command.SEND_KEYS_TO_ELEMENT:
+            return await context.send_keys(element, params["text"])
+        if command in ELEMENT_SCRIPTS:
+            return await context.call(ELEMENT_SCRIPTS[command], [element, params.get("name")])
+        if command == Command.GET_WINDOW_RECT:
+            return await context.window_rect()
+        if command == Command.SET_WINDOW_RECT:
+            return await context.set_window_rect(params.get("x"), params.get("y"), params.get("width"),
+                                                 params.get("height"))
+        if command == Command.W3C_GET_CURRENT_WINDOW_HANDLE:
+            return context.target_id
+        if command == Command.W3C_GET_WINDOW_HANDLES:
+            return [context.target_id]
+        if command == Command.GET_ALL_COOKIES:
+            return await context.cookies()
+        if command == Command.ADD_COOKIE:
+            return await context.add_cookie(params["cookie"])
+        if command == Command.DELETE_ALL_COOKIES:
+            return await context.clear_cookies()
+        if command == Command.SCREENSHOT:
+            return (await context.command("Page.captureScreenshot", {"format": "png"}))["data"]
+        if command == "executeCdpCommand":
+            return await context.command(params["cmd"], params.get("params") or {})
+        raise UnknownCommand(f"{command} is not available on a browsing context")
+
+
+class SharedBrowser:
+    """A Chromium browser's browsing contexts, driven from an event loop thread."""
+
+    def __init__(self, driver, name):
+        address = network.debugger_address(driver)
+        if address is None:
+            raise ContextsUnsupported(f"{name} has no DevTools endpoint (debuggerAddress)")
+        version = requests.get(f"http://{address}/json/version", timeout=5).json()
+        self.name = name
+        self.version = version.get("Browser", "").partition("/")[2]
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=f"contexts-{name}", daemon=True)
+        self._thread.start()
+        try:
+            self.cdp = self.run(CdpBrowser.connect(version["webSocketDebuggerUrl"]), COMMAND_TIMEOUT)
+        except Exception:
+            self._stop()
+            raise
+
+    def run(self, coroutine, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    @contextmanager
+    def driver(self, window_size=DEFAULT_WINDOW_SIZE):
+        """A ``WebDriver`` on a new browsing context, disposed with its cookies and storage afterwards."""
+        context = self.run(BrowsingContext.open(self.cdp, window_size), COMMAND_TIMEOUT)
+        try:
+            yield WebDriver(command_executor=ContextExecutor(self, context), options=ChromeOptions())
+        finally:
+            try:
+                self.run(context.close(), COMMAND_TIMEOUT)
+            except Exception:
+                pass
+
+    def _stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+    def close(self):
+        try:
+            self.run(self.cdp.close(), 5)
+        except Exception:
+            pass
+        self._stop()
+
+
+# -- scheduling ---------------------------------------------------------------
+
+def browser_of(item):
+    callspec = getattr(item, "callspec", None)
+    config = callspec.params.get("browser_config") if callspec is not None else None
+    return config.browser if config is not None else "chrome"
+
+
+def is_candidate(item):
+    """A read-only test whose fixtures a browsing context can provide, on a Chromium browser."""
+    if item.get_closest_marker(MARKER) is None or not hasattr(item, "_fixtureinfo"):
+        return False
+    callspec = getattr(item, "callspec", None)
+    fixtures = set(item._fixtureinfo.argnames) - set(callspec.params if callspec is not None else ())
+    return fixtures <= CONTEXT_FIXTURES and bool(fixtures & BROWSER_FIXTURES) and browser_of(item) in CHROMIUM
+
+
+def ran(request):
+    """True when the test already ran on a browsing context: its browser fixtures then lease nothing."""
+    return RESULT_KEY in request.node.stash
+
+
+def run_test(shared, item, arguments):
+    """Run ``item``'s test function on a new context; its outcome and the properties it recorded."""
+    node = SimpleNamespace(nodeid=item.nodeid, user_properties=[], stash=pytest.Stash())
+    request = SimpleNamespace(config=item.config, node=node)
+    callspec = getattr(item, "callspec", None)
+    started = time.perf_counter()
+    error = None
+    try:
+        with shared.driver() as driver:
+            values = dict(callspec.params if callspec is not None else {}, **arguments(item, request, driver))
+            config = values.get("browser_config")
+            with instrument(request, driver, shared.name, config.viewport if config is not None else None,
+                            shared=True):
+                item.obj(**{name: values[name] for name in item._fixtureinfo.argnames})
+    except BaseException as exception:
+        # Skips and failures alike: the test's call phase re-raises it
+        error = exception
+    return error, node.user_properties, time.perf_counter() - started
+
+
+class ContextPlugin:
+    """Runs the selected read-only tests ``--contexts`` at a time on browsing contexts of one browser."""
+
+    def __init__(self, config):
+        self.config = config
+        self.size = config.getoption("--contexts")
+        self.unavailable = {}      # browser -> why its tests ran one per browser
+        self._batches = itertools.count(1)
+        self._done = False
+
+    # After every plugin that reorders or deselects tests
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        if self.size < 1:
+            return
+        for item in items:
+            if is_candidate(item):
+                item.stash[SELECTED_KEY] = True
+                # The session fixture that runs the batch, set up before the first selected test
+                item.fixturenames.insert(0, "context_batch")
+
+    def run(self, session, lease, arguments):
+        """
+        Run every selected test of ``session`` now. ``lease(browser)`` lends
+        the browser that hosts the contexts; ``arguments(item, request,
+        driver)`` returns the test's fixture values for a context's driver.
+        """
+        if self._done:
+            return
+        self._done = True
+        by_browser = defaultdict(list)
+        for item in session.items:
+            if item.stash.get(SELECTED_KEY, False):
+                by_browser[browser_of(item)].append(item)
+        for browser, items in by_browser.items():
+            try:
+                with lease(browser) as host:
+                    self._run_batch(SharedBrowser(host, browser), browser, items, arguments)
+            except (ContextsUnsupported, CdpError, ConnectionError, OSError, requests.RequestException,
+                    asyncio.TimeoutError, FutureTimeoutError) as error:
+                self.unavailable[browser] = f"{type(error).__name__}: {error}"
+
+    def _run_batch(self, shared, browser, items, arguments):
+        contexts = min(self.size, len(items))
+        batch = f"{os.getpid()}-{next(self._batches)}"
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(contexts, thread_name_prefix=f"context-{browser}") as executor:
+                results = list(executor.map(lambda item: run_test(shared, item, arguments), items))
+        finally:
+            shared.close()
+        wall = time.perf_counter() - started
+        for item, (error, properties, seconds) in zip(items, results):
+            entry = {"test": item.nodeid, "browser": browser, "contexts": contexts, "batch": batch,
+                     "seconds": round(seconds, 3), "wall": round(wall, 3)}
+            item.stash[RESULT_KEY] = ContextResult(error, properties + [(PROPERTY, entry)])
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pyfunc_call(self, pyfuncitem):
+        result = pyfuncitem.stash.get(RESULT_KEY, None)
+        if result is None:
+            return None
+        if result.error is not None:
+            raise result.error
+        return True
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_teardown(self, item):
+        # Reported with the teardown, like every probe's properties; a rerun runs on a leased browser
+        result = item.stash.get(RESULT_KEY, None)
+        if result is not None:
+            del item.stash[RESULT_KEY]
+            item.user_properties.extend(result.properties)
+
+    def summary_lines(self, reports):
+        # One test per browser, a test takes its median duration in the history
+        history = getattr(self.config, "_history", None)
+        return summary_lines(collect(reports), history.durations if history is not None else None, self.unavailable)
+
+
+def collect(reports):
+    return [value for report in reports for name, value in getattr(report, "user_properties", ()) if name == PROPERTY]
+
+
+def summary_lines(entries, baseline=None, unavailable=None):
+    baseline = baseline or {}
+    batches = defaultdict(list)
+    for entry in entries:
+        batches[entry["batch"]].append(entry)
+    lines = []
+    for batch in sorted(batches.values(), key=lambda batch: batch[0]["browser"]):
+        first = batch[0]
+        wall, seconds = first["wall"], sum(entry["seconds"] for entry in batch)
+        lines.append(f"{first['browser']}: {len(batch)} read-only tests on {first['contexts']} browsing contexts "
+                     f"of one browser in {wall:.1f}s wall ({seconds:.1f}s of test time, "
+                     f"{seconds / wall if wall else 0:.1f} running at once on average)")
+        known = [baseline[entry["test"]] for entry in batch if entry["test"] in baseline]
+        if len(known) == len(batch):
+            serial = sum(known)
+            lines.append(f"  one test per browser they take {serial:.1f}s (history medians): "
+                         f"{serial / wall if wall else 0:.1f}x the throughput")
+        else:
+            lines.append(f"  no duration history for {len(batch) - len(known)} of them; one at a time they "
+                         f"would take at most {seconds:.1f}s: {seconds / wall if wall else 0:.1f}x the throughput")
+    for browser, reason in sorted((unavailable or {}).items()):
+        lines.append(f"{browser}: no browsing contexts ({reason}); its read-only tests ran one per browser")
+    return lines
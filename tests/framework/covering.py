@@ -0,0 +1,145 @@
+"""
+n-wise covering arrays (IPOG).
+
+``covering_array`` returns rows (dicts) such that every combination of
+values of any ``strength`` parameters appears in at least one row. For
+pairwise coverage that is usually close to the product of the two largest
+domains instead of the product of all of them.
+
+The construction is IPOG (Lei et al.): start from the full product of the
+first ``strength`` parameters, then add one parameter at a time. Each
+existing row first gets the value that covers the most new combinations
+(horizontal growth). Rows are then added or completed for whatever is still
+uncovered (vertical growth). ``allowed(partial)`` can rule out invalid
+combinations; it is called with partial rows and must only reject what no
+completion could make valid.
+"""
+from itertools import combinations, product
+
+
+def _valid(allowed, names, row):
+    if allowed is None:
+        return True
+    return allowed({name: value for name, value in zip(names, row) if value is not None})
+
+
+def _tuples(names, domains, index, strength, allowed):
+    """Uncovered ``strength``-tuples that end with parameter ``index``."""
+    tuples = set()
+    for others in combinations(range(index), strength - 1):
+        for values in product(*(domains[i] for i in others)):
+            for value in domains[index]:
+                combo = tuple(zip(others, values)) + ((index, value),)
+                row = [None] * len(names)
+                for i, v in combo:
+                    row[i] = v
+                if _valid(allowed, names, row):
+                    tuples.add(combo)
+    return tuples
+
+
+def _covered(row, combo):
+    return all(row[i] == value for i, value in combo)
+
+
+def _gain(row, index, value, strength, uncovered):
+    trial = list(row)
+    trial[index] = value
+    gain = 0
+    for others in combinations(range(index), strength - 1):
+        if any(trial[i] is None for i in others):
+            continue
+        if tuple((i, trial[i]) for i in others) + ((index, value),) in uncovered:
+            gain += 1
+    return gain
+
+
+def covering_array(parameters, strength=2, allowed=None):
+    """
+    ``parameters`` is an ordered mapping name -> list of values. Returns a
+    list of dicts covering every ``strength``-way combination of values.
+    ``strength`` greater than or equal to the number of parameters gives the
+    full product.
+    """
+    names = list(parameters)
+    domains = [list(parameters[name]) for name in names]
+    if any(not domain for domain in domains):
+        raise ValueError("Every parameter needs at least one value")
+    strength = max(1, min(strength, len(names)))
+
+    # Larger domains first keeps IPOG's arrays small; columns are mapped back at the end
+    order = sorted(range(len(names)), key=lambda i: -len(domains[i]))
+    names_sorted = [names[i] for i in order]
+    domains_sorted = [domains[i] for i in order]
+
+    rows = [
+        list(values) + [None] * (len(names) - strength)
+        for values in product(*domains_sorted[:strength])
+    ]
+    rows = [row for row in rows if _valid(allowed, names_sorted, row)]
+
+    for index in range(strength, len(names)):
+        uncovered = _tuples(names_sorted, domains_sorted, index, strength, allowed)
+        # Horizontal growth
+        for row in rows:
+            candidates = [value for value in domains_sorted[index]
+                          if _valid(allowed, names_sorted, row[:index] + [value] + row[index + 1:])]
+            if not candidates:
+                continue
+            best = max(candidates, key=lambda value: _gain(row, index, value, strength, uncovered))
+            row[index] = best
+            uncovered = {combo for combo in uncovered if not _covered(row, combo)}
+        # Vertical growth
+        for combo in sorted(uncovered, key=repr):
+            if any(_covered(row, combo) for row in rows):
+                continue
+            for row in rows:
+                if all(row[i] in (None, value) for i, value in combo):
+                    trial = list(row)
+                    for i, value in combo:
+                        trial[i] = value
+                    if _valid(allowed, names_sorted, trial):
+                        row[:] = trial
+                        break
+            else:
+                row = [None] * len(names)
+                for i, value in combo:
+                    row[i] = value
+                rows.append(row)
+
+    # Don't-care cells take the first value that keeps the row valid
+    for row in rows:
+        for index, value in enumerate(row):
+            if value is None:
+                row[index] = next(
+                    (candidate for candidate in domains_sorted[index]
+                     if _valid(allowed, names_sorted, row[:index] + [candidate] + row[index + 1:])),
+                    domains_sorted[index][0],
+                )
+    result = []
+    for row in rows:
+        by_name = dict(zip(names_sorted, row))
+        entry = {name: by_name[name] for name in names}
+        if entry not in result:
+            result.append(entry)
+    return result
+
+
+def uncovered(rows, parameters, strength=2, allowed=None):
+    """The ``strength``-way combinations (as dicts) that ``rows`` miss."""
+    names = list(parameters)
+    missing = []
+    for chosen in combinations(names, min(strength, len(names))):
+        for values in product(*(parameters[name] for name in chosen)):
+            combo = dict(zip(chosen, values))
+            if allowed is not None and not allowed(combo):
+                continue
+            if not any(all(row[name] == value for name, value in combo.items()) for row in rows):
+                missing.append(combo)
+    return missing
+
+
+def full_product(parameters, allowed=None):
+    names = list(parameters)
+    rows = [dict(zip(names, values)) for values in product(*(parameters[name] for name in names))]
+    return [row for row in rows if allowed is None or allowed(row)]
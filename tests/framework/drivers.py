@@ -0,0 +1,153 @@
+"""
+Driver-binary resolution with an on-disk lockfile.
+
+``ChromeDriverManager().install()`` and friends look up the latest driver
+version on every call, which costs a network round-trip and fails outright on
+air-gapped agents. ``DriverResolver`` resolves each browser's driver at most
+once per session and remembers the result per machine in a lockfile keyed by
+browser version:
+
+    {"chrome@131.0.6778": {"path": "/home/ci/.wdm/.../chromedriver", "resolved_at": 1730000000}}
+
+Resolution order:
+
+1. a pre-provisioned binary given with ``--driver-path chrome=/opt/chromedriver``
+2. the lockfile entry for the installed browser version
+3. webdriver-manager (skipped with ``--offline-drivers``)
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+from webdriver_manager.firefox import GeckoDriverManager
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "opencart-suite")
+LOCKFILE_NAME = "drivers.lock.json"
+
+# browser name -> (webdriver-manager class, browser type for version lookup)
+MANAGERS = {
+    "chrome": (ChromeDriverManager, ChromeType.GOOGLE),
+    "firefox": (GeckoDriverManager, "firefox"),
+    "edge": (EdgeChromiumDriverManager, ChromeType.MSEDGE),
+}
+
+Resolution = namedtuple("Resolution", "browser version path source seconds")
+
+
+class DriverResolutionError(RuntimeError):
+    """Raised when no driver binary can be found for a browser."""
+
+
+def installed_browser_version(browser):
+    """Version of the locally installed browser, or None if not found."""
+    return OperationSystemManager().get_browser_version_from_os(MANAGERS[browser][1])
+
+
+def install_driver(browser):
+    """Download (or reuse webdriver-manager's cache) and return the driver path."""
+    return MANAGERS[browser][0]().install()
+
+
+class DriverResolver:
+    """
+    Resolves driver binaries once per session and caches them per machine.
+
+    ``version_lookup`` and ``installer`` default to the webdriver-manager
+    backed functions above; tests pass stubs.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, offline=False, provisioned=None,
+                 version_lookup=installed_browser_version, installer=install_driver):
+        self.cache_dir = cache_dir
+        self.lockfile = os.path.join(cache_dir, LOCKFILE_NAME)
+        self.offline = offline
+        self.provisioned = dict(provisioned or {})
+        self.version_lookup = version_lookup
+        self.installer = installer
+        self.resolutions = {}
+
+    def resolve(self, browser):
+        if browser not in self.resolutions:
+            start = time.perf_counter()
+            version, path, source = self._resolve(browser)
+            self.resolutions[browser] = Resolution(
+                browser, version, path, source, time.perf_counter() - start
+            )
+        return self.resolutions[browser].path
+
+    def _resolve(self, browser):
+        if browser in self.provisioned:
+            path = self.provisioned[browser]
+            if not os.path.isfile(path):
+                raise DriverResolutionError(f"Provisioned {browser} driver not found: {path}")
+            return None, path, "provisioned"
+
+        version = self.version_lookup(browser)
+        entry = self._locked_entry(browser, version)
+        if entry is not None:
+            return version, entry["path"], "lockfile"
+
+        if self.offline:
+            raise DriverResolutionError(
+                f"No cached {browser} driver for browser version {version or 'unknown'} in "
+                f"{self.lockfile}; pass --driver-path {browser}=PATH or run once online"
+            )
+        path = self.installer(browser)
+        self._lock(browser, version, path)
+        return version, path, "download"
+
+    def _read_lockfile(self):
+        try:
+            with open(self.lockfile) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _locked_entry(self, browser, version):
+        entries = self._read_lockfile()
+        if version is not None:
+            candidates = [entries.get(f"{browser}@{version}")]
+        else:
+            # Version lookup failed (e.g. unusual install path): newest entry wins
+            candidates = sorted(
+                (entry for key, entry in entries.items() if key.startswith(f"{browser}@")),
+                key=lambda entry: entry.get("resolved_at", 0), reverse=True,
+            )
+        for entry in candidates:
+            if entry and os.path.isfile(entry["path"]):
+                return entry
+        return None
+
+    def _lock(self, browser, version, path):
+        if version is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Re-read so parallel workers do not drop each other's entries
+        entries = self._read_lockfile()
+        entries[f"{browser}@{version}"] = {"path": path, "resolved_at": int(time.time())}
+        temp = f"{self.lockfile}.{os.getpid()}.tmp"
+        with open(temp, "w") as handle:
+            json.dump(entries, handle, indent=2, sort_keys=True)
+        os.replace(temp, self.lockfile)
+
+    def summary_lines(self):
+        return [
+            f"{res.browser} {res.version or '(provisioned)'}: {res.source} in "
+            f"{res.seconds * 1000:.0f} ms -> {res.path}"
+            for res in self.resolutions.values()
+        ]
+
+
+def parse_driver_paths(values):
+    """Turn ``["chrome=/opt/chromedriver", ...]`` into a dict."""
+    paths = {}
+    for value in values or []:
+        browser, sep, path = value.partition("=")
+        if not sep or browser not in MANAGERS:
+            raise ValueError(f"Expected BROWSER=PATH with BROWSER in {sorted(MANAGERS)}, got {value!r}")
+        paths[browser] = path
+    return paths
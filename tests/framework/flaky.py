@@ -0,0 +1,261 @@
+"""
+Flaky tests: fresh-browser reruns, flake scores and quarantine.
+
+A failed test is rerun, up to ``--reruns`` times, before it counts as
+failed. Reruns lease their browsers with ``fresh=True``, so a rerun never
+inherits the browser that failed (cookies, an open dialog, a wedged
+renderer); module and session fixtures are kept. Reruns are bounded by a
+retry budget for the whole run. By default the budget is statistical:
+each collected test's flake score is taken as its chance of failing
+spuriously, and the budget covers the expected number of spurious
+failures plus ``BUDGET_SIGMAS`` standard deviations (at least
+``MIN_BUDGET``). Tests that failed their last ``BROKEN_RUNS`` runs are
+broken, not flaky, and are not rerun: that is where reruns waste the most
+CI minutes.
+
+A test that passes on a rerun is recorded as "flaky" in the duration
+history (``history``), which thereby keeps every test's pass/fail record
+per configuration: matrix tests have one node id per browser
+configuration. The flake score is the share of the last ``WINDOW`` runs
+that were inconsistent: flaky runs plus flips between passing and
+failing. A test that broke once and stays broken flips once; one that
+fails one run in five scores about 0.4.
+
+Tests scoring ``--quarantine-threshold`` or more over at least
+``MIN_RUNS`` runs are quarantined. They still run, but a failure is
+reported as xfail, so it no longer fails the run, and is recorded in the
+history as a failure, so the score keeps tracking the test and the
+quarantine lifts once it has been consistent for long enough.
+
+Every failed attempt records where it failed: the last wait that timed
+out (page and locator, e.g. ``HomePage.show_all_desktops``), else a page
+locator named in the error, else the exception and line. The "flaky
+tests" summary groups the failures of flaky and quarantined tests by it.
+"""
+import json
+import math
+import re
+from pathlib import Path
+
+import pytest
+from _pytest.runner import runtestprotocol
+
+from . import waits
+
+PROPERTY = "flaky"
+RERUN = "rerun"
+QUARANTINED = "quarantined"
+# Attempt number of the running test; 0 is the first run
+ATTEMPT_KEY = pytest.StashKey[int]()
+
+WINDOW = 20                # recent runs a test is scored over
+MIN_RUNS = 4               # fewer runs never quarantine a test
+BROKEN_RUNS = 3            # failed in all of these: broken, not rerun
+MIN_BUDGET = 2
+BUDGET_SIGMAS = 2.0
+
+LOCATOR = re.compile(r"\b([A-Z]\w*Page\.\w+)")
+
+
+def is_rerun(request):
+    """True while a failed test is being rerun: its browser fixtures then lease a fresh browser."""
+    return request.node.stash.get(ATTEMPT_KEY, 0) > 0
+
+
+def outcomes(entries):
+    """Pass/fail outcomes of ``HistoryStore.recent`` entries, newest first; skipped runs are dropped."""
+    return [entry[0] for entry in entries if entry[0] in ("passed", "failed", "flaky")]
+
+
+def flake_score(entries, window=WINDOW):
+    """Share of the last ``window`` runs that were flaky or flipped between passing and failing."""
+    runs = outcomes(entries)[:window]
+    if not runs:
+        return 0.0
+    final = ["failed" if outcome == "failed" else "passed" for outcome in runs]
+    flips = sum(1 for newer, older in zip(final, final[1:]) if newer != older)
+    return min(1.0, (runs.count("flaky") + flips) / len(runs))
+
+
+def is_broken(entries):
+    runs = outcomes(entries)[:BROKEN_RUNS]
+    return len(runs) == BROKEN_RUNS and all(outcome == "failed" for outcome in runs)
+
+
+def retry_budget(scores, minimum=MIN_BUDGET, sigmas=BUDGET_SIGMAS):
+    """Reruns for a run of tests with these flake scores: expected spurious failures plus ``sigmas`` SDs."""
+    expected = sum(scores)
+    spread = math.sqrt(sum(score * (1 - score) for score in scores))
+    return max(minimum, math.ceil(expected + sigmas * spread))
+
+
+def failure_site(report, recorded=()):
+    """Where a failed attempt failed; ``recorded`` is its ``waits`` property."""
+    timed_out = [label for label, _, met in recorded if not met]
+    if timed_out:
+        return f"wait {timed_out[-1]}"
+    crash = getattr(report.longrepr, "reprcrash", None)
+    message = crash.message if crash is not None else str(report.longrepr)
+    found = LOCATOR.search(message)
+    if found:
+        return f"locator {found.group(1)}"
+    # Rewritten asserts report the assertion itself, other exceptions "Type: message"
+    kind = "AssertionError" if message.startswith("assert ") else message.split("\n", 1)[0].split(":", 1)[0]
+    return f"{kind} at {Path(crash.path).name}:{crash.lineno}" if crash is not None else kind
+
+
+def is_quarantined_failure(report):
+    return report.skipped and getattr(report, "wasxfail", "").startswith(QUARANTINED)
+
+
+class FlakePlugin:
+    """Reruns failures in fresh browsers within the retry budget and quarantines flaky tests."""
+
+    def __init__(self, config):
+        self.config = config
+        self.reruns = config.getoption("--reruns")
+        self.threshold = config.getoption("--quarantine-threshold")
+        self.budget = config.getoption("--retry-budget")
+        self.scores = {}           # nodeid -> (flake score, scored runs), before this run
+        self.quarantined = {}      # nodeid -> flake score
+        self.broken = set()
+        self.spent = 0
+        self.attempts = {}         # nodeid -> [(attempt, outcome, site), ...] of its failed attempts
+        self.passed = set()
+        state = config.getoption("--worker-flakes")
+        if state is not None:
+            with open(state) as handle:
+                state = json.load(handle)
+            self.quarantined, self.broken, self.budget = state["quarantined"], set(state["broken"]), state["budget"]
+
+    @property
+    def is_worker(self):
+        return self.config.getoption("--worker-results") is not None
+
+    def write_worker_state(self, path, workers):
+        """The quarantine and one worker's share of the retry budget, for ``--worker-flakes``."""
+        with open(path, "w") as handle:
+            json.dump({"quarantined": self.quarantined, "broken": sorted(self.broken),
+                       "budget": math.ceil(self.budget / workers)}, handle)
+
+    # After the history plugin has read the collected tests' history
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        if not self.is_worker:
+            scheduler = getattr(config, "_history", None)
+            history = scheduler.previous if scheduler is not None else {}
+            for item in items:
+                entries = history.get(item.nodeid, ())
+                score, runs = flake_score(entries), len(outcomes(entries)[:WINDOW])
+                self.scores[item.nodeid] = (score, runs)
+                if is_broken(entries):
+                    self.broken.add(item.nodeid)
+                elif runs >= MIN_RUNS and score >= self.threshold:
+                    self.quarantined[item.nodeid] = score
+            if self.budget is None:
+                self.budget = retry_budget([score for score, _ in self.scores.values()])
+        for item in items:
+            if item.nodeid in self.quarantined:
+                reason = f"{QUARANTINED}: flake score {self.quarantined[item.nodeid]:.2f}"
+                item.add_marker(pytest.mark.xfail(reason=reason, strict=False))
+
+    def may_rerun(self, item, attempt):
+        return (attempt < self.reruns and self.spent < (self.budget or 0)
+                and item.nodeid not in self.quarantined and item.nodeid not in self.broken)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        if self.reruns < 1:
+            return None
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        attempt = 0
+        while True:
+            retry = self.may_rerun(item, attempt)
+            item.stash[ATTEMPT_KEY] = attempt
+            # Reports copy the list: each attempt reports only its own properties
+            item.user_properties.clear()
+            # Until the test has passed or used up its reruns, tear down only its own fixtures
+            reports = runtestprotocol(item, nextitem=item.parent if retry else nextitem, log=False)
+            failed = next((report for report in reports if report.failed), None)
+            if failed is not None and retry:
+                self.record(failed, reports, attempt, RERUN)
+                for report in reports:
+                    report.outcome = RERUN
+                    item.ihook.pytest_runtest_logreport(report=report)
+                self.spent += 1
+                attempt += 1
+                continue
+            if retry:
+                reports[-1] = self.finish_teardown(item, nextitem, reports[-1])
+            for report in reports:
+                if report.failed or is_quarantined_failure(report):
+                    self.record(report, reports, attempt, QUARANTINED if report.skipped else "failed")
+                item.ihook.pytest_runtest_logreport(report=report)
+            break
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        return True
+
+    @staticmethod
+    def record(report, reports, attempt, outcome):
+        recorded = [entry for name, value in reports[-1].user_properties if name == waits.PROPERTY
+                    for entry in value]
+        report.user_properties.append(
+            (PROPERTY, {"attempt": attempt, "outcome": outcome, "site": failure_site(report, recorded)}))
+
+    @staticmethod
+    def finish_teardown(item, nextitem, report):
+        """Tear down what a possible rerun kept; errors become the test's teardown report."""
+        call = pytest.CallInfo.from_call(lambda: item.session._setupstate.teardown_exact(nextitem), "teardown")
+        if call.excinfo is None:
+            return report
+        return item.ihook.pytest_runtest_makereport(item=item, call=call)
+
+    def pytest_report_teststatus(self, report, config):
+        if report.outcome == RERUN:
+            if report.longrepr is None:
+                return "", "", ""
+            return RERUN, "R", ("RERUN", {"yellow": True})
+        return None
+
+    def pytest_runtest_logreport(self, report):
+        if self.is_worker:
+            return
+        for name, value in report.user_properties:
+            if name == PROPERTY:
+                self.attempts.setdefault(report.nodeid, []).append((value["attempt"], value["outcome"],
+                                                                    value["site"]))
+        if report.when == "call" and report.passed:
+            self.passed.add(report.nodeid)
+
+    def summary_lines(self):
+        reran = [nodeid for nodeid, attempts in self.attempts.items()
+                 if any(outcome == RERUN for _, outcome, _ in attempts)]
+        quarantined = [nodeid for nodeid, attempts in self.attempts.items()
+                       if any(outcome == QUARANTINED for _, outcome, _ in attempts)]
+        if not reran and not self.quarantined:
+            return []
+        flaky = [nodeid for nodeid in reran if nodeid in self.passed]
+        reruns = sum(outcome == RERUN for attempts in self.attempts.values() for _, outcome, _ in attempts)
+        exhausted = ", used up" if reruns >= (self.budget or 0) else ""
+        lines = [f"{reruns} reruns in fresh browsers (retry budget {self.budget}{exhausted}): "
+                 f"{len(flaky)} of {len(reran)} failed tests passed on a rerun"]
+        for nodeid in sorted(reran, key=lambda nodeid: (nodeid not in flaky, nodeid)):
+            score, runs = self.scores.get(nodeid, (0.0, 0))
+            verdict = "flaky " if nodeid in flaky else "failed"
+            lines.append(f"  {verdict}  score {score:.2f} over {runs:2d} runs  {nodeid}")
+        if self.quarantined:
+            lines.append(f"{len(self.quarantined)} quarantined (flake score >= {self.threshold:.2f}), "
+                         f"{len(quarantined)} of them failed and were reported as xfail")
+            for nodeid, score in sorted(self.quarantined.items(), key=lambda item: -item[1]):
+                lines.append(f"  {'failed' if nodeid in quarantined else 'passed'}  score {score:.2f}  {nodeid}")
+        sites = {}
+        for nodeid in flaky + quarantined:
+            for _, outcome, site in self.attempts[nodeid]:
+                tests = sites.setdefault(site, [0, set()])
+                tests[0] += 1
+                tests[1].add(nodeid)
+        if sites:
+            lines.append("Flaky failures by wait or locator:")
+            for site, (count, tests) in sorted(sites.items(), key=lambda item: (-item[1][0], item[0])):
+                lines.append(f"  {count:3d}x  {site}  ({len(tests)} tests)")
+        return lines
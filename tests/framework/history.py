@@ -0,0 +1,237 @@
+"""
+Test duration history and history-based scheduling.
+
+Every run appends one row per test to a local SQLite database: outcome,
+setup/call/teardown seconds, the WebDriver command count (from the
+``webdriver_commands`` user property) and whether the test ran on a browsing
+context shared with other tests (``--contexts``). Such a test is slowed down
+by the ones beside it, so its row counts for outcomes but not for durations. Rows are never updated, so the
+database is the timing record of every run on this machine or agent.
+
+``--schedule history`` (the default) orders the collected tests with it:
+tests that failed in their most recent run first, for fast feedback, then
+the rest longest-first by median duration, so ``--workers`` shards pack
+well and the long checkout flows do not start last. Tests without history
+keep their collection order after the failures, at the median duration.
+
+The outcome is "flaky" when the test failed and then passed on a rerun,
+and "failed" when a quarantined test's failure was reported as xfail; the
+``flaky`` plugin scores tests by these outcomes.
+
+After the run, each test's duration is compared with its recent passing
+runs. A test is flagged as a regression when it took more than
+``REGRESSION_SIGMAS`` robust standard deviations (1.4826 x MAD) above its
+median, at least ``REGRESSION_RATIO`` times the median and at least
+``REGRESSION_FLOOR`` seconds longer. Too few runs means no verdict.
+"""
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+from . import commands, contexts, flaky
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    workers INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    nodeid TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    setup REAL NOT NULL,
+    call REAL NOT NULL,
+    teardown REAL NOT NULL,
+    commands INTEGER,
+    contexts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_nodeid ON results (nodeid, run_id);
+"""
+
+WINDOW = 20                # recent runs a test is judged against
+MIN_SAMPLES = 5
+REGRESSION_SIGMAS = 3.0
+REGRESSION_RATIO = 1.5
+REGRESSION_FLOOR = 0.5     # seconds
+
+
+class HistoryStore:
+    """Append-only timing database."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.executescript(SCHEMA)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(results)")]
+        if "contexts" not in columns:
+            # Databases written before --contexts existed only hold solo runs
+            with self.connection:
+                self.connection.execute("ALTER TABLE results ADD COLUMN contexts INTEGER NOT NULL DEFAULT 0")
+
+    def close(self):
+        self.connection.close()
+
+    def append_run(self, results, workers=0, started=None):
+        """``results`` is an iterable of (nodeid, outcome, setup, call, teardown, commands, contexts)."""
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO runs (started, workers) VALUES (?, ?)",
+                                             (started or time.time(), workers))
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO results (run_id, nodeid, outcome, setup, call, teardown, commands, contexts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *result[:6], int(bool(result[6]))) for result in results],
+            )
+        return run_id
+
+    def recent(self, nodeids=None, window=WINDOW):
+        """
+        nodeid -> [(outcome, total seconds, commands), ...], newest first, at most
+        ``window`` each. Seconds are None for runs on a shared browsing context.
+        """
+        rows = self.connection.execute(
+            "SELECT nodeid, outcome, CASE WHEN contexts THEN NULL ELSE setup + call + teardown END, commands "
+            "FROM results ORDER BY run_id DESC"
+        )
+        wanted = set(nodeids) if nodeids is not None else None
+        history = {}
+        for nodeid, outcome, seconds, count in rows:
+            if wanted is not None and nodeid not in wanted:
+                continue
+            entries = history.setdefault(nodeid, [])
+            if len(entries) < window:
+                entries.append((outcome, seconds, count))
+        return history
+
+    def runs(self):
+        return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def median_durations(history):
+    """nodeid -> median seconds over its timed passing runs (all timed runs if it never passed)."""
+    medians = {}
+    for nodeid, entries in history.items():
+        timed = [(outcome, seconds) for outcome, seconds, _ in entries if seconds is not None]
+        passed = [seconds for outcome, seconds in timed if outcome == "passed"]
+        if timed:
+            medians[nodeid] = statistics.median(passed or [seconds for _, seconds in timed])
+    return medians
+
+
+def schedule(nodeids, history):
+    """Most recently failed first, then longest median first; unknown tests at the overall median."""
+    medians = median_durations(history)
+    fallback = statistics.median(medians.values()) if medians else 0.0
+    position = {nodeid: index for index, nodeid in enumerate(nodeids)}
+
+    def key(nodeid):
+        entries = history.get(nodeid)
+        failed = bool(entries) and entries[0][0] == "failed"
+        return (not failed, -medians.get(nodeid, fallback), position[nodeid])
+
+    return sorted(nodeids, key=key)
+
+
+def regression(seconds, entries):
+    """The threshold ``seconds`` crossed against ``entries``' passing runs, or None."""
+    passed = [duration for outcome, duration, _ in entries if outcome == "passed" and duration is not None]
+    if len(passed) < MIN_SAMPLES:
+        return None
+    median = statistics.median(passed)
+    spread = 1.4826 * statistics.median(abs(duration - median) for duration in passed)
+    threshold = max(median + REGRESSION_SIGMAS * spread, median * REGRESSION_RATIO, median + REGRESSION_FLOOR)
+    return threshold if seconds > threshold else None
+
+
+class HistoryPlugin:
+    """Records every run in the ``HistoryStore`` and orders tests by it (``--schedule history``)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.results = {}          # nodeid -> {"outcome", "setup", "call", "teardown", "commands"}
+        self.previous = {}         # history of the collected tests, read before this run
+        self.regressions = []
+        self.started = time.time()
+        self._store = None
+
+    @property
+    def is_worker(self):
+        return self.config.getoption("--worker-results") is not None
+
+    @property
+    def store(self):
+        # Opened lazily: the cache provider is configured after this plugin
+        if self._store is None:
+            path = self.config.getoption("--history")
+            if path is None:
+                cache = getattr(self.config, "cache", None)
+                if cache is None:
+                    return None
+                path = cache.mkdir("opencart") / "history.sqlite3"
+            self._store = HistoryStore(path)
+        return self._store
+
+    @property
+    def durations(self):
+        """Median seconds per collected test, for sharding."""
+        return median_durations(self.previous)
+
+    def pytest_collection_modifyitems(self, config, items):
+        if self.is_worker or self.store is None:
+            return
+        self.previous = self.store.recent([item.nodeid for item in items])
+        if config.getoption("--schedule") == "history" and self.previous:
+            order = {nodeid: index for index, nodeid in enumerate(schedule([item.nodeid for item in items],
+                                                                           self.previous))}
+            items.sort(key=lambda item: order[item.nodeid])
+
+    def pytest_runtest_logreport(self, report):
+        if self.is_worker:
+            return
+        entry = self.results.setdefault(report.nodeid, {"outcome": "passed", "setup": 0.0, "call": 0.0,
+                                                        "teardown": 0.0, "commands": None})
+        entry[report.when] += report.duration
+        if report.failed or flaky.is_quarantined_failure(report):
+            entry["outcome"] = "failed"
+        elif report.outcome == flaky.RERUN and entry["outcome"] == "passed":
+            entry["outcome"] = "flaky"
+        elif report.skipped and entry["outcome"] == "passed":
+            entry["outcome"] = "skipped"
+        for name, value in report.user_properties:
+            if name == commands.PROPERTY and report.when == "teardown":
+                entry["commands"] = (entry["commands"] or 0) + value
+            elif name == contexts.PROPERTY:
+                # Ran in a batch (set up with the first test of it): its own time on its context
+                entry.update(setup=0.0, call=value["seconds"], teardown=0.0, contexts=True)
+
+    def pytest_sessionfinish(self, session):
+        if self.is_worker or not self.results or self.store is None:
+            return
+        for nodeid, entry in self.results.items():
+            seconds = entry["setup"] + entry["call"] + entry["teardown"]
+            # Tests sharing a browser take longer than alone: no regression check for them
+            threshold = None if entry.get("contexts") else regression(seconds, self.previous.get(nodeid, ()))
+            if entry["outcome"] == "passed" and threshold is not None:
+                median = median_durations({nodeid: self.previous[nodeid]})[nodeid]
+                self.regressions.append((nodeid, seconds, median, threshold))
+        self.store.append_run(
+            [(nodeid, entry["outcome"], entry["setup"], entry["call"], entry["teardown"], entry["commands"],
+              entry.get("contexts", False))
+             for nodeid, entry in self.results.items()],
+            workers=self.config.getoption("--workers"), started=self.started,
+        )
+
+    def pytest_unconfigure(self, config):
+        if self._store is not None:
+            self._store.close()
+
+    def summary_lines(self):
+        lines = []
+        for nodeid, seconds, median, threshold in sorted(self.regressions, key=lambda item: item[2] - item[1]):
+            lines.append(f"  {seconds:7.2f}s  median {median:.2f}s, threshold {threshold:.2f}s  {nodeid}")
+        if lines:
+            lines.insert(0, f"{len(self.regressions)} tests slower than their history:")
+        return lines
@@ -0,0 +1,259 @@
+"""
+HTTP backend for tests that check server-side state.
+
+Cart contents, login redirects and session expiry do not need a rendered
+page. ``StoreClient`` drives the same OpenCart endpoints the browser's AJAX
+calls hit (``checkout/cart/add``, ``checkout/cart/edit``, ...) over a
+keep-alive ``requests`` session and reads the results with a small
+``html.parser`` based parser, so a state-transition scenario costs a few
+milliseconds instead of several page loads.
+
+Clients share one ``HTTPAdapter`` (and therefore its connection pool) while
+each keeps its own cookie jar, i.e. its own OpenCart session.
+"""
+import re
+from html.parser import HTMLParser
+from urllib.parse import quote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .model import ForkUnsupported
+
+SESSION_COOKIE = "OCSESSID"
+
+
+def make_adapter(pool_size=10):
+    """A connection pool that several ``StoreClient`` instances can share."""
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+
+class PageParser(HTMLParser):
+    """
+    Collects what the scenarios read from a page: title, element ids, form
+    inputs, links and the text of ``.alert-*`` boxes.
+    """
+
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.ids = set()
+        self.inputs = {}
+        self.links = []
+        self.alerts = []
+        self.text = []
+        self._stack = []
+        self._capture = []   # open captures: [kind, tag depth, text parts]
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("id"):
+            self.ids.add(attrs["id"])
+        if tag in ("input", "textarea") and attrs.get("name"):
+            self.inputs[attrs["name"]] = attrs.get("value", "")
+        if tag == "a":
+            self._link = [attrs.get("href", ""), []]
+        classes = (attrs.get("class") or "").split()
+        if "alert" in classes:
+            kind = next((name[6:] for name in classes if name.startswith("alert-")), "info")
+            self._capture.append([kind, len(self._stack), []])
+        if tag not in self.VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS or tag not in self._stack:
+            return
+        while self._stack and self._stack.pop() != tag:
+            pass
+        if tag == "a" and self._link is not None:
+            self.links.append(("".join(self._link[1]).strip(), self._link[0]))
+            self._link = None
+        while self._capture and self._capture[-1][1] >= len(self._stack):
+            kind, _, parts = self._capture.pop()
+            self.alerts.append((kind, " ".join("".join(parts).split())))
+
+    def handle_data(self, data):
+        if self._stack and self._stack[-1] == "title":
+            self.title += data
+        if self._stack and self._stack[-1] in ("script", "style"):
+            return
+        self.text.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+        for capture in self._capture:
+            capture[2].append(data)
+
+
+class Page:
+    """A parsed response: what a test would otherwise read from the DOM."""
+
+    def __init__(self, response):
+        parser = PageParser()
+        parser.feed(response.text)
+        parser.close()
+        self.url = response.url
+        self.status = response.status_code
+        self.title = parser.title.strip()
+        self.ids = parser.ids
+        self.inputs = parser.inputs
+        self.links = parser.links
+        self.alerts = parser.alerts
+        self.text = " ".join("".join(parser.text).split())
+
+    def alert_texts(self, kind):
+        return [text for alert_kind, text in self.alerts if alert_kind == kind]
+
+    def has_link(self, partial_text):
+        return any(partial_text in text for text, _ in self.links)
+
+
+class StoreClient:
+    """
+    Page-level store operations over HTTP.
+
+    Mirrors what the browser tests do through the UI: add to cart, update a
+    quantity, remove an item, log in, read alerts. ``last_alerts`` holds the
+    alerts of the most recent operation, whether they came from a page or
+    from an AJAX JSON response.
+    """
+
+    def __init__(self, base_url, adapter=None, timeout=10):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._owns_adapter = adapter is None
+        adapter = adapter or make_adapter()
+        self.adapter = adapter
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.last_alerts = []
+        self.last_page = None
+        self.requests = 0
+
+    def url(self, route, **params):
+        query = "".join(f"&{key}={value}" for key, value in params.items())
+        return f"{self.base_url}index.php?route={route}{query}"
+
+    def _request(self, method, route, data=None, **params):
+        self.requests += 1
+        return self.session.request(method, self.url(route, **params), data=data, timeout=self.timeout)
+
+    def open(self, route, **params):
+        return self._page(self._request("GET", route, **params))
+
+    def _post_page(self, route, data):
+        return self._page(self._request("POST", route, data=data))
+
+    def _page(self, response):
+        page = Page(response)
+        self.last_page = page
+        self.last_alerts = page.alerts
+        return page
+
+    def _post_json(self, route, data):
+        result = self._request("POST", route, data=data).json()
+        self.last_alerts = []
+        if result.get("success"):
+            self.last_alerts.append(("success", strip_tags(result["success"])))
+        for message in flatten_errors(result.get("error")):
+            self.last_alerts.append(("danger", strip_tags(message)))
+        return result
+
+    # -- cart ------------------------------------------------------------
+
+    def add_to_cart(self, product_id, quantity=1):
+        return self._post_json("checkout/cart/add", {"product_id": product_id, "quantity": quantity})
+
+    def cart(self):
+        return self.open("checkout/cart")
+
+    def cart_items(self):
+        """Cart key -> quantity, as shown on the cart page."""
+        return {
+            match.group(1): int(value)
+            for name, value in self.cart().inputs.items()
+            for match in [re.fullmatch(r"quantity\[(.+)\]", name)] if match
+        }
+
+    def update_quantity(self, key, quantity):
+        return self._post_page("checkout/cart/edit", {f"quantity[{key}]": quantity})
+
+    def remove(self, key):
+        return self._post_json("checkout/cart/remove", {"key": key})
+
+    def search(self, term):
+        return self.open("product/search", search=quote(term))
+
+    # -- account ---------------------------------------------------------
+
+    def login(self, email, password):
+        return self._post_page("account/login", {"email": email, "password": password})
+
+    def logout(self):
+        return self.open("account/logout")
+
+    def register(self, firstname, lastname, email, telephone, password):
+        return self._post_page("account/register", {
+            "firstname": firstname, "lastname": lastname, "email": email, "telephone": telephone,
+            "password": password, "confirm": password, "newsletter": "0", "agree": "1",
+        })
+
+    def is_logged_in(self):
+        return "route=account/login" not in self.open("account/account").url
+
+    def add_to_wishlist(self, product_id):
+        return self._post_json("account/wishlist/add", {"product_id": product_id})
+
+    def wishlist_product_ids(self):
+        page = self.open("account/wishlist")
+        return sorted({int(match) for _, href in page.links
+                       for match in re.findall(r"product_id=(\d+)", href)
+                       if "route=product/product" in href})
+
+    def remove_from_wishlist(self, product_id):
+        return self.open("account/wishlist", remove=product_id)
+
+    # -- session ---------------------------------------------------------
+
+    def clear_cookies(self):
+        """What ``driver.delete_all_cookies()`` does: drop the OpenCart session."""
+        self.session.cookies.clear()
+
+    def fork(self):
+        """
+        A client on a copy of this OpenCart session, for branching model paths.
+
+        Only the stand-in can copy a session; the live store raises
+        ``ForkUnsupported`` and callers replay the prefix instead.
+        """
+        response = self._request("POST", "testing/session/clone")
+        if response.status_code != 200 or "json" not in response.headers.get("Content-Type", ""):
+            raise ForkUnsupported(self.base_url)
+        clone = StoreClient(self.base_url, adapter=self.adapter, timeout=self.timeout)
+        clone.session.cookies.set(
+            SESSION_COOKIE, response.json()["session_id"], domain=urlsplit(self.base_url).hostname, path="/"
+        )
+        return clone
+
+    def alerts(self, kind):
+        return [text for alert_kind, text in self.last_alerts if alert_kind == kind]
+
+    def close(self):
+        # A shared adapter outlives its clients; closing it would drop the pool
+        if self._owns_adapter:
+            self.session.close()
+
+
+def strip_tags(html):
+    return " ".join(re.sub(r"<[^>]+>", "", html).split())
+
+
+def flatten_errors(error):
+    if not error:
+        return []
+    if isinstance(error, dict):
+        return [message for value in error.values() for message in flatten_errors(value)]
+    return [error]
@@ -0,0 +1,573 @@
+"""
+Test-impact selection: rerun only the tests whose pages changed.
+
+While a browser test runs, ``record`` notes every page it visits and every
+locator it reads or acts on. Page objects report their locators through
+``touch``, and raw ``driver.find_element`` calls are caught on the driver.
+The pages are keyed by route plus the parameters that pick the content
+(``route=checkout/cart``, ``route=product/product&product_id=43``). The
+result is attached to the test as the ``impact`` user property, so
+``--workers`` runs are indexed too.
+
+At the end of the session every page those tests used is fetched once over
+HTTP and fingerprinted. The fingerprint is a hash of the server-rendered
+subtree each recorded locator matches, plus the response status. These go
+into a JSON index on disk. Only the tests that ran are rewritten, so the
+index is updated incrementally.
+
+``--impact select`` re-fetches the fingerprints (one GET per page, in
+parallel) before the run and deselects every test whose last run passed
+and whose module, pages and locator subtrees are all unchanged. Tests that
+are new, failed or skipped last time, or recorded no pages (the HTTP-only
+tests), always run. So does everything when the framework or conftest
+changed.
+
+Locators are matched against the HTML with a small CSS subset (tags, ids,
+classes, attribute tests, ``:nth-child``, descendant and child
+combinators), Selenium's name/tag/class/link-text strategies and
+``contains(text(), ...)`` XPath. A locator outside that subset falls back
+to the whole ``<body>``: a false rerun is cheap, a missed one is not.
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from selenium.webdriver.remote.command import Command
+
+from .commands import restore_execute
+from .http_backend import PageParser, make_adapter
+
+PROPERTY = "impact"
+INDEX_VERSION = 1
+# Query parameters that identify a session or a visitor, not the page content
+VOLATILE_PARAMS = {"route", "token", "user_token", "customer_token", "OCSESSID", "language", "currency"}
+FIND_COMMANDS = {Command.FIND_ELEMENT, Command.FIND_ELEMENTS}
+FRAMEWORK_DIR = Path(__file__).resolve().parent
+
+_touched = None   # list while a test is being recorded
+_last_url = None
+
+
+def page_key(url):
+    """``route=product/product&product_id=43`` for a store URL; None for anything else."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return None
+    query = parse_qsl(parts.query)
+    route = next((value for name, value in query if name == "route"), "common/home")
+    params = sorted((name, value) for name, value in query if name not in VOLATILE_PARAMS)
+    return urlencode([("route", route)] + params, safe="/")
+
+
+def touch(url, by=None, selector=None):
+    """Record that the running test visited ``url`` (and read ``by``/``selector`` there)."""
+    global _last_url
+    if _touched is None:
+        return
+    _last_url = url
+    _touched.append((url, by, selector))
+
+
+@contextmanager
+def record(request, driver):
+    """Attach the pages and locators the test used to its reports (``--impact`` on)."""
+    global _touched, _last_url
+    if request.config.getoption("--impact") == "off":
+        yield
+        return
+    _touched, _last_url = [], None
+    previous = driver.__dict__.get("execute")
+    original = driver.execute
+
+    def execute(command, params=None):
+        if command == Command.GET:
+            touch(params["url"])
+        elif command in FIND_COMMANDS and _last_url is not None:
+            touch(_last_url, params.get("using"), params.get("value"))
+        return original(command, params)
+
+    driver.execute = execute
+    try:
+        yield
+    finally:
+        restore_execute(driver, previous)
+        pages = {}
+        for url, by, selector in _touched:
+            key = page_key(url)
+            if key is None:
+                continue
+            locators = pages.setdefault(key, [])
+            if by is not None and [by, selector] not in locators:
+                locators.append([by, selector])
+        _touched = None
+        request.node.user_properties.append((PROPERTY, pages))
+
+
+# -- fingerprints ----------------------------------------------------------
+
+class Node:
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []      # Node or str
+
+    @property
+    def elements(self):
+        return [child for child in self.children if isinstance(child, Node)]
+
+    def text(self):
+        return "".join(child if isinstance(child, str) else child.text() for child in self.children)
+
+    def iter(self):
+        for child in self.elements:
+            yield child
+            yield from child.iter()
+
+    def canonical(self):
+        """Tag, sorted attributes, collapsed text and children; what a fingerprint hashes."""
+        attrs = " ".join(f"{name}={value!r}" for name, value in sorted(self.attrs.items()))
+        inner = "".join(
+            child.canonical() if isinstance(child, Node) else " ".join(child.split())
+            for child in self.children
+        )
+        return f"<{self.tag} {attrs}>{inner}</{self.tag}>"
+
+
+class TreeParser(HTMLParser):
+    """Builds a ``Node`` tree, tolerating the unclosed tags real pages have."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = self.current = Node("#document", {})
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or "" for name, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in PageParser.VOID_TAGS:
+            self.current = node
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_document(html):
+    parser = TreeParser()
+    parser.feed(html)
+    parser.close()
+    return parser.root
+
+
+_SIMPLE = re.compile(r"""
+    \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[\^$*~|]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]*))\s*)?\]
+  | :nth-child\((?P<nth>\d+)\)
+""", re.X)
+_TAG = re.compile(r"[a-zA-Z][\w-]*|\*")
+_CONTAINS_TEXT = re.compile(r"""^//(\*|[a-zA-Z]\w*)\[contains\(text\(\),\s*(?:'([^']*)'|"([^"]*)")\)\]$""")
+
+
+def _split(selector, separators):
+    """Split on ``separators`` outside brackets and quotes: [part, separator, part, ...]."""
+    parts, current, depth, quote = [], "", 0, None
+    for char in selector:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif depth == 0 and char in separators:
+            parts.append(current)
+            parts.append(char)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _compound(text):
+    """``button.btn-light[type='submit']`` -> [tests]; None if outside the subset."""
+    tests, position = [], 0
+    tag = _TAG.match(text)
+    if tag:
+        if tag.group() != "*":
+            tests.append(("tag", tag.group().lower()))
+        position = tag.end()
+    while position < len(text):
+        match = _SIMPLE.match(text, position)
+        if not match:
+            return None
+        if match.group("id"):
+            tests.append(("attr", "id", "=", match.group("id")))
+        elif match.group("cls"):
+            tests.append(("attr", "class", "~=", match.group("cls")))
+        elif match.group("nth"):
+            tests.append(("nth", int(match.group("nth"))))
+        else:
+            value = next((v for v in match.group("dq", "sq", "bare") if v is not None), None)
+            tests.append(("attr", match.group("attr"), match.group("op"), value))
+        position = match.end()
+    return tests if tests else None
+
+
+def _parse_css(selector):
+    """A list of chains ``[(combinator, tests), ...]``, or None if unsupported."""
+    chains = []
+    for group in _split(selector, ",")[::2]:
+        chain, combinator = [], " "
+        for index, piece in enumerate(_split(group.strip(), " >")):
+            if index % 2:
+                combinator = ">" if piece == ">" else combinator
+                continue
+            if not piece:
+                continue
+            tests = _compound(piece)
+            if tests is None:
+                return None
+            chain.append((combinator, tests))
+            combinator = " "
+        if not chain:
+            return None
+        chains.append(chain)
+    return chains
+
+
+def _attr_matches(node, name, op, expected):
+    value = node.attrs.get(name)
+    if value is None:
+        return False
+    if op is None:
+        return True
+    if op == "=":
+        return value == expected
+    if op == "~=":
+        return expected in value.split()
+    if op == "^=":
+        return value.startswith(expected)
+    if op == "$=":
+        return value.endswith(expected)
+    if op == "*=":
+        return expected in value
+    return value == expected or value.startswith(expected + "-")    # |=
+
+
+def _matches(node, tests):
+    for test in tests:
+        if test[0] == "tag" and node.tag != test[1]:
+            return False
+        if test[0] == "attr" and not _attr_matches(node, *test[1:]):
+            return False
+        if test[0] == "nth" and (node.parent is None or node not in node.parent.elements
+                                 or node.parent.elements.index(node) + 1 != test[1]):
+            return False
+    return True
+
+
+def _chain_matches(node, chain):
+    combinator, tests = chain[-1]
+    if not _matches(node, tests):
+        return False
+    if len(chain) == 1:
+        return True
+    parent = node.parent
+    if combinator == ">":
+        return parent is not None and _chain_matches(parent, chain[:-1])
+    while parent is not None:
+        if _chain_matches(parent, chain[:-1]):
+            return True
+        parent = parent.parent
+    return False
+
+
+def select(root, by, selector):
+    """Nodes ``by``/``selector`` matches in ``root``; None if the locator is outside the subset."""
+    nodes = list(root.iter())
+    if by == "id":
+        return [node for node in nodes if node.attrs.get("id") == selector]
+    if by == "name":
+        return [node for node in nodes if node.attrs.get("name") == selector]
+    if by == "tag name":
+        return [node for node in nodes if node.tag == selector.lower()]
+    if by == "class name":
+        return [node for node in nodes if selector in node.attrs.get("class", "").split()]
+    if by in ("link text", "partial link text"):
+        links = [node for node in nodes if node.tag == "a"]
+        if by == "link text":
+            return [node for node in links if " ".join(node.text().split()) == selector]
+        return [node for node in links if selector in node.text()]
+    if by == "css selector":
+        chains = _parse_css(selector)
+        if chains is None:
+            return None
+        return [node for node in nodes if any(_chain_matches(node, chain) for chain in chains)]
+    if by == "xpath":
+        match = _CONTAINS_TEXT.match(selector)
+        if not match:
+            return None
+        tag, text = match.group(1), match.group(2) if match.group(2) is not None else match.group(3)
+        return [node for node in nodes if (tag == "*" or node.tag == tag)
+                and any(isinstance(child, str) and text in child for child in node.children)]
+    return None
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def locator_key(by, selector):
+    return f"{by}={selector}"
+
+
+def fingerprint_page(status, html, base_url, locators):
+    """{"status": ..., locator key: subtree hash} for one fetched page."""
+    # Absolute links embed the store URL (the stand-in's port changes per run)
+    root = parse_document(html.replace(base_url.rstrip("/"), ""))
+    body = next((node for node in root.iter() if node.tag == "body"), root)
+    prints = {"status": str(status)}
+    for by, selector in locators:
+        nodes = select(root, by, selector)
+        if nodes is None:
+            nodes = [body]
+        prints[locator_key(by, selector)] = _digest("".join(node.canonical() for node in nodes))
+    return prints
+
+
+def fetch_fingerprints(base_url, pages, workers=8, timeout=10):
+    """
+    ``pages`` maps page key -> locators. Fetches every page once, in
+    parallel, and returns page key -> fingerprints (None if the fetch failed).
+    """
+    session = requests.Session()
+    adapter = make_adapter(workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def fetch(item):
+        key, locators = item
+        try:
+            response = session.get(f"{base_url.rstrip('/')}/index.php?{key}", timeout=timeout)
+        except requests.RequestException:
+            return key, None
+        return key, fingerprint_page(response.status_code, response.text, base_url, locators)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(executor.map(fetch, pages.items()))
+    finally:
+        session.close()
+
+
+def source_digest(*paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def framework_digest(conftest):
+    """Changes here can affect any test, so they invalidate the whole index."""
+    return source_digest(conftest, *sorted(FRAMEWORK_DIR.rglob("*.py")))
+
+
+# -- index -----------------------------------------------------------------
+
+class ImpactIndex:
+    """
+    ``tests`` maps node id -> {"outcome", "module", "pages": {page key:
+    {locator key: hash}}}. ``framework`` is the digest the entries were
+    recorded under.
+    """
+
+    def __init__(self, path, framework=None, tests=None):
+        self.path = Path(path)
+        self.framework = framework
+        self.tests = tests or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("framework"), data.get("tests"))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        with open(temporary, "w") as handle:
+            json.dump({"version": INDEX_VERSION, "framework": self.framework, "tests": self.tests},
+                      handle, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def locators(self, nodeids):
+        """page key -> locators recorded by any of ``nodeids``."""
+        pages = {}
+        for nodeid in nodeids:
+            for key, prints in self.tests.get(nodeid, {}).get("pages", {}).items():
+                locators = pages.setdefault(key, [])
+                for name in prints:
+                    if name != "status":
+                        by, selector = name.split("=", 1)
+                        if [by, selector] not in locators:
+                            locators.append([by, selector])
+        return pages
+
+    def reason(self, nodeid, module, current):
+        """Why ``nodeid`` must run against ``current`` fingerprints; None if it can be skipped."""
+        entry = self.tests.get(nodeid)
+        if entry is None:
+            return "new"
+        if entry["outcome"] != "passed":
+            return f"last run {entry['outcome']}"
+        if entry["module"] != module:
+            return "module changed"
+        if not entry["pages"]:
+            return "no pages recorded"
+        for key, prints in entry["pages"].items():
+            now = current.get(key)
+            if now is None:
+                return f"{key} unreachable"
+            if any(now.get(name) != value for name, value in prints.items()):
+                return f"{key} changed"
+        return None
+
+
+class ImpactPlugin:
+    """``--impact record``: keep the index up to date. ``--impact select``: also deselect unaffected tests."""
+
+    def __init__(self, config, store, conftest):
+        self.config = config
+        self.mode = config.getoption("--impact")
+        self.store = store                  # context manager yielding a base URL to fingerprint
+        self.framework = framework_digest(conftest)
+        self._index = None
+        self.modules = {}                   # nodeid -> module digest
+        self.ran = {}                       # nodeid -> [outcome, {page key: locators}]
+        self.current = {}                   # fingerprints fetched this session
+        self.selection = None               # (selected, deselected, reasons)
+
+    @property
+    def is_worker(self):
+        return self.config.getoption("--worker-results") is not None
+
+    @property
+    def index(self):
+        # Loaded lazily: the cache provider is configured after this plugin
+        if self._index is None:
+            path = self.config.getoption("--impact-index")
+            if path is None:
+                cache = getattr(self.config, "cache", None)
+                path = cache.mkdir("opencart") / "impact-index.json" if cache is not None \
+                    else Path(self.config.rootpath, ".impact-index.json")
+            self._index = ImpactIndex.load(path)
+        return self._index
+
+    def pytest_collection_modifyitems(self, config, items):
+        if self.is_worker:
+            return
+        digests = {}
+        for item in items:
+            path = str(item.path)
+            if path not in digests:
+                digests[path] = source_digest(path)
+            self.modules[item.nodeid] = digests[path]
+        if self.mode != "select":
+            return
+        if not self.index.tests or self.index.framework != self.framework:
+            reason = "framework or conftest changed" if self.index.tests else "no index yet"
+            self.selection = (len(items), 0, {reason: len(items)})
+            return
+        pages = self.index.locators(item.nodeid for item in items)
+        if pages:
+            with self.store() as base_url:
+                self.current = fetch_fingerprints(base_url, pages)
+        selected, deselected, reasons = [], [], {}
+        for item in items:
+            reason = self.index.reason(item.nodeid, self.modules[item.nodeid], self.current)
+            if reason is None:
+                deselected.append(item)
+            else:
+                selected.append(item)
+                reasons[reason] = reasons.get(reason, 0) + 1
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+        self.selection = (len(selected), len(deselected), reasons)
+
+    def pytest_runtest_logreport(self, report):
+        if self.is_worker:
+            return
+        entry = self.ran.setdefault(report.nodeid, ["passed", None])
+        if report.failed:
+            entry[0] = "failed"
+        elif report.skipped and entry[0] == "passed":
+            entry[0] = "skipped"
+        for name, value in report.user_properties:
+            if name != PROPERTY:
+                continue
+            pages = entry[1] if entry[1] is not None else {}
+            for key, locators in value.items():
+                known = pages.setdefault(key, [])
+                known.extend(locator for locator in locators if locator not in known)
+            entry[1] = pages
+
+    def pytest_sessionfinish(self, session):
+        if self.is_worker or self.config.option.collectonly or not self.ran:
+            return
+        if self.index.framework != self.framework:
+            # Recorded under other framework code: start over
+            self.index.framework, self.index.tests = self.framework, {}
+        wanted = {}
+        for outcome, pages in self.ran.values():
+            for key, locators in (pages or {}).items():
+                have = self.current.get(key)
+                if have is None or any(locator_key(*locator) not in have for locator in locators):
+                    known = wanted.setdefault(key, [])
+                    known.extend(locator for locator in locators if locator not in known)
+        if wanted:
+            with self.store() as base_url:
+                self.current.update(fetch_fingerprints(base_url, wanted))
+        for nodeid, (outcome, pages) in self.ran.items():
+            recorded = {}
+            for key, locators in (pages or {}).items():
+                prints = self.current.get(key)
+                if prints is None:
+                    outcome = "unfingerprinted"
+                    continue
+                recorded[key] = {"status": prints["status"],
+                                 **{locator_key(*locator): prints[locator_key(*locator)] for locator in locators}}
+            self.index.tests[nodeid] = {"outcome": outcome, "module": self.modules.get(nodeid), "pages": recorded}
+        self.index.save()
+
+    def summary_lines(self):
+        lines = []
+        if self.selection is not None:
+            selected, deselected, reasons = self.selection
+            lines.append(f"{selected} tests selected, {deselected} deselected as unaffected")
+            for reason, count in sorted(reasons.items(), key=lambda item: -item[1])[:8]:
+                lines.append(f"  {count:4d}  {reason}")
+        if self.ran and self._index is not None:
+            lines.append(f"index: {len(self.index.tests)} tests in {self.index.path}")
+        return lines
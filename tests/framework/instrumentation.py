@@ -0,0 +1,33 @@
+"""
+Everything recorded about a leased browser while a test drives it: WebDriver
+commands (``commands``), each command's timing and call site
+(``profiler``), time blocked in waits (``waits``), page
+performance samples (``perf``), accessibility audits of every page
+(``a11y``), the pages and locators the test depends
+on (``impact``) and the requests the network layer intercepted
+(``network``). Browser fixtures wrap their lease in
+``instrument`` so every browser test reports the same data. A ``shared``
+browser (other tests drive it at the same time, see ``contexts``) skips the
+two recorded process-wide.
+"""
+from contextlib import ExitStack, contextmanager
+
+from . import a11y, impact, network, perf
+from .profiler import profile_commands
+from .commands import count_commands
+from .waits import record_waits
+
+
+@contextmanager
+def instrument(request, driver, browser, viewport=None, shared=False):
+    with ExitStack() as stack:
+        # Innermost wrapper: it times the round-trip, not the other probes
+        stack.enter_context(profile_commands(request, driver))
+        stack.enter_context(count_commands(request, driver))
+        stack.enter_context(record_waits(request))
+        stack.enter_context(perf.probe(request, driver, browser, viewport))
+        stack.enter_context(a11y.probe(request, driver))
+        if not shared:
+            stack.enter_context(impact.record(request, driver))
+            stack.enter_context(network.record(request, driver))
+        yield driver
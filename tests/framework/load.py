@@ -0,0 +1,460 @@
+"""
+Concurrent-user load generation for the Performance & Load suite.
+
+The suite specifies 10-50 concurrent users for TC-005, TC-009 and TC-014.
+Browsers cannot provide that, so ``run_load`` replays the same cart,
+checkout and wishlist flows as asyncio virtual users over HTTP:
+
+* every virtual user has its own cookie jar (its own OpenCart session);
+* all users share an ``AsyncConnectionPool`` of keep-alive HTTP/1.1
+  connections, so connections are reused instead of reopened per request;
+* a ``LoadProfile`` starts users one by one over the ramp-up, keeps them all
+  running for the hold period and stops them one by one over the ramp-down;
+* every request of a flow is timed as a named transaction (``add-to-cart``,
+  ``cart-update``, ``checkout-guest``, ...) into an HDR-style ``Histogram``,
+  and completions are counted per second for throughput.
+
+The client is written on ``asyncio`` streams so the load mode needs nothing
+beyond the standard library; it runs offline against the stand-in store
+(``--store=local``).
+"""
+import asyncio
+import json
+import re
+import ssl
+import time
+from collections import Counter, defaultdict, namedtuple
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+MACBOOK = 43
+GUEST_DETAILS = {
+    "firstname": "Load", "lastname": "User", "email": "load@example.com", "telephone": "0123456",
+    "address_1": "1 Main St", "city": "Town", "postcode": "1000", "country": "BE",
+}
+
+
+# -- histogram ----------------------------------------------------------------
+
+class Histogram:
+    """
+    Log-linear latency histogram in the style of HdrHistogram.
+
+    Values (seconds) are counted in microseconds. Below ``sub_buckets`` every
+    microsecond has its own bucket; above it each power of two is split into
+    ``sub_buckets / 2`` linear buckets, so a recorded value is reported within
+    ``2 / sub_buckets`` of its true value (about 3% for the default 64) and
+    memory stays constant however many samples are recorded.
+    """
+
+    UNIT = 1e-6
+
+    def __init__(self, sub_buckets=64):
+        self.sub_buckets = sub_buckets
+        self.shift = sub_buckets.bit_length() - 1
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        ticks = int(value / self.UNIT)
+        if ticks < self.sub_buckets:
+            return ticks
+        exponent = ticks.bit_length() - self.shift
+        return (ticks >> exponent) << exponent
+
+    def record(self, value):
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct):
+        """Lower bound of the bucket holding the ``pct``-th percentile (seconds)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(pct / 100 * self.count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(bucket * self.UNIT, self.max)
+        return self.max
+
+    def distribution(self, rows=8):
+        """(upper bound in seconds, count) rows on a log scale, for display."""
+        if not self.count:
+            return []
+        low, high = max(self.min, self.UNIT), max(self.max, self.UNIT)
+        ratio = (high / low) ** (1 / rows) if high > low else 2.0
+        bounds = [low * ratio ** (i + 1) for i in range(rows)]
+        bins = [0] * rows
+        for bucket, count in self.counts.items():
+            value = bucket * self.UNIT
+            index = next((i for i, bound in enumerate(bounds) if value <= bound), rows - 1)
+            bins[index] += count
+        return list(zip(bounds, bins))
+
+
+# -- async HTTP client -------------------------------------------------------
+
+Response = namedtuple("Response", "status headers body url")
+
+
+def response_json(response):
+    return json.loads(response.body.decode("utf-8") or "{}")
+
+
+class AsyncConnectionPool:
+    """Keep-alive HTTP/1.1 connections shared by every virtual user."""
+
+    def __init__(self, limit=50):
+        self.limit = limit
+        self._idle = defaultdict(list)
+        self._slots = defaultdict(lambda: asyncio.Semaphore(limit))
+        self.opened = 0
+        self.reused = 0
+
+    async def acquire(self, scheme, host, port):
+        key = (scheme, host, port)
+        await self._slots[key].acquire()
+        while self._idle[key]:
+            reader, writer = self._idle[key].pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer, True
+            writer.close()
+        try:
+            context = ssl.create_default_context() if scheme == "https" else None
+            reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        except BaseException:
+            self._slots[key].release()
+            raise
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, scheme, host, port, connection, reusable):
+        key = (scheme, host, port)
+        reader, writer = connection
+        if reusable:
+            self._idle[key].append((reader, writer))
+        else:
+            writer.close()
+        self._slots[key].release()
+
+    def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+class VirtualUser:
+    """One simulated shopper: an OpenCart session driven over the shared pool."""
+
+    MAX_REDIRECTS = 5
+
+    def __init__(self, base_url, pool, report, timeout=30):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.pool = pool
+        self.report = report
+        self.timeout = timeout
+        self.cookies = {}
+
+    def url(self, route, **params):
+        query = "".join(f"&{key}={value}" for key, value in params.items())
+        return f"{self.base_url}index.php?route={route}{query}"
+
+    async def transaction(self, name, method, route, data=None, check=None, **params):
+        """Time one request (redirects included) as transaction ``name``."""
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._fetch(method, self.url(route, **params), data), self.timeout)
+            ok = response.status < 400 and (check is None or check(response))
+        # EOFError: readexactly's IncompleteReadError; IndexError: a malformed status line
+        except (OSError, EOFError, IndexError, asyncio.TimeoutError, ValueError) as error:
+            response, ok = error, False
+        self.report.record(name, time.perf_counter() - start, ok)
+        return response
+
+    async def _fetch(self, method, url, data):
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = await self._send(method, url, data)
+            if response.status not in (301, 302, 303, 307) or "location" not in response.headers:
+                return response
+            url = urljoin(url, response.headers["location"])
+            method, data = "GET", None
+        return response
+
+    async def _send(self, method, url, data):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        body = urlencode(data).encode() if data is not None else b""
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        lines = [f"{method} {target or '/'} HTTP/1.1", f"Host: {parts.netloc}",
+                 "Connection: keep-alive", "User-Agent: opencart-suite-load", f"Content-Length: {len(body)}"]
+        if data is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{name}={value}" for name, value in self.cookies.items()))
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+        for attempt in range(2):
+            reader, writer, reused = await self.pool.acquire(parts.scheme, parts.hostname, port)
+            reusable = False
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    # The server closed an idle keep-alive connection: retry once on a fresh one
+                    if reused and attempt == 0:
+                        continue
+                    raise ConnectionResetError("connection closed before the response")
+                status = int(status_line.split()[1])
+                headers, cookies = await self._read_headers(reader)
+                payload = await self._read_body(reader, headers)
+                for name, morsel in cookies.items():
+                    self.cookies[name] = morsel.value
+                reusable = headers.get("connection", "").lower() != "close"
+                return Response(status, headers, payload, url)
+            finally:
+                self.pool.release(parts.scheme, parts.hostname, port, (reader, writer), reusable)
+
+    async def _read_headers(self, reader):
+        headers, cookies = {}, SimpleCookie()
+        while True:
+            line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                return headers, cookies
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookies.load(value)
+            else:
+                headers[name] = value
+
+    async def _read_body(self, reader, headers):
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    return b"".join(chunks)
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+        if "content-length" in headers:
+            return await reader.readexactly(int(headers["content-length"]))
+        headers["connection"] = "close"
+        return await reader.read()
+
+
+# -- scenarios ----------------------------------------------------------------
+
+def _json_without_error(response):
+    return "error" not in response_json(response)
+
+
+def _cart_key(response):
+    match = re.search(rb'name="quantity\[([^\]]+)\]"', response.body)
+    return match.group(1).decode() if match else None
+
+
+async def cart_flow(user):
+    """TC-005: add to cart, view, update the quantity, remove."""
+    await user.transaction("add-to-cart", "POST", "checkout/cart/add",
+                           {"product_id": MACBOOK, "quantity": 1}, check=_json_without_error)
+    cart = await user.transaction("cart-view", "GET", "checkout/cart")
+    key = _cart_key(cart) if isinstance(cart, Response) else None
+    if key is None:
+        return
+    await user.transaction("cart-update", "POST", "checkout/cart/edit", {f"quantity[{key}]": 2},
+                           check=lambda response: b"alert-success" in response.body)
+    await user.transaction("cart-remove", "POST", "checkout/cart/remove", {"key": key})
+
+
+async def checkout_flow(user):
+    """TC-009: guest checkout from a filled cart to the order confirmation."""
+    await user.transaction("add-to-cart", "POST", "checkout/cart/add",
+                           {"product_id": MACBOOK, "quantity": 1}, check=_json_without_error)
+    await user.transaction("checkout-open", "GET", "checkout/checkout")
+    await user.transaction("checkout-guest", "POST", "checkout/guest/save", GUEST_DETAILS,
+                           check=_json_without_error)
+    await user.transaction("checkout-payment", "POST", "checkout/payment_method/save", {"agree": "1"},
+                           check=_json_without_error)
+    await user.transaction("checkout-confirm", "POST", "checkout/confirm",
+                           check=lambda response: b"checkout/success" in response.body)
+
+
+async def wishlist_flow(user):
+    """TC-014: a guest adds to the wishlist and is asked to log in."""
+    await user.transaction("wishlist-add", "POST", "account/wishlist/add", {"product_id": MACBOOK},
+                           check=lambda response: "success" in response_json(response))
+
+
+SCENARIOS = {"TC-005": cart_flow, "TC-009": checkout_flow, "TC-014": wishlist_flow}
+
+
+# -- profile & runner -------------------------------------------------------
+
+class LoadProfile(namedtuple("LoadProfile", "users ramp_up hold ramp_down think_time")):
+    """Peak ``users``; durations in seconds."""
+
+    def __new__(cls, users=10, ramp_up=5.0, hold=30.0, ramp_down=5.0, think_time=0.0):
+        if users < 1:
+            raise ValueError("a load profile needs at least one user")
+        return super().__new__(cls, users, ramp_up, hold, ramp_down, think_time)
+
+    @classmethod
+    def parse(cls, users, spec):
+        """``spec`` is ``RAMP_UP,HOLD,RAMP_DOWN`` in seconds, e.g. ``5,30,5``."""
+        try:
+            ramp_up, hold, ramp_down = (float(part) for part in spec.split(","))
+        except ValueError:
+            raise ValueError(f"Expected RAMP_UP,HOLD,RAMP_DOWN seconds, got {spec!r}")
+        return cls(users, ramp_up, hold, ramp_down)
+
+    @property
+    def duration(self):
+        return self.ramp_up + self.hold + self.ramp_down
+
+    def window(self, index):
+        """(start, stop) offsets of user ``index``: first in is last out."""
+        start = self.ramp_up * index / self.users
+        stop = self.ramp_up + self.hold + self.ramp_down * (self.users - index) / self.users
+        return start, stop
+
+
+class LoadReport:
+    def __init__(self, profile):
+        self.profile = profile
+        self.histograms = defaultdict(Histogram)
+        self.errors = Counter()
+        self.per_second = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.iterations = 0
+        self.peak_users = 0
+        self.pool = None
+
+    def record(self, name, seconds, ok):
+        self.histograms[name].record(seconds)
+        if not ok:
+            self.errors[name] += 1
+        self.per_second[int(time.perf_counter() - self.started)] += 1
+
+    @property
+    def total(self):
+        return sum(histogram.count for histogram in self.histograms.values())
+
+    @property
+    def throughput(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def summary_lines(self):
+        profile = self.profile
+        lines = [
+            f"{profile.users} users (ramp-up {profile.ramp_up:g}s, hold {profile.hold:g}s, "
+            f"ramp-down {profile.ramp_down:g}s): {self.iterations} iterations, {self.total} requests "
+            f"in {self.elapsed:.1f}s, {self.throughput:.1f} req/s (peak {max(self.per_second.values(), default=0)} req/s, "
+            f"{self.peak_users} users active at once)",
+        ]
+        if self.pool is not None:
+            lines.append(f"connections: {self.pool.opened} opened, {self.pool.reused} reuses")
+        lines.append(f"  {'transaction':<18}{'count':>7}{'errors':>7}{'req/s':>7}"
+                     f"{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}  (ms)")
+        for name, histogram in sorted(self.histograms.items()):
+            rate = histogram.count / self.elapsed if self.elapsed else 0.0
+            lines.append(
+                f"  {name:<18}{histogram.count:>7}{self.errors[name]:>7}{rate:>7.1f}"
+                + "".join(f"{histogram.percentile(pct) * 1000:>8.1f}" for pct in (50, 90, 99))
+                + f"{histogram.max * 1000:>8.1f}"
+            )
+        return lines
+
+    def histogram_lines(self, name, width=40):
+        histogram = self.histograms[name]
+        rows = histogram.distribution()
+        peak = max((count for _, count in rows), default=0) or 1
+        return [f"  <= {bound * 1000:8.1f}ms {count:6d} {'#' * round(width * count / peak)}" for bound, count in rows]
+
+    def as_dict(self):
+        return {
+            "profile": self.profile._asdict(),
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "per_second": [self.per_second[second] for second in range(int(self.elapsed) + 1)],
+            "transactions": {
+                name: {
+                    "count": histogram.count, "errors": self.errors[name], "mean": histogram.mean,
+                    "p50": histogram.percentile(50), "p90": histogram.percentile(90),
+                    "p99": histogram.percentile(99), "max": histogram.max,
+                    "histogram": sorted((bucket * Histogram.UNIT, count) for bucket, count in histogram.counts.items()),
+                }
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+
+async def _virtual_user(index, base_url, pool, report, profile, scenarios, active):
+    start, stop = profile.window(index)
+    await asyncio.sleep(start)
+    deadline = report.started + stop
+    user = VirtualUser(base_url, pool, report)
+    active[0] += 1
+    report.peak_users = max(report.peak_users, active[0])
+    try:
+        turn = index
+        while time.perf_counter() < deadline:
+            # Users rotate through the scenarios so every flow runs at every load level
+            await scenarios[turn % len(scenarios)](user)
+            report.iterations += 1
+            turn += 1
+            if profile.think_time:
+                await asyncio.sleep(profile.think_time)
+    finally:
+        active[0] -= 1
+
+
+async def run_load_async(base_url, profile, scenarios=None, pool_limit=None):
+    """``scenarios`` maps names to ``async flow(user)``; defaults to ``SCENARIOS``."""
+    scenarios = list((scenarios or SCENARIOS).values())
+    pool = AsyncConnectionPool(limit=pool_limit or profile.users)
+    report = LoadReport(profile)
+    report.pool = pool
+    active = [0]
+    try:
+        await asyncio.gather(*(
+            _virtual_user(index, base_url, pool, report, profile, scenarios, active)
+            for index in range(profile.users)
+        ))
+    finally:
+        report.elapsed = time.perf_counter() - report.started
+        pool.close()
+    return report
+
+
+def run_load(base_url, profile, scenarios=None, pool_limit=None):
+    """Run ``profile`` against ``base_url`` and return a ``LoadReport``."""
+    return asyncio.run(run_load_async(base_url, profile, scenarios, pool_limit))
+
+
+def write_report(path, reports):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump([report.as_dict() for report in reports], handle, indent=2)
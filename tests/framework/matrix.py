@@ -0,0 +1,207 @@
+"""
+Browser x viewport x locale x zoom configuration matrix.
+
+Configuration tests declare the matrix once (through the ``browser_config``
+fixture) instead of copying a test per browser or per screen size. The
+browsers come from ``--browsers`` and the locales and zoom levels from
+``--locales`` / ``--zoom-levels``. A test can narrow the viewports with
+``@pytest.mark.viewports("tablet", "mobile")``.
+
+The full product of browser, device, orientation, locale and zoom is too
+expensive to run, so ``plan_matrix`` picks an n-wise covering array
+(``covering.py``): pairwise by default, 3-wise or the full product with
+``--config-coverage``. Rows are ordered by browser, so configurations
+sharing a browser run back-to-back on the same warm pooled driver.
+
+Locale and zoom are emulated per lease over CDP (``apply_config``). Browsers
+without CDP can only run the default locale at 100%; other cells are skipped.
+"""
+import math
+from collections import namedtuple
+
+from selenium.common.exceptions import WebDriverException
+
+from .covering import covering_array, full_product
+
+BROWSERS = ("chrome", "firefox", "edge")
+
+VIEWPORTS = {
+    "desktop": (1920, 1080),
+    "tablet": (768, 1024),             # iPad portrait
+    "tablet-landscape": (1024, 768),
+    "mobile": (375, 667),              # iPhone SE portrait
+    "mobile-landscape": (667, 375),    # iPhone SE landscape
+    "large-desktop": (2560, 1440),
+}
+
+# Device -> orientations it is used in; desktops are not rotated
+DEVICES = {
+    "desktop": ("landscape",),
+    "tablet": ("portrait", "landscape"),
+    "mobile": ("portrait", "landscape"),
+    "large-desktop": ("landscape",),
+}
+
+DEFAULT_LOCALE = "en-GB"
+DEFAULT_ZOOM = 100
+COVERAGE = {"pairwise": 2, "3-wise": 3, "full": None}
+
+
+def viewport_name(device, orientation):
+    """``tablet`` + ``landscape`` -> ``tablet-landscape``; natural orientations keep the device name."""
+    natural = "landscape" if VIEWPORTS[device][0] > VIEWPORTS[device][1] else "portrait"
+    return device if orientation == natural else f"{device}-{orientation}"
+
+
+def split_viewport(name):
+    """Inverse of ``viewport_name``: (device, orientation)."""
+    for device, orientations in DEVICES.items():
+        for orientation in orientations:
+            if viewport_name(device, orientation) == name:
+                return device, orientation
+    raise ValueError(f"Unknown viewport: {name}")
+
+
+class BrowserConfig(namedtuple("BrowserConfig", "browser viewport width height locale zoom",
+                               defaults=(DEFAULT_LOCALE, DEFAULT_ZOOM))):
+    """One cell of the matrix, e.g. ``chrome-tablet-de-DE-125%`` (768x1024)."""
+
+    @property
+    def orientation(self):
+        return "landscape" if self.width > self.height else "portrait"
+
+    @property
+    def css_width(self):
+        """Layout width the page sees at this zoom level."""
+        return round(self.width * 100 / self.zoom)
+
+    def __str__(self):
+        name = f"{self.browser}-{self.viewport}"
+        if self.locale != DEFAULT_LOCALE:
+            name += f"-{self.locale}"
+        if self.zoom != DEFAULT_ZOOM:
+            name += f"-{self.zoom}%"
+        return name
+
+
+def build_matrix(browsers=("chrome",), viewports=None):
+    """Return the full browser x viewport product in declaration order."""
+    _check_browsers(browsers)
+    names = list(viewports) if viewports else list(VIEWPORTS)
+    missing = [name for name in names if name not in VIEWPORTS]
+    if missing:
+        raise ValueError(f"Unknown viewport(s): {', '.join(missing)}")
+    return [
+        BrowserConfig(browser, name, *VIEWPORTS[name])
+        for browser in browsers
+        for name in names
+    ]
+
+
+def _check_browsers(browsers):
+    unknown = [name for name in browsers if name not in BROWSERS]
+    if unknown:
+        raise ValueError(f"Unknown browser(s): {', '.join(unknown)}")
+
+
+class MatrixPlan:
+    """The configurations chosen for one test, and what running them costs."""
+
+    def __init__(self, parameters, strength, configs, full_size):
+        self.parameters = parameters
+        self.strength = strength
+        self.configs = configs
+        self.full_size = full_size
+
+    def launches(self, max_uses):
+        """Browser launches when rows sharing a browser reuse one pooled driver."""
+        counts = {}
+        for config in self.configs:
+            counts[config.browser] = counts.get(config.browser, 0) + 1
+        return sum(math.ceil(count / max_uses) for count in counts.values())
+
+    def summary_line(self, name, max_uses):
+        domains = " x ".join(f"{key}({len(values)})" for key, values in self.parameters.items())
+        coverage = "full product" if self.strength is None else f"all {self.strength}-way combinations"
+        launches = self.launches(max_uses)
+        return (f"{name}: {len(self.configs)} of {self.full_size} configurations cover {coverage} of {domains}; "
+                f"{launches} warm browser launch(es) instead of {self.full_size} cold ones for the full product "
+                f"({self.full_size - launches} avoided)")
+
+
+def plan_matrix(browsers=("chrome",), viewports=None, locales=(DEFAULT_LOCALE,), zooms=(DEFAULT_ZOOM,),
+                coverage="pairwise"):
+    """
+    Choose configurations covering every ``coverage`` combination of browser,
+    device, orientation, locale and zoom. ``viewports`` (names from
+    ``VIEWPORTS``) limits the device/orientation pairs.
+    """
+    _check_browsers(browsers)
+    if coverage not in COVERAGE:
+        raise ValueError(f"Unknown coverage: {coverage} (expected {', '.join(COVERAGE)})")
+    pairs = [split_viewport(name) for name in viewports] if viewports else [
+        (device, orientation) for device, orientations in DEVICES.items() for orientation in orientations
+    ]
+    devices = list(dict.fromkeys(device for device, _ in pairs))
+    orientations = list(dict.fromkeys(orientation for _, orientation in pairs))
+    parameters = {"browser": list(browsers), "device": devices, "orientation": orientations,
+                  "locale": list(locales), "zoom": [int(zoom) for zoom in zooms]}
+
+    def allowed(row):
+        if "device" in row and "orientation" in row:
+            return (row["device"], row["orientation"]) in pairs
+        return True
+
+    strength = COVERAGE[coverage]
+    full = full_product(parameters, allowed)
+    rows = full if strength is None else covering_array(parameters, strength, allowed)
+    # Back-to-back per browser (in --browsers order) so one warm driver serves them
+    rows.sort(key=lambda row: (browsers.index(row["browser"]), devices.index(row["device"]),
+                               orientations.index(row["orientation"])))
+    configs = []
+    for row in rows:
+        name = viewport_name(row["device"], row["orientation"])
+        configs.append(BrowserConfig(row["browser"], name, *VIEWPORTS[name], row["locale"], row["zoom"]))
+    return MatrixPlan(parameters, strength, configs, len(full))
+
+
+def apply_config(driver, config):
+    """
+    Size the window and emulate the locale and zoom. Returns the aspects
+    this driver cannot emulate (empty when the whole config applies).
+    """
+    driver.set_window_size(config.width, config.height)
+    needs_cdp = config.locale != DEFAULT_LOCALE or config.zoom != DEFAULT_ZOOM
+    if not needs_cdp:
+        return []
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return [aspect for aspect, default in (("locale", DEFAULT_LOCALE), ("zoom", DEFAULT_ZOOM))
+                if getattr(config, aspect) != default]
+    try:
+        if config.zoom != DEFAULT_ZOOM:
+            # Zoom shrinks the CSS viewport and scales every CSS pixel
+            driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", {
+                "width": config.css_width, "height": round(config.height * 100 / config.zoom),
+                "deviceScaleFactor": config.zoom / 100, "mobile": False,
+            })
+        if config.locale != DEFAULT_LOCALE:
+            driver.execute_cdp_cmd("Emulation.setLocaleOverride", {"locale": config.locale})
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setExtraHTTPHeaders", {"headers": {"Accept-Language": config.locale}})
+    except WebDriverException:
+        return ["locale/zoom (CDP)"]
+    return []
+
+
+def clear_config(driver, config):
+    """Undo ``apply_config``'s emulation before the driver goes back to the pool."""
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return
+    try:
+        if config.zoom != DEFAULT_ZOOM:
+            driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+        if config.locale != DEFAULT_LOCALE:
+            driver.execute_cdp_cmd("Emulation.setLocaleOverride", {})
+            driver.execute_cdp_cmd("Network.setExtraHTTPHeaders", {"headers": {}})
+    except WebDriverException:
+        pass
@@ -0,0 +1,321 @@
+"""
+Declarative state-machine models and generated transition-coverage paths.
+
+A ``StateMachine`` declares states (with an optional invariant checked on
+entry), transitions (with an action, an optional guard and an optional effect
+on the model's context) and an initial state once. From it:
+
+* ``generate_paths`` plans a small set of paths from the initial state that
+  covers all states, all transitions (0-switch) or all transition pairs
+  (1-switch). Requirements are chained greedily, so one path covers as many as
+  it can before a fresh session is needed.
+* ``execute`` runs the paths as a prefix tree: a shared prefix is executed
+  once and the backend is forked at branch points. Backends without ``fork``
+  fall back to replaying the prefix on a fresh backend.
+* ``ModelReport`` summarises coverage and the actions saved compared with
+  running each requirement as its own test from the initial state.
+"""
+from collections import deque
+
+
+class ForkUnsupported(Exception):
+    """Raised by a backend's ``fork`` when its state cannot be copied."""
+
+
+class Transition:
+    def __init__(self, name, source, target, action, guard=None, effect=None):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.action = action
+        self.guard = guard
+        self.effect = effect
+
+    @property
+    def key(self):
+        return f"{self.source} --{self.name}--> {self.target}"
+
+    def enabled(self, context):
+        return self.guard is None or self.guard(context)
+
+    def apply(self, context):
+        return dict(context, **self.effect(context)) if self.effect else dict(context)
+
+    def __repr__(self):
+        return f"Transition({self.key})"
+
+
+class StateMachine:
+    """
+    ``invariants`` maps a state to ``check(backend, context)``; it runs every
+    time the state is entered. ``context`` is the extended state (e.g. the
+    expected cart quantity) that guards read and effects update.
+    """
+
+    def __init__(self, name, initial, transitions, invariants=None, context=None):
+        self.name = name
+        self.initial = initial
+        self.transitions = list(transitions)
+        self.invariants = dict(invariants or {})
+        self.initial_context = dict(context or {})
+        keys = [transition.key for transition in self.transitions]
+        if len(keys) != len(set(keys)):
+            raise ValueError(f"Duplicate transitions in model {name!r}")
+
+    @property
+    def states(self):
+        states = [self.initial]
+        for transition in self.transitions:
+            for state in (transition.source, transition.target):
+                if state not in states:
+                    states.append(state)
+        return states
+
+    def enabled(self, state, context):
+        return [t for t in self.transitions if t.source == state and t.enabled(context)]
+
+    def switch_pairs(self):
+        """All 1-switch requirements: consecutive transition pairs."""
+        return [
+            (first, second)
+            for first in self.transitions
+            for second in self.transitions
+            if first.target == second.source
+        ]
+
+
+def _freeze(context):
+    return tuple(sorted(context.items()))
+
+
+def _shortest_walk(machine, state, context, goal, max_depth):
+    """
+    BFS over (state, context) for the shortest walk that ends by taking the
+    transition sequence ``goal``. Returns the list of transitions or None.
+    """
+    queue = deque([(state, context, [])])
+    seen = {(state, _freeze(context))}
+    while queue:
+        current, ctx, walk = queue.popleft()
+        taken = _take_sequence(machine, current, ctx, goal)
+        if taken is not None:
+            return walk + goal
+        if len(walk) >= max_depth:
+            continue
+        for transition in machine.enabled(current, ctx):
+            next_ctx = transition.apply(ctx)
+            node = (transition.target, _freeze(next_ctx))
+            if node not in seen:
+                seen.add(node)
+                queue.append((transition.target, next_ctx, walk + [transition]))
+    return None
+
+
+def _take_sequence(machine, state, context, sequence):
+    for transition in sequence:
+        if transition.source != state or not transition.enabled(context):
+            return None
+        context = transition.apply(context)
+        state = transition.target
+    return state, context
+
+
+def _requirements(machine, criterion):
+    if criterion == "all-states":
+        # Entering a state through any one transition is enough
+        reqs = {}
+        for transition in machine.transitions:
+            reqs.setdefault(transition.target, [transition])
+        return [seq for state, seq in reqs.items() if state != machine.initial]
+    if criterion == "all-transitions":
+        return [[transition] for transition in machine.transitions]
+    if criterion == "1-switch":
+        return [[first, second] for first, second in machine.switch_pairs()]
+    raise ValueError(f"Unknown coverage criterion: {criterion}")
+
+
+def _covers(path, requirement):
+    width = len(requirement)
+    return any(path[i:i + width] == requirement for i in range(len(path) - width + 1))
+
+
+class Plan:
+    """
+    Generated paths for one coverage criterion.
+
+    ``naive_actions`` is what running every requirement as its own test costs:
+    the shortest walk from the initial state through it, replayed from scratch
+    each time. ``infeasible`` lists requirements the guards rule out.
+    """
+
+    def __init__(self, criterion, paths, naive_actions, infeasible):
+        self.criterion = criterion
+        self.paths = paths
+        self.naive_actions = naive_actions
+        self.infeasible = infeasible
+
+
+def generate_paths(machine, criterion="all-transitions", max_length=12):
+    """
+    Plan paths (lists of transitions from the initial state) meeting
+    ``criterion``: ``all-states``, ``all-transitions`` (0-switch) or
+    ``1-switch``.
+    """
+    pending, naive_actions, infeasible = [], 0, []
+    for requirement in _requirements(machine, criterion):
+        walk = _shortest_walk(machine, machine.initial, dict(machine.initial_context), requirement, max_length)
+        if walk is None:
+            infeasible.append(requirement)
+        else:
+            pending.append(requirement)
+            naive_actions += len(walk)
+
+    paths = []
+    while pending:
+        path, state, context = [], machine.initial, dict(machine.initial_context)
+        while pending and len(path) < max_length:
+            candidates = []
+            for requirement in pending:
+                walk = _shortest_walk(machine, state, context, requirement, max_length - len(path))
+                if walk is not None:
+                    candidates.append(walk)
+            if not candidates:
+                break
+            walk = min(candidates, key=len)
+            for transition in walk:
+                context = transition.apply(context)
+            state = walk[-1].target
+            path.extend(walk)
+            pending = [req for req in pending if not _covers(path, req)]
+        paths.append(path)
+    return Plan(criterion, paths, naive_actions, infeasible)
+
+
+class _Node:
+    def __init__(self, transition=None):
+        self.transition = transition
+        self.children = []
+
+    def child(self, transition):
+        for node in self.children:
+            if node.transition is transition:
+                return node
+        node = _Node(transition)
+        self.children.append(node)
+        return node
+
+
+def build_prefix_tree(paths):
+    root = _Node()
+    for path in paths:
+        node = root
+        for transition in path:
+            node = node.child(transition)
+    return root
+
+
+class ModelReport:
+    def __init__(self, machine, plan):
+        self.machine = machine
+        self.plan = plan
+        self.naive_actions = plan.naive_actions
+        self.executed_actions = 0
+        self.forks = 0
+        self.replayed_actions = 0
+        self.visited_states = set()
+        self.taken = []   # every transition sequence actually executed, per branch
+
+    def record(self, walk):
+        self.taken.append(walk)
+
+    @property
+    def covered_transitions(self):
+        return {t.key for walk in self.taken for t in walk}
+
+    @property
+    def covered_pairs(self):
+        return {
+            (first.key, second.key)
+            for walk in self.taken
+            for first, second in zip(walk, walk[1:])
+        }
+
+    @property
+    def saved_actions(self):
+        return self.naive_actions - self.executed_actions
+
+    def summary_lines(self):
+        machine = self.machine
+        total_pairs = len(machine.switch_pairs())
+        return [
+            f"{machine.name} [{self.plan.criterion}]: {len(self.plan.paths)} paths"
+            + (f", {len(self.plan.infeasible)} requirements infeasible under guards" if self.plan.infeasible else ""),
+            f"  states {len(self.visited_states)}/{len(machine.states)}, "
+            f"transitions {len(self.covered_transitions)}/{len(machine.transitions)}, "
+            f"1-switch {len(self.covered_pairs)}/{total_pairs}",
+            f"  actions executed {self.executed_actions} vs naive replay {self.naive_actions} "
+            f"(saved {self.saved_actions}; {self.forks} forks, {self.replayed_actions} replayed)",
+        ]
+
+
+def execute(machine, plan, backend_factory):
+    """
+    Run ``plan`` against backends from ``backend_factory`` sharing prefixes.
+
+    Every transition's action is called as ``action(backend, context)`` and
+    the target state's invariant is checked after it.
+    """
+    report = ModelReport(machine, plan)
+    root = build_prefix_tree(plan.paths)
+    context = dict(machine.initial_context)
+    backend = backend_factory()
+    _check(machine, machine.initial, backend, context, report)
+    _run_node(machine, root, backend, context, [], backend_factory, report)
+    return report
+
+
+def _check(machine, state, backend, context, report):
+    report.visited_states.add(state)
+    invariant = machine.invariants.get(state)
+    if invariant is not None:
+        invariant(backend, context)
+
+
+def _step(machine, transition, backend, context, report):
+    transition.action(backend, context)
+    context = transition.apply(context)
+    report.executed_actions += 1
+    _check(machine, transition.target, backend, context, report)
+    return context
+
+
+def _run_node(machine, node, backend, context, walk, backend_factory, report):
+    if not node.children:
+        report.record(walk)
+        return
+    # Copies for all but the first child must be taken before it mutates state
+    branches = [backend]
+    for _ in node.children[1:]:
+        branches.append(_branch(machine, backend, walk, backend_factory, report))
+    for child, branch in zip(node.children, branches):
+        next_context = _step(machine, child.transition, branch, dict(context), report)
+        _run_node(machine, child, branch, next_context, walk + [child.transition], backend_factory, report)
+
+
+def _branch(machine, backend, walk, backend_factory, report):
+    fork = getattr(backend, "fork", None)
+    if fork is not None:
+        try:
+            copy = fork()
+            report.forks += 1
+            return copy
+        except ForkUnsupported:
+            pass
+    copy = backend_factory()
+    context = dict(machine.initial_context)
+    for transition in walk:
+        transition.action(copy, context)
+        context = transition.apply(context)
+        report.executed_actions += 1
+        report.replayed_actions += 1
+    return copy
@@ -0,0 +1,628 @@
+"""
+Network interception: a persistent static-asset cache and third-party blocking.
+
+Every browser the pool launches used to download the store's stylesheets,
+scripts, fonts and product images again, plus whatever third-party widgets
+(analytics, ads, share buttons) the pages pull in. No assertion needs the
+third-party ones, and the static ones rarely change. ``NetworkLayer`` puts
+a policy in front of every browser's requests:
+
+- requests to ``DEFAULT_BLOCKED_DOMAINS`` (or ``--block-domains``) fail
+  immediately;
+- with ``--network=stub-images``, catalogue images (``/image/...``) are
+  answered with a 1x1 GIF, except in tests marked ``visual``;
+- static assets are served from ``AssetCache``, a content-addressed store on
+  disk (``~/.cache/opencart-suite/assets``) shared by every run on the
+  machine. Misses go to the network and fill the cache. Loopback origins
+  (the stand-in) are not cached: they are already local and their port
+  changes every run.
+
+Chromium browsers are intercepted with the CDP ``Fetch`` domain over the
+browser's DevTools websocket (``CdpInterceptor``). WebDriver's
+``execute_cdp_cmd`` cannot receive the ``Fetch.requestPaused`` events, so
+when the websocket cannot be reached only the blocking is kept, through
+``Network.setBlockedURLs``. Firefox is pointed at ``AssetProxy``, a local
+HTTP proxy with the same policy. It can see inside plain-HTTP requests
+only: HTTPS goes through as an opaque ``CONNECT`` tunnel, so it can be
+blocked by host but not cached.
+
+Each intercepted request is logged with its action and timing (the network
+time from request to response for fetched assets) and attached to the test
+as the ``network`` user property, so ``--workers`` runs report it too.
+"""
+import base64
+import hashlib
+import ipaddress
+import itertools
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+import websocket
+from selenium.common.exceptions import WebDriverException
+
+from .perf import percentile
+
+PROPERTY = "network"
+
+STATIC_TYPES = ("Stylesheet", "Script", "Font", "Image")
+
+EXTENSION_TYPES = {
+    ".css": "Stylesheet",
+    ".js": "Script",
+    ".woff": "Font", ".woff2": "Font", ".ttf": "Font", ".otf": "Font", ".eot": "Font",
+    ".png": "Image", ".jpg": "Image", ".jpeg": "Image", ".gif": "Image", ".svg": "Image",
+    ".webp": "Image", ".ico": "Image",
+}
+
+# Analytics, ads and share widgets; nothing the suite asserts on
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "facebook.net",
+    "addthis.com",
+    "sharethis.com",
+)
+
+MAX_AGE = 7 * 24 * 3600    # seconds a cached asset is served before it is fetched again
+
+PLACEHOLDER_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+# Dropped when relaying a response whose body has been decoded and re-sent
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "proxy-authorization", "proxy-authenticate",
+              "te", "trailer", "transfer-encoding", "upgrade", "content-encoding", "content-length"}
+
+
+class NetworkUnsupported(Exception):
+    """The browser exposes no DevTools websocket to intercept requests on."""
+
+
+def resource_type(url):
+    """The CDP resource type a URL's extension implies, or None (documents, XHR)."""
+    path = urlsplit(url).path.lower()
+    return EXTENSION_TYPES.get(os.path.splitext(path)[1])
+
+
+def is_blocked(host, domains):
+    host = (host or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def is_product_image(url):
+    return "/image/" in urlsplit(url).path
+
+
+class AssetCache:
+    """
+    URL -> body store. Bodies are saved once per SHA-256 under ``objects/``;
+    ``index.json`` maps each URL to its digest, content type, size and the
+    time it was fetched.
+    """
+
+    def __init__(self, directory, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+        self._added = {}
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def entry(self, url, now=None):
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is None or (now or time.time()) - entry["stored"] > self.max_age:
+            return None
+        return entry
+
+    def size(self, url):
+        """Size of the last copy stored, fresh or not (what a stubbed image would have cost)."""
+        with self._lock:
+            entry = self._index.get(url)
+        return entry["size"] if entry is not None else None
+
+    def get(self, url):
+        """(content type, body) of a fresh cached copy, or None."""
+        entry = self.entry(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._object_path(entry["digest"]), "rb") as handle:
+                return entry["content_type"], handle.read()
+        except OSError:
+            return None
+
+    def put(self, url, content_type, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as handle:
+                handle.write(body)
+            os.replace(temporary, path)
+        entry = {"digest": digest, "content_type": content_type, "size": len(body), "stored": time.time()}
+        with self._lock:
+            self._index[url] = self._added[url] = entry
+        return digest
+
+    def save(self):
+        """Merge this process's additions into the index on disk (workers share it)."""
+        with self._lock:
+            added, self._added = self._added, {}
+        if not added:
+            return
+        index = self._read_index()
+        index.update(added)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(index, handle)
+        os.replace(temporary, self.index_path)
+
+
+class CdpConnection:
+    """A DevTools websocket; events and command results are handled on its reader thread."""
+
+    def __init__(self, url, on_event):
+        self.socket = websocket.create_connection(url, suppress_origin=True, enable_multithread=True)
+        self.on_event = on_event
+        self._ids = itertools.count(1)
+        self._callbacks = {}
+        self._thread = threading.Thread(target=self._read, name="cdp-network", daemon=True)
+        self._thread.start()
+
+    def send(self, method, params=None, session_id=None, callback=None):
+        message = {"id": next(self._ids), "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        if callback is not None:
+            self._callbacks[message["id"]] = callback
+        try:
+            self.socket.send(json.dumps(message))
+        except (websocket.WebSocketException, OSError):
+            self._callbacks.pop(message["id"], None)
+
+    def _read(self):
+        while True:
+            try:
+                raw = self.socket.recv()
+            except (websocket.WebSocketException, OSError):
+                return
+            if not raw:
+                return
+            message = json.loads(raw)
+            if "id" in message:
+                callback = self._callbacks.pop(message["id"], None)
+                if callback is not None:
+                    callback(message.get("result"), message.get("error"))
+            else:
+                self.on_event(message.get("method"), message.get("params", {}), message.get("sessionId"))
+
+    def close(self):
+        try:
+            self.socket.close()
+        except (websocket.WebSocketException, OSError):
+            pass
+
+
+def debugger_address(driver):
+    """host:port of a Chromium browser's DevTools endpoint (``goog:`` or ``ms:`` options)."""
+    for key, value in driver.capabilities.items():
+        if key.endswith("Options") and isinstance(value, dict) and value.get("debuggerAddress"):
+            return value["debuggerAddress"]
+    return None
+
+
+def fetch_patterns(blocked_domains):
+    """Static assets pause at both stages (serve from cache / fill it); blocked hosts at request."""
+    patterns = [{"urlPattern": "*", "resourceType": kind, "requestStage": stage}
+                for stage in ("Request", "Response") for kind in STATIC_TYPES]
+    for domain in blocked_domains:
+        patterns += [{"urlPattern": f"*://{domain}/*"}, {"urlPattern": f"*://*.{domain}/*"}]
+    return patterns
+
+
+class CdpInterceptor:
+    """Applies a ``NetworkLayer``'s policy to every page of one Chromium browser."""
+
+    def __init__(self, driver, layer):
+        self.driver = driver
+        self.layer = layer
+        self.connection = None
+        self._attached = set()
+        self._pending = {}      # requestId -> perf_counter() when it went to the network
+        self._ready = threading.Event()
+
+    def start(self, timeout=5):
+        address = debugger_address(self.driver)
+        if address is None:
+            raise NetworkUnsupported("no debuggerAddress in the capabilities")
+        version = requests.get(f"http://{address}/json/version", timeout=timeout).json()
+        self.connection = CdpConnection(version["webSocketDebuggerUrl"], self._event)
+        # Windows opened later are attached as they appear
+        self.connection.send("Target.setDiscoverTargets", {"discover": True})
+        self.connection.send("Target.getTargets", callback=self._targets)
+        if not self._ready.wait(timeout):
+            self.stop()
+            raise NetworkUnsupported(f"Fetch.enable got no answer within {timeout}s")
+        return self
+
+    def stop(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def _targets(self, result, error):
+        pages = [info["targetId"] for info in (result or {}).get("targetInfos", ()) if info["type"] == "page"]
+        if not pages:
+            self._ready.set()
+        for target_id in pages:
+            self._attach(target_id)
+
+    def _attach(self, target_id):
+        if target_id in self._attached:
+            return
+        self._attached.add(target_id)
+
+        def attached(result, error):
+            if result is None:
+                self._ready.set()
+                return
+            self.connection.send("Fetch.enable", {"patterns": fetch_patterns(self.layer.blocked_domains)},
+                                 result["sessionId"], callback=lambda *_: self._ready.set())
+
+        self.connection.send("Target.attachToTarget", {"targetId": target_id, "flatten": True},
+                             callback=attached)
+
+    def _event(self, method, params, session_id):
+        if method == "Target.targetCreated" and params["targetInfo"]["type"] == "page":
+            self._attach(params["targetInfo"]["targetId"])
+        elif method == "Fetch.requestPaused":
+            self._paused(params, session_id)
+
+    def _paused(self, params, session_id):
+        request_id = params["requestId"]
+        url, method = params["request"]["url"], params["request"]["method"]
+        kind = params.get("resourceType") or resource_type(url)
+
+        def send(command, **extra):
+            self.connection.send(command, dict(extra, requestId=request_id), session_id)
+
+        if "responseStatusCode" in params or "responseErrorReason" in params:
+            started, action = self._pending.pop(request_id, (None, "pass"))
+            elapsed = (time.perf_counter() - started) * 1000 if started is not None else None
+            if action != "fetch" or params.get("responseStatusCode") != 200:
+                self.layer.log(url, kind, action, elapsed, None)
+                send("Fetch.continueRequest")
+                return
+            headers = {header["name"].lower(): header["value"] for header in params.get("responseHeaders", ())}
+
+            def store(result, error):
+                size = None
+                if result is not None:
+                    body = result["body"]
+                    body = base64.b64decode(body) if result.get("base64Encoded") else body.encode("utf-8")
+                    self.layer.cache.put(url, headers.get("content-type", "application/octet-stream"), body)
+                    size = len(body)
+                self.layer.log(url, kind, "fetch", elapsed, size)
+                send("Fetch.continueRequest")
+
+            self.connection.send("Fetch.getResponseBody", {"requestId": request_id}, session_id, callback=store)
+            return
+
+        started = time.perf_counter()
+        action, asset = self.layer.decide(method, url, kind)
+        if action == "block":
+            send("Fetch.failRequest", errorReason="BlockedByClient")
+            self.layer.log(url, kind, action, (time.perf_counter() - started) * 1000, None)
+        elif action in ("stub", "cache"):
+            content_type, body = asset
+            send("Fetch.fulfillRequest", responseCode=200,
+                 responseHeaders=[{"name": "Content-Type", "value": content_type}],
+                 body=base64.b64encode(body).decode("ascii"))
+            self.layer.log(url, kind, action, (time.perf_counter() - started) * 1000,
+                           len(body) if action == "cache" else self.layer.cache.size(url))
+        else:
+            # Timed until its response stage pauses (static assets only)
+            self._pending[request_id] = (started, action)
+            send("Fetch.continueRequest")
+
+
+def _relay(client, upstream):
+    """Copy bytes both ways until either side closes (a CONNECT tunnel)."""
+    with selectors.DefaultSelector() as selector:
+        selector.register(client, selectors.EVENT_READ, upstream)
+        selector.register(upstream, selectors.EVENT_READ, client)
+        while True:
+            for key, _ in selector.select(timeout=60):
+                try:
+                    data = key.fileobj.recv(65536)
+                    if not data:
+                        return
+                    key.data.sendall(data)
+                except OSError:
+                    return
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    server_version = "OpenCartAssetProxy"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def layer(self):
+        return self.server.layer
+
+    def do_CONNECT(self):
+        host, _, port = self.path.rpartition(":")
+        if is_blocked(host, self.layer.blocked_domains):
+            self.layer.log(f"https://{host}/", None, "block", 0.0, None)
+            self.send_error(403, "Blocked by the suite")
+            return
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=10)
+        except (OSError, ValueError):
+            self.send_error(502)
+            return
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        try:
+            _relay(self.connection, upstream)
+        finally:
+            upstream.close()
+            self.close_connection = True
+
+    def do_GET(self):
+        self._forward("GET")
+
+    def do_HEAD(self):
+        self._forward("HEAD")
+
+    def do_POST(self):
+        self._forward("POST")
+
+    def _answer(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _forward(self, method):
+        url = self.path
+        if not url.startswith("http://"):
+            self.send_error(400, "Only absolute http:// URLs can be proxied")
+            return
+        kind = resource_type(url)
+        started = time.perf_counter()
+        action, asset = self.layer.decide(method, url, kind)
+        if action == "block":
+            self.send_error(403, "Blocked by the suite")
+            self.layer.log(url, kind, action, (time.perf_counter() - started) * 1000, None)
+            return
+        if action in ("stub", "cache"):
+            self._answer(200, *asset)
+            self.layer.log(url, kind, action, (time.perf_counter() - started) * 1000,
+                           len(asset[1]) if action == "cache" else self.layer.cache.size(url))
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        headers = {name: value for name, value in self.headers.items()
+                   if name.lower() not in HOP_BY_HOP and name.lower() != "host"}
+        try:
+            response = self.server.session().request(method, url, headers=headers,
+                                                     data=self.rfile.read(length) if length else None,
+                                                     allow_redirects=False, timeout=30)
+        except requests.RequestException:
+            self.send_error(502)
+            return
+        body = response.content
+        self._answer(response.status_code, None, body,
+                     [(name, value) for name, value in response.raw.headers.items() if name.lower() not in HOP_BY_HOP])
+        if action == "fetch" and response.status_code == 200:
+            self.layer.cache.put(url, response.headers.get("Content-Type", "application/octet-stream"), body)
+        if kind in STATIC_TYPES:
+            self.layer.log(url, kind, action, response.elapsed.total_seconds() * 1000, len(body))
+
+
+class AssetProxy(ThreadingHTTPServer):
+    """A local forward proxy applying a ``NetworkLayer``'s policy (Firefox)."""
+
+    daemon_threads = True
+
+    def __init__(self, layer):
+        super().__init__(("127.0.0.1", 0), _ProxyHandler)
+        self.layer = layer
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self.serve_forever, name="asset-proxy", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return self.server_address[:2]
+
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+            self._local.session.trust_env = False
+        return self._local.session
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class NetworkLayer:
+    """
+    The interception policy and the request log shared by every browser of a
+    session. ``mode`` is ``cache`` (cache and block) or ``stub-images``
+    (cache, block and stub catalogue images outside ``visual`` tests).
+    """
+
+    def __init__(self, cache_dir, mode="cache", blocked_domains=DEFAULT_BLOCKED_DOMAINS, max_age=MAX_AGE):
+        self.mode = mode
+        self.cache = AssetCache(os.path.join(cache_dir, "assets"), max_age=max_age)
+        self.blocked_domains = tuple(blocked_domains)
+        self.stub_images = False        # set per test by ``record``
+        self.entries = None             # the current test's log
+        self.fallbacks = 0              # Chromium browsers left with blocking only
+        self._lock = threading.Lock()
+        self._interceptors = weakref.WeakKeyDictionary()
+        self._proxy = None
+
+    def decide(self, method, url, kind):
+        """(action, (content type, body) or None); action is block, stub, cache, fetch or pass."""
+        parts = urlsplit(url)
+        if is_blocked(parts.hostname, self.blocked_domains):
+            return "block", None
+        if method != "GET" or kind not in STATIC_TYPES:
+            return "pass", None
+        if self.stub_images and kind == "Image" and is_product_image(url):
+            return "stub", ("image/gif", PLACEHOLDER_GIF)
+        if is_loopback(parts.hostname):
+            return "pass", None
+        asset = self.cache.get(url)
+        return ("cache", asset) if asset is not None else ("fetch", None)
+
+    def log(self, url, kind, action, ms, size):
+        with self._lock:
+            if self.entries is not None:
+                self.entries.append({"url": url, "type": kind, "action": action,
+                                     "ms": None if ms is None else round(ms, 1), "bytes": size})
+
+    def attach(self, driver):
+        """Intercept a freshly launched Chromium browser; blocking only if the websocket is out of reach."""
+        try:
+            self._interceptors[driver] = CdpInterceptor(driver, self).start()
+        except (NetworkUnsupported, requests.RequestException, websocket.WebSocketException, OSError, KeyError):
+            self.fallbacks += 1
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [
+                    pattern for domain in self.blocked_domains for pattern in (f"*://{domain}/*", f"*.{domain}/*")
+                ]})
+            except WebDriverException:
+                pass
+        return driver
+
+    def proxy_address(self):
+        if self._proxy is None:
+            self._proxy = AssetProxy(self)
+        return self._proxy.address
+
+    def firefox_preferences(self):
+        host, port = self.proxy_address()
+        return {
+            "network.proxy.type": 1,
+            "network.proxy.http": host,
+            "network.proxy.http_port": port,
+            "network.proxy.ssl": host,
+            "network.proxy.ssl_port": port,
+            "network.proxy.no_proxies_on": "",
+            # Otherwise the loopback stand-in bypasses the proxy
+            "network.proxy.allow_hijacking_localhost": True,
+        }
+
+    @contextmanager
+    def record(self, request):
+        with self._lock:
+            self.entries = []
+        self.stub_images = self.mode == "stub-images" and request.node.get_closest_marker("visual") is None
+        try:
+            yield self
+        finally:
+            self.stub_images = False
+            with self._lock:
+                entries, self.entries = self.entries, None
+            request.node.user_properties.append((PROPERTY, entries))
+
+    def close(self):
+        for interceptor in list(self._interceptors.values()):
+            interceptor.stop()
+        if self._proxy is not None:
+            self._proxy.close()
+        self.cache.save()
+
+
+@contextmanager
+def record(request, driver):
+    """Attribute intercepted requests to the running test (no-op with ``--network=off``)."""
+    layer = getattr(request.config, "_network", None)
+    if layer is None:
+        yield None
+        return
+    with layer.record(request) as recording:
+        yield recording
+
+
+def collect(reports):
+    return [
+        entry
+        for report in reports
+        for name, value in getattr(report, "user_properties", ())
+        if name == PROPERTY
+        for entry in value
+    ]
+
+
+def summary_lines(entries, top=5):
+    if not entries:
+        return []
+    actions = {}
+    for entry in entries:
+        actions.setdefault(entry["action"], []).append(entry)
+    saved = sum(entry["bytes"] or 0 for entry in entries if entry["action"] in ("cache", "stub"))
+    parts = [f"{len(actions.get('cache', ()))} from the asset cache ({saved / 1024:.0f} KB saved)"]
+    fetched = [entry["ms"] for entry in actions.get("fetch", ()) if entry["ms"] is not None]
+    timing = f", p50 {percentile(fetched, 50):.0f}ms, p95 {percentile(fetched, 95):.0f}ms" if fetched else ""
+    parts.append(f"{len(actions.get('fetch', ()))} fetched{timing}")
+    if actions.get("pass"):
+        parts.append(f"{len(actions['pass'])} passed through uncached")
+    parts.append(f"{len(actions.get('block', ()))} blocked")
+    if actions.get("stub"):
+        parts.append(f"{len(actions['stub'])} images stubbed")
+    lines = [f"{len(entries)} intercepted requests: " + ", ".join(parts)]
+    slowest = sorted((entry for entry in actions.get("fetch", ()) if entry["ms"] is not None),
+                     key=lambda entry: -entry["ms"])[:top]
+    if slowest:
+        lines.append("slowest fetches:")
+        lines.extend(f"  {entry['ms']:7.0f}ms  {entry['url']}" for entry in slowest)
+    return lines
+
+
+def write_report(path, entries):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"requests": entries}, handle, indent=2)
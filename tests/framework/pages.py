@@ -0,0 +1,446 @@
+"""
+Page objects for the OpenCart pages the suite drives.
+
+Locators are declared once per page instead of being repeated across test
+files. Reads go through ``snapshot()``: a single ``execute_script`` call
+collects, for every locator of the page, the matching elements with their
+visibility, enabled state, text, value and the attributes the tests check,
+plus the page title and URL. The snapshot is cached, so
+``is_displayed``/``text``/``get_attribute`` style checks cost no extra
+WebDriver round-trips.
+
+A click or typing marks the snapshot dirty: the next read takes a fresh one,
+while actions keep using the cached element handles. A handle that turns out
+to be stale (the page navigated or re-rendered) triggers a fresh snapshot and
+one retry, so the cache never has to be invalidated by hand.
+
+Every locator a test reads or acts on is reported to ``framework.impact``,
+which indexes the pages and selectors each test depends on.
+
+Waits (``wait_for`` and friends) run through ``framework.waits``: the
+condition is evaluated in the page on every DOM or network signal and the
+snapshot is taken in the same call once it holds.
+
+Visibility is computed in the page (rendered box, ``display`` and
+``visibility``), which matches ``is_displayed()`` for the elements the suite
+checks; as with Selenium, hidden elements report empty text.
+"""
+from collections import namedtuple
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+from . import impact
+from .waits import WaitEngine
+
+ATTRIBUTES = ("alt", "aria-label", "class", "href", "title", "type")
+
+# Helpers shared by the snapshot script and the in-page wait conditions
+LOCATOR_LIBRARY = """
+function byText(selector, partial) {
+  return Array.prototype.filter.call(document.getElementsByTagName('a'), function (a) {
+    var text = a.innerText.trim();
+    return partial ? text.indexOf(selector) !== -1 : text === selector;
+  });
+}
+function find(by, selector) {
+  switch (by) {
+    case 'id': var el = document.getElementById(selector); return el ? [el] : [];
+    case 'name': return document.getElementsByName(selector);
+    case 'tag name': return document.getElementsByTagName(selector);
+    case 'class name': return document.getElementsByClassName(selector);
+    case 'link text': return byText(selector, false);
+    case 'partial link text': return byText(selector, true);
+    case 'xpath':
+      var result = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+      var nodes = [];
+      for (var i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+      return nodes;
+    default: return document.querySelectorAll(selector);
+  }
+}
+function describe(el, attributes) {
+  var style = window.getComputedStyle(el);
+  var displayed = el.getClientRects().length > 0 && style.display !== 'none'
+    && style.visibility !== 'hidden' && !(el.tagName === 'INPUT' && el.type === 'hidden');
+  var attrs = {};
+  for (var i = 0; i < attributes.length; i++) attrs[attributes[i]] = el.getAttribute(attributes[i]);
+  return [el, displayed, !el.disabled, displayed ? el.innerText.trim() : '',
+          el.value === undefined ? null : String(el.value), attrs];
+}
+function snapshot(specs, attributes) {
+  var out = {};
+  for (var name in specs) {
+    out[name] = Array.prototype.map.call(find(specs[name][0], specs[name][1]), function (el) {
+      return describe(el, attributes);
+    });
+  }
+  return {title: document.title, url: location.href, elements: out};
+}
+function located(locator, visible, clickable) {
+  var els = find(locator[0], locator[1]);
+  if (!els.length) return false;
+  if (!visible && !clickable) return true;
+  var state = describe(els[0], []);
+  return state[1] && (!clickable || state[2]);
+}
+function linkShown(partial) {
+  return byText(partial, true).some(function (el) { return describe(el, [])[1]; });
+}
+"""
+
+SNAPSHOT_SCRIPT = LOCATOR_LIBRARY + "return snapshot(arguments[0], arguments[1]);"
+
+ElementState = namedtuple("ElementState", "element displayed enabled text value attributes")
+
+
+class Snapshot:
+    """Everything one ``SNAPSHOT_SCRIPT`` call read from the page."""
+
+    def __init__(self, raw):
+        self.title = raw["title"]
+        self.url = raw["url"]
+        self.elements = {
+            name: [ElementState(*values) for values in states]
+            for name, states in raw["elements"].items()
+        }
+
+    def all(self, name):
+        return self.elements.get(name, [])
+
+    def first(self, name):
+        states = self.all(name)
+        return states[0] if states else None
+
+
+class BasePage:
+    """
+    ``LOCATORS`` maps a name to a ``(By, selector)`` pair. Subclasses extend
+    the header/alert locators shared by every OpenCart page.
+    """
+
+    ROUTE = None
+    LOCATORS = {
+        "logo": (By.ID, "logo"),
+        "search": (By.ID, "search"),
+        "search_input": (By.NAME, "search"),
+        "search_button": (By.CSS_SELECTOR, "button.btn-light"),
+        "menu": (By.ID, "menu"),
+        "content": (By.ID, "content"),
+        "heading": (By.TAG_NAME, "h1"),
+        "alert": (By.CSS_SELECTOR, ".alert"),
+        "success_alert": (By.CSS_SELECTOR, ".alert-success"),
+        "danger_alert": (By.CSS_SELECTOR, ".alert-danger"),
+        "links": (By.TAG_NAME, "a"),
+    }
+
+    def __init__(self, driver, base_url, timeout=10):
+        self.driver = driver
+        self.base_url = base_url
+        self.timeout = timeout
+        self._snapshot = None
+        self._dirty = False
+        self.snapshots = 0
+        self.waits = WaitEngine(driver, timeout)
+
+    def url(self, **params):
+        if self.ROUTE is None:
+            return self.base_url
+        query = "".join(f"&{key}={value}" for key, value in params.items())
+        return f"{self.base_url}/index.php?route={self.ROUTE}{query}"
+
+    def open(self, **params):
+        impact.touch(self.url(**params))
+        self.driver.get(self.url(**params))
+        self.invalidate()
+        return self
+
+    def back(self):
+        self.driver.back()
+        self.invalidate()
+
+    # -- reads -------------------------------------------------------------
+
+    def snapshot(self):
+        """The cached page state, taken with one script call when missing."""
+        if self._snapshot is None or self._dirty:
+            self._snapshot = Snapshot(self.driver.execute_script(SNAPSHOT_SCRIPT, self._specs(), list(ATTRIBUTES)))
+            self._dirty = False
+            self.snapshots += 1
+        return self._snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _touch(self, name):
+        impact.touch(self._snapshot.url if self._snapshot is not None else self.url(), *self.LOCATORS[name])
+
+    def _specs(self):
+        return {name: list(locator) for name, locator in self.LOCATORS.items()}
+
+    def state(self, name, index=0):
+        states = self.states(name)
+        return states[index] if index < len(states) else None
+
+    def states(self, name):
+        states = self.snapshot().all(name)
+        self._touch(name)
+        return states
+
+    def is_displayed(self, name):
+        state = self.state(name)
+        return state is not None and state.displayed
+
+    def text(self, name):
+        state = self.state(name)
+        return state.text if state is not None else None
+
+    @property
+    def title(self):
+        snapshot = self.snapshot()
+        impact.touch(snapshot.url, By.TAG_NAME, "title")
+        return snapshot.title
+
+    @property
+    def current_url(self):
+        return self.snapshot().url
+
+    def link(self, partial_text):
+        snapshot = self.snapshot()
+        impact.touch(snapshot.url, By.PARTIAL_LINK_TEXT, partial_text)
+        return next((state for state in snapshot.all("links") if partial_text in state.text), None)
+
+    # -- waits -------------------------------------------------------------
+
+    def wait_until(self, condition, timeout=None, message="", label=None, check=None, args=None):
+        """
+        Wait until ``condition(snapshot)`` returns something truthy.
+
+        With ``check`` (JavaScript over ``args`` and the locator helpers) the
+        condition is evaluated in the page on every DOM/network signal and a
+        snapshot is only taken once it holds; without it, a fresh snapshot is
+        handed to ``condition`` after every burst of page changes. The cached
+        snapshot is tried first either way.
+        """
+        if self._snapshot is not None and not self._dirty:
+            result = condition(self._snapshot)
+            if result:
+                return result
+
+        def accept(raw):
+            self._snapshot = Snapshot(raw)
+            self._dirty = False
+            self.snapshots += 1
+            return condition(self._snapshot)
+
+        return self.waits.wait(
+            label or f"{type(self).__name__}", value="return snapshot(args.specs, args.attributes);",
+            check=check, library=LOCATOR_LIBRARY, accept=accept, timeout=timeout or self.timeout, message=message,
+            args=dict(args or {}, specs=self._specs(), attributes=list(ATTRIBUTES)),
+        )
+
+    def wait_for(self, name, visible=True, clickable=False, timeout=None):
+        """The first ``name`` element once present (and visible/clickable)."""
+        def condition(snapshot):
+            state = snapshot.first(name)
+            if state is None or (visible or clickable) and not state.displayed:
+                return None
+            if clickable and not state.enabled:
+                return None
+            return state
+        label = f"{type(self).__name__}.{name}"
+        state = self.wait_until(
+            condition, timeout, f"{label} not found", label,
+            check="return located(args.locator, args.visible, args.clickable);",
+            args={"locator": list(self.LOCATORS[name]), "visible": visible, "clickable": clickable},
+        )
+        self._touch(name)
+        return state
+
+    def wait_for_all(self, name, timeout=None):
+        """Every ``name`` element once at least one is present."""
+        label = f"{type(self).__name__}.{name}"
+        states = self.wait_until(
+            lambda snapshot: snapshot.all(name), timeout, f"{label} not found", label,
+            check="return located(args.locator, false, false);",
+            args={"locator": list(self.LOCATORS[name])},
+        )
+        self._touch(name)
+        return states
+
+    def wait_for_link(self, partial_text, timeout=None):
+        def condition(snapshot):
+            return next((state for state in snapshot.all("links")
+                         if state.displayed and partial_text in state.text), None)
+        state = self.wait_until(
+            condition, timeout, f"No visible link containing {partial_text!r}", f"{type(self).__name__}.link",
+            check="return linkShown(args.text);", args={"text": partial_text},
+        )
+        impact.touch(self._snapshot.url, By.PARTIAL_LINK_TEXT, partial_text)
+        return state
+
+    # -- actions -----------------------------------------------------------
+
+    def _act(self, name, index, action):
+        """Run ``action(element)``; a stale cached element triggers one re-read."""
+        for attempt in (1, 2):
+            # Handles from a dirty snapshot are still usable; staleness is detected on use
+            states = (self._snapshot or self.snapshot()).all(name)
+            if index >= len(states) and self._dirty:
+                states = self.snapshot().all(name)
+            if index >= len(states):
+                raise LookupError(f"{type(self).__name__}.{name}[{index}] is not on the page")
+            self._touch(name)
+            try:
+                result = action(states[index].element)
+            except StaleElementReferenceException:
+                self.invalidate()
+                if attempt == 2:
+                    raise
+                continue
+            # Any interaction may change the page; the next read re-snapshots
+            self._dirty = True
+            return result
+
+    def click(self, name, index=0):
+        self._act(name, index, lambda element: element.click())
+
+    def fill(self, name, text, clear=True, index=0):
+        def action(element):
+            if clear:
+                element.clear()
+            element.send_keys(text)
+        self._act(name, index, action)
+
+    def clear(self, name, index=0):
+        self._act(name, index, lambda element: element.clear())
+
+    def scroll_to(self, name, index=0):
+        self._act(name, index, lambda element: self.driver.execute_script("arguments[0].scrollIntoView();", element))
+
+    def search(self, term):
+        """Type ``term`` into the header search box and submit it."""
+        self.wait_for("search_input")
+        self.fill("search_input", term)
+        self.click("search_button")
+
+
+class HomePage(BasePage):
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        images=(By.TAG_NAME, "img"),
+        navbar_toggler=(By.CSS_SELECTOR, ".navbar-toggler"),
+        desktops_menu=(By.LINK_TEXT, "Desktops"),
+        show_all_desktops=(By.LINK_TEXT, "Show All Desktops"),
+        pc_menu=(By.LINK_TEXT, "PC"),
+    )
+
+
+class CategoryPage(BasePage):
+    ROUTE = "product/category"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        products=(By.CSS_SELECTOR, ".product-thumb"),
+        product_links=(By.CSS_SELECTOR, ".product-thumb a"),
+        compare_buttons=(By.CSS_SELECTOR, "button[title='Compare this Product']"),
+    )
+
+
+class ProductPage(BasePage):
+    ROUTE = "product/product"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        quantity=(By.ID, "input-quantity"),
+        add_to_cart=(By.ID, "button-cart"),
+        wishlist=(By.CSS_SELECTOR, "button[title='Add to Wish List']"),
+        availability=(By.CSS_SELECTOR, ".list-unstyled li:nth-child(3)"),
+    )
+
+    def add_to_cart(self, quantity=None):
+        self.wait_for("add_to_cart", clickable=True)
+        if quantity is not None:
+            self.fill("quantity", quantity)
+        self.click("add_to_cart")
+
+
+class CartPage(BasePage):
+    ROUTE = "checkout/cart"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        quantity=(By.CSS_SELECTOR, "input[name^='quantity']"),
+        update=(By.CSS_SELECTOR, "button[type='submit']"),
+        remove=(By.CSS_SELECTOR, "button.btn-danger"),
+        checkout=(By.LINK_TEXT, "Checkout"),
+        empty_message=(By.XPATH, "//*[contains(text(), 'Your shopping cart is empty!')]"),
+    )
+
+    def update_quantity(self, quantity):
+        self.fill("quantity", quantity)
+        self.click("update")
+
+
+class CheckoutPage(BasePage):
+    ROUTE = "checkout/checkout"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        guest=(By.CSS_SELECTOR, "input[value='guest']"),
+        account_continue=(By.ID, "button-account"),
+        payment_firstname=(By.ID, "input-payment-firstname"),
+    )
+
+
+class LoginPage(BasePage):
+    ROUTE = "account/login"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        email=(By.ID, "input-email"),
+        password=(By.ID, "input-password"),
+        submit=(By.CSS_SELECTOR, "button[type='submit']"),
+        register_continue=(By.LINK_TEXT, "Continue"),
+    )
+
+    def login(self, email, password):
+        self.wait_for("email")
+        self.fill("email", email, clear=False)
+        self.fill("password", password, clear=False)
+        self.click("submit")
+
+
+class AccountPage(BasePage):
+    ROUTE = "account/account"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        edit_account=(By.PARTIAL_LINK_TEXT, "Edit your account"),
+        wishlist_link=(By.PARTIAL_LINK_TEXT, "Modify your wish list"),
+        order_history=(By.PARTIAL_LINK_TEXT, "order history"),
+    )
+
+
+class WishlistPage(BasePage):
+    ROUTE = "account/wishlist"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        product_links=(By.CSS_SELECTOR, "#content table a"),
+    )
+
+
+class RegisterPage(BasePage):
+    ROUTE = "account/register"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        firstname=(By.ID, "input-firstname"),
+        lastname=(By.ID, "input-lastname"),
+        email=(By.ID, "input-email"),
+        password=(By.ID, "input-password"),
+    )
+
+
+class ContactPage(BasePage):
+    ROUTE = "information/contact"
+    LOCATORS = dict(
+        BasePage.LOCATORS,
+        name=(By.ID, "input-name"),
+        email=(By.ID, "input-email"),
+        enquiry=(By.ID, "input-enquiry"),
+        submit=(By.CSS_SELECTOR, "button[type='submit']"),
+    )
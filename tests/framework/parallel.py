@@ -0,0 +1,179 @@
+"""
+Parallel sharded execution.
+
+With ``--workers N`` the pytest process becomes a controller: it collects the
+tests, splits them into N shards balanced by historical duration and runs each
+shard in its own ``pytest`` subprocess. Every worker owns its own driver pool,
+so browsers are never shared between processes.
+
+Workers stream their reports back as JSON lines; the controller replays them
+through its own hooks, so the terminal summary, ``--junitxml`` and any other
+reporting plugin produce a single merged report.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from . import auth, flaky, visual
+
+# Assumed duration for tests that have never run; roughly one page flow
+DEFAULT_DURATION = 5.0
+
+
+def balance_shards(nodeids, durations, workers):
+    """
+    Split ``nodeids`` into ``workers`` shards with similar total duration.
+
+    Longest-processing-time-first: the slowest test goes to the least loaded
+    shard, so one long checkout flow does not set the wall-clock time. Within
+    a shard tests keep their collection order.
+    """
+    known = [durations[nodeid] for nodeid in nodeids if nodeid in durations]
+    fallback = statistics.median(known) if known else DEFAULT_DURATION
+    position = {nodeid: index for index, nodeid in enumerate(nodeids)}
+    shards = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    for nodeid in sorted(nodeids, key=lambda n: durations.get(n, fallback), reverse=True):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(nodeid)
+        loads[lightest] += durations.get(nodeid, fallback)
+    for shard in shards:
+        shard.sort(key=position.__getitem__)
+    return shards, loads
+
+
+class ShardingPlugin:
+    """Controller and worker halves of ``--workers``."""
+
+    def __init__(self, config):
+        self.config = config
+        self.workers = config.getoption("--workers")
+        self.worker_nodes = config.getoption("--worker-nodes")
+        self.worker_results = config.getoption("--worker-results")
+        if self.is_worker:
+            # The controller owns the report files. Registered from a tryfirst
+            # pytest_configure, so this runs before junitxml/html read them.
+            for option in ("xmlpath", "htmlpath"):
+                if getattr(config.option, option, None):
+                    setattr(config.option, option, None)
+
+    @property
+    def is_worker(self):
+        return self.worker_results is not None
+
+    # -- worker side ---------------------------------------------------
+
+    def pytest_collection_modifyitems(self, config, items):
+        if not self.worker_nodes:
+            return
+        with open(self.worker_nodes) as handle:
+            # The controller's (scheduled) order, not this process's collection order
+            wanted = {nodeid: index for index, nodeid in enumerate(handle.read().split("\n"))}
+        selected = sorted((item for item in items if item.nodeid in wanted), key=lambda item: wanted[item.nodeid])
+        deselected = [item for item in items if item.nodeid not in wanted]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+    def pytest_runtest_logreport(self, report):
+        if self.is_worker:
+            data = self.config.hook.pytest_report_to_serializable(config=self.config, report=report)
+            with open(self.worker_results, "a") as handle:
+                handle.write(json.dumps(data, default=str) + "\n")
+
+    # -- controller side -----------------------------------------------
+
+    def pytest_runtestloop(self, session):
+        if self.is_worker or self.workers < 2 or self.config.option.collectonly:
+            return None
+        if not session.items:
+            return True
+        cache = getattr(self.config, "cache", None)
+        # Shards are balanced on the duration history's medians (framework.history)
+        scheduler = getattr(self.config, "_history", None)
+        durations = scheduler.durations if scheduler is not None else {}
+        nodeids = [item.nodeid for item in session.items]
+        shards, loads = balance_shards(nodeids, durations, self.workers)
+
+        reporter = self.config.pluginmanager.get_plugin("terminalreporter")
+        workdir = tempfile.mkdtemp(prefix="opencart-shards-")
+        shared = auth.FileCache(os.path.join(workdir, "auth.json"))
+        if cache is not None:
+            shared.set(auth.CACHE_KEY, cache.get(auth.CACHE_KEY, {}))
+        running = []
+        for index, shard in enumerate(shards):
+            if not shard:
+                continue
+            running.append(self._start_worker(index, shard, workdir))
+            if reporter:
+                reporter.write_line(
+                    f"[worker {index}] {len(shard)} tests, ~{loads[index]:.1f}s by history"
+                )
+
+        for index, shard, process, results, log in running:
+            process.wait()
+            log.close()
+            missing = self._replay(results, shard)
+            if missing:
+                # A crashed worker must not look like a green run
+                session.testsfailed += len(missing)
+                if reporter:
+                    reporter.write_line(
+                        f"[worker {index}] exited before running {len(missing)} test(s); "
+                        f"see {log.name}", red=True,
+                    )
+        if cache is not None:
+            # Snapshots the workers refreshed or registered serve the next run
+            cache.set(auth.CACHE_KEY, shared.get(auth.CACHE_KEY, {}))
+        return True
+
+    def _start_worker(self, index, shard, workdir):
+        nodes_file = os.path.join(workdir, f"worker-{index}.nodes")
+        results_file = os.path.join(workdir, f"worker-{index}.jsonl")
+        with open(nodes_file, "w") as handle:
+            handle.write("\n".join(shard))
+        open(results_file, "w").close()
+        args = [
+            sys.executable, "-m", "pytest", *self.config.invocation_params.args,
+            # Node ids are relative to the controller's rootdir
+            f"--rootdir={self.config.rootpath}",
+            "--workers=0",
+            f"--worker-nodes={nodes_file}",
+            f"--worker-results={results_file}",
+            "-p", "no:cacheprovider",
+            # Workers have no cache: the baselines a serial run recorded are the ones to compare against
+            f"--visual-baselines={visual.baseline_directory(self.config)}",
+            f"--worker-auth={os.path.join(workdir, 'auth.json')}",
+        ]
+        flakes = getattr(self.config, "_flaky", None)
+        if flakes is not None:
+            # Workers have no history: the controller hands down the quarantine and a share of the budget
+            flakes_file = os.path.join(workdir, f"worker-{index}.flakes")
+            flakes.write_worker_state(flakes_file, self.workers)
+            args.append(f"--worker-flakes={flakes_file}")
+        env = dict(os.environ, OPENCART_WORKER=str(index))
+        log = open(os.path.join(workdir, f"worker-{index}.log"), "w")
+        process = subprocess.Popen(
+            args, cwd=str(self.config.invocation_params.dir), env=env,
+            stdout=log, stderr=subprocess.STDOUT,
+        )
+        return index, shard, process, results_file, log
+
+    def _replay(self, results_file, shard):
+        hook = self.config.hook
+        started, finished = set(), set()
+        with open(results_file) as handle:
+            for line in handle:
+                report = hook.pytest_report_from_serializable(config=self.config, data=json.loads(line))
+                # Reruns report setup/call/teardown again under the same start and finish
+                if report.when == "setup" and report.nodeid not in started:
+                    started.add(report.nodeid)
+                    hook.pytest_runtest_logstart(nodeid=report.nodeid, location=report.location)
+                hook.pytest_runtest_logreport(report=report)
+                if report.when == "teardown" and report.outcome != flaky.RERUN:
+                    hook.pytest_runtest_logfinish(nodeid=report.nodeid, location=report.location)
+                    finished.add(report.nodeid)
+        return [nodeid for nodeid in shard if nodeid not in finished]
@@ -0,0 +1,355 @@
+"""
+Generated boundary-value and equivalence-partition input matrices.
+
+A ``FieldSpec`` states what a field accepts (kind, min/max length or value,
+pattern, required). ``generate_cases`` derives from it:
+
+* BVA: min-1, min, min+1, max-1, max and max+1 (lengths for text fields,
+  values for number fields);
+* EP: a representative valid value and the invalid partitions of the kind
+  (empty, whitespace only, malformed e-mail, non-numeric, negative, ...);
+* the malicious partition from TC-016 (``scenarios.MALICIOUS_INPUTS``).
+
+Each case carries the verdict the spec predicts, so no expected values are
+hard-coded in the tests. A store may also take an invalid value without an
+error: OpenCart casts the cart quantity to int and never rejects one. Forms
+with ``taken`` name the JSON key whose leading number is what the store
+actually took (the cart total of the fresh session). An invalid case then
+passes when the store rejected it, took nothing, or took a valid value in its
+place (defaulted); a valid case passes only when the store took it as sent.
+
+``run_matrix`` executes the cases against a form that is already loaded. One
+async script call handles a whole batch of cases. For each case it resets the
+form in place, fills the baseline values plus the case value (firing
+``input``/``change`` like typing does), serializes the fields as the form would,
+and submits them with ``fetch``. It then reads the field error from the
+response. A few hundred cases cost one page load and a handful of round-trips
+instead of a reload per value. Cases are submitted without cookies, so every
+case is an independent first submission. A response that renders a payload as
+markup (a ``<script>`` or ``on*`` handler) fails the case whatever the
+validation verdict.
+"""
+import re
+from collections import namedtuple
+
+from .scenarios import MALICIOUS_INPUTS
+from .standin.catalog import MIN_QUANTITY
+
+PROPERTY = "input_matrix"
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+UNIQUE = "{unique}"
+BATCH_SIZE = 25
+
+FieldSpec = namedtuple("FieldSpec", "name kind min max pattern required", defaults=("text", None, None, None, True))
+FieldSpec.__doc__ = "``kind`` is text, password, tel, email or number; min/max bound length (number: value)."
+
+FormSpec = namedtuple(
+    "FormSpec", "name container action method fields baseline checked mirror validates taken creates",
+    defaults=("POST", (), None, (), None, True, None, False),
+)
+FormSpec.__doc__ = """
+``container`` holds the form fields (a ``<form>`` or, for AJAX forms, any
+element); ``action`` is the route the fields are submitted to. ``baseline``
+gives every other field a valid value, ``checked`` lists checkboxes to tick
+and ``mirror`` copies one field's value into another (password confirmation).
+Forms that do not validate (search) only check status and injection.
+``taken`` names the JSON response key that starts with the amount the store
+took (cart/add's ``total``, "N item(s) - $X"). Valid submissions of forms
+that ``creates`` leave a record behind (an account, an enquiry).
+"""
+
+Case = namedtuple("Case", "id field technique label value valid")
+Verdict = namedtuple("Verdict", "case actual message injected passed")
+
+FORMS = {
+    "search": FormSpec(
+        "search", "#search", "product/search", method="GET", validates=False,
+        fields=(FieldSpec("search", min=0, max=255, required=False),),
+    ),
+    "quantity": FormSpec(
+        "quantity", "#product", "checkout/cart/add", taken="total",
+        fields=(FieldSpec("quantity", "number", MIN_QUANTITY),),
+    ),
+    "contact": FormSpec(
+        "contact", "#content form", "information/contact",
+        fields=(FieldSpec("name", min=3, max=32), FieldSpec("email", "email"), FieldSpec("enquiry", min=10, max=3000)),
+        baseline={"name": "Bva Case", "email": "bva@example.com", "enquiry": "A boundary value test enquiry."},
+        creates=True,
+    ),
+    "register": FormSpec(
+        "register", "#content form", "account/register",
+        fields=(
+            FieldSpec("firstname", min=1, max=32), FieldSpec("lastname", min=1, max=32),
+            FieldSpec("email", "email"), FieldSpec("telephone", "tel", 3, 32),
+            FieldSpec("password", "password", 4, 20),
+        ),
+        baseline={"firstname": "Bva", "lastname": "Case", "email": f"bva.{UNIQUE}@example.com",
+                  "telephone": "0123456789", "password": "Pass1234"},
+        checked=("agree",), mirror={"confirm": "password"}, creates=True,
+    ),
+}
+
+
+def is_valid(spec, value):
+    """What ``spec`` says the store should do with ``value`` (after trimming)."""
+    text = value.replace(UNIQUE, "x").strip()
+    if spec.kind == "number":
+        try:
+            number = int(text)
+        except ValueError:
+            return False
+        return (spec.min is None or number >= spec.min) and (spec.max is None or number <= spec.max)
+    if not text:
+        return not spec.required
+    if spec.min is not None and len(text) < spec.min or spec.max is not None and len(text) > spec.max:
+        return False
+    if spec.kind == "email" and not EMAIL_PATTERN.match(text):
+        return False
+    return spec.pattern is None or re.fullmatch(spec.pattern, text) is not None
+
+
+def _boundaries(spec):
+    points = []
+    if spec.min is not None:
+        points += [("min-1", spec.min - 1), ("min", spec.min), ("min+1", spec.min + 1)]
+    if spec.max is not None:
+        points += [("max-1", spec.max - 1), ("max", spec.max), ("max+1", spec.max + 1)]
+    if spec.kind == "number":
+        return [(f"{name} ({point})", str(point)) for name, point in points]
+    char = "1" if spec.kind == "tel" else "A"
+    return [(f"{name} ({point} chars)", char * point) for name, point in points if point >= 0]
+
+
+def _partitions(spec):
+    if spec.kind == "number":
+        middle = (spec.min + spec.max) // 2 if spec.max is not None else (spec.min or 0) + 1
+        large = [("large", "1000")] if spec.max is None else []
+        return [("valid", str(middle))] + large + [
+            ("negative", "-5"), ("decimal", "1.5"), ("non-numeric", "abc"), ("empty", "")]
+    if spec.kind == "email":
+        return [("valid", f"bva.{UNIQUE}@example.com"), ("missing @", "invalid-email"),
+                ("missing domain", "user@"), ("missing TLD", "user@example"),
+                ("contains space", "user name@example.com"), ("empty", "")]
+    low = spec.min or 1
+    high = spec.max if spec.max is not None else low + 10
+    char = "1" if spec.kind == "tel" else "A"
+    return [("valid", char * ((low + high) // 2)), ("empty", ""), ("whitespace only", "   ")]
+
+
+def generate_cases(form):
+    """Every BVA, EP and malicious case for every field of ``form``, deduplicated per field."""
+    cases = []
+    for spec in form.fields:
+        seen = set()
+        candidates = (
+            [("BVA", label, value) for label, value in _boundaries(spec)]
+            + [("EP", label, value) for label, value in _partitions(spec)]
+            + [("EP", "malicious", payload) for payload in MALICIOUS_INPUTS]
+        )
+        for technique, label, value in candidates:
+            if value in seen:
+                continue
+            seen.add(value)
+            valid = is_valid(spec, value) if form.validates else True
+            cases.append(Case(f"{form.name}-{len(cases) + 1:03d}", spec.name, technique, label, value, valid))
+    return cases
+
+
+MATRIX_SCRIPT = """
+var form = arguments[0], cases = arguments[1], callback = arguments[arguments.length - 1];
+var root = document.querySelector(form.container);
+var MARK = 'alert(';
+function fields() { return root.querySelectorAll('input[name], select[name], textarea[name]'); }
+function reset() {
+  if (root.tagName === 'FORM') { root.reset(); return; }
+  fields().forEach(function (el) {
+    if (el.type === 'checkbox' || el.type === 'radio') { el.checked = el.defaultChecked; }
+    else { el.value = el.defaultValue; }
+  });
+}
+function fill(values) {
+  Object.keys(values).forEach(function (name) {
+    var el = root.querySelector('[name="' + name + '"]');
+    if (!el) return;
+    if (el.type === 'checkbox' || el.type === 'radio') { el.checked = !!values[name]; }
+    else { el.value = values[name]; }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+  });
+}
+function serialize() {
+  var params = new URLSearchParams();
+  fields().forEach(function (el) {
+    if (el.disabled || ((el.type === 'checkbox' || el.type === 'radio') && !el.checked)) return;
+    params.append(el.name, el.value);
+  });
+  return params;
+}
+function injected(doc) {
+  return Array.prototype.some.call(doc.querySelectorAll('*'), function (el) {
+    if (el.tagName === 'SCRIPT' && el.textContent.indexOf("alert('xss')") >= 0) return true;
+    return Array.prototype.some.call(el.attributes, function (attr) {
+      return attr.name.indexOf('on') === 0 && attr.value.indexOf(MARK) >= 0;
+    });
+  });
+}
+function fieldError(doc, name) {
+  var input = doc.querySelector('[name="' + name + '"]');
+  var group = input && input.closest('.form-group');
+  var error = group && group.querySelector('.text-danger');
+  return error ? error.textContent.trim() : null;
+}
+function run(item, index) {
+  var unique = Date.now().toString(36) + index;
+  var values = {};
+  Object.keys(form.baseline).forEach(function (name) { values[name] = form.baseline[name]; });
+  values[item.field] = item.value;
+  Object.keys(values).forEach(function (name) { values[name] = String(values[name]).split('{unique}').join(unique); });
+  Object.keys(form.mirror).forEach(function (name) { values[name] = values[form.mirror[name]]; });
+  form.checked.forEach(function (name) { values[name] = true; });
+  reset();
+  fill(values);
+  var sent = root.querySelector('[name="' + item.field + '"]');
+  var params = serialize(), url = form.url, init = {method: form.method, credentials: 'omit'};
+  if (form.method === 'GET') { url += '&' + params.toString(); }
+  else {
+    init.headers = {'Content-Type': 'application/x-www-form-urlencoded'};
+    init.body = params.toString();
+  }
+  return fetch(url, init).then(function (response) {
+    var type = response.headers.get('Content-Type') || '';
+    return response.text().then(function (text) {
+      var result = {id: item.id, status: response.status, sent: sent ? sent.value.length : null};
+      if (type.indexOf('json') >= 0) {
+        var data = JSON.parse(text || '{}'), error = data.error;
+        result.message = error ? (typeof error === 'string' ? error : error[item.field] || JSON.stringify(error)) : null;
+        result.rejected = !!error;
+        result.injected = false;
+        if (form.taken) {
+          var taken = parseInt(data[form.taken], 10);
+          result.taken = isNaN(taken) ? null : taken;
+        }
+      } else {
+        var doc = new DOMParser().parseFromString(text, 'text/html');
+        result.message = fieldError(doc, item.field);
+        result.rejected = result.message !== null;
+        result.injected = injected(doc);
+      }
+      return result;
+    });
+  }, function (error) { return {id: item.id, error: String(error)}; });
+}
+var results = [];
+cases.reduce(function (chain, item, index) {
+  return chain.then(function () { return run(item, index); }).then(function (result) { results.push(result); });
+}, Promise.resolve()).then(function () {
+  reset();
+  callback(results);
+}, function (error) { callback({error: String(error)}); });
+"""
+
+
+class MatrixReport:
+    def __init__(self, form, verdicts, script_calls):
+        self.form = form
+        self.verdicts = verdicts
+        self.script_calls = script_calls
+
+    @property
+    def failures(self):
+        return [verdict for verdict in self.verdicts if not verdict.passed]
+
+    def summary_line(self):
+        return (f"{self.form.name}: {len(self.verdicts)} cases in {self.script_calls} script calls, "
+                f"{len(self.verdicts) - len(self.failures)} passed, {len(self.failures)} failed")
+
+    def table_lines(self, verdicts=None):
+        lines = [f"  {'case':<14}{'field':<11}{'tech':<5}{'partition':<20}{'value':<26}{'expected':<10}{'actual':<10}verdict"]
+        for verdict in self.verdicts if verdicts is None else verdicts:
+            case = verdict.case
+            value = repr(case.value) if len(case.value) <= 22 else repr(case.value[:10]) + f"..({len(case.value)})"
+            lines.append(
+                f"  {case.id:<14}{case.field:<11}{case.technique:<5}{case.label:<20}{value:<26}"
+                f"{'valid' if case.valid else 'invalid':<10}{verdict.actual:<10}"
+                f"{'PASS' if verdict.passed else 'FAIL'}"
+                + (" (payload rendered as markup)" if verdict.injected else "")
+                + (f" - {verdict.message}" if verdict.message and not verdict.passed else "")
+            )
+        return lines
+
+    def as_property(self):
+        return {
+            "form": self.form.name,
+            "script_calls": self.script_calls,
+            "cases": [
+                [v.case.id, v.case.field, v.case.technique, v.case.label, v.case.value, v.case.valid,
+                 v.actual, v.message, v.injected, v.passed]
+                for v in self.verdicts
+            ],
+        }
+
+
+def _verdict(form, case, result):
+    if result is None or "error" in result:
+        return Verdict(case, "error", (result or {}).get("error", "no result"), False, False)
+    if result["status"] >= 500:
+        return Verdict(case, f"HTTP {result['status']}", result.get("message"), result["injected"], False)
+    actual = "rejected" if result["rejected"] else "accepted"
+    expected_ok = not form.validates or (actual == "accepted") == case.valid
+    taken = result.get("taken")
+    if form.validates and actual == "accepted" and taken is not None:
+        spec = next(spec for spec in form.fields if spec.name == case.field)
+        if case.valid:
+            expected_ok = str(taken) == case.value.strip()
+            actual = "accepted" if expected_ok else f"took {taken}"
+        else:
+            expected_ok = taken == 0 or is_valid(spec, str(taken))
+            actual = "ignored" if taken == 0 else "defaulted" if expected_ok else f"took {taken}"
+    return Verdict(case, actual, result.get("message"), result["injected"], expected_ok and not result["injected"])
+
+
+def run_matrix(page, form, cases=None, batch_size=BATCH_SIZE):
+    """Run ``cases`` (default: all generated) against ``form`` on the loaded ``page``."""
+    cases = generate_cases(form) if cases is None else cases
+    arguments = {
+        "container": form.container, "method": form.method,
+        "url": f"{page.base_url.rstrip('/')}/index.php?route={form.action}",
+        "baseline": dict(form.baseline or {}), "checked": list(form.checked), "mirror": dict(form.mirror or {}),
+        "taken": form.taken,
+    }
+    results, calls = {}, 0
+    for start in range(0, len(cases), batch_size):
+        batch = cases[start:start + batch_size]
+        payload = [{"id": case.id, "field": case.field, "value": case.value} for case in batch]
+        calls += 1
+        returned = page.driver.execute_async_script(MATRIX_SCRIPT, arguments, payload)
+        if isinstance(returned, dict):
+            raise RuntimeError(f"Input matrix script failed on {form.name}: {returned['error']}")
+        results.update((result["id"], result) for result in returned)
+    page.invalidate()
+    return MatrixReport(form, [_verdict(form, case, results.get(case.id)) for case in cases], calls)
+
+
+def summary_lines(reports, verbose=False):
+    matrices = [
+        value
+        for report in reports
+        for name, value in getattr(report, "user_properties", ())
+        if name == PROPERTY
+    ]
+    if not matrices:
+        return []
+    total = sum(len(matrix["cases"]) for matrix in matrices)
+    calls = sum(matrix["script_calls"] for matrix in matrices)
+    lines = [f"{total} generated cases on {len(matrices)} loaded forms in {calls} script calls"]
+    for matrix in matrices:
+        form = FORMS.get(matrix["form"]) or FormSpec(matrix["form"], "", "")
+        verdicts = [
+            Verdict(Case(*row[:6]), row[6], row[7], row[8], row[9]) for row in matrix["cases"]
+        ]
+        report = MatrixReport(form, verdicts, matrix["script_calls"])
+        lines.append(report.summary_line())
+        shown = verdicts if verbose else report.failures
+        if shown:
+            lines.extend(report.table_lines(shown))
+    return lines
@@ -0,0 +1,297 @@
+"""
+Page-performance capture for every page a browser test visits.
+
+Wall-clock time around ``driver.get`` measures Selenium as much as the page.
+``PerfProbe`` reads what the browser itself recorded instead: Navigation
+Timing (TTFB, DOMContentLoaded, load), Resource Timing (request count and
+transferred bytes), paint timing (first contentful paint) and, where an
+observer could be installed before the page loaded, largest contentful paint
+and long tasks.
+
+On Chromium the observer script is registered with
+``Page.addScriptToEvaluateOnNewDocument``; it also stores a sample in
+``sessionStorage`` when a page is left, so pages reached by clicking a link
+are measured too. Other browsers are sampled before every ``driver.get`` and
+at the end of the test (no LCP/long tasks there).
+
+Samples are tagged with route, browser and viewport and attached to the test
+report as the ``perf`` user property, so ``--workers`` runs aggregate them as
+well. ``ROUTE_BUDGETS`` declares thresholds per route; violations are listed
+in the "performance" summary section, or fail the test with
+``--perf=enforce``.
+"""
+import json
+import math
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+
+from .commands import raw_execute, restore_execute
+from .matrix import VIEWPORTS
+
+PROPERTY = "perf"
+STORAGE_KEY = "__ocPerf"
+METRICS = ("ttfb", "dom_content_loaded", "load", "fcp", "lcp", "long_task_ms", "resources", "transfer_kb")
+TIMED = ("ttfb", "dom_content_loaded", "load", "fcp", "lcp")
+
+# Milliseconds. "*" applies to every route; a route entry overrides it per metric.
+ROUTE_BUDGETS = {
+    "*": {"ttfb": 1500, "fcp": 3000, "lcp": 4000, "load": 5000},
+    "common/home": {"fcp": 2500},
+    "product/search": {"ttfb": 2000},
+    "checkout/checkout": {"load": 6000},
+}
+
+COLLECT_FUNCTION = """
+function collectPerf() {
+  var nav = performance.getEntriesByType('navigation')[0];
+  if (!nav || !/^https?:/.test(location.href)) return null;
+  var paints = {}, observed = window.__ocPerf || {}, transfer = nav.transferSize || 0;
+  performance.getEntriesByType('paint').forEach(function (entry) { paints[entry.name] = entry.startTime; });
+  var resources = performance.getEntriesByType('resource');
+  resources.forEach(function (entry) { transfer += entry.transferSize || 0; });
+  return {
+    document: performance.timeOrigin,
+    url: location.href,
+    ttfb: nav.responseStart,
+    dom_content_loaded: nav.domContentLoadedEventEnd || null,
+    load: nav.loadEventEnd || null,
+    fcp: 'first-contentful-paint' in paints ? paints['first-contentful-paint'] : null,
+    lcp: observed.lcp === undefined ? null : observed.lcp,
+    long_tasks: observed.longTasks === undefined ? null : observed.longTasks,
+    long_task_ms: observed.longTaskMs === undefined ? null : observed.longTaskMs,
+    resources: resources.length,
+    transfer_kb: Math.round(transfer / 102.4) / 10,
+    window: [window.outerWidth, window.outerHeight]
+  };
+}
+"""
+
+OBSERVER_SCRIPT = COLLECT_FUNCTION + """
+(function () {
+  var perf = window.__ocPerf = {lcp: null, longTasks: 0, longTaskMs: 0};
+  try {
+    new PerformanceObserver(function (list) {
+      list.getEntries().forEach(function (entry) { perf.lcp = entry.startTime; });
+    }).observe({type: 'largest-contentful-paint', buffered: true});
+  } catch (e) {}
+  try {
+    new PerformanceObserver(function (list) {
+      list.getEntries().forEach(function (entry) { perf.longTasks++; perf.longTaskMs += entry.duration; });
+    }).observe({type: 'longtask', buffered: true});
+  } catch (e) {}
+  window.addEventListener('pagehide', function () {
+    try {
+      var sample = collectPerf();
+      if (!sample) return;
+      var stored = JSON.parse(sessionStorage.getItem('%(key)s') || '[]');
+      stored.push(sample);
+      sessionStorage.setItem('%(key)s', JSON.stringify(stored));
+    } catch (e) {}
+  });
+})();
+""" % {"key": STORAGE_KEY}
+
+SAMPLE_SCRIPT = COLLECT_FUNCTION + "return collectPerf();"
+
+DRAIN_SCRIPT = """
+var stored = [];
+try {
+  stored = JSON.parse(sessionStorage.getItem('%(key)s') || '[]');
+  sessionStorage.removeItem('%(key)s');
+} catch (e) {}
+return stored;
+""" % {"key": STORAGE_KEY}
+
+
+def route_of(url):
+    """The OpenCart route a URL renders; the bare store URL is the home page."""
+    route = parse_qs(urlsplit(url).query).get("route")
+    return route[0] if route else "common/home"
+
+
+def viewport_of(window):
+    """The matrix name for a window size, else ``WIDTHxHEIGHT``."""
+    size = tuple(window or ())
+    return next((name for name, dims in VIEWPORTS.items() if dims == size), "x".join(map(str, size)) or "unknown")
+
+
+def budget_for(route):
+    budget = dict(ROUTE_BUDGETS["*"])
+    budget.update(ROUTE_BUDGETS.get(route, {}))
+    return budget
+
+
+def violations(sample):
+    budget = budget_for(sample["route"])
+    return [
+        f"{sample['route']} {metric} {sample[metric]:.0f}ms > {limit}ms"
+        for metric, limit in budget.items()
+        if sample.get(metric) is not None and sample[metric] > limit
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class PerfProbe:
+    """
+    ``viewport`` tags every sample; when None (tests that resize the window
+    themselves) each sample is tagged from the window size it was taken at.
+    """
+
+    def __init__(self, driver, browser, viewport):
+        self.driver = driver
+        self.browser = browser
+        self.viewport = viewport
+        self.samples = []
+        self._script_id = None
+        self._previous = None
+        self._wrapped = False
+
+    def _cdp(self, cmd, params):
+        return raw_execute(self.driver, "executeCdpCommand", {"cmd": cmd, "params": params})["value"]
+
+    def _script(self, script):
+        return raw_execute(self.driver, Command.W3C_EXECUTE_SCRIPT, {"script": script, "args": []})["value"]
+
+    def start(self):
+        if hasattr(self.driver, "execute_cdp_cmd"):
+            try:
+                self._script_id = self._cdp("Page.addScriptToEvaluateOnNewDocument",
+                                            {"source": OBSERVER_SCRIPT})["identifier"]
+                return
+            except WebDriverException:
+                pass
+        # No way to run a script before the page: sample each page before leaving it
+        self._previous = self.driver.__dict__.get("execute")
+        forward = self.driver.execute
+
+        def execute(command, params=None):
+            if command == Command.GET:
+                self.sample()
+            return forward(command, params)
+
+        self.driver.execute = execute
+        self._wrapped = True
+
+    def _add(self, raw):
+        # A page sampled by the test and again when it is left counts once
+        for sample in self.samples:
+            if sample["document"] == raw["document"]:
+                return sample
+        sample = dict(raw, route=route_of(raw["url"]), browser=self.browser,
+                      viewport=self.viewport or viewport_of(raw.get("window")))
+        self.samples.append(sample)
+        return sample
+
+    def sample(self):
+        """Measure the current page now; None if it is not an http(s) page."""
+        try:
+            raw = self._script(SAMPLE_SCRIPT)
+        except WebDriverException:
+            return None
+        return self._add(raw) if raw else None
+
+    def stop(self):
+        """Collect pages left by clicking plus the current one, and unhook."""
+        if self._wrapped:
+            restore_execute(self.driver, self._previous)
+            self._wrapped = False
+        try:
+            if self._script_id is not None:
+                for raw in self._script(DRAIN_SCRIPT) or []:
+                    self._add(raw)
+                self._cdp("Page.removeScriptToEvaluateOnNewDocument", {"identifier": self._script_id})
+        except WebDriverException:
+            pass
+        self.sample()
+        return self.samples
+
+
+PROBE_KEY = pytest.StashKey()
+
+
+@contextmanager
+def probe(request, driver, browser, viewport=None):
+    """Sample every page ``driver`` visits during the test (unless ``--perf=off``)."""
+    mode = request.config.getoption("--perf")
+    if mode == "off":
+        yield None
+        return
+    perf_probe = PerfProbe(driver, browser, viewport)
+    perf_probe.start()
+    request.node.stash[PROBE_KEY] = perf_probe
+    try:
+        yield perf_probe
+    finally:
+        samples = perf_probe.stop()
+        request.node.user_properties.append((PROPERTY, samples))
+    problems = [problem for sample in samples for problem in violations(sample)]
+    if problems and mode == "enforce":
+        pytest.fail("Performance budget exceeded: " + "; ".join(problems), pytrace=False)
+
+
+def collect(reports):
+    return [
+        sample
+        for report in reports
+        for name, value in getattr(report, "user_properties", ())
+        if name == PROPERTY
+        for sample in value
+    ]
+
+
+def aggregate(samples):
+    """(route, browser, viewport) -> metric -> {n, p50, p95, p99}."""
+    groups = {}
+    for sample in samples:
+        key = (sample["route"], sample["browser"], sample["viewport"])
+        for metric in METRICS:
+            if sample.get(metric) is not None:
+                groups.setdefault(key, {}).setdefault(metric, []).append(sample[metric])
+    return {
+        key: {
+            metric: {"n": len(values), "p50": percentile(values, 50),
+                     "p95": percentile(values, 95), "p99": percentile(values, 99)}
+            for metric, values in metrics.items()
+        }
+        for key, metrics in groups.items()
+    }
+
+
+def summary_lines(samples):
+    if not samples:
+        return []
+    lines = [f"{len(samples)} page samples (ms, p50/p95/p99)"]
+    for (route, browser, viewport), metrics in sorted(aggregate(samples).items()):
+        timed = "  ".join(
+            f"{metric} {stats['p50']:.0f}/{stats['p95']:.0f}/{stats['p99']:.0f}"
+            for metric, stats in metrics.items() if metric in TIMED
+        )
+        count = max(stats["n"] for stats in metrics.values())
+        lines.append(f"  {route} [{browser}, {viewport}] n={count}  {timed}")
+    problems = sorted({problem for sample in samples for problem in violations(sample)})
+    if problems:
+        lines.append(f"{len(problems)} budget violations:")
+        lines.extend(f"  {problem}" for problem in problems)
+    return lines
+
+
+def write_report(path, samples):
+    report = {
+        "samples": samples,
+        "aggregates": [
+            {"route": route, "browser": browser, "viewport": viewport, "metrics": metrics}
+            for (route, browser, viewport), metrics in sorted(aggregate(samples).items())
+        ],
+        "budgets": ROUTE_BUDGETS,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
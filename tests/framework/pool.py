@@ -0,0 +1,194 @@
+"""
+Session-scoped WebDriver pool.
+
+Launching a browser takes most of the wall-clock time of a Selenium test, so
+the fixtures lease warm browsers from a pool instead of starting one per test.
+Between leases each browser is put back to a clean state: cookies and storage
+cleared, extra windows closed, window size back to 1920x1080 and about:blank.
+
+A browser is health-checked before it is handed out and recycled (quit and
+replaced) once it has served ``max_uses`` leases or stops responding.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_WINDOW_SIZE = (1920, 1080)
+
+# Runs before leaving the page: storage is per-origin, so it has to be cleared
+# while the test's origin is still loaded. about:blank raises SecurityError.
+CLEAR_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+class PooledDriver:
+    """A browser owned by a pool, plus the bookkeeping used to recycle it."""
+
+    def __init__(self, browser, driver):
+        self.browser = browser
+        self.driver = driver
+        self.uses = 0
+        self.started_at = time.time()
+
+    def is_healthy(self):
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            # A crashed driver process surfaces as urllib3/socket errors, not WebDriverException
+            return False
+
+    def reset(self, window_size=DEFAULT_WINDOW_SIZE):
+        driver = self.driver
+        driver.execute_script(CLEAR_STORAGE_SCRIPT)
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        if hasattr(driver, "execute_cdp_cmd"):
+            # Chromium can drop cookies for every domain in one call
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        else:
+            driver.delete_all_cookies()
+        driver.set_window_size(*window_size)
+        driver.get("about:blank")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """
+    Keeps up to ``size`` browsers of one kind alive for the whole session.
+
+    ``factory`` is a zero-argument callable returning a new WebDriver.
+    """
+
+    def __init__(self, browser, factory, size=1, max_uses=25, window_size=DEFAULT_WINDOW_SIZE):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self.browser = browser
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.window_size = window_size
+        self._idle = []
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self.stats = {"launches": 0, "leases": 0, "recycled": 0, "launch_time": 0.0}
+
+    def _launch(self):
+        start = time.perf_counter()
+        driver = self.factory()
+        driver.set_window_size(*self.window_size)
+        self.stats["launches"] += 1
+        self.stats["launch_time"] += time.perf_counter() - start
+        return PooledDriver(self.browser, driver)
+
+    def _recycle(self, pooled):
+        self.stats["recycled"] += 1
+        pooled.quit()
+
+    def acquire(self, timeout=None, fresh=False):
+        """
+        Lease a healthy browser, launching one if the pool is not full.
+
+        ``fresh`` always launches a new browser, recycling the idle one it
+        displaces: reruns of a failed test must not inherit its browser.
+        """
+        with self._lock:
+            while not self._idle and self._in_use >= self.size:
+                if not self._lock.wait(timeout):
+                    raise TimeoutError(f"No {self.browser} driver became free within {timeout}s")
+            pooled = self._idle.pop() if self._idle else None
+            # Take the slot before launching so other threads see it as used
+            self._in_use += 1
+
+        try:
+            if pooled is not None and (fresh or not pooled.is_healthy()):
+                self._recycle(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = self._launch()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        pooled.uses += 1
+        self.stats["leases"] += 1
+        return pooled
+
+    def release(self, pooled):
+        """Return a leased browser, resetting it or recycling it as needed."""
+        keep = pooled.uses < self.max_uses
+        try:
+            if keep:
+                try:
+                    pooled.reset(self.window_size)
+                except Exception:
+                    keep = False
+            if not keep:
+                self._recycle(pooled)
+        finally:
+            # Whatever happened to the browser, its slot goes back to the pool
+            with self._lock:
+                self._in_use -= 1
+                if keep:
+                    self._idle.append(pooled)
+                self._lock.notify()
+
+    @contextmanager
+    def lease(self, fresh=False):
+        pooled = self.acquire(fresh=fresh)
+        try:
+            yield pooled.driver
+        finally:
+            self.release(pooled)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.quit()
+
+
+class DriverPools:
+    """One ``DriverPool`` per browser name, created on first use."""
+
+    def __init__(self, factories, size=1, max_uses=25):
+        self.factories = factories
+        self.size = size
+        self.max_uses = max_uses
+        self._pools = {}
+
+    def get(self, browser):
+        if browser not in self._pools:
+            self._pools[browser] = DriverPool(
+                browser, self.factories[browser], size=self.size, max_uses=self.max_uses
+            )
+        return self._pools[browser]
+
+    def lease(self, browser, fresh=False):
+        return self.get(browser).lease(fresh=fresh)
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+    def summary_lines(self):
+        lines = []
+        for name, pool in self._pools.items():
+            stats = pool.stats
+            lines.append(
+                f"{name}: {stats['leases']} leases served by {stats['launches']} launches "
+                f"({stats['recycled']} recycled, {stats['launch_time']:.1f}s spent launching)"
+            )
+        return lines
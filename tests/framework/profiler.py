@@ -0,0 +1,224 @@
+"""
+WebDriver command profiler.
+
+``commands`` counts round-trips and ``waits`` times the waits. Neither says
+where a slow test's time actually went: the site, the waits, or the sheer
+number of round-trips. ``CommandProfiler`` wraps ``driver.execute`` for the
+length of a test and records every command: what it was, when it started,
+how long the browser took to answer, the test line that issued it, and the
+Python call stack that led to it (test function, page-object methods, the
+wait engine).
+
+Each test's wall time is then split three ways:
+
+- browser: commands issued outside a wait;
+- waits: time blocked in ``WaitEngine``/``WebDriverWait`` waits, including
+  the commands made inside them;
+- other: everything else (Python, HTTP seeding, sleeps).
+
+The profile is attached as the ``command_profile`` user property, so
+``--workers`` runs report it too. The "command profile" summary section
+lists the slowest tests' breakdowns and a hot-command table (command x
+calling line); ``-v`` adds each slow test's heaviest call stacks, flamegraph
+style. ``--command-trace`` writes everything as Chrome trace-event JSON,
+which chrome://tracing, Perfetto and speedscope open. Each test gets its
+own track, with its waits and commands nested under it.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.webdriver.support.wait import WebDriverWait
+
+from . import waits
+from .commands import restore_execute
+
+PROPERTY = "command_profile"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAMEWORK = os.path.join(ROOT, "framework") + os.sep
+
+# Wrappers around driver.execute: never the caller, never part of a stack
+INSTRUMENTATION = {os.path.join(FRAMEWORK, name) for name in ("commands.py", "perf.py", "a11y.py",
+                                                               "impact.py", "profiler.py")}
+
+WAIT_CODES = {waits.WaitEngine.wait.__code__, WebDriverWait.until.__code__, WebDriverWait.until_not.__code__}
+
+
+def call_stack(frame):
+    """
+    (caller, stack, in_wait) for a command issued from ``frame``: the
+    innermost suite frame outside ``framework/`` as ``file:line``, the suite
+    frames outermost first, and whether a wait is on the stack.
+    """
+    caller, stack, in_wait = None, [], False
+    while frame is not None:
+        code = frame.f_code
+        in_wait = in_wait or code in WAIT_CODES
+        filename = code.co_filename
+        if filename.startswith(ROOT) and filename not in INSTRUMENTATION:
+            if caller is None and not filename.startswith(FRAMEWORK):
+                caller = f"{os.path.relpath(filename, ROOT)}:{frame.f_lineno}"
+            stack.append(getattr(code, "co_qualname", code.co_name))     # co_qualname: Python 3.11+
+        frame = frame.f_back
+    stack.reverse()
+    return caller or "?", stack, in_wait
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class CommandProfiler:
+    def __init__(self, driver):
+        self.driver = driver
+        self.commands = []       # [command, start ms, duration ms, caller, stack index, in wait]
+        self.stacks = []
+        self._stack_index = {}
+        self._previous = None
+        self._started = None
+        self._epoch = None
+        self._first_wait = 0
+        self._thread = None
+        self._attached = False
+
+    def _intern(self, stack):
+        key = tuple(stack)
+        if key not in self._stack_index:
+            self._stack_index[key] = len(self.stacks)
+            self.stacks.append(stack)
+        return self._stack_index[key]
+
+    def attach(self):
+        # Attached before the other wrappers, so it times the bare round-trip
+        self._previous = self.driver.__dict__.get("execute")
+        forward = self.driver.execute
+        self._epoch, self._started = time.time(), time.perf_counter()
+        self._first_wait, self._thread = len(waits.RECORDS), threading.get_ident()
+
+        def execute(command, params=None):
+            caller, stack, in_wait = call_stack(sys._getframe(1))
+            start = time.perf_counter()
+            try:
+                return forward(command, params)
+            finally:
+                self.commands.append([command, _ms(start - self._started), _ms(time.perf_counter() - start),
+                                      caller, self._intern(stack), in_wait])
+
+        self.driver.execute = execute
+        self._attached = True
+
+    def detach(self):
+        if self._attached:
+            restore_execute(self.driver, self._previous)
+            self._attached = False
+        waited = [[record.label, _ms(record.started - self._started), _ms(record.seconds), record.met]
+                  for record in waits.RECORDS[self._first_wait:]
+                  if record.started >= self._started and record.thread == self._thread]
+        return {"epoch": self._epoch, "pid": os.getpid(), "wall": _ms(time.perf_counter() - self._started),
+                "commands": self.commands, "stacks": self.stacks, "waits": waited}
+
+
+@contextmanager
+def profile_commands(request, driver):
+    profiler = CommandProfiler(driver)
+    profiler.attach()
+    try:
+        yield profiler
+    finally:
+        request.node.user_properties.append((PROPERTY, profiler.detach()))
+
+
+def collect(reports):
+    """nodeid -> profile (a test leased several browsers: one profile each)."""
+    profiles = {}
+    for report in reports:
+        for name, value in getattr(report, "user_properties", ()):
+            if name == PROPERTY:
+                profiles.setdefault(report.nodeid, []).append(value)
+    return profiles
+
+
+def breakdown(profile):
+    """(browser ms, wait ms, other ms, commands) of one profile."""
+    browser = sum(duration for _, _, duration, _, _, in_wait in profile["commands"] if not in_wait)
+    waited = sum(duration for _, _, duration, _ in profile["waits"])
+    return browser, waited, max(0.0, profile["wall"] - browser - waited), len(profile["commands"])
+
+
+def hot_commands(profiles):
+    """(command, caller) -> [count, total ms], over every profile."""
+    hot = {}
+    for runs in profiles.values():
+        for profile in runs:
+            for command, _, duration, caller, _, _ in profile["commands"]:
+                entry = hot.setdefault((command, caller), [0, 0.0])
+                entry[0] += 1
+                entry[1] += duration
+    return hot
+
+
+def flame(profile):
+    """Collapsed stacks (``a;b;command``) -> ms, the input format of flamegraph tools."""
+    stacks = {}
+    for command, _, duration, _, index, _ in profile["commands"]:
+        key = ";".join(profile["stacks"][index] + [command])
+        stacks[key] = stacks.get(key, 0.0) + duration
+    return stacks
+
+
+def summary_lines(profiles, verbose=False, top=5):
+    if not profiles:
+        return []
+    tests = {nodeid: [sum(values) for values in zip(*(breakdown(profile) for profile in runs))] +
+             [sum(profile["wall"] for profile in runs)]
+             for nodeid, runs in profiles.items()}
+    browser, waited, other, count, wall = (sum(values) for values in zip(*tests.values()))
+    lines = [f"{int(count)} commands over {len(tests)} browser tests: browser {browser / 1000:.2f}s, "
+             f"waits {waited / 1000:.2f}s, other {other / 1000:.2f}s"]
+    lines.append("slowest tests (wall = browser + waits + other):")
+    for nodeid, (browser, waited, other, count, wall) in sorted(tests.items(), key=lambda item: -item[1][4])[:top]:
+        lines.append(f"  {wall / 1000:6.2f}s = {browser / 1000:.2f}s ({int(count)} commands) + "
+                     f"{waited / 1000:.2f}s + {other / 1000:.2f}s  {nodeid}")
+        if verbose:
+            stacks = {}
+            for profile in profiles[nodeid]:
+                for stack, ms in flame(profile).items():
+                    stacks[stack] = stacks.get(stack, 0.0) + ms
+            for stack, ms in sorted(stacks.items(), key=lambda item: -item[1])[:3]:
+                lines.append(f"      {ms:8.1f}ms  {stack}")
+    lines.append("hot commands (total, calls, mean, command at calling line):")
+    for (command, caller), (calls, total) in sorted(hot_commands(profiles).items(),
+                                                    key=lambda item: -item[1][1])[:top + 3]:
+        lines.append(f"  {total:8.1f}ms {calls:4d}x {total / calls:6.1f}ms  {command}  {caller}")
+    return lines
+
+
+def trace_events(profiles):
+    """Chrome trace-event format: one thread (track) per test, times in microseconds."""
+    events = []
+    runs = [(nodeid, profile) for nodeid, entries in profiles.items() for profile in entries]
+    origin = min((profile["epoch"] for _, profile in runs), default=0.0)
+    for tid, (nodeid, profile) in enumerate(sorted(runs, key=lambda run: run[1]["epoch"]), start=1):
+        base = (profile["epoch"] - origin) * 1e6
+        pid = profile["pid"]
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": nodeid}})
+        events.append({"ph": "X", "cat": "test", "name": nodeid.rpartition("::")[2], "pid": pid, "tid": tid,
+                       "ts": base, "dur": profile["wall"] * 1000})
+        for label, start, duration, met in profile["waits"]:
+            events.append({"ph": "X", "cat": "wait", "name": f"wait: {label}", "pid": pid, "tid": tid,
+                           "ts": base + start * 1000, "dur": duration * 1000, "args": {"met": met}})
+        for command, start, duration, caller, index, in_wait in profile["commands"]:
+            events.append({"ph": "X", "cat": "command", "name": command, "pid": pid, "tid": tid,
+                           "ts": base + start * 1000, "dur": duration * 1000,
+                           "args": {"caller": caller, "stack": ";".join(profile["stacks"][index]),
+                                    "in_wait": in_wait}})
+    return events
+
+
+def write_trace(path, profiles):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"traceEvents": trace_events(profiles), "displayTimeUnit": "ms"}, handle)
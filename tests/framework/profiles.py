@@ -0,0 +1,156 @@
+"""
+Execution profiles: curated browser flags per browser, plus a startup benchmark.
+
+The factories used to start every browser headed, with only
+``--no-sandbox``/``--disable-dev-shm-usage``: extensions, the GPU process,
+background networking, component updates and first-run checks all ran on
+every launch. A profile bundles the flags for one way of running the suite:
+
+- ``fast-headless`` (default): headless, with everything the tests never
+  look at switched off;
+- ``headed-debug``: a visible window with the flags the suite has always
+  used, for watching or pausing a run;
+- ``visual-fidelity``: headless, with deterministic rendering (sRGB colour
+  profile, scale factor 1, no font hinting, hidden scrollbars) for layout
+  and screenshot comparisons.
+
+``benchmark`` measures a profile on the current machine: cold start (the
+factory call, driver process included), the first ``get`` of the store's
+home page, and the round-trip latency of a cheap WebDriver command. The
+profile benchmark test (``--benchmark-profiles``) runs it for every profile
+and lists the results side by side, so the profile is chosen from data.
+"""
+import statistics
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import WebDriverException
+
+from .perf import percentile
+
+Profile = namedtuple("Profile", "name description headless chromium firefox_prefs")
+
+# Flags every Chromium profile keeps: the container workarounds the suite always had
+BASE_CHROMIUM = ("--no-sandbox", "--disable-dev-shm-usage")
+
+QUIET_CHROMIUM = (
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--metrics-recording-only",
+    "--password-store=basic",
+    "--use-mock-keychain",
+    "--mute-audio",
+)
+
+QUIET_FIREFOX = {
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.homepage_override.mstone": "ignore",
+    "browser.startup.page": 0,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "toolkit.telemetry.enabled": False,
+    "extensions.update.enabled": False,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "network.prefetch-next": False,
+    "media.autoplay.default": 5,
+}
+
+PROFILES = {
+    "fast-headless": Profile(
+        "fast-headless", "headless, extensions/GPU/background networking off",
+        True, BASE_CHROMIUM + QUIET_CHROMIUM + ("--headless=new", "--disable-gpu", "--hide-scrollbars"),
+        QUIET_FIREFOX,
+    ),
+    "headed-debug": Profile(
+        "headed-debug", "visible window, the suite's historical flags",
+        False, BASE_CHROMIUM, {},
+    ),
+    "visual-fidelity": Profile(
+        "visual-fidelity", "headless, deterministic rendering for layout/screenshot checks",
+        True, BASE_CHROMIUM + QUIET_CHROMIUM + (
+            "--headless=new", "--force-device-scale-factor=1", "--force-color-profile=srgb",
+            "--font-render-hinting=none", "--disable-font-subpixel-positioning", "--hide-scrollbars",
+        ),
+        dict(QUIET_FIREFOX, **{"layout.css.devPixelsPerPx": "1.0", "ui.prefersReducedMotion": 1}),
+    ),
+}
+
+DEFAULT_PROFILE = "fast-headless"
+
+COMMAND_SAMPLES = 20
+
+
+def configure_chromium(options, profile):
+    for argument in profile.chromium:
+        options.add_argument(argument)
+    return options
+
+
+def configure_firefox(options, profile):
+    if profile.headless:
+        options.add_argument("-headless")
+    for name, value in profile.firefox_prefs.items():
+        options.set_preference(name, value)
+    return options
+
+
+class BenchmarkResult(namedtuple("BenchmarkResult", "profile browser cold_start first_get command_p50 "
+                                                    "command_p95 error")):
+    """Seconds for ``cold_start``/``first_get`` (medians over rounds), milliseconds for commands."""
+
+    @property
+    def total(self):
+        return self.cold_start + self.first_get
+
+
+def benchmark(profile, browser, factory, url, rounds=3, commands=COMMAND_SAMPLES):
+    """Launch ``rounds`` fresh browsers through ``factory`` and time them."""
+    cold, first, latencies = [], [], []
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            driver = factory()
+            try:
+                cold.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                driver.get(url)
+                first.append(time.perf_counter() - start)
+                for _ in range(commands):
+                    start = time.perf_counter()
+                    driver.execute_script("return 1")
+                    latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                driver.quit()
+    except WebDriverException as error:
+        return BenchmarkResult(profile, browser, None, None, None, None, str(error).splitlines()[0])
+    return BenchmarkResult(profile, browser, statistics.median(cold), statistics.median(first),
+                           percentile(latencies, 50), percentile(latencies, 95), None)
+
+
+def summary_lines(results):
+    if not results:
+        return []
+    lines = ["profile          browser   cold start  first get  command p50/p95"]
+    for result in sorted(results, key=lambda result: (result.browser, result.profile)):
+        if result.error is not None:
+            lines.append(f"{result.profile:<16} {result.browser:<9} failed: {result.error}")
+            continue
+        lines.append(f"{result.profile:<16} {result.browser:<9} {result.cold_start:9.2f}s "
+                     f"{result.first_get:9.2f}s  {result.command_p50:6.1f}/{result.command_p95:.1f}ms")
+    measured = [result for result in results if result.error is None]
+    for browser in sorted({result.browser for result in measured}):
+        best = min((result for result in measured if result.browser == browser), key=lambda result: result.total)
+        lines.append(f"fastest {browser} profile on this machine: {best.profile} "
+                     f"({best.total:.2f}s to the first page)")
+    return lines
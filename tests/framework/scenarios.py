@@ -0,0 +1,226 @@
+"""
+State-transition scenarios written against page-level store operations.
+
+A scenario only calls ``add_to_cart``, ``cart_items``, ``update_quantity``,
+``remove``, ``login``, ``is_logged_in``, ``search``, ``clear_cookies`` and
+``alerts``, so it runs unchanged on any backend offering them. ``StoreClient`` (HTTP) runs
+one in milliseconds; the browser is kept for rendering-sensitive checks.
+
+Each scenario asserts every state it reaches and returns the state names in
+order. The same flows are also declared as ``StateMachine`` models at the end
+of this module, for generated coverage paths.
+"""
+from .model import StateMachine, Transition
+
+MACBOOK = 43
+
+# TC-016 partitions: inputs that must be treated as plain text
+MALICIOUS_INPUTS = (
+    "<script>alert('xss')</script>",
+    "\"><img src=x onerror=alert(1)>",
+    "' OR '1'='1",
+    "'; DROP TABLE oc_product; --",
+)
+
+
+def cart_lifecycle(store, product_id=MACBOOK):
+    """TC-005: Empty Cart → Item Added → Quantity Updated → Item Removed"""
+    assert store.cart_items() == {}, "New session should start with an empty cart"
+    states = ["Empty Cart"]
+
+    store.add_to_cart(product_id)
+    assert store.alerts("success"), f"No success alert after adding: {store.last_alerts}"
+    items = store.cart_items()
+    assert list(items.values()) == [1]
+    states.append("Item Added")
+
+    key = next(iter(items))
+    store.update_quantity(key, 2)
+    assert store.alerts("success"), f"No success alert after update: {store.last_alerts}"
+    assert store.cart_items() == {key: 2}
+    states.append("Quantity Updated")
+
+    store.remove(key)
+    assert store.cart_items() == {}
+    states.append("Item Removed")
+    return states
+
+
+def session_timeout(store, product_id=MACBOOK):
+    """TC-010: Active Session → Timeout (cookies cleared) → Cart check"""
+    store.add_to_cart(product_id)
+    assert store.cart_items(), "Item should be in the cart while the session is active"
+    states = ["Active Session"]
+
+    store.clear_cookies()
+    states.append("Timed Out")
+
+    assert store.cart_items() == {}, "Cart should not survive the loss of the session cookie"
+    states.append("Empty Cart")
+    return states
+
+
+def protected_page_redirect(store):
+    """TC-013: Protected page → Login Required"""
+    assert not store.is_logged_in(), "Guest should be redirected from account/account to login"
+    return ["Protected", "Login Required"]
+
+
+def failed_login(store, email="wrong@email.com", password="wrongpass"):
+    """TC-012: Logged Out → Login Failed"""
+    store.login(email, password)
+    assert store.alerts("danger"), "Failed login should show a warning"
+    assert not store.is_logged_in()
+    return ["Logged Out", "Login Failed"]
+
+
+def cart_stress(store, product_ids):
+    """TC-006: Empty Cart → N unique items in the cart"""
+    assert store.cart_items() == {}, "New session should start with an empty cart"
+    states = ["Empty Cart"]
+
+    for product_id in product_ids:
+        store.add_to_cart(product_id)
+        assert store.alerts("success"), f"Adding product {product_id} failed: {store.last_alerts}"
+    items = store.cart_items()
+    assert len(items) == len(product_ids), f"Expected {len(product_ids)} cart lines, found {len(items)}"
+    assert set(items.values()) == {1}
+    states.append(f"{len(product_ids)} Items")
+    return states
+
+
+def malicious_input(store, payloads=MALICIOUS_INPUTS):
+    """TC-016: Malicious search and login input is echoed as text and rejected"""
+    for payload in payloads:
+        page = store.search(payload)
+        assert page.status == 200, f"Search for {payload!r} returned {page.status}"
+        # The parser only sees the payload as text if the store escaped it
+        assert payload in page.text, f"Search term {payload!r} was not rendered as text"
+        store.login(payload, payload)
+        assert store.alerts("danger"), f"Login with {payload!r} did not show a warning"
+        assert not store.is_logged_in(), f"Login with {payload!r} succeeded"
+    return ["Safe", "Rejected"]
+
+
+# -- declarative models (see framework/model.py) ------------------------------
+
+def _cart_key(store):
+    return next(iter(store.cart_items()))
+
+
+def _add_macbook(store, context):
+    store.add_to_cart(MACBOOK)
+
+
+def _update_to_two(store, context):
+    store.update_quantity(_cart_key(store), 2)
+
+
+def _remove_item(store, context):
+    store.remove(_cart_key(store))
+
+
+def _drop_session(store, context):
+    store.clear_cookies()
+
+
+def _assert_cart_empty(store, context):
+    assert store.cart_items() == {}, "Cart should be empty"
+
+
+def _assert_cart_quantity(store, context):
+    assert list(store.cart_items().values()) == [context["quantity"]]
+
+
+def _empties_cart(context):
+    return {"quantity": 0}
+
+
+CART_MODEL = StateMachine(
+    "cart",
+    initial="Empty Cart",
+    context={"quantity": 0},
+    transitions=[
+        Transition("add", "Empty Cart", "Item Added", _add_macbook, effect=lambda ctx: {"quantity": 1}),
+        Transition("update", "Item Added", "Quantity Updated", _update_to_two, effect=lambda ctx: {"quantity": 2}),
+        # Guarded self-loop: keeps generated paths finite
+        Transition("add again", "Quantity Updated", "Quantity Updated", _add_macbook,
+                   guard=lambda ctx: ctx["quantity"] < 3,
+                   effect=lambda ctx: {"quantity": ctx["quantity"] + 1}),
+        Transition("remove", "Item Added", "Empty Cart", _remove_item, effect=_empties_cart),
+        Transition("remove", "Quantity Updated", "Empty Cart", _remove_item, effect=_empties_cart),
+        Transition("session timeout", "Item Added", "Empty Cart", _drop_session, effect=_empties_cart),
+        Transition("session timeout", "Quantity Updated", "Empty Cart", _drop_session, effect=_empties_cart),
+    ],
+    invariants={
+        "Empty Cart": _assert_cart_empty,
+        "Item Added": _assert_cart_quantity,
+        "Quantity Updated": _assert_cart_quantity,
+    },
+)
+
+
+def _bad_login(store, context):
+    store.login("wrong@email.com", "wrongpass")
+
+
+def _open_account(store, context):
+    store.open("account/account")
+
+
+def _assert_login_failed(store, context):
+    assert store.alerts("danger"), "Failed login should show a warning"
+
+
+def _assert_login_required(store, context):
+    assert "route=account/login" in store.last_page.url
+
+
+LOGIN_MODEL = StateMachine(
+    "login",
+    initial="Logged Out",
+    transitions=[
+        Transition("bad login", "Logged Out", "Login Failed", _bad_login),
+        Transition("bad login", "Login Failed", "Login Failed", _bad_login),
+        Transition("open account", "Logged Out", "Login Required", _open_account),
+        Transition("open account", "Login Failed", "Login Required", _open_account),
+        Transition("bad login", "Login Required", "Login Failed", _bad_login),
+    ],
+    invariants={
+        "Login Failed": _assert_login_failed,
+        "Login Required": _assert_login_required,
+    },
+)
+
+
+def _open(route, **params):
+    def action(store, context):
+        store.open(route, **params)
+    return action
+
+
+def _title_is(title):
+    def check(store, context):
+        assert store.last_page.title == title, f"Expected {title!r}, got {store.last_page.title!r}"
+    return check
+
+
+NAVIGATION_MODEL = StateMachine(
+    "navigation",
+    initial="Start",
+    transitions=[
+        Transition("open store", "Start", "Home", _open("common/home")),
+        Transition("open category", "Home", "Category", _open("product/category", path=20)),
+        Transition("open product", "Category", "Product", _open("product/product", product_id=MACBOOK)),
+        Transition("back", "Product", "Category", _open("product/category", path=20)),
+        Transition("logo", "Category", "Home", _open("common/home")),
+        Transition("logo", "Product", "Home", _open("common/home")),
+    ],
+    invariants={
+        "Category": _title_is("Desktops"),
+        "Product": _title_is("MacBook"),
+        "Home": _title_is("Your Store"),
+    },
+)
+
+MODELS = {model.name: model for model in (CART_MODEL, LOGIN_MODEL, NAVIGATION_MODEL)}
@@ -0,0 +1,142 @@
+"""
+Named preconditions seeded without the UI.
+
+Tests used to build their starting state by hand: open product 43, click
+``#button-cart``, wait for the alert, open the cart. Only the transition a
+test is about needs to go through the browser. ``PRECONDITIONS`` names the
+states tests start from ("cart with MacBook x2", "guest at billing step",
+...), and ``Seeder`` builds them through the fastest channel available:
+
+1. the stand-in's ``testing/seed`` route, which sets the cart and wish list
+   in one request;
+2. otherwise plain HTTP posts (``checkout/cart/add``, wish list removals)
+   through ``StoreClient``, which work against the live store too.
+
+The seeded OpenCart session is then injected into the leased browser with
+the same one-step cookie injection as ``framework.auth``, and the browser
+lands on the precondition's page. Checkout steps that only exist in the
+page's JavaScript (choosing guest checkout) are replayed by ``land``, since
+the server has no state to seed for them.
+"""
+from collections import namedtuple
+
+from .auth import capture_client, inject_driver
+from .http_backend import StoreClient
+from .pages import CheckoutPage
+
+Seed = namedtuple("Seed", "cart logged_in wishlist", defaults=((), False, None))
+Seed.__doc__ = """
+``cart``: ((product_id, quantity), ...). ``logged_in``: use the shared
+``AuthSessions`` account. ``wishlist``: product ids, or None to leave it alone.
+"""
+
+Precondition = namedtuple("Precondition", "name seed route land", defaults=("common/home", None))
+
+PRECONDITIONS = {}
+
+
+class SeedUnsupported(Exception):
+    """The store has no seeding endpoint (the live demo); use HTTP posts."""
+
+
+def precondition(name, seed, route="common/home", land=None):
+    PRECONDITIONS[name] = Precondition(name, seed, route, land)
+
+
+def _choose_guest(driver, base_url):
+    checkout = CheckoutPage(driver, base_url)
+    checkout.wait_for("guest", clickable=True)
+    checkout.click("guest")
+    checkout.click("account_continue")
+    checkout.wait_for("payment_firstname")
+
+
+precondition("empty cart", Seed(), route="checkout/cart")
+precondition("cart with MacBook", Seed(cart=((43, 1),)), route="checkout/cart")
+precondition("cart with MacBook x2", Seed(cart=((43, 2),)), route="checkout/cart")
+precondition("guest at billing step", Seed(cart=((43, 1),)), route="checkout/checkout", land=_choose_guest)
+precondition("logged-in with empty wishlist", Seed(logged_in=True, wishlist=()), route="account/wishlist")
+
+
+class Seeder:
+    """Builds ``PRECONDITIONS`` on fresh OpenCart sessions and hands them to browsers."""
+
+    def __init__(self, base_url, adapter=None, auth=None):
+        self.base_url = base_url
+        self.adapter = adapter
+        self.auth = auth
+        self.endpoint = None        # unknown until the first seed
+        self.channels = {}          # channel -> preconditions seeded through it
+        self.requests = 0
+
+    def seed_client(self, client, seed):
+        """Put ``client``'s session into ``seed``; returns the channel used."""
+        start = client.requests
+        if seed.logged_in:
+            if self.auth is None:
+                raise RuntimeError("A logged-in precondition needs AuthSessions")
+            self.auth.login_client(client)
+        channel = "HTTP posts"
+        if self.endpoint is not False:
+            try:
+                self._seed_endpoint(client, seed)
+                channel = "seed endpoint"
+            except SeedUnsupported:
+                self.endpoint = False
+        if channel == "HTTP posts":
+            self._seed_http(client, seed)
+        self.channels[channel] = self.channels.get(channel, 0) + 1
+        self.requests += client.requests - start
+        return channel
+
+    def _seed_endpoint(self, client, seed):
+        data = {"cart": ",".join(f"{product_id}:{quantity}" for product_id, quantity in seed.cart)}
+        if seed.wishlist is not None:
+            data["wishlist"] = ",".join(str(product_id) for product_id in seed.wishlist)
+        response = client._request("POST", "testing/seed", data=data)
+        if response.status_code != 200 or "json" not in response.headers.get("Content-Type", ""):
+            raise SeedUnsupported(self.base_url)
+        result = response.json()
+        if "error" in result:
+            raise ValueError(f"Seeding failed: {result['error']}")
+        self.endpoint = True
+
+    def _seed_http(self, client, seed):
+        # A fresh session starts with an empty cart; the logged-in one may not
+        if seed.logged_in:
+            for key in client.cart_items():
+                client.remove(key)
+        for product_id, quantity in seed.cart:
+            client.add_to_cart(product_id, quantity)
+            if client.alerts("danger"):
+                raise ValueError(f"Seeding failed: {client.alerts('danger')}")
+        if seed.wishlist is not None:
+            current = client.wishlist_product_ids()
+            for product_id in current:
+                if product_id not in seed.wishlist:
+                    client.remove_from_wishlist(product_id)
+            for product_id in seed.wishlist:
+                if product_id not in current:
+                    client.add_to_wishlist(product_id)
+
+    def seed_driver(self, driver, name):
+        """Seed ``name`` and land ``driver`` on its page, ready for the transition under test."""
+        if name not in PRECONDITIONS:
+            raise KeyError(f"Unknown precondition {name!r} (known: {', '.join(PRECONDITIONS)})")
+        precondition = PRECONDITIONS[name]
+        client = StoreClient(self.base_url, adapter=self.adapter)
+        try:
+            self.seed_client(client, precondition.seed)
+            inject_driver(driver, capture_client(client, None), self.base_url)
+        finally:
+            client.close()
+        driver.get(f"{self.base_url.rstrip('/')}/index.php?route={precondition.route}")
+        if precondition.land is not None:
+            precondition.land(driver, self.base_url)
+        return driver
+
+    def summary_lines(self):
+        if not self.channels:
+            return []
+        seeded = ", ".join(f"{count} via {channel}" for channel, count in sorted(self.channels.items()))
+        return [f"{sum(self.channels.values())} preconditions seeded ({seeded}) in {self.requests} HTTP requests"]
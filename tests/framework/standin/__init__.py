@@ -0,0 +1,9 @@
+"""
+Bundled stand-in for the OpenCart routes the suite uses.
+
+Run the suite against it with ``pytest --store=local``; the live demo store
+stays the default so the nightly pass still exercises the real site.
+"""
+from .server import Faults, StandInServer, StandInStore
+
+__all__ = ["Faults", "StandInServer", "StandInStore"]
@@ -0,0 +1,73 @@
+"""
+Product and category data served by the stand-in store.
+
+Mirrors the tutorialsninja demo catalogue closely enough for the suite:
+same product ids (MacBook is 43), same category paths (Desktops is 20) and
+the same names the tests search for and click on.
+"""
+from collections import namedtuple
+
+Product = namedtuple("Product", "product_id name model brand price stock categories description")
+Category = namedtuple("Category", "category_id name parent_id")
+
+# OpenCart's default product minimum: the smallest quantity that puts a product
+# in the cart. cart/add has no upper limit and rejects nothing; it casts the
+# quantity to int, and lines at zero or below are not shown.
+MIN_QUANTITY = 1
+
+CATEGORIES = [
+    Category(20, "Desktops", 0),
+    Category(26, "PC", 20),
+    Category(27, "Mac", 20),
+    Category(18, "Laptops & Notebooks", 0),
+    Category(25, "Components", 0),
+    Category(28, "Monitors", 25),
+    Category(57, "Tablets", 0),
+    Category(24, "Phones & PDAs", 0),
+    Category(33, "Cameras", 0),
+]
+
+PRODUCTS = [
+    Product(28, "HTC Touch HD", "Product 1", "HTC", 122.00, 939, (20, 24), "HTC Touch - in High Definition."),
+    Product(29, "Palm Treo Pro", "Product 2", "Palm", 337.99, 999, (24,), "Redefine your workday with the Palm Treo Pro smartphone."),
+    Product(30, "Canon EOS 5D", "Product 3", "Canon", 122.00, 7, (20, 33), "Canon's press material for the EOS 5D states that it defines (a) new D-SLR category."),
+    Product(31, "Nikon D300", "Product 4", "Nikon", 98.00, 1000, (33,), "Engineered with pro-level features and performance."),
+    Product(33, "Samsung SyncMaster 941BW", "Product 6", "Samsung", 242.00, 0, (20, 28), "Imagine the advantages of going big without slowing down."),
+    Product(40, "iPhone", "product 11", "Apple", 123.20, 970, (20, 24), "iPhone is a revolutionary new mobile phone."),
+    Product(41, "iMac", "Product 14", "Apple", 122.00, 977, (20, 27), "Just when you thought iMac had everything, now there's even more."),
+    Product(42, "Apple Cinema 30\"", "Product 15", "Apple", 122.00, 990, (20, 28), "The 30-inch Apple Cinema HD Display delivers an amazing 2560 x 1600 pixel resolution."),
+    Product(43, "MacBook", "Product 16", "Apple", 602.00, 929, (18, 20), "Intel Core 2 Duo processor."),
+    Product(44, "MacBook Air", "Product 17", "Apple", 1202.00, 1000, (18, 20), "MacBook Air is ultrathin, ultraportable, and ultra unlike anything else."),
+    Product(45, "MacBook Pro", "Product 18", "Apple", 2000.00, 0, (18,), "Latest Intel mobile architecture."),
+    Product(46, "Sony VAIO", "Product 19", "Sony", 1202.00, 1000, (18, 20), "Unprecedented power."),
+    Product(47, "HP LP3065", "Product 21", "Hewlett-Packard", 122.00, 1000, (18, 20), "Stop your co-workers in their tracks with the stunning new 30-inch diagonal HP LP3065."),
+    Product(48, "iPod Classic", "product 20", "Apple", 122.00, 995, (20, 34), "More room to move."),
+    Product(49, "Samsung Galaxy Tab 10.1", "SAM1", "Samsung", 241.99, 0, (57,), "Samsung Galaxy Tab 10.1, is the world's thinnest tablet."),
+]
+
+# TC-006 cart stress needs 100+ unique products; these stay out of the menus
+PRODUCTS += [
+    Product(product_id, f"Stress Item {product_id}", f"Stress {product_id}", "Generic", 10.00, 1000, (0,), "Filler product for cart stress tests.")
+    for product_id in range(1000, 1120)
+]
+
+PRODUCTS_BY_ID = {product.product_id: product for product in PRODUCTS}
+CATEGORIES_BY_ID = {category.category_id: category for category in CATEGORIES}
+
+
+def products_in_category(category_id):
+    return [product for product in PRODUCTS if category_id in product.categories]
+
+
+def search_products(term):
+    term = term.strip().lower()
+    if not term:
+        return []
+    return [
+        product for product in PRODUCTS
+        if term in product.name.lower() and 0 not in product.categories
+    ]
+
+
+def subcategories(parent_id):
+    return [category for category in CATEGORIES if category.parent_id == parent_id]
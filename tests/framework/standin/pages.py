@@ -0,0 +1,485 @@
+"""
+HTML for the stand-in store.
+
+Only the markup the suite relies on is reproduced: the ids, classes, names and
+link texts of the OpenCart default theme (``#logo``, ``#search``,
+``button.btn-light``, ``#menu``, ``#content``, ``#button-cart``,
+``.product-thumb``, ``.alert-success`` ...). Interactions that are AJAX on the
+real store (add to cart, wishlist, compare, checkout steps) are AJAX here too,
+so element references survive them the same way.
+"""
+from html import escape
+from urllib.parse import quote
+
+from .catalog import CATEGORIES_BY_ID, products_in_category, subcategories
+
+STYLE = """
+body { font-family: sans-serif; margin: 0; }
+.container { max-width: 1170px; margin: 0 auto; padding: 0 15px; }
+#top, header, footer { padding: 8px 0; }
+#logo img { width: 200px; height: 40px; }
+#search { display: flex; max-width: 100%; }
+#search input { flex: 1; min-width: 0; }
+#menu ul { list-style: none; margin: 0; padding: 0; display: flex; flex-wrap: wrap; }
+#menu li { position: relative; margin-right: 16px; }
+#menu .dropdown-menu { display: none; position: absolute; background: #fff; border: 1px solid #ccc; padding: 4px; z-index: 10; }
+#menu .dropdown-menu.open { display: block; }
+#menu .dropdown-menu a { display: block; white-space: nowrap; }
+.navbar-toggler { display: none; }
+@media (max-width: 767px) { .navbar-toggler { display: inline-block; } }
+.row { display: flex; flex-wrap: wrap; }
+.product-layout { width: 25%; box-sizing: border-box; padding: 8px; }
+@media (max-width: 767px) { .product-layout { width: 100%; } }
+.product-thumb img { max-width: 100%; }
+.alert { padding: 10px; margin: 8px 0; border: 1px solid; }
+.alert-success { color: #3c763d; background: #dff0d8; }
+.alert-danger { color: #a94442; background: #f2dede; }
+.text-danger { color: #a94442; }
+.hidden { display: none; }
+table { border-collapse: collapse; width: 100%; }
+td { border: 1px solid #ddd; padding: 4px; }
+"""
+
+SCRIPT = """
+var base = document.querySelector('base').href;
+function post(route, data) {
+  return fetch(base + 'index.php?route=' + route, {
+    method: 'POST', credentials: 'same-origin',
+    headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+    body: new URLSearchParams(data).toString()
+  }).then(function (r) { return r.json(); });
+}
+function showAlert(kind, html) {
+  document.querySelectorAll('.alert, .text-danger').forEach(function (el) { el.remove(); });
+  var alert = document.createElement('div');
+  alert.className = 'alert alert-' + kind;
+  alert.innerHTML = html;
+  var content = document.getElementById('content');
+  content.insertBefore(alert, content.firstChild);
+}
+function showFieldErrors(errors, prefix) {
+  Object.keys(errors).forEach(function (field) {
+    var input = document.getElementById(prefix + field);
+    var error = document.createElement('div');
+    error.className = 'text-danger';
+    error.textContent = errors[field];
+    if (input) { input.parentNode.appendChild(error); } else { showAlert('danger', errors[field]); }
+  });
+}
+function updateCartTotal(total) {
+  if (total) { document.querySelector('#cart-total').textContent = total; }
+}
+var cart = {
+  add: function (productId, quantity) {
+    post('checkout/cart/add', {product_id: productId, quantity: quantity || 1}).then(function (json) {
+      if (json.error) {
+        showAlert('danger', json.error.quantity || json.error.product);
+      } else {
+        showAlert('success', json.success);
+        updateCartTotal(json.total);
+      }
+    });
+  },
+  remove: function (key) {
+    post('checkout/cart/remove', {key: key}).then(function () { location.reload(); });
+  }
+};
+var wishlist = {
+  add: function (productId) {
+    post('account/wishlist/add', {product_id: productId}).then(function (json) {
+      showAlert('success', json.success);
+    });
+  }
+};
+var compare = {
+  add: function (productId) {
+    post('product/compare/add', {product_id: productId}).then(function (json) {
+      showAlert('success', json.success);
+    });
+  }
+};
+document.addEventListener('DOMContentLoaded', function () {
+  var input = document.querySelector('#search input[name=search]');
+  function search() {
+    location = base + 'index.php?route=product/search&search=' + encodeURIComponent(input.value);
+  }
+  document.querySelector('#search button').addEventListener('click', search);
+  input.addEventListener('keydown', function (e) { if (e.key === 'Enter') { search(); } });
+  document.querySelectorAll('#menu .dropdown-toggle').forEach(function (toggle) {
+    toggle.addEventListener('click', function (e) {
+      e.preventDefault();
+      toggle.nextElementSibling.classList.toggle('open');
+    });
+  });
+  var cartButton = document.getElementById('button-cart');
+  if (cartButton) {
+    cartButton.addEventListener('click', function () {
+      cart.add(cartButton.dataset.productId, document.getElementById('input-quantity').value);
+    });
+  }
+});
+"""
+
+
+def url(route, **params):
+    query = "".join(f"&{key}={quote(str(value))}" for key, value in params.items())
+    return f"index.php?route={route}{query}"
+
+
+def money(amount):
+    return f"${amount:,.2f}"
+
+
+def layout(base, title, content, cart_summary, logged_in=False, alerts=()):
+    account_links = (
+        f'<li><a href="{url("account/account")}">My Account</a></li>'
+        f'<li><a href="{url("account/logout")}">Logout</a></li>'
+        if logged_in else
+        f'<li><a href="{url("account/register")}">Register</a></li>'
+        f'<li><a href="{url("account/login")}">Login</a></li>'
+    )
+    menu_items = []
+    for category in subcategories(0):
+        children = subcategories(category.category_id)
+        if children:
+            links = "".join(
+                f'<a href="{url("product/category", path=f"{category.category_id}_{child.category_id}")}">'
+                f"{escape(child.name)}</a>"
+                for child in children
+            )
+            menu_items.append(
+                f'<li class="dropdown"><a href="{url("product/category", path=category.category_id)}" '
+                f'class="dropdown-toggle">{escape(category.name)}</a>'
+                f'<div class="dropdown-menu">{links}'
+                f'<a class="see-all" href="{url("product/category", path=category.category_id)}">'
+                f"Show All {escape(category.name)}</a></div></li>"
+            )
+        else:
+            menu_items.append(
+                f'<li><a href="{url("product/category", path=category.category_id)}">{escape(category.name)}</a></li>'
+            )
+    alert_html = "".join(
+        f'<div class="alert alert-{kind}">{message}</div>' for kind, message in alerts
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<base href="{base}">
+<title>{escape(title)}</title>
+<style>{STYLE}</style>
+<script>{SCRIPT}</script>
+</head>
+<body>
+<nav id="top"><div class="container">
+<ul class="top-links">
+{account_links}
+<li><a href="{url("account/wishlist")}" id="wishlist-total">Wish List</a></li>
+<li><a href="{url("checkout/cart")}">Shopping Cart</a></li>
+<li><a href="{url("checkout/checkout")}">Checkout</a></li>
+</ul>
+</div></nav>
+<header><div class="container">
+<div id="logo"><a href="{url("common/home")}" aria-label="Your Store"><img src="image/catalog/logo.png" alt="Your Store"></a></div>
+<div id="search" class="input-group">
+<input type="text" name="search" value="" placeholder="Search" aria-label="Search" class="form-control input-lg">
+<button type="button" class="btn btn-default btn-light btn-lg" aria-label="Search">Search</button>
+</div>
+<div id="cart"><a href="{url("checkout/cart")}"><span id="cart-total">{cart_summary}</span></a></div>
+</div></header>
+<div class="container">
+<nav id="menu" class="navbar">
+<button type="button" class="navbar-toggler" aria-label="Categories">Categories</button>
+<ul class="nav navbar-nav">{"".join(menu_items)}</ul>
+</nav>
+</div>
+<div class="container">
+<div id="content">
+{alert_html}
+{content}
+</div>
+</div>
+<footer><div class="container">
+<ul class="list-unstyled footer-links">
+<li><a href="{url("information/contact")}">Contact Us</a></li>
+<li><a href="{url("account/account")}">My Account</a></li>
+</ul>
+<p>Powered By OpenCart (stand-in)</p>
+</div></footer>
+</body>
+</html>"""
+
+
+def product_thumb(product):
+    link = url("product/product", product_id=product.product_id)
+    return f"""<div class="product-layout"><div class="product-thumb">
+<div class="image"><a href="{link}"><img src="image/catalog/product-{product.product_id}.png" alt="{escape(product.name)}" title="{escape(product.name)}"></a></div>
+<div class="caption"><h4><a href="{link}">{escape(product.name)}</a></h4>
+<p class="price">{money(product.price)}</p></div>
+<div class="button-group">
+<button type="button" onclick="cart.add('{product.product_id}');">Add to Cart</button>
+<button type="button" title="Add to Wish List" aria-label="Add to Wish List" onclick="wishlist.add('{product.product_id}');">&#9825;</button>
+<button type="button" title="Compare this Product" aria-label="Compare this Product" onclick="compare.add('{product.product_id}');">&#8644;</button>
+</div>
+</div></div>"""
+
+
+def home_page(featured):
+    thumbs = "".join(product_thumb(product) for product in featured)
+    return f"<h1>Your Store</h1><h3>Featured</h3><div class=\"row\">{thumbs}</div>"
+
+
+def category_page(category_id):
+    category = CATEGORIES_BY_ID[category_id]
+    products = products_in_category(category_id)
+    children = subcategories(category_id)
+    refine = ""
+    if children:
+        refine = "<h3>Refine Search</h3><ul>" + "".join(
+            f'<li><a href="{url("product/category", path=f"{category_id}_{child.category_id}")}">{escape(child.name)}</a></li>'
+            for child in children
+        ) + "</ul>"
+    if products:
+        listing = '<div class="row">' + "".join(product_thumb(product) for product in products) + "</div>"
+    else:
+        listing = "<p>There are no products to list in this category.</p>"
+    return f"<h2>{escape(category.name)}</h2>{refine}{listing}"
+
+
+def product_page(product):
+    in_stock = product.stock > 0
+    availability = "In Stock" if in_stock else "Out Of Stock"
+    disabled = "" if in_stock else " disabled"
+    return f"""<div class="row"><div class="col-sm-8">
+<img src="image/catalog/product-{product.product_id}.png" alt="{escape(product.name)}">
+<div id="tab-description">{escape(product.description)}</div>
+</div>
+<div class="col-sm-4">
+<h1>{escape(product.name)}</h1>
+<ul class="list-unstyled">
+<li>Brand: {escape(product.brand)}</li>
+<li>Product Code: {escape(product.model)}</li>
+<li>Availability: {availability}</li>
+</ul>
+<ul class="list-unstyled"><li><h2>{money(product.price)}</h2></li></ul>
+<button type="button" title="Add to Wish List" aria-label="Add to Wish List" onclick="wishlist.add('{product.product_id}');">&#9825;</button>
+<button type="button" title="Compare this Product" aria-label="Compare this Product" onclick="compare.add('{product.product_id}');">&#8644;</button>
+<div id="product">
+<label for="input-quantity">Qty</label>
+<input type="text" name="quantity" value="1" size="2" id="input-quantity" class="form-control">
+<input type="hidden" name="product_id" value="{product.product_id}">
+<button type="button" id="button-cart" data-product-id="{product.product_id}" class="btn btn-primary btn-lg btn-block{disabled}"{disabled}>Add to Cart</button>
+</div>
+</div></div>"""
+
+
+def search_page(term, results):
+    heading = f"Search - {escape(term)}" if term else "Search"
+    if results:
+        listing = '<div class="row">' + "".join(product_thumb(product) for product in results) + "</div>"
+    else:
+        listing = "<p>There is no product that matches the search criteria.</p>"
+    return f"""<h1>{heading}</h1>
+<label for="input-search">Search Criteria</label>
+<input type="text" name="search" value="{escape(term)}" id="input-search" class="form-control">
+<h2>Products meeting the search criteria</h2>
+{listing}"""
+
+
+def cart_page(lines, total):
+    if not lines:
+        return f'<h1>Shopping Cart</h1><p>Your shopping cart is empty!</p><a href="{url("common/home")}" class="btn btn-primary">Continue</a>'
+    rows = "".join(
+        f"""<tr>
+<td><a href="{url("product/product", product_id=product.product_id)}">{escape(product.name)}</a></td>
+<td>{escape(product.model)}</td>
+<td><input type="text" name="quantity[{key}]" value="{quantity}" size="1" class="form-control" aria-label="Quantity">
+<button type="submit" title="Update" aria-label="Update" class="btn btn-primary">&#8635;</button>
+<button type="button" title="Remove" aria-label="Remove" class="btn btn-danger" onclick="cart.remove('{key}');">&#10005;</button></td>
+<td>{money(product.price)}</td>
+<td>{money(product.price * quantity)}</td>
+</tr>"""
+        for key, product, quantity in lines
+    )
+    return f"""<h1>Shopping Cart</h1>
+<form action="{url("checkout/cart/edit")}" method="post">
+<table class="table"><tbody>{rows}</tbody></table>
+</form>
+<table id="cart-totals"><tr><td><strong>Total:</strong></td><td>{money(total)}</td></tr></table>
+<a href="{url("common/home")}" class="btn btn-default">Continue Shopping</a>
+<a href="{url("checkout/checkout")}" class="btn btn-primary">Checkout</a>"""
+
+
+def field(name, label, prefix="input-", kind="text", value=""):
+    return (
+        f'<div class="form-group"><label for="{prefix}{name}">{label}</label>'
+        f'<input type="{kind}" name="{name}" value="{escape(value)}" id="{prefix}{name}" class="form-control"></div>'
+    )
+
+
+def field_errors(errors, name):
+    if name in errors:
+        return f'<div class="text-danger">{escape(errors[name])}</div>'
+    return ""
+
+
+def form_fields(fields, values, errors):
+    return "".join(
+        field(name, label, kind=kind, value=values.get(name, "")).replace(
+            "</div>", field_errors(errors, name) + "</div>", 1
+        )
+        for name, label, kind in fields
+    )
+
+
+CHECKOUT_STEPS = """
+<script>
+document.addEventListener('DOMContentLoaded', function () {
+  document.getElementById('button-account').addEventListener('click', function () {
+    var choice = document.querySelector('input[name=account]:checked').value;
+    if (choice === 'register') { location = base + 'index.php?route=account/register'; return; }
+    document.getElementById('collapse-payment-address').classList.remove('hidden');
+  });
+  document.getElementById('button-guest').addEventListener('click', function () {
+    var data = {};
+    document.querySelectorAll('#collapse-payment-address input').forEach(function (el) { data[el.name] = el.value; });
+    post('checkout/guest/save', data).then(function (json) {
+      document.querySelectorAll('.text-danger').forEach(function (el) { el.remove(); });
+      if (json.error) { showFieldErrors(json.error, 'input-payment-'); return; }
+      document.getElementById('collapse-payment-method').classList.remove('hidden');
+    });
+  });
+  document.getElementById('button-payment-method').addEventListener('click', function () {
+    var agree = document.querySelector('input[name=agree]').checked ? '1' : '';
+    post('checkout/payment_method/save', {payment_method: 'cod', agree: agree}).then(function (json) {
+      if (json.error) { showAlert('danger', json.error.warning); return; }
+      document.getElementById('collapse-checkout-confirm').classList.remove('hidden');
+    });
+  });
+  document.getElementById('button-confirm').addEventListener('click', function () {
+    post('checkout/confirm', {}).then(function (json) { location = json.redirect; });
+  });
+});
+</script>"""
+
+PAYMENT_FIELDS = [
+    ("firstname", "First Name", "text"),
+    ("lastname", "Last Name", "text"),
+    ("email", "E-Mail", "email"),
+    ("telephone", "Telephone", "tel"),
+    ("address_1", "Address 1", "text"),
+    ("city", "City", "text"),
+    ("postcode", "Post Code", "text"),
+    ("country", "Country", "text"),
+]
+
+
+def checkout_page(total):
+    fields = "".join(field(name, label, prefix="input-payment-", kind=kind) for name, label, kind in PAYMENT_FIELDS)
+    return f"""<h1>Checkout</h1>
+<div class="panel" id="collapse-checkout-option">
+<h4>Step 1: Checkout Options</h4>
+<label><input type="radio" name="account" value="register"> Register Account</label>
+<label><input type="radio" name="account" value="guest" checked> Guest Checkout</label>
+<input type="button" value="Continue" id="button-account" class="btn btn-primary">
+</div>
+<div class="panel hidden" id="collapse-payment-address">
+<h4>Step 2: Billing Details</h4>
+{fields}
+<input type="button" value="Continue" id="button-guest" class="btn btn-primary">
+</div>
+<div class="panel hidden" id="collapse-payment-method">
+<h4>Step 5: Payment Method</h4>
+<label><input type="radio" name="payment_method" value="cod" checked> Cash On Delivery</label>
+<label><input type="checkbox" name="agree" value="1"> I have read and agree to the Terms &amp; Conditions</label>
+<input type="button" value="Continue" id="button-payment-method" class="btn btn-primary">
+</div>
+<div class="panel hidden" id="collapse-checkout-confirm">
+<h4>Step 6: Confirm Order</h4>
+<p>Total: {money(total)}</p>
+<input type="button" value="Confirm Order" id="button-confirm" class="btn btn-primary">
+</div>
+{CHECKOUT_STEPS}"""
+
+
+def message_page(heading, message):
+    return f'<h1>{escape(heading)}</h1><p>{message}</p><a href="{url("common/home")}" class="btn btn-primary">Continue</a>'
+
+
+def login_page(email=""):
+    return f"""<div class="row">
+<div class="col-sm-6 well"><h2>New Customer</h2>
+<p>By creating an account you will be able to shop faster.</p>
+<a href="{url("account/register")}" class="btn btn-primary">Continue</a></div>
+<div class="col-sm-6 well"><h2>Returning Customer</h2>
+<form action="{url("account/login")}" method="post">
+{field("email", "E-Mail Address", kind="text", value=email)}
+{field("password", "Password", kind="password")}
+<button type="submit" class="btn btn-primary">Login</button>
+</form></div>
+</div>"""
+
+
+REGISTER_FIELDS = [
+    ("firstname", "First Name", "text"),
+    ("lastname", "Last Name", "text"),
+    ("email", "E-Mail", "email"),
+    ("telephone", "Telephone", "tel"),
+    ("password", "Password", "password"),
+    ("confirm", "Password Confirm", "password"),
+]
+
+
+def register_page(values=None, errors=None):
+    values, errors = values or {}, errors or {}
+    shown = {key: value for key, value in values.items() if key not in ("password", "confirm")}
+    agree_error = field_errors(errors, "agree")
+    return f"""<h1>Register Account</h1>
+<form action="{url("account/register")}" method="post">
+{form_fields(REGISTER_FIELDS, shown, errors)}
+<label><input type="checkbox" name="agree" value="1"> I have read and agree to the Privacy Policy</label>{agree_error}
+<button type="submit" class="btn btn-primary">Continue</button>
+</form>"""
+
+
+def account_page(firstname):
+    return f"""<h2>My Account</h2>
+<p>Welcome back, {escape(firstname)}.</p>
+<ul class="list-unstyled">
+<li><a href="{url("account/edit")}">Edit your account information</a></li>
+<li><a href="{url("account/password")}">Change your password</a></li>
+<li><a href="{url("account/address")}">Modify your address book entries</a></li>
+<li><a href="{url("account/wishlist")}">Modify your wish list</a></li>
+</ul>
+<h2>My Orders</h2>
+<ul class="list-unstyled"><li><a href="{url("account/order")}">View your order history</a></li></ul>"""
+
+
+def wishlist_page(products):
+    if not products:
+        return "<h2>My Wish List</h2><p>Your wish list is empty.</p>"
+    rows = "".join(
+        f'<tr><td><a href="{url("product/product", product_id=product.product_id)}">{escape(product.name)}</a></td>'
+        f"<td>{money(product.price)}</td></tr>"
+        for product in products
+    )
+    return f'<h2>My Wish List</h2><table class="table"><tbody>{rows}</tbody></table>'
+
+
+CONTACT_FIELDS = [
+    ("name", "Your Name", "text"),
+    ("email", "E-Mail Address", "email"),
+]
+
+
+def contact_page(values=None, errors=None):
+    values, errors = values or {}, errors or {}
+    return f"""<h1>Contact Us</h1>
+<form action="{url("information/contact")}" method="post">
+{form_fields(CONTACT_FIELDS, values, errors)}
+<div class="form-group"><label for="input-enquiry">Enquiry</label>
+<textarea name="enquiry" rows="10" id="input-enquiry" class="form-control">{escape(values.get("enquiry", ""))}</textarea>
+{field_errors(errors, "enquiry")}</div>
+<button type="submit" class="btn btn-primary">Submit</button>
+</form>"""
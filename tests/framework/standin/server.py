@@ -0,0 +1,544 @@
+"""
+In-process HTTP server standing in for the OpenCart demo store.
+
+``StandInServer`` runs a ``ThreadingHTTPServer`` on a free localhost port in a
+background thread and serves ``/demo/index.php?route=...`` like the demo
+store does. State lives in ``StandInStore``: sessions keyed by the
+``OCSESSID`` cookie (cart, wishlist, compare list, logged-in customer) and
+registered customers. Clearing the browser's cookies therefore starts a new,
+empty session, just like on the live site.
+
+Tests can put a session into a precondition in one request with the
+``testing/seed`` route (not part of OpenCart; see ``framework.seeding``).
+
+Stress tests can set ``StandInStore.faults`` to a ``Faults`` instance to make
+the store slow, drop connections or expire sessions for a share of requests.
+"""
+import base64
+import copy
+import json
+import random
+import re
+import secrets
+import socket
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import pages
+from .catalog import (
+    CATEGORIES_BY_ID, PRODUCTS_BY_ID, search_products,
+)
+
+SESSION_COOKIE = "OCSESSID"
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# 1x1 transparent PNG served for every catalogue image
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+FEATURED_PRODUCT_IDS = (43, 40, 42, 30)
+
+
+class Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.cart = {}          # cart key -> [product_id, quantity]
+        self.wishlist = []
+        self.compare = []
+        self.customer = None    # email of the logged-in customer
+        self.guest = None       # billing details saved during guest checkout
+        self.payment_method = None
+        self.flash = []         # alerts shown on the next page render
+        self.last_seen = time.time()
+
+
+class Faults:
+    """
+    Failures injected into a share of requests.
+
+    ``service_time`` is held under the store lock on every request, so it
+    models a slow shared backend with a fixed capacity. ``slow_rate`` of the
+    responses are delayed by ``slow_seconds`` after that, ``drop_rate`` of the
+    connections are closed without a response and ``expire_rate`` of the
+    requests find their session expired.
+    """
+
+    def __init__(self, service_time=0.0, slow_rate=0.0, slow_seconds=0.5, drop_rate=0.0, expire_rate=0.0,
+                 seed=None):
+        self.service_time = service_time
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.drop_rate = drop_rate
+        self.expire_rate = expire_rate
+        self.random = random.Random(seed)
+
+    def hit(self, rate):
+        return rate > 0 and self.random.random() < rate
+
+
+class StandInStore:
+    """All mutable state of the stand-in store, guarded by one lock."""
+
+    def __init__(self, session_lifetime=None, faults=None):
+        self.session_lifetime = session_lifetime
+        self.faults = faults
+        self.sessions = {}
+        self.customers = {}
+        self.orders = []
+        self.lock = threading.RLock()
+
+    def session(self, session_id):
+        """Return the live session for ``session_id`` or a fresh one."""
+        now = time.time()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None and self.session_lifetime is not None:
+                if now - session.last_seen > self.session_lifetime:
+                    del self.sessions[session_id]
+                    session = None
+            if session is None:
+                session = Session(secrets.token_hex(13))
+                self.sessions[session.session_id] = session
+            session.last_seen = now
+            return session
+
+    def expire(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def cart_lines(self, session):
+        return [
+            (key, PRODUCTS_BY_ID[product_id], quantity)
+            for key, (product_id, quantity) in session.cart.items()
+            if quantity > 0
+        ]
+
+    def cart_total(self, session):
+        return sum(product.price * quantity for _, product, quantity in self.cart_lines(session))
+
+    def cart_summary(self, session):
+        count = sum(quantity for _, _, quantity in self.cart_lines(session))
+        return f"{count} item(s) - {pages.money(self.cart_total(session))}"
+
+
+class Response:
+    def __init__(self, status=200, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.status = status
+        self.body = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+def parse_int(value, default=0):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+def cast_int(value):
+    """PHP's ``(int)`` cast, as OpenCart applies it to quantities: "1.5" is 1, "abc" and "" are 0."""
+    match = re.match(r"\s*([+-]?\d+)", str(value))
+    return int(match.group(1)) if match else 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes ``index.php?route=...`` requests to ``route_*`` methods."""
+
+    protocol_version = "HTTP/1.1"
+    store = None          # set on the subclass created by StandInServer
+    base_path = "/demo/"
+
+    # -- plumbing --------------------------------------------------------
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, keep-alive
+        # clients wait on delayed ACKs (~40 ms per request)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        path = re.sub(r"/+", "/", parts.path)
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.form = {}
+        length = parse_int(self.headers.get("Content-Length"))
+        if length:
+            raw = self.rfile.read(length).decode("utf-8", "replace")
+            self.form = {key: values[-1] for key, values in parse_qs(raw, keep_blank_values=True).items()}
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        requested = cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+        faults = self.store.faults
+        if faults is not None and faults.hit(faults.expire_rate):
+            self.store.expire(requested)
+        self.session = self.store.session(requested)
+
+        if path.startswith(self.base_path + "image/"):
+            response = Response(body=PIXEL_PNG, content_type="image/png")
+        elif path in (self.base_path, self.base_path + "index.php", self.base_path.rstrip("/")):
+            route = self.query.get("route", "common/home")
+            handler = getattr(self, "route_" + route.replace("/", "_"), None)
+            with self.store.lock:
+                response = handler(method) if handler else self.not_found()
+                if faults is not None and faults.service_time:
+                    time.sleep(faults.service_time)
+        else:
+            response = self.not_found()
+        if faults is not None:
+            if faults.hit(faults.drop_rate):
+                self.close_connection = True
+                return
+            if faults.hit(faults.slow_rate):
+                time.sleep(faults.slow_seconds)
+        self._send(response)
+
+    def _send(self, response):
+        self.send_response(response.status)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.send_header("Set-Cookie", f"{SESSION_COOKIE}={self.session.session_id}; Path=/; HttpOnly")
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    @property
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}{self.base_path}"
+
+    def page(self, title, content, alerts=()):
+        session = self.session
+        flash, session.flash = session.flash, []
+        html = pages.layout(
+            self.base_url, title, content, self.store.cart_summary(session),
+            logged_in=session.customer is not None, alerts=list(flash) + list(alerts),
+        )
+        return Response(body=html)
+
+    def json(self, data):
+        return Response(body=json.dumps(data), content_type="application/json")
+
+    def redirect(self, route, **params):
+        return Response(status=302, headers={"Location": self.base_url + pages.url(route, **params)})
+
+    def not_found(self):
+        html = pages.layout(self.base_url, "Page Not Found!", pages.message_page(
+            "Page Not Found!", "The page you requested cannot be found."
+        ), self.store.cart_summary(self.session))
+        return Response(status=404, body=html)
+
+    # -- catalogue -------------------------------------------------------
+
+    def route_common_home(self, method):
+        featured = [PRODUCTS_BY_ID[product_id] for product_id in FEATURED_PRODUCT_IDS]
+        return self.page("Your Store", pages.home_page(featured))
+
+    def route_product_category(self, method):
+        category_id = parse_int(self.query.get("path", "").split("_")[-1])
+        if category_id not in CATEGORIES_BY_ID:
+            return self.not_found()
+        return self.page(CATEGORIES_BY_ID[category_id].name, pages.category_page(category_id))
+
+    def route_product_product(self, method):
+        product = PRODUCTS_BY_ID.get(parse_int(self.query.get("product_id")))
+        if product is None:
+            return self.not_found()
+        return self.page(product.name, pages.product_page(product))
+
+    def route_product_search(self, method):
+        term = self.query.get("search", "")
+        return self.page(f"Search - {term}" if term else "Search", pages.search_page(term, search_products(term)))
+
+    def route_product_compare_add(self, method):
+        product = PRODUCTS_BY_ID.get(parse_int(self.form.get("product_id")))
+        if product is None:
+            return self.json({"error": "Product not found!"})
+        if product.product_id not in self.session.compare:
+            self.session.compare = (self.session.compare + [product.product_id])[-4:]
+        return self.json({
+            "success": f'Success: You have added <a href="{pages.url("product/product", product_id=product.product_id)}">'
+                       f'{product.name}</a> to your <a href="{pages.url("product/compare")}">product comparison</a>!',
+            "total": f"Product Compare ({len(self.session.compare)})",
+        })
+
+    # -- cart ------------------------------------------------------------
+
+    def route_checkout_cart(self, method):
+        session = self.session
+        return self.page("Shopping Cart", pages.cart_page(self.store.cart_lines(session), self.store.cart_total(session)))
+
+    def route_checkout_cart_add(self, method):
+        product = PRODUCTS_BY_ID.get(parse_int(self.form.get("product_id")))
+        if product is None:
+            return self.json({"error": {"product": "Product not found!"}})
+        # Like OpenCart: no range check, the cast quantity is added to the line
+        # and lines at zero or below are simply not shown
+        quantity = cast_int(self.form.get("quantity", 1))
+        cart = self.session.cart
+        key = str(product.product_id)
+        cart[key] = [product.product_id, cart.get(key, [0, 0])[1] + quantity]
+        return self.json({
+            "success": f'Success: You have added <a href="{pages.url("product/product", product_id=product.product_id)}">'
+                       f'{product.name}</a> to your <a href="{pages.url("checkout/cart")}">shopping cart</a>!',
+            "total": self.store.cart_summary(self.session),
+        })
+
+    def route_checkout_cart_edit(self, method):
+        cart = self.session.cart
+        for name, value in self.form.items():
+            match = re.fullmatch(r"quantity\[(.+)\]", name)
+            if match and match.group(1) in cart:
+                quantity = cast_int(value)
+                if quantity > 0:
+                    cart[match.group(1)][1] = quantity
+                else:
+                    del cart[match.group(1)]
+        self.session.flash.append(("success", "Success: You have modified your shopping cart!"))
+        return self.redirect("checkout/cart")
+
+    def route_checkout_cart_remove(self, method):
+        self.session.cart.pop(self.form.get("key"), None)
+        return self.json({"success": "Success: You have modified your shopping cart!",
+                          "total": self.store.cart_summary(self.session)})
+
+    # -- checkout --------------------------------------------------------
+
+    def route_checkout_checkout(self, method):
+        if not self.store.cart_lines(self.session):
+            return self.redirect("checkout/cart")
+        return self.page("Checkout", pages.checkout_page(self.store.cart_total(self.session)))
+
+    def route_checkout_guest_save(self, method):
+        errors = {}
+        for name, label, _ in pages.PAYMENT_FIELDS:
+            value = self.form.get(name, "").strip()
+            if name == "email":
+                if not EMAIL_PATTERN.match(value):
+                    errors[name] = "E-Mail address does not appear to be valid!"
+            elif name == "telephone":
+                if not 3 <= len(value) <= 32:
+                    errors[name] = "Telephone must be between 3 and 32 characters!"
+            elif name == "postcode":
+                if len(value) > 10:
+                    errors[name] = "Postcode must be between 2 and 10 characters!"
+            elif not 1 <= len(value) <= 32:
+                errors[name] = f"{label} must be between 1 and 32 characters!"
+        if errors:
+            return self.json({"error": errors})
+        self.session.guest = {name: self.form.get(name, "") for name, _, _ in pages.PAYMENT_FIELDS}
+        return self.json({})
+
+    def route_checkout_payment_method_save(self, method):
+        if self.session.guest is None and self.session.customer is None:
+            return self.json({"error": {"warning": "Warning: Billing details required!"}})
+        if not self.form.get("agree"):
+            return self.json({"error": {"warning": "Warning: You must agree to the Terms & Conditions!"}})
+        self.session.payment_method = self.form.get("payment_method", "cod")
+        return self.json({})
+
+    def route_checkout_confirm(self, method):
+        session = self.session
+        if not self.store.cart_lines(session) or session.payment_method is None:
+            return self.json({"redirect": self.base_url + pages.url("checkout/cart")})
+        self.store.orders.append({
+            "customer": session.customer or session.guest,
+            "lines": [(product.product_id, quantity) for _, product, quantity in self.store.cart_lines(session)],
+            "total": self.store.cart_total(session),
+        })
+        session.cart = {}
+        session.payment_method = None
+        return self.json({"redirect": self.base_url + pages.url("checkout/success")})
+
+    def route_checkout_success(self, method):
+        return self.page("Your order has been placed!", pages.message_page(
+            "Your order has been placed!", "Your order has been successfully processed!"
+        ))
+
+    # -- account ---------------------------------------------------------
+
+    def route_account_login(self, method):
+        if method == "POST":
+            email = self.form.get("email", "").strip().lower()
+            customer = self.store.customers.get(email)
+            if customer is None or customer["password"] != self.form.get("password", ""):
+                return self.page("Account Login", pages.login_page(email), alerts=[
+                    ("danger", "Warning: No match for E-Mail Address and/or Password.")
+                ])
+            self.session.customer = email
+            return self.redirect("account/account")
+        if self.session.customer is not None:
+            return self.redirect("account/account")
+        return self.page("Account Login", pages.login_page())
+
+    def route_account_logout(self, method):
+        self.session.customer = None
+        self.session.wishlist = []
+        return self.page("Account Logout", pages.message_page(
+            "Account Logout", "You have been logged off your account."
+        ))
+
+    def route_account_register(self, method):
+        if method != "POST":
+            return self.page("Register Account", pages.register_page())
+        values = {name: self.form.get(name, "").strip() for name, _, _ in pages.REGISTER_FIELDS}
+        values["email"] = values["email"].lower()
+        errors = {}
+        for name in ("firstname", "lastname"):
+            if not 1 <= len(values[name]) <= 32:
+                label = "First Name" if name == "firstname" else "Last Name"
+                errors[name] = f"{label} must be between 1 and 32 characters!"
+        if not EMAIL_PATTERN.match(values["email"]):
+            errors["email"] = "E-Mail Address does not appear to be valid!"
+        elif values["email"] in self.store.customers:
+            errors["email"] = "Warning: E-Mail Address is already registered!"
+        if not 3 <= len(values["telephone"]) <= 32:
+            errors["telephone"] = "Telephone must be between 3 and 32 characters!"
+        if not 4 <= len(values["password"]) <= 20:
+            errors["password"] = "Password must be between 4 and 20 characters!"
+        elif values["confirm"] != values["password"]:
+            errors["confirm"] = "Password confirmation does not match password!"
+        if not self.form.get("agree"):
+            errors["agree"] = "Warning: You must agree to the Privacy Policy!"
+        if errors:
+            return self.page("Register Account", pages.register_page(values, errors))
+        self.store.customers[values["email"]] = values
+        self.session.customer = values["email"]
+        return self.redirect("account/success")
+
+    def route_account_success(self, method):
+        return self.page("Your Account Has Been Created!", pages.message_page(
+            "Your Account Has Been Created!", "Congratulations! Your new account has been successfully created!"
+        ))
+
+    def route_account_account(self, method):
+        if self.session.customer is None:
+            return self.redirect("account/login")
+        customer = self.store.customers[self.session.customer]
+        return self.page("My Account", pages.account_page(customer["firstname"]))
+
+    def route_account_wishlist(self, method):
+        if self.session.customer is None:
+            return self.redirect("account/login")
+        remove = parse_int(self.query.get("remove"), default=None)
+        if remove in self.session.wishlist:
+            self.session.wishlist.remove(remove)
+            self.session.flash.append(("success", "Success: You have modified your wish list!"))
+            return self.redirect("account/wishlist")
+        products = [PRODUCTS_BY_ID[product_id] for product_id in self.session.wishlist]
+        return self.page("My Wish List", pages.wishlist_page(products))
+
+    def route_account_wishlist_add(self, method):
+        product = PRODUCTS_BY_ID.get(parse_int(self.form.get("product_id")))
+        if product is None:
+            return self.json({"error": "Product not found!"})
+        link = f'<a href="{pages.url("product/product", product_id=product.product_id)}">{product.name}</a>'
+        if self.session.customer is None:
+            return self.json({"success": f'You must <a href="{pages.url("account/login")}">login</a> or '
+                                         f'<a href="{pages.url("account/register")}">create an account</a> '
+                                         f"to save {link} to your wish list!"})
+        if product.product_id not in self.session.wishlist:
+            self.session.wishlist.append(product.product_id)
+        return self.json({
+            "success": f'Success: You have added {link} to your <a href="{pages.url("account/wishlist")}">wish list</a>!',
+            "total": f"Wish List ({len(self.session.wishlist)})",
+        })
+
+    # -- test support (not part of OpenCart) ---------------------------------
+
+    def route_testing_session_clone(self, method):
+        """Copy the caller's session so model paths can branch from it."""
+        clone = self.store.session(None)
+        for name in ("cart", "wishlist", "compare", "customer", "guest", "payment_method"):
+            setattr(clone, name, copy.deepcopy(getattr(self.session, name)))
+        return self.json({"session_id": clone.session_id})
+
+    def route_testing_seed(self, method):
+        """
+        Replace the caller's cart (``cart=43:2,40:1``) and, when given, its
+        wish list (``wishlist=43,40``; empty for none) in one request.
+        """
+        session = self.session
+        if "cart" in self.form:
+            cart = {}
+            for item in filter(None, self.form["cart"].split(",")):
+                product_id, _, quantity = item.partition(":")
+                product = PRODUCTS_BY_ID.get(parse_int(product_id))
+                if product is None:
+                    return self.json({"error": f"Product {product_id} not found!"})
+                cart[str(product.product_id)] = [product.product_id, cast_int(quantity or 1)]
+            session.cart = cart
+        if "wishlist" in self.form:
+            session.wishlist = [parse_int(product_id) for product_id in filter(None, self.form["wishlist"].split(","))
+                                if parse_int(product_id) in PRODUCTS_BY_ID]
+        return self.json({"session_id": session.session_id, "total": self.store.cart_summary(session)})
+
+    # -- information -----------------------------------------------------
+
+    def route_information_contact(self, method):
+        if method != "POST":
+            return self.page("Contact Us", pages.contact_page())
+        values = {name: self.form.get(name, "").strip() for name in ("name", "email", "enquiry")}
+        errors = {}
+        if not 3 <= len(values["name"]) <= 32:
+            errors["name"] = "Name must be between 3 and 32 characters!"
+        if not EMAIL_PATTERN.match(values["email"]):
+            errors["email"] = "E-Mail Address does not appear to be valid!"
+        if not 10 <= len(values["enquiry"]) <= 3000:
+            errors["enquiry"] = "Enquiry must be between 10 and 3000 characters!"
+        if errors:
+            return self.page("Contact Us", pages.contact_page(values, errors))
+        return self.redirect("information/contact/success")
+
+    def route_information_contact_success(self, method):
+        return self.page("Contact Us", pages.message_page(
+            "Contact Us", "Your enquiry has been successfully sent to the store owner!"
+        ))
+
+
+class StandInServer:
+    """
+    Runs the stand-in store on ``http://127.0.0.1:<port>/demo/``.
+
+    Usable as a context manager; ``base_url`` is valid once started.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, store=None):
+        self.store = store or StandInStore()
+        handler = type("BoundStandInHandler", (StandInHandler,), {"store": self.store})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{StandInHandler.base_path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="standin-store", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
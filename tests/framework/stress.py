@@ -0,0 +1,257 @@
+"""
+Stress and resilience runs: find the breaking point, then inject faults.
+
+The load mode (``load.py``) holds a configured user count. ``run_stress``
+keeps adding virtual users instead, ``step_users`` at a time, until a step's
+error rate or p95 latency crosses ``StressLimits``. The last step within the
+limits is the capacity knee.
+
+Virtual users run the functional scenarios from ``scenarios.py`` (TC-005 cart
+lifecycle, TC-006 cart with many unique items, TC-010 session timeout, TC-016
+malicious input) on ``StoreClient`` instances, one fresh OpenCart session per
+iteration, in threads sharing one connection pool. Every request is timed as
+a transaction named after its route, and a scenario whose assertions fail
+counts as an error. The flows are the same ones the functional tests check
+one at a time.
+
+After the steps the run drops back to the knee. With ``faults`` (the
+stand-in's ``Faults``: slow responses, dropped connections, expired sessions)
+it injects them for ``fault_seconds`` and then clears them. Recovery time is
+how long it takes until a one-second window is within the limits again.
+"""
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+
+import requests
+
+from . import scenarios
+from .http_backend import StoreClient, make_adapter
+from .load import Histogram
+
+STRESS_PRODUCT_IDS = tuple(range(1000, 1100))   # stand-in filler products
+
+STRESS_SCENARIOS = {
+    "TC-005 cart": scenarios.cart_lifecycle,
+    "TC-006 cart x100": partial(scenarios.cart_stress, product_ids=STRESS_PRODUCT_IDS),
+    "TC-010 session timeout": scenarios.session_timeout,
+    "TC-016 malicious input": scenarios.malicious_input,
+}
+
+StressLimits = namedtuple("StressLimits", "max_error_rate max_p95")
+StressLimits.__new__.__defaults__ = (0.05, 1.0)
+
+StepResult = namedtuple("StepResult", "users requests errors throughput p95 healthy")
+
+
+class Window:
+    """Requests and failures recorded over one interval of the run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.histogram = Histogram()
+        self.errors = 0
+        self.failures = {}
+        self.seconds = {}          # second offset -> [Histogram, errors]
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok, failure=None):
+        """``seconds`` is None for a failed scenario: an error without a request."""
+        with self.lock:
+            second = self.seconds.setdefault(int(time.perf_counter() - self.started), [Histogram(), 0])
+            if seconds is not None:
+                self.histogram.record(seconds)
+                second[0].record(seconds)
+            if not ok:
+                self.errors += 1
+                second[1] += 1
+                if failure:
+                    self.failures[failure] = self.failures.get(failure, 0) + 1
+
+    @staticmethod
+    def _healthy(histogram, errors, limits):
+        return (histogram.count > 0 and errors <= limits.max_error_rate * histogram.count
+                and histogram.percentile(95) <= limits.max_p95)
+
+    def result(self, users, limits):
+        elapsed = time.perf_counter() - self.started
+        return StepResult(users, self.histogram.count, self.errors, self.histogram.count / elapsed,
+                          self.histogram.percentile(95), self._healthy(self.histogram, self.errors, limits))
+
+    def first_healthy_second(self, limits):
+        """Offset of the first complete one-second window within the limits."""
+        last = int(time.perf_counter() - self.started)
+        for second in sorted(self.seconds):
+            if second < last and self._healthy(*self.seconds[second], limits):
+                return second
+        return None
+
+
+class TimedStoreClient(StoreClient):
+    """A ``StoreClient`` that records every request in the run's current window."""
+
+    def __init__(self, base_url, run, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.run = run
+
+    def _request(self, method, route, data=None, **params):
+        start = time.perf_counter()
+        try:
+            response = super()._request(method, route, data=data, **params)
+        except requests.RequestException:
+            self.run.window.record(time.perf_counter() - start, False, f"{route}: connection failed")
+            raise
+        ok = response.status_code < 500
+        self.run.window.record(time.perf_counter() - start, ok, None if ok else f"{route}: {response.status_code}")
+        return response
+
+
+class StressRun:
+    """
+    Virtual-user threads that can be added and stopped while the run goes on.
+    ``window`` is swapped per phase; in-flight requests land in whichever
+    window is current when they finish.
+    """
+
+    def __init__(self, base_url, scenario_map, pool_size):
+        self.base_url = base_url
+        self.scenarios = list(scenario_map.items())
+        self.adapter = make_adapter(pool_size)
+        self.window = Window()
+        self.users = []            # (thread, stop event)
+        self.iterations = 0
+        self.scenario_failures = {}
+        self.lock = threading.Lock()
+
+    def new_window(self):
+        self.window = Window()
+        return self.window
+
+    def resize(self, count):
+        while len(self.users) < count:
+            stop = threading.Event()
+            thread = threading.Thread(target=self._user, args=(len(self.users), stop),
+                                      name=f"stress-user-{len(self.users)}", daemon=True)
+            self.users.append((thread, stop))
+            thread.start()
+        while len(self.users) > count:
+            _, stop = self.users.pop()
+            stop.set()
+
+    def _user(self, index, stop):
+        turn = index
+        while not stop.is_set():
+            name, scenario = self.scenarios[turn % len(self.scenarios)]
+            turn += 1
+            # Every iteration is a new shopper: a fresh OpenCart session
+            client = TimedStoreClient(self.base_url, self, adapter=self.adapter)
+            try:
+                scenario(client)
+            except (AssertionError, requests.RequestException, ValueError) as error:
+                self.window.record(None, False, f"{name}: {type(error).__name__}")
+                with self.lock:
+                    self.scenario_failures[name] = self.scenario_failures.get(name, 0) + 1
+            finally:
+                client.close()
+            with self.lock:
+                self.iterations += 1
+
+    def stop(self, timeout=15):
+        threads = [thread for thread, _ in self.users]
+        self.resize(0)
+        for thread in threads:
+            thread.join(timeout)
+        self.adapter.close()
+
+
+class StressReport:
+    def __init__(self, limits):
+        self.limits = limits
+        self.steps = []
+        self.knee = None           # last StepResult within the limits
+        self.breaking = None       # first StepResult over them
+        self.fault_phase = None
+        self.fault_failures = {}
+        self.recovery_seconds = None
+        self.recovered = None
+        self.scenario_failures = {}
+        self.iterations = 0
+
+    def summary_lines(self):
+        limits = self.limits
+        lines = [f"limits: error rate <= {limits.max_error_rate:.0%}, p95 <= {limits.max_p95 * 1000:.0f}ms; "
+                 f"{self.iterations} scenario iterations"]
+        lines.append(f"  {'users':>6}{'requests':>10}{'errors':>8}{'req/s':>8}{'p95 ms':>9}")
+        for step in self.steps:
+            marker = "  <- knee" if step is self.knee else "  <- breaking point" if step is self.breaking else ""
+            lines.append(f"  {step.users:>6}{step.requests:>10}{step.errors:>8}{step.throughput:>8.1f}"
+                         f"{step.p95 * 1000:>9.1f}{marker}")
+        if self.knee is None:
+            lines.append("capacity knee: none (the first step was already over the limits)")
+        else:
+            lines.append(f"capacity knee: {self.knee.users} users, {self.knee.throughput:.1f} req/s"
+                         + ("" if self.breaking else " (limits not reached)"))
+        if self.fault_phase is not None:
+            phase = self.fault_phase
+            lines.append(f"under faults at {phase.users} users: {phase.errors}/{phase.requests} errors, "
+                         f"p95 {phase.p95 * 1000:.1f}ms")
+            lines.extend(f"  {count:5d}x {failure}" for failure, count in
+                         sorted(self.fault_failures.items(), key=lambda item: -item[1])[:6])
+        if self.recovered is not None:
+            lines.append(f"recovery: back within the limits after {self.recovery_seconds}s" if self.recovered
+                         else "recovery: not within the limits by the end of the run")
+        return lines
+
+
+def run_stress(base_url, start_users=20, step_users=20, max_users=200, step_seconds=3.0, limits=None,
+               scenario_map=None, faults=None, inject=None, fault_seconds=3.0, recovery_seconds=10.0):
+    """
+    Step up users until ``limits`` are crossed (or ``max_users``), then hold at
+    the knee, inject ``faults`` via ``inject(faults)`` for ``fault_seconds``,
+    clear them with ``inject(None)`` and measure recovery.
+    """
+    limits = limits or StressLimits()
+    report = StressReport(limits)
+    run = StressRun(base_url, scenario_map or STRESS_SCENARIOS, pool_size=max_users)
+    try:
+        users = start_users
+        while users <= max_users:
+            run.resize(users)
+            window = run.new_window()
+            time.sleep(step_seconds)
+            step = window.result(users, limits)
+            report.steps.append(step)
+            if not step.healthy:
+                report.breaking = step
+                break
+            report.knee = step
+            users += step_users
+
+        settle = report.knee.users if report.knee else start_users
+        run.resize(settle)
+        if faults is not None and inject is not None:
+            window = run.new_window()
+            inject(faults)
+            try:
+                time.sleep(fault_seconds)
+            finally:
+                inject(None)
+            report.fault_phase = window.result(settle, limits)
+            report.fault_failures = dict(window.failures)
+        if report.breaking is not None or report.fault_phase is not None:
+            # Time from the overload (or faults) ending until a clean second
+            window = run.new_window()
+            deadline = time.perf_counter() + recovery_seconds
+            while time.perf_counter() < deadline:
+                time.sleep(0.25)
+                healthy = window.first_healthy_second(limits)
+                if healthy is not None:
+                    report.recovery_seconds = healthy + 1
+                    break
+            report.recovered = report.recovery_seconds is not None
+    finally:
+        run.stop()
+        report.iterations = run.iterations
+        report.scenario_failures = dict(run.scenario_failures)
+    return report
@@ -0,0 +1,389 @@
+"""
+Layout capture and visual baselines for the responsive tests.
+
+The responsive tests used to check that ``#logo``/``#search``/``#menu``
+were displayed and nothing else; horizontal overflow on mobile went
+unchecked. ``capture`` reads the layout of a page in one script call:
+
+- the bounding box of each layout landmark (``LANDMARKS``);
+- overflow: how wide the document is against the viewport, and which
+  elements stick out past its right edge;
+- the boxes of regions that change by themselves (carousels, ``MASKS``).
+
+It then takes a screenshot. On browsers with CDP it takes a
+``THUMBNAIL_WIDTH`` pixel wide capture of the viewport, which the browser
+scales itself, so the PNG that comes back is a few kilobytes. That capture
+is decoded (``decode_png``, 8-bit PNGs only, no imaging library needed),
+turned into greyscale, masked and reduced to a 64-bit difference hash.
+
+``VisualEngine.check`` compares a capture with its baseline:
+
+- landmark boxes that moved by more than ``LAYOUT_TOLERANCE`` pixels, or
+  that appeared or disappeared, are layout changes;
+- equal hashes mean the page looks the same, and the pixels are not
+  compared at all;
+- different hashes fall back to a pixel diff of the thumbnails: the page
+  has changed when more than ``MAX_CHANGED`` of the pixels differ by more
+  than ``PIXEL_TOLERANCE`` grey levels.
+
+A baseline is a small JSON file (hash, boxes) and the thumbnail as
+zlib-compressed 8-bit greyscale, usually a few kilobytes. Baselines live
+under ``--visual-baselines``, one file pair per execution profile, matrix
+configuration and route. A missing baseline is recorded by the first run
+and ``--visual=update`` re-records them. Browsers without CDP only get the
+layout checks. Results are attached as the ``visual`` user property and
+summarised in the "visual layout" section.
+"""
+import base64
+import json
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+
+from .pages import LOCATOR_LIBRARY
+from .perf import route_of
+
+PROPERTY = "visual"
+
+LANDMARKS = ("logo", "search", "menu", "navbar_toggler", "content")
+
+# Regions that change between two loads of the same page
+MASKS = (".carousel", ".swiper-viewport", ".swiper", ".owl-carousel", "[data-visual-mask]")
+
+THUMBNAIL_WIDTH = 160
+HASH_SIZE = 8
+LAYOUT_TOLERANCE = 4      # CSS pixels
+PIXEL_TOLERANCE = 24      # grey levels, absorbs anti-aliasing
+MAX_CHANGED = 0.005       # share of thumbnail pixels
+
+LAYOUT_SCRIPT = LOCATOR_LIBRARY + """
+var specs = arguments[0], masks = arguments[1];
+window.scrollTo(0, 0);
+if (!document.getElementById('visual-freeze')) {
+  var freeze = document.createElement('style');
+  freeze.id = 'visual-freeze';
+  freeze.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; ' +
+                       'caret-color: transparent !important; }';
+  document.head.appendChild(freeze);
+}
+function box(el) {
+  var r = el.getBoundingClientRect();
+  return [Math.round(r.left), Math.round(r.top), Math.round(r.width), Math.round(r.height)];
+}
+var width = window.innerWidth, boxes = {};
+for (var name in specs) {
+  var shown = Array.prototype.filter.call(find(specs[name][0], specs[name][1]), function (el) {
+    return describe(el, [])[1];
+  });
+  boxes[name] = shown.length ? box(shown[0]) : null;
+}
+var scrollWidth = document.documentElement.scrollWidth, overflow = [];
+if (scrollWidth > width) {
+  // Only elements that widen the page: content clipped by an ancestor does not
+  Array.prototype.forEach.call(document.body.getElementsByTagName('*'), function (el) {
+    if (overflow.length >= 5 || el.getBoundingClientRect().right <= width + 1) return;
+    for (var parent = el.parentElement; parent && parent !== document.body; parent = parent.parentElement) {
+      if (getComputedStyle(parent).overflowX !== 'visible') return;
+    }
+    var label = el.tagName.toLowerCase() + (el.id ? '#' + el.id : '') +
+      (typeof el.className === 'string' && el.className.trim() ? '.' + el.className.trim().split(/\\s+/)[0] : '');
+    overflow.push([label, Math.round(el.getBoundingClientRect().right)]);
+  });
+}
+return {url: location.href, viewport: [width, window.innerHeight], boxes: boxes, scroll_width: scrollWidth,
+        overflow: overflow, masks: Array.prototype.map.call(document.querySelectorAll(masks.join(',')), box)};
+"""
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}     # PNG colour type -> samples per pixel
+
+
+def decode_png(data):
+    """(width, height, channels, rows) of an 8-bit, non-interlaced PNG; rows are bytearrays."""
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("not a PNG")
+    position, chunks, header = 8, [], None
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        position += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"IDAT":
+            chunks.append(chunk)
+        elif kind == b"IEND":
+            break
+    width, height, depth, colour, _, _, interlace = header
+    if depth != 8 or interlace or colour not in CHANNELS:
+        raise ValueError(f"unsupported PNG (bit depth {depth}, colour type {colour}, interlace {interlace})")
+    channels = CHANNELS[colour]
+    raw = zlib.decompress(b"".join(chunks))
+    stride = width * channels
+    previous, rows = bytearray(stride), []
+    for y in range(height):
+        start = y * (stride + 1)
+        method, row = raw[start], bytearray(raw[start + 1:start + 1 + stride])
+        if method == 1:
+            for i in range(channels, stride):
+                row[i] = (row[i] + row[i - channels]) & 0xFF
+        elif method == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, previous))
+        elif method == 3:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif method == 4:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                up = previous[i]
+                corner = previous[i - channels] if i >= channels else 0
+                estimate = left + up - corner
+                pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - corner)
+                predictor = left if pa <= pb and pa <= pc else up if pb <= pc else corner
+                row[i] = (row[i] + predictor) & 0xFF
+        rows.append(row)
+        previous = row
+    return width, height, channels, rows
+
+
+def greyscale(width, height, channels, rows):
+    """Rows of RGB(A)/grey samples -> one bytearray of grey levels, row-major."""
+    if channels < 3:
+        return bytearray(row[x * channels] for row in rows for x in range(width))
+    return bytearray((row[i] * 299 + row[i + 1] * 587 + row[i + 2] * 114) // 1000
+                     for row in rows for i in range(0, width * channels, channels))
+
+
+def resize(pixels, width, height, new_width, new_height):
+    """Box-average ``pixels`` (grey, row-major) down or up to ``new_width`` x ``new_height``."""
+    out = bytearray(new_width * new_height)
+    for y in range(new_height):
+        top = y * height // new_height
+        bottom = max(top + 1, (y + 1) * height // new_height)
+        for x in range(new_width):
+            left = x * width // new_width
+            right = max(left + 1, (x + 1) * width // new_width)
+            total = sum(sum(pixels[row * width + left:row * width + right]) for row in range(top, bottom))
+            out[y * new_width + x] = total // ((bottom - top) * (right - left))
+    return out
+
+
+def mask(pixels, width, height, boxes, scale):
+    """Blank the ``boxes`` (CSS pixels) of a thumbnail ``scale`` times the CSS size."""
+    for left, top, box_width, box_height in boxes:
+        x0, x1 = max(0, int(left * scale)), min(width, int((left + box_width) * scale + 1))
+        for y in range(max(0, int(top * scale)), min(height, int((top + box_height) * scale + 1))):
+            if x1 > x0:
+                pixels[y * width + x0:y * width + x1] = bytes(x1 - x0)
+    return pixels
+
+
+def difference_hash(pixels, width, height):
+    """64-bit dHash as hex: does brightness increase left to right on a 9x8 reduction."""
+    small = resize(pixels, width, height, HASH_SIZE + 1, HASH_SIZE)
+    bits = 0
+    for y in range(HASH_SIZE):
+        for x in range(HASH_SIZE):
+            bits = bits << 1 | (small[y * (HASH_SIZE + 1) + x] < small[y * (HASH_SIZE + 1) + x + 1])
+    return f"{bits:016x}"
+
+
+def hamming(first, second):
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+
+def pixel_diff(first, second, tolerance=PIXEL_TOLERANCE):
+    """Share of pixels whose grey level differs by more than ``tolerance``."""
+    if len(first) != len(second):
+        return 1.0
+    changed = sum(1 for a, b in zip(first, second) if abs(a - b) > tolerance)
+    return changed / len(first) if first else 0.0
+
+
+class Capture(namedtuple("Capture", "url viewport boxes scroll_width overflow size pixels phash")):
+    """One page at one viewport. ``size``/``pixels``/``phash`` are None without a screenshot."""
+
+    @property
+    def overflow_problems(self):
+        width = self.viewport[0]
+        if self.scroll_width <= width:
+            return []
+        culprits = ", ".join(f"{label} (right edge {right}px)" for label, right in self.overflow)
+        return [f"page is {self.scroll_width}px wide in a {width}px viewport" + (f": {culprits}" if culprits else "")]
+
+
+def capture(driver, page, screenshot=True):
+    """Layout of the page ``page`` (a page object) is on, plus a thumbnail when ``screenshot`` and CDP allow."""
+    specs = {name: list(page.LOCATORS[name]) for name in LANDMARKS if name in page.LOCATORS}
+    raw = driver.execute_script(LAYOUT_SCRIPT, specs, list(MASKS))
+    size = pixels = phash = None
+    if screenshot and hasattr(driver, "execute_cdp_cmd"):
+        width, height = raw["viewport"]
+        shot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png", "clip": {"x": 0, "y": 0, "width": width, "height": height,
+                                      "scale": THUMBNAIL_WIDTH / width},
+        })
+        decoded = decode_png(base64.b64decode(shot["data"]))
+        size = [THUMBNAIL_WIDTH, max(1, round(height * THUMBNAIL_WIDTH / width))]
+        # Zoom and device scale factors make the browser's image a little larger; normalise it
+        pixels = resize(greyscale(*decoded), decoded[0], decoded[1], *size)
+        mask(pixels, size[0], size[1], raw["masks"], THUMBNAIL_WIDTH / width)
+        phash = difference_hash(pixels, *size)
+    return Capture(raw["url"], raw["viewport"], raw["boxes"], raw["scroll_width"], raw["overflow"],
+                   size, pixels, phash)
+
+
+Baseline = namedtuple("Baseline", "boxes size pixels phash")
+
+
+def baseline_directory(config):
+    """``--visual-baselines``, else the pytest cache (``.visual-baselines`` in the rootdir without one)."""
+    directory = config.getoption("--visual-baselines")
+    if directory is None:
+        cache = getattr(config, "cache", None)
+        directory = str(cache.mkdir("opencart") / "visual-baselines") if cache is not None \
+            else os.path.join(str(config.rootpath), ".visual-baselines")
+    return directory
+
+
+class BaselineStore:
+    """``<directory>/<profile>/<config>/<route>.json`` plus a ``.grey`` file holding the zlib-compressed thumbnail."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, *(part.replace("/", "-") for part in key))
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with open(path + ".json", encoding="utf-8") as handle:
+                meta = json.load(handle)
+            pixels = None
+            if meta["phash"] is not None:
+                with open(path + ".grey", "rb") as handle:
+                    pixels = bytearray(zlib.decompress(handle.read()))
+        except (OSError, ValueError, KeyError, zlib.error):
+            return None
+        return Baseline(meta["boxes"], meta["size"], pixels, meta["phash"])
+
+    def save(self, key, shot):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if shot.pixels is not None:
+            with open(path + ".grey", "wb") as handle:
+                handle.write(zlib.compress(bytes(shot.pixels), 9))
+        with open(path + ".json", "w", encoding="utf-8") as handle:
+            json.dump({"url": shot.url, "viewport": shot.viewport, "boxes": shot.boxes, "size": shot.size,
+                       "phash": shot.phash}, handle, indent=1, sort_keys=True)
+
+
+def layout_changes(before, after, tolerance=LAYOUT_TOLERANCE):
+    changes = []
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        if old is None and new is None:
+            continue
+        if old is None or new is None:
+            changes.append(f"{name} {'appeared' if old is None else 'disappeared'}")
+        elif any(abs(a - b) > tolerance for a, b in zip(old, new)):
+            changes.append(f"{name} moved {old} -> {new}")
+    return changes
+
+
+class VisualResult(namedtuple("VisualResult", "key status capture layout_changes distance changed ms")):
+    """
+    ``status``: new, updated, match (equal hashes), similar (pixels within
+    tolerance), changed, or layout (no screenshot to compare).
+    ``distance``: hash bits that differ; ``changed``: share of differing pixels.
+    """
+
+    @property
+    def overflow(self):
+        return self.capture.overflow_problems
+
+    @property
+    def boxes(self):
+        return self.capture.boxes
+
+    @property
+    def passed(self):
+        return self.status != "changed" and not self.layout_changes and not self.overflow
+
+    @property
+    def message(self):
+        problems = self.overflow + self.layout_changes
+        if self.status == "changed":
+            problems.append(f"{self.changed:.1%} of the pixels differ from the baseline "
+                            f"(hash distance {self.distance})")
+        return f"{'/'.join(self.key)}: " + "; ".join(problems) if problems else ""
+
+    def as_property(self):
+        return {"key": "/".join(self.key), "status": self.status, "layout_changes": self.layout_changes,
+                "overflow": self.overflow, "distance": self.distance, "changed": self.changed, "ms": self.ms}
+
+
+class VisualEngine:
+    """``mode``: check (compare, record missing baselines), update (re-record) or off (layout and overflow only)."""
+
+    def __init__(self, directory, mode="check"):
+        self.store = BaselineStore(directory)
+        self.mode = mode
+
+    def compare(self, key, shot):
+        start = time.perf_counter()
+        baseline = None if self.mode == "update" else self.store.load(key)
+        changes, distance, changed = [], None, None
+        if baseline is None:
+            self.store.save(key, shot)
+            status = "updated" if self.mode == "update" else "new"
+        else:
+            changes = layout_changes(baseline.boxes, shot.boxes)
+            if shot.phash is None or baseline.phash is None or baseline.size != shot.size:
+                status = "layout"
+            else:
+                distance = hamming(baseline.phash, shot.phash)
+                if distance == 0:
+                    status = "match"
+                else:
+                    changed = pixel_diff(baseline.pixels, shot.pixels)
+                    status = "changed" if changed > MAX_CHANGED else "similar"
+        return VisualResult(key, status, shot, changes, distance, changed,
+                            round((time.perf_counter() - start) * 1000, 3))
+
+    def check(self, request, driver, key, page):
+        """Capture ``page`` and compare it under ``key`` + its route; the result is also reported."""
+        shot = capture(driver, page, screenshot=self.mode != "off")
+        key = tuple(key) + (route_of(shot.url),)
+        if self.mode == "off":
+            result = VisualResult(key, "layout", shot, [], None, None, 0.0)
+        else:
+            result = self.compare(key, shot)
+        request.node.user_properties.append((PROPERTY, result.as_property()))
+        return result
+
+
+def collect(reports):
+    return [value for report in reports for name, value in getattr(report, "user_properties", ()) if name == PROPERTY]
+
+
+def summary_lines(entries):
+    if not entries:
+        return []
+    counts = {}
+    for entry in entries:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    compared = [entry for entry in entries if entry["status"] in ("match", "similar", "changed")]
+    statuses = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    lines = [f"{len(entries)} layout checks ({statuses}); {len(compared)} compared with their baseline in "
+             f"{sum(entry['ms'] for entry in compared):.1f}ms"]
+    for entry in entries:
+        problems = entry["overflow"] + entry["layout_changes"]
+        if entry["status"] == "changed":
+            problems.append(f"{entry['changed']:.1%} of pixels changed")
+        if problems:
+            lines.append(f"  {entry['key']}: {'; '.join(problems)}")
+    return lines
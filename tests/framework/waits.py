@@ -0,0 +1,228 @@
+"""
+Event-driven waits.
+
+``WebDriverWait`` polls every 500 ms, so a condition that holds after 20 ms
+still costs up to half a second, and every poll is a round-trip. ``WaitEngine``
+waits inside the page instead: one ``execute_async_script`` call evaluates
+the condition and, if it does not hold yet, re-evaluates it whenever the page
+signals a change, i.e. a DOM mutation (alerts appearing, a cart re-rendering),
+an XHR/fetch completing or the document's ready state changing. The call
+returns as soon as the condition holds or after a slice of at most
+``SLICE_SECONDS``.
+
+A navigation while the script is waiting unloads the document and fails the
+call. Only then does the engine fall back to polling, with an interval that
+starts at 50 ms and doubles up to 500 ms, until the new document answers.
+
+Every wait is recorded with the time it actually blocked, so slow locators
+show up in the "waits" summary section instead of hiding inside test time.
+"""
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+PROPERTY = "waits"
+SLICE_SECONDS = 2.0
+FIRST_INTERVAL = 0.05
+MAX_INTERVAL = 0.5
+
+# Installed once per document: counts in-flight XHR/fetch requests and fires
+# "ocwait:network" when one finishes.
+WATCHER = """
+function watcher() {
+  if (window.__ocWait) return window.__ocWait;
+  var w = window.__ocWait = {pending: 0, lastNetwork: performance.timeOrigin};
+  performance.getEntriesByType('resource').forEach(function (entry) {
+    w.lastNetwork = Math.max(w.lastNetwork, performance.timeOrigin + entry.responseEnd);
+  });
+  function settled() {
+    w.pending = Math.max(0, w.pending - 1);
+    w.lastNetwork = Date.now();
+    window.dispatchEvent(new Event('ocwait:network'));
+  }
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    w.pending++;
+    this.addEventListener('loadend', settled);
+    return send.apply(this, arguments);
+  };
+  if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function () {
+      w.pending++;
+      return fetch.apply(this, arguments).finally(settled);
+    };
+  }
+  return w;
+}
+"""
+
+WAIT_TEMPLATE = """
+var args = arguments[0], sliceMs = arguments[1], immediate = arguments[2], inPage = arguments[3];
+var callback = arguments[arguments.length - 1];
+%(library)s
+%(watcher)s
+function check(args, w) { %(check)s }
+function value(args) { %(value)s }
+var w = watcher(), start = Date.now(), finished = false;
+var observer = null, timer = null, recheck = null, settle = null;
+function finish(met) {
+  if (finished) return;
+  finished = true;
+  if (observer) observer.disconnect();
+  clearTimeout(timer);
+  clearTimeout(settle);
+  clearInterval(recheck);
+  window.removeEventListener('ocwait:network', signal);
+  document.removeEventListener('readystatechange', signal);
+  callback({met: met, waited: Date.now() - start, value: value(args)});
+}
+function signal() {
+  if (finished) return;
+  if (inPage) {
+    if (check(args, w)) finish(true);
+  } else if (settle === null) {
+    // Python-side condition: hand back the page once a burst of changes settles
+    settle = setTimeout(function () { finish(false); }, 16);
+  }
+}
+if (immediate) {
+  finish(false);
+} else if (inPage && check(args, w)) {
+  finish(true);
+} else {
+  observer = new MutationObserver(signal);
+  observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+  window.addEventListener('ocwait:network', signal);
+  document.addEventListener('readystatechange', signal);
+  // Conditions that depend on elapsed time (network idle) need a clock too
+  if (args.recheck) recheck = setInterval(signal, args.recheck);
+  timer = setTimeout(function () { finish(check(args, w)); }, sliceMs);
+}
+"""
+
+WaitRecord = namedtuple("WaitRecord", "label seconds calls fallbacks met started thread")
+
+# Every wait in this process, in order; ``record_waits`` slices it per test (and
+# per thread: tests on browsing contexts run side by side, see ``contexts``)
+RECORDS = []
+
+
+class WaitEngine:
+    """
+    ``wait`` runs ``check`` (JavaScript returning a boolean, with ``args``
+    and the network watcher ``w`` in scope) in the page until it holds, then
+    returns ``accept(value)`` where ``value`` is what the ``value`` script
+    returned at that moment. ``library`` is extra JavaScript (helper
+    functions) made available to both.
+
+    Without a ``check`` the condition lives in Python: ``accept(value)`` is
+    evaluated on the current value first and then after every signal from
+    the page, until it returns something truthy.
+    """
+
+    def __init__(self, driver, timeout=10):
+        self.driver = driver
+        self.timeout = timeout
+
+    def _script(self, library, check, value):
+        return WAIT_TEMPLATE % {"library": library, "watcher": WATCHER, "check": check, "value": value}
+
+    def wait(self, label, value, check=None, library="", args=None, accept=None, timeout=None, message=""):
+        accept = accept or (lambda result: result)
+        in_page = check is not None
+        script = self._script(library, check or "return false;", value)
+        args = dict(args or {})
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        calls = fallbacks = 0
+        interval = FIRST_INTERVAL
+        immediate = not in_page
+        while True:
+            remaining = deadline - time.perf_counter()
+            slice_ms = int(max(0.0, min(SLICE_SECONDS, remaining)) * 1000)
+            try:
+                calls += 1
+                result = self.driver.execute_async_script(script, args, slice_ms, immediate, in_page)
+            except WebDriverException:
+                # Navigation unloaded the document (or async scripts are
+                # unavailable): poll until the next document answers
+                result = None
+                fallbacks += 1
+            if result is not None:
+                interval = FIRST_INTERVAL
+                outcome = accept(result["value"]) if (result["met"] or not in_page) else None
+                if outcome:
+                    self._record(label, start, calls, fallbacks, True)
+                    return outcome
+                if not in_page:
+                    # The next call waits for a change instead of reading at once
+                    immediate = False
+            if time.perf_counter() >= deadline:
+                self._record(label, start, calls, fallbacks, False)
+                raise TimeoutException(message or f"Timed out after {timeout}s waiting for {label}")
+            if result is None:
+                time.sleep(min(interval, max(0.0, deadline - time.perf_counter())))
+                interval = min(interval * 2, MAX_INTERVAL)
+                # A Python-side condition reads the new document right away
+                immediate = not in_page
+
+    def _record(self, label, start, calls, fallbacks, met):
+        RECORDS.append(WaitRecord(label, time.perf_counter() - start, calls, fallbacks, met, start,
+                                  threading.get_ident()))
+
+    def wait_for_network_idle(self, quiet=0.5, timeout=None):
+        """No XHR/fetch in flight and none finished during the last ``quiet`` seconds."""
+        return self.wait(
+            "network idle", value="return true;",
+            check="return w.pending === 0 && Date.now() - w.lastNetwork >= args.quiet;",
+            args={"quiet": int(quiet * 1000), "recheck": 50}, timeout=timeout,
+        )
+
+    def wait_for_navigation(self, from_url, timeout=None):
+        """A new document has been committed (URL changed, no longer loading)."""
+        return self.wait(
+            "navigation", value="return location.href;",
+            check="return location.href !== args.from && document.readyState !== 'loading';",
+            args={"from": from_url}, timeout=timeout,
+        )
+
+
+@contextmanager
+def record_waits(request):
+    """Attach the waits made during the test to its reports."""
+    first, thread = len(RECORDS), threading.get_ident()
+    try:
+        yield
+    finally:
+        request.node.user_properties.append(
+            (PROPERTY, [(record.label, round(record.seconds, 4), record.met) for record in RECORDS[first:]
+                        if record.thread == thread])
+        )
+
+
+def summary_lines(reports, top=8):
+    totals = {}
+    for report in reports:
+        for name, value in getattr(report, "user_properties", ()):
+            if name != PROPERTY:
+                continue
+            for label, seconds, met in value:
+                entry = totals.setdefault(label, [0, 0.0, 0.0, 0])
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+                entry[3] += 0 if met else 1
+    if not totals:
+        return []
+    count = sum(entry[0] for entry in totals.values())
+    blocked = sum(entry[1] for entry in totals.values())
+    lines = [f"{count} waits blocked {blocked:.2f}s in total"]
+    for label, (n, seconds, longest, timeouts) in sorted(totals.items(), key=lambda item: -item[1][1])[:top]:
+        note = f", {timeouts} timed out" if timeouts else ""
+        lines.append(f"  {seconds:7.3f}s  {n:3d}x  max {longest:.3f}s  {label}{note}")
+    return lines
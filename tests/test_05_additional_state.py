@@ -1,55 +1,53 @@
 import pytest
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+
+from framework.pages import (AccountPage, CartPage, CategoryPage, CheckoutPage, HomePage, LoginPage,
+                             ProductPage, WishlistPage)
 
 # ISTQB Technique: State Transition Testing
 # Additional comprehensive state transition tests
 
+@pytest.mark.read_only
 def test_product_category_navigation_STATE_TRANSITION(driver, base_url):
     """
     TC-002: Product Category Navigation - State Transition Testing
     ✅ ISTQB Technique: STATE TRANSITION TESTING
     States: Home → Category → Product → Back
     """
-    driver.get(base_url)
-    wait = WebDriverWait(driver, 10)
+    home = HomePage(driver, base_url).open()
     
     # State 1: Homepage
-    assert "Your Store" in driver.title
+    assert "Your Store" in home.title
     
     # Transition to Category (Desktops)
-    desktops_menu = wait.until(EC.element_to_be_clickable((By.LINK_TEXT, "Desktops")))
-    desktops_menu.click()
+    home.wait_for("desktops_menu", clickable=True)
+    home.click("desktops_menu")
     
     # State 2: Category page
-    # Click on "Show All Desktops" or a subcategory
-    try:
-        show_all = wait.until(EC.element_to_be_clickable((By.LINK_TEXT, "Show All Desktops")))
-        show_all.click()
-    except:
-        # Alternative: click on PC subcategory
-        pc_link = wait.until(EC.element_to_be_clickable((By.LINK_TEXT, "PC")))
-        pc_link.click()
+    # Click on "Show All Desktops", or the PC subcategory where the menu has none
+    def shown(snapshot):
+        return next((name for name in ("show_all_desktops", "pc_menu")
+                     if snapshot.first(name) is not None and snapshot.first(name).displayed), None)
+    home.click(home.wait_until(shown, message="Desktops menu shows neither 'Show All Desktops' nor 'PC'",
+                               label="HomePage.desktops_submenu"))
     
     # State 3: Product listing
-    products = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".product-thumb")))
+    category = CategoryPage(driver, base_url)
+    products = category.wait_for_all("products")
     assert len(products) > 0
     
     # Transition to Product detail
-    first_product = products[0].find_element(By.CSS_SELECTOR, "a")
-    first_product.click()
+    category.click("product_links")
     
     # State 4: Product detail page
-    product_title = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "h1")))
-    assert product_title.is_displayed()
+    product = ProductPage(driver, base_url)
+    product_title = product.wait_for("heading")
+    assert product_title.displayed
     
     # Transition back
-    driver.back()
+    category.back()
     
     # Verify we're back at product listing
-    products = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".product-thumb")))
+    products = category.wait_for_all("products")
     assert len(products) > 0
 
 def test_account_dashboard_STATE_TRANSITION(driver, base_url):
@@ -58,14 +56,13 @@ def test_account_dashboard_STATE_TRANSITION(driver, base_url):
     ✅ ISTQB Technique: STATE TRANSITION TESTING
     States: Dashboard sections and protected page redirects
     """
-    driver.get(f"{base_url}/index.php?route=account/login")
-    wait = WebDriverWait(driver, 10)
+    login = LoginPage(driver, base_url).open()
     
-    # Note: This test requires valid credentials or registration
-    # For demo purposes, we'll navigate to the account page structure
+    # Logged-out partition; the logged-in dashboard is covered by
+    # test_account_dashboard_logged_in_STATE_TRANSITION
     
     # Navigate to registration instead (state transition)
-    register_link = wait.until(EC.element_to_be_clickable((By.LINK_TEXT, "Continue")))
+    register_link = login.wait_for("register_continue", clickable=True)
     
     # Alternative: test the account menu structure without login
     driver.get(f"{base_url}/index.php?route=account/account")
@@ -73,63 +70,74 @@ def test_account_dashboard_STATE_TRANSITION(driver, base_url):
     # Should redirect to login (state transition: Protected -> Login Required)
     assert "login" in driver.current_url.lower()
 
-def test_guest_checkout_flow_STATE_TRANSITION(driver, base_url):
+def test_account_dashboard_logged_in_STATE_TRANSITION(logged_in_driver, base_url):
+    """
+    TC-013: Account Dashboard Navigation - Logged-in State Transitions
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Logged In → Dashboard → Wish List → Dashboard
+    """
+    # State 1: Protected page is reachable (no redirect to login)
+    account = AccountPage(logged_in_driver, base_url).open()
+    account.wait_for("wishlist_link", clickable=True)
+    assert "login" not in account.current_url.lower()
+    assert account.is_displayed("edit_account")
+
+    # State 2: Dashboard -> Wish List
+    account.click("wishlist_link")
+    wishlist = WishlistPage(logged_in_driver, base_url)
+    wishlist.wait_until(lambda snapshot: "account/wishlist" in snapshot.url, message="Wish list did not open")
+    assert "Wish List" in wishlist.title
+
+    # State 3: Back to the dashboard
+    wishlist.back()
+    account.wait_for("wishlist_link")
+    assert "account/account" in account.current_url
+
+@pytest.mark.precondition("cart with MacBook")
+def test_guest_checkout_flow_STATE_TRANSITION(seeded_driver, base_url):
     """
     TC-008: Guest Checkout - Complete Flow with State Transitions
     ✅ ISTQB Technique: STATE TRANSITION TESTING
     States: Cart → Checkout → Billing → Payment
     """
-    # State 1: Add product to cart
-    driver.get(f"{base_url}/index.php?route=product/product&product_id=43")
-    wait = WebDriverWait(driver, 10)
-    
-    add_btn = wait.until(EC.element_to_be_clickable((By.ID, "button-cart")))
-    add_btn.click()
-    
-    # Wait for success
-    success = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".alert-success")))
-    assert success.is_displayed()
-    
-    # State 2: Go to cart
-    driver.get(f"{base_url}/index.php?route=checkout/cart")
-    
-    cart_item = wait.until(EC.visibility_of_element_located((By.PARTIAL_LINK_TEXT, "MacBook")))
-    assert cart_item.is_displayed()
+    driver = seeded_driver
+
+    # State 1-2: Cart with a product (seeded over HTTP, browser lands on the cart)
+    cart = CartPage(driver, base_url)
+    cart_item = cart.wait_for_link("MacBook")
+    assert cart_item.displayed
     
     # State 3: Proceed to checkout
-    checkout_btn = driver.find_element(By.LINK_TEXT, "Checkout")
-    checkout_btn.click()
+    cart.click("checkout")
     
     # State 4: Checkout page (may require login or guest option)
     # The exact flow depends on OpenCart configuration
-    try:
-        guest_option = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[value='guest']")))
-        guest_option.click()
-    except:
-        # Might already be on billing form or require login
-        pass
+    checkout = CheckoutPage(driver, base_url)
+    def step(snapshot):
+        return next((name for name in ("guest", "payment_firstname")
+                     if snapshot.first(name) is not None and snapshot.first(name).displayed), None)
+    # Guest option first, unless the store goes straight to the billing form
+    if checkout.wait_until(step, message="Checkout shows neither the guest option nor the billing form",
+                           label="CheckoutPage.first_step") == "guest":
+        checkout.click("guest")
 
-def test_session_timeout_STATE_TRANSITION(driver, base_url):
+@pytest.mark.precondition("cart with MacBook")
+def test_session_timeout_STATE_TRANSITION(seeded_driver, base_url):
     """
     TC-010: Checkout Session Timeout - State Transition
     ✅ ISTQB Technique: STATE TRANSITION TESTING
     States: Active Session → Timeout (cookies cleared) → Cart check
     """
-    driver.get(f"{base_url}/index.php?route=product/product&product_id=43")
-    wait = WebDriverWait(driver, 10)
-    
-    # Add to cart
-    add_btn = wait.until(EC.element_to_be_clickable((By.ID, "button-cart")))
-    add_btn.click()
-    
+    driver = seeded_driver
+    cart = CartPage(driver, base_url)
+    assert cart.wait_for_link("MacBook").displayed
+
     # Clear cookies to simulate session timeout
     driver.delete_all_cookies()
-    
-    # Try to access cart
-    driver.get(f"{base_url}/index.php?route=checkout/cart")
-    
-    # Cart might be empty or preserved depending on implementation
-    # This tests the state transition behavior
+
+    # The cart belonged to the lost session
+    cart.open()
+    assert cart.wait_for("empty_message").displayed
 
 def test_out_of_stock_STATE_TRANSITION(driver, base_url):
     """
@@ -140,18 +148,15 @@ def test_out_of_stock_STATE_TRANSITION(driver, base_url):
     # Note: This test requires finding an out-of-stock product
     # For demo purposes, we'll check the product page structure
     
-    driver.get(f"{base_url}/index.php?route=product/product&product_id=43")
-    wait = WebDriverWait(driver, 10)
+    product = ProductPage(driver, base_url).open(product_id=43)
     
     # Check if product has stock status displayed
-    try:
-        availability = driver.find_element(By.CSS_SELECTOR, ".list-unstyled li:nth-child(3)")
+    availability = product.state("availability")
+    if availability is not None:
         stock_text = availability.text
         
         # If out of stock, add to cart should be disabled
         if "Out Of Stock" in stock_text:
-            add_btn = driver.find_element(By.ID, "button-cart")
-            assert not add_btn.is_enabled() or "disabled" in add_btn.get_attribute("class")
-    except:
-        # Product might be in stock
-        pass
+            add_btn = product.state("add_to_cart")
+            if add_btn is not None:
+                assert not add_btn.enabled or "disabled" in (add_btn.attributes["class"] or "")
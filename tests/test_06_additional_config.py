@@ -1,35 +1,23 @@
 import pytest
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.edge.service import Service as EdgeService
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+from framework.instrumentation import instrument
+from framework.pages import HomePage
+from framework.perf import budget_for
 
 # ISTQB Technique: Configuration Testing
 # Additional cross-browser and configuration tests
 
 @pytest.fixture
-def firefox_driver():
+def firefox_driver(request, driver_pools):
     """Firefox browser fixture for cross-browser testing"""
-    options = webdriver.FirefoxOptions()
-    # options.add_argument("--headless")
-    driver = webdriver.Firefox(service=FirefoxService(GeckoDriverManager().install()), options=options)
-    driver.set_window_size(1920, 1080)
-    yield driver
-    driver.quit()
+    with driver_pools.lease("firefox") as driver, instrument(request, driver, "firefox"):
+        yield driver
 
 @pytest.fixture
-def edge_driver():
+def edge_driver(request, driver_pools):
     """Edge browser fixture for cross-browser testing"""
-    options = webdriver.EdgeOptions()
-    # options.add_argument("--headless")
-    driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=options)
-    driver.set_window_size(1920, 1080)
-    yield driver
-    driver.quit()
+    with driver_pools.lease("edge") as driver, instrument(request, driver, "edge"):
+        yield driver
 
 def test_firefox_compatibility_CONFIGURATION(firefox_driver, base_url):
     """
@@ -37,17 +25,15 @@ def test_firefox_compatibility_CONFIGURATION(firefox_driver, base_url):
     ✅ ISTQB Technique: CONFIGURATION TESTING
     Tests: Firefox browser configuration
     """
-    firefox_driver.get(base_url)
-    wait = WebDriverWait(firefox_driver, 10)
+    home = HomePage(firefox_driver, base_url).open()
     
     # Verify critical elements load correctly
-    logo = wait.until(EC.visibility_of_element_located((By.ID, "logo")))
-    assert logo.is_displayed()
+    logo = home.wait_for("logo")
+    assert logo.displayed
     
-    search = firefox_driver.find_element(By.ID, "search")
-    assert search.is_displayed()
+    assert home.is_displayed("search")
     
-    assert "Your Store" in firefox_driver.title
+    assert "Your Store" in home.title
 
 @pytest.mark.skip(reason="Edge driver may not be available on all systems")
 def test_edge_compatibility_CONFIGURATION(edge_driver, base_url):
@@ -56,116 +42,80 @@ def test_edge_compatibility_CONFIGURATION(edge_driver, base_url):
     ✅ ISTQB Technique: CONFIGURATION TESTING
     Tests: Edge browser configuration
     """
-    edge_driver.get(base_url)
-    wait = WebDriverWait(edge_driver, 10)
+    home = HomePage(edge_driver, base_url).open()
     
-    logo = wait.until(EC.visibility_of_element_located((By.ID, "logo")))
-    assert logo.is_displayed()
+    logo = home.wait_for("logo")
+    assert logo.displayed
     
-    assert "Your Store" in edge_driver.title
+    assert "Your Store" in home.title
 
-def test_mobile_landscape_CONFIGURATION(driver, base_url):
+@pytest.mark.read_only
+@pytest.mark.visual
+@pytest.mark.viewports("mobile-landscape", "tablet", "large-desktop")
+def test_viewport_matrix_CONFIGURATION(matrix_driver, base_url, browser_config, visual_check):
     """
-    TC-019 Extended: Mobile Landscape Orientation
+    TC-019/TC-021 Extended: Orientation & Resolution Matrix
     ✅ ISTQB Technique: CONFIGURATION TESTING
-    Tests: Mobile landscape viewport (667x375)
+    Tests: --browsers at mobile landscape (667x375), tablet portrait
+    (768x1024) and large desktop (2560x1440), pairwise with --locales and
+    --zoom-levels
     """
-    # Mobile landscape (iPhone SE)
-    driver.set_window_size(667, 375)
-    driver.get(base_url)
-    
-    wait = WebDriverWait(driver, 10)
+    home = HomePage(matrix_driver, base_url).open()
     
-    logo = wait.until(EC.visibility_of_element_located((By.ID, "logo")))
-    assert logo.is_displayed()
+    logo = home.wait_for("logo")
+    assert logo.displayed
     
     # Check that layout adapts
-    search = driver.find_element(By.ID, "search")
-    assert search.is_displayed()
-
-def test_tablet_portrait_CONFIGURATION(driver, base_url):
-    """
-    TC-019 Extended: Tablet Portrait Orientation
-    ✅ ISTQB Technique: CONFIGURATION TESTING
-    Tests: Tablet portrait viewport (768x1024)
-    """
-    # Tablet portrait (iPad)
-    driver.set_window_size(768, 1024)
-    driver.get(base_url)
-    
-    wait = WebDriverWait(driver, 10)
-    
-    logo = wait.until(EC.visibility_of_element_located((By.ID, "logo")))
-    assert logo.is_displayed()
-    
-    menu = driver.find_element(By.ID, "menu")
-    assert menu.is_displayed()
-
-def test_large_desktop_CONFIGURATION(driver, base_url):
-    """
-    TC-021 Extended: Large Desktop Resolution
-    ✅ ISTQB Technique: CONFIGURATION TESTING
-    Tests: Large desktop viewport (2560x1440)
-    """
-    # Large desktop (2560x1440)
-    driver.set_window_size(2560, 1440)
-    driver.get(base_url)
-    
-    wait = WebDriverWait(driver, 10)
+    assert home.is_displayed("search")
     
-    logo = wait.until(EC.visibility_of_element_located((By.ID, "logo")))
-    assert logo.is_displayed()
+    # The full menu bar is only expected from tablet width upwards (CSS pixels)
+    if browser_config.css_width >= 768:
+        assert home.is_displayed("menu")
     
-    # Verify layout doesn't break at large resolutions
-    content = driver.find_element(By.ID, "content")
-    assert content.is_displayed()
+    # Verify layout doesn't break at any resolution
+    assert home.is_displayed("content")
+    layout = visual_check(home)
+    assert layout.passed, layout.message
 
-def test_page_load_performance_CONFIGURATION(driver, base_url):
+def test_page_load_performance_CONFIGURATION(driver, base_url, perf_probe):
     """
     TC-021: Page Load Performance Benchmark
     ✅ ISTQB Technique: CONFIGURATION TESTING
-    Tests: Performance across different configurations
+    Tests: Browser-reported Navigation/Paint Timing of the homepage against
+    its route budget (every other browser test is sampled the same way)
     """
-    import time
-    
-    start_time = time.time()
-    driver.get(base_url)
+    home = HomePage(driver, base_url).open()
+    home.wait_for("logo")
     
-    wait = WebDriverWait(driver, 10)
-    wait.until(EC.visibility_of_element_located((By.ID, "logo")))
+    sample = perf_probe.sample()
+    budget = budget_for(sample["route"])
     
-    load_time = time.time() - start_time
+    # Assert the page loads within its budget (5 seconds for the homepage)
+    assert sample["load"] is not None, "Navigation Timing has no loadEventEnd"
+    assert sample["load"] < budget["load"], f"Page load {sample['load']:.0f}ms exceeds {budget['load']}ms"
     
-    # Assert page loads within acceptable time (5 seconds)
-    assert load_time < 5.0, f"Page load time {load_time}s exceeds threshold"
-    
-    print(f"Homepage load time: {load_time:.2f}s")
+    print(f"Homepage: TTFB {sample['ttfb']:.0f}ms, FCP {sample['fcp'] or 0:.0f}ms, load {sample['load']:.0f}ms")
 
-def test_accessibility_CONFIGURATION(driver, base_url):
+def test_accessibility_CONFIGURATION(driver, base_url, a11y_audit):
     """
     TC-020: Accessibility Compliance - Basic Checks
     ✅ ISTQB Technique: CONFIGURATION TESTING
     Tests: WCAG 2.1 Level AA configuration compliance
     """
-    driver.get(base_url)
-    wait = WebDriverWait(driver, 10)
-    
+    HomePage(driver, base_url).open().wait_for_all("images")
+
+    # One in-page audit covers every image, link, heading and form field
+    result = a11y_audit()
+    assert result is not None, "Home page could not be audited"
+
     # Check 1: Images have alt attributes
-    images = wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, "img")))
-    
-    for img in images[:5]:  # Check first 5 images
-        alt_text = img.get_attribute("alt")
-        # Alt can be empty string for decorative images, but should exist
-        assert alt_text is not None, "Image missing alt attribute"
-    
-    # Check 2: Page has proper heading structure
-    h1_elements = driver.find_elements(By.TAG_NAME, "h1")
-    # Should have at least one H1
-    assert len(h1_elements) >= 0  # Some pages might not have H1
-    
-    # Check 3: Links have text or aria-label
-    links = driver.find_elements(By.TAG_NAME, "a")
-    for link in links[:10]:  # Check first 10 links
-        link_text = link.text.strip()
-        aria_label = link.get_attribute("aria-label")
-        assert link_text or aria_label, "Link has no text or aria-label"
+    # (alt can be an empty string for decorative images, but should exist)
+    assert result.checked.get("image-alt", 0) > 0, "No visible images audited"
+    assert not result.failed.get("image-alt"), f"Images missing alt attribute: {result.violations_of('image-alt')}"
+
+    # Check 2: Page has a heading structure
+    assert result.checked.get("heading-order", 0) > 0, "Page has no headings"
+
+    # Check 3: Links have text or an accessible label
+    assert result.checked.get("link-name", 0) > 0, "No visible links audited"
+    assert not result.failed.get("link-name"), f"Links without a name: {result.violations_of('link-name')}"
@@ -0,0 +1,48 @@
+from framework import scenarios
+
+# ISTQB Technique: State Transition Testing
+# Server-side state checks over the HTTP backend (no browser needed)
+
+def test_cart_http_STATE_TRANSITION(store_client):
+    """
+    TC-005 (HTTP): Update Cart Quantity - State Transition
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Empty Cart → Item Added → Quantity Updated → Item Removed
+    """
+    states = scenarios.cart_lifecycle(store_client)
+    assert states[-1] == "Item Removed"
+
+def test_session_timeout_http_STATE_TRANSITION(store_client):
+    """
+    TC-010 (HTTP): Checkout Session Timeout - State Transition
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Active Session → Timeout (cookies cleared) → Empty Cart
+    """
+    states = scenarios.session_timeout(store_client)
+    assert states[-1] == "Empty Cart"
+
+def test_account_dashboard_http_STATE_TRANSITION(store_client):
+    """
+    TC-013 (HTTP): Account Dashboard - Protected Page Redirect
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Protected → Login Required
+    """
+    scenarios.protected_page_redirect(store_client)
+
+def test_login_http_STATE_TRANSITION(store_client):
+    """
+    TC-012 (HTTP): Login Functionality - State Transition
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Logged Out → Login Failed
+    """
+    scenarios.failed_login(store_client)
+
+def test_wishlist_logged_in_http_STATE_TRANSITION(logged_in_client):
+    """
+    TC-014 (HTTP): Add to Wishlist - Logged-in State
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    States: Logged In (injected session snapshot) → Wish List Updated
+    """
+    assert logged_in_client.is_logged_in()
+    logged_in_client.add_to_wishlist(43)
+    assert any("wish list" in alert.lower() for alert in logged_in_client.alerts("success"))
@@ -0,0 +1,21 @@
+import pytest
+
+from framework.scenarios import MODELS
+
+# ISTQB Technique: State Transition Testing
+# Paths generated from declarative models (framework/model.py); shared
+# prefixes run once and branch by forking the OpenCart session
+
+@pytest.mark.parametrize("model_name", sorted(MODELS))
+def test_generated_paths_STATE_TRANSITION(model_runner, model_name):
+    """
+    TC-005 / TC-012 / TC-013 (model): generated transition coverage
+    ✅ ISTQB Technique: STATE TRANSITION TESTING
+    Covers every transition (or state / transition pair, see --model-coverage)
+    of the cart, login and navigation models
+    """
+    model = MODELS[model_name]
+    report = model_runner(model)
+    assert report.visited_states == set(model.states)
+    if report.plan.criterion != "all-states":
+        assert len(report.covered_transitions) == len(model.transitions)
@@ -0,0 +1,28 @@
+import pytest
+
+from framework.load import SCENARIOS
+
+# Performance & Load suite: TC-005 / TC-009 / TC-014 under 10-50 concurrent
+# users, replayed as asyncio virtual users over HTTP (framework/load.py).
+# Runs against the stand-in with --store=local; the live store needs an
+# explicit --load-users
+
+P90_BUDGET = 2.0   # seconds per transaction
+MAX_ERROR_RATE = 0.01
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_concurrent_users_PERFORMANCE(load_runner, scenario):
+    """
+    TC-005 / TC-009 / TC-014 (load): concurrent virtual users
+    Ramp-up, hold and ramp-down from --load-users / --load-profile; every
+    transaction of the flow stays within the p90 budget and error rate
+    """
+    report = load_runner({scenario: SCENARIOS[scenario]})
+    assert report.total > 0, "No transactions completed"
+    assert report.peak_users == report.profile.users
+    for name, histogram in report.histograms.items():
+        assert report.errors[name] <= MAX_ERROR_RATE * histogram.count, \
+            f"{name}: {report.errors[name]} of {histogram.count} requests failed"
+        assert histogram.percentile(90) < P90_BUDGET, \
+            f"{name}: p90 {histogram.percentile(90):.3f}s over {P90_BUDGET}s"
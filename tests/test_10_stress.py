@@ -0,0 +1,39 @@
+import pytest
+
+from framework import scenarios
+from framework.standin import Faults
+
+# Stress & Resilience suite: TC-006 cart boundaries, TC-016 malicious input
+# partitions and the stepped stress run with injected faults
+# (framework/stress.py). The stress run and TC-006 need --store=local
+
+@pytest.mark.parametrize("items", [1, 50, 100])
+def test_cart_unique_items_BVA(store_client, stress_products, items):
+    """
+    TC-006: Cart Stress Test - Boundary Value Analysis
+    ✅ ISTQB Technique: BOUNDARY VALUE ANALYSIS
+    Boundaries: 1, 50 and 100 unique items in one cart
+    """
+    states = scenarios.cart_stress(store_client, stress_products[:items])
+    assert states[-1] == f"{items} Items"
+
+def test_malicious_input_EP(store_client):
+    """
+    TC-016: Malicious Input Injection - Equivalence Partitioning
+    ✅ ISTQB Technique: EQUIVALENCE PARTITIONING
+    Partition: SQL / XSS payloads in search and login are plain text and rejected
+    """
+    assert scenarios.malicious_input(store_client) == ["Safe", "Rejected"]
+
+def test_breaking_point_and_recovery_STRESS(stress_runner):
+    """
+    TC-006 / TC-010 / TC-016 (stress): breaking point and recovery
+    Steps users up until the error rate or p95 limit is crossed, then injects
+    slow responses, dropped connections and expired sessions at the knee
+    """
+    report = stress_runner(Faults(slow_rate=0.05, slow_seconds=0.3, drop_rate=0.02, expire_rate=0.02))
+    assert report.steps, "No stress step completed"
+    assert report.knee is not None, f"Already over the limits at {report.steps[0].users} users"
+    if report.fault_phase is not None:
+        assert report.fault_phase.errors > 0, "Injected faults were not observed"
+        assert report.recovered, "Store did not recover after the faults were cleared"
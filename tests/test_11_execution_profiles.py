@@ -0,0 +1,24 @@
+import pytest
+
+from framework.profiles import PROFILES
+
+# Execution profiles: cold start, first page load and WebDriver command
+# latency of each browser flag set on this machine (framework/profiles.py).
+# Launches fresh browsers outside the pool, so it only runs with
+# --benchmark-profiles; the comparison is in the "execution profiles"
+# summary section
+
+COMMAND_P95_BUDGET = 100   # milliseconds per WebDriver round-trip
+
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_execution_profile_startup_PERFORMANCE(profile_benchmark, profile):
+    """
+    Execution profile benchmark: every browser in --browsers starts with the
+    profile's flags, loads the home page and answers commands within budget
+    """
+    for result in profile_benchmark(profile):
+        assert result.error is None, f"{result.browser} failed to start with {profile}: {result.error}"
+        assert result.cold_start > 0 and result.first_get > 0
+        assert result.command_p95 < COMMAND_P95_BUDGET, \
+            f"{result.browser}: command p95 {result.command_p95:.1f}ms over {COMMAND_P95_BUDGET}ms"
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+from selenium.webdriver.remote.command import Command
+
+from framework import a11y
+from framework.commands import CommandCounter
+
+
+def raw(url, hash, failed=None, violations=(), cached=False):
+    if cached:
+        return {"hash": hash, "url": url, "cached": True}
+    return {"hash": hash, "url": url, "cached": False, "checked": {"image-alt": 3, "link-name": 5},
+            "failed": failed or {}, "violations": [list(violation) for violation in violations], "incomplete": 1}
+
+
+class FakeDriver:
+    """Answers the audit script with the current page's raw result, as the browser would."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.scripts = []
+
+    def execute(self, command, params=None):
+        if command == Command.GET:
+            self.pages.pop(0)
+            return {"value": None}
+        if command == Command.W3C_EXECUTE_SCRIPT:
+            self.scripts.append(params)
+            page = self.pages[0]
+            if page is not None and page["hash"] in params["args"][0]:
+                page = {"hash": page["hash"], "url": page["url"], "cached": True}
+            return {"value": page}
+        return {"value": None}
+
+    def get(self, url):
+        self.execute(Command.GET, {"url": url})
+
+
+def fake_request(mode="report"):
+    return SimpleNamespace(
+        config=SimpleNamespace(getoption=lambda name: mode),
+        node=SimpleNamespace(user_properties=[], stash={}),
+    )
+
+
+def test_unchanged_dom_is_answered_from_the_cache():
+    home = raw("http://store/", "a1:100", {"image-alt": 1}, [("image-alt", "img:nth-of-type(2)", "/logo.png")])
+    driver = FakeDriver([home, home, None])
+    auditor = a11y.Auditor()
+
+    first = auditor.audit(driver)
+    assert driver.scripts[0] == {"script": a11y.AUDIT_SCRIPT, "args": [[], a11y.MAX_DETAILS]}
+    assert not first.cached and first.total == 1
+    assert first.violations_of("image-alt") == [("image-alt", "img:nth-of-type(2)", "/logo.png")]
+
+    driver.pages.pop(0)
+    again = auditor.audit(driver)
+    assert driver.scripts[1]["args"][0] == ["a1:100"]
+    assert again.cached and again.failed == {"image-alt": 1}
+    assert (auditor.audits, auditor.cache_hits) == (1, 1)
+
+    driver.pages.pop(0)
+    assert auditor.audit(driver) is None          # about:blank, data: URLs
+
+
+def test_probe_audits_every_page_without_counting_commands(monkeypatch):
+    monkeypatch.setattr(a11y, "AUDITOR", a11y.Auditor())
+    home = raw("http://store/", "a1:100")
+    cart = raw("http://store/index.php?route=checkout/cart", "b2:200", {"label": 2},
+               [("label", "input#coupon", "coupon"), ("label", "input#voucher", "voucher")])
+    driver = FakeDriver([home, cart])
+    request = fake_request()
+    counter = CommandCounter(driver)
+    counter.attach()
+    with a11y.probe(request, driver) as probe:
+        driver.get("http://store/index.php?route=checkout/cart")
+        assert request.node.stash[a11y.PROBE_KEY] is probe
+        assert probe.audit().hash == "b2:200"
+    counter.detach()
+
+    assert counter.commands == {Command.GET: 1}
+    (name, entries), = request.node.user_properties
+    assert name == a11y.PROPERTY
+    assert [(entry["route"], entry["cached"]) for entry in entries] == [("common/home", False),
+                                                                         ("checkout/cart", False)]
+    lines = a11y.summary_lines(entries, verbose=True)
+    assert lines[0] == "2 page audits, 2 distinct DOMs (0 answered from the DOM-hash cache); 1 with violations"
+    assert lines[1] == "  label (WCAG 1.3.1, form fields have a label): 2 on checkout/cart"
+    assert lines[-1] == "    label  input#voucher  voucher"
+
+
+def test_enforce_fails_the_test(monkeypatch):
+    monkeypatch.setattr(a11y, "AUDITOR", a11y.Auditor())
+    driver = FakeDriver([raw("http://store/", "c3:300", {"link-name": 1}, [("link-name", "a.cart", "#")])])
+    with pytest.raises(pytest.fail.Exception, match="link-name a.cart #"):
+        with a11y.probe(fake_request("enforce"), driver):
+            pass
+
+    request = fake_request("off")
+    with a11y.probe(request, driver) as probe:
+        assert probe is None
+    assert request.node.user_properties == []
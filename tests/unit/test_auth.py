@@ -0,0 +1,104 @@
+import time
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from framework.auth import CACHE_KEY, AuthSessions, FileCache, SessionSnapshot, inject_driver, new_account
+from framework.http_backend import SESSION_COOKIE, StoreClient
+from framework.standin import StandInServer
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+class MemoryCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+def test_logs_in_once_and_reuses_the_snapshot(server):
+    sessions = AuthSessions(server.base_url)
+    clients = [StoreClient(server.base_url) for _ in range(3)]
+    accounts = {sessions.login_client(client) for client in clients}
+    assert len(accounts) == 1
+    assert all(client.is_logged_in() for client in clients)
+    assert (sessions.registrations, sessions.logins, sessions.refreshes) == (1, 0, 0)
+
+
+def test_expired_session_is_refreshed_by_logging_in_again(server):
+    cache = MemoryCache()
+    sessions = AuthSessions(server.base_url, cache=cache)
+    sessions.current()
+    server.store.expire(sessions.snapshot.cookies[0]["value"])
+    client = StoreClient(server.base_url)
+    sessions.login_client(client)
+    assert client.is_logged_in()
+    assert (sessions.registrations, sessions.logins, sessions.refreshes) == (1, 1, 1)
+    # A later run starts from the cached, still valid snapshot
+    again = AuthSessions(server.base_url, cache=cache)
+    again.current()
+    assert (again.registrations, again.logins) == (0, 0)
+
+
+def test_workers_reuse_the_controllers_account_through_a_file(server, tmp_path):
+    controller = MemoryCache()
+    AuthSessions(server.base_url, cache=controller).current()
+    shared = FileCache(str(tmp_path / "auth.json"))
+    shared.set(CACHE_KEY, controller[CACHE_KEY])
+    workers = [AuthSessions(server.base_url, cache=FileCache(shared.path)) for _ in range(2)]
+    for worker in workers:
+        worker.current()
+    assert [(worker.registrations, worker.logins) for worker in workers] == [(0, 0), (0, 0)]
+    assert FileCache(str(tmp_path / "missing.json")).get(CACHE_KEY, {}) == {}
+
+
+def test_cookie_expiry_is_detected():
+    snapshot = SessionSnapshot(new_account(), [{"name": SESSION_COOKIE, "value": "x", "expiry": time.time() - 1}])
+    assert snapshot.expired()
+    assert SessionSnapshot.from_dict(snapshot.as_dict()).expired()
+    assert not SessionSnapshot(new_account(), [{"name": SESSION_COOKIE, "value": "x"}]).expired()
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url):
+        self.calls.append(("get", url))
+
+    def add_cookie(self, cookie):
+        self.calls.append(("add_cookie", cookie["name"]))
+
+    def execute_script(self, script, *args):
+        self.calls.append(("script", args))
+
+
+class FakeChromeDriver(FakeDriver):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+
+    def execute_cdp_cmd(self, cmd, params):
+        if self.fail:
+            raise WebDriverException("no CDP")
+        self.calls.append((cmd, params["cookies"][0]["url"]))
+
+
+def test_injection_is_one_cdp_call_or_one_page_load():
+    snapshot = SessionSnapshot(new_account(), [{"name": SESSION_COOKIE, "value": "x", "domain": "127.0.0.1",
+                                                "path": "/"}])
+    chrome = FakeChromeDriver()
+    assert inject_driver(chrome, snapshot, "http://127.0.0.1:9/demo/") == 0
+    assert chrome.calls == [("Network.setCookies", "http://127.0.0.1:9/demo/")]
+
+    for driver in (FakeDriver(), FakeChromeDriver(fail=True)):
+        assert inject_driver(driver, snapshot, "http://127.0.0.1:9/demo/") == 1
+        assert driver.calls == [("get", "http://127.0.0.1:9/robots.txt"), ("add_cookie", SESSION_COOKIE)]
+
+    snapshot.local_storage = {"k": "v"}
+    driver = FakeChromeDriver()
+    assert inject_driver(driver, snapshot, "http://127.0.0.1:9/demo/") == 1
+    assert driver.calls[-1] == ("script", ({"k": "v"}, {}))
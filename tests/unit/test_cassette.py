@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import requests
+
+from framework import cassette
+from framework.http_backend import StoreClient
+from framework.standin import StandInServer
+
+
+def fake_request():
+    return SimpleNamespace(node=SimpleNamespace(user_properties=[]))
+
+
+def shop(base_url, product_ids):
+    """Two clients, two carts: what a replay has to keep apart."""
+    carts = []
+    for product_id in product_ids:
+        client = StoreClient(base_url)
+        client.open("common/home")
+        client.add_to_cart(product_id)
+        carts.append(sorted(client.cart_items()))
+        client.close()
+    return carts
+
+
+def test_normalized_keys():
+    assert cassette.normalize("GET", "/demo/index.php?route=product/search&search=mac&_=1699") == \
+        cassette.normalize("GET", "/demo/index.php?search=mac&route=product/search")
+    login = cassette.normalize("POST", "/index.php?route=account/login", b"password=secret&email=a%40b.c",
+                               "application/x-www-form-urlencoded")
+    assert login == "POST /index.php?route=account/login email=*&password=*"
+    assert cassette.is_static("/catalog/view/theme/default/stylesheet/stylesheet.css?v=3")
+    assert cassette.changes_state("GET", "/index.php?route=account/logout")
+    assert cassette.local_cookie("OCSESSID=abc; Path=/; Domain=.tutorialsninja.com; Secure; HttpOnly", "p1") == \
+        "OCSESSID=p1; Path=/; HttpOnly"
+
+
+def test_replay_serves_session_state_without_the_store(tmp_path):
+    request = fake_request()
+    with StandInServer() as server:
+        recorder = cassette.CassetteProxy(server.base_url, cassette.Cassette(str(tmp_path)), mode="record")
+        with recorder.record(request):
+            recorded = shop(recorder.base_url, [43, 40])
+            page = requests.get(recorder.base_url)
+        recorder.close()
+    assert recorded[0] != recorded[1]
+    # Absolute links point at whichever proxy serves the page, never at the store
+    assert server.base_url not in page.text and recorder.base_url in page.text
+
+    replayer = cassette.CassetteProxy(server.base_url, cassette.Cassette(str(tmp_path)), mode="replay",
+                                      latency="dc")
+    with replayer.record(request):
+        # The same sessions in the opposite order: the state digest, not the order, picks the response
+        assert shop(replayer.base_url, [40, 43]) == recorded[::-1]
+        missed = requests.get(replayer.base_url + "index.php?route=product/search&search=never")
+        assert replayer.base_url in requests.get(replayer.base_url).text
+    replayer.close()
+    assert missed.status_code == 502
+
+    entries = cassette.collect([SimpleNamespace(user_properties=request.node.user_properties)])
+    lines = cassette.summary_lines(entries, latency="dc")
+    assert {action for action, _, _, _ in entries} == {"record", "hit", "miss"}
+    replayed = [entry for name, value in request.node.user_properties[1:] for entry in value]
+    assert [action for action, _, _, _ in replayed].count("miss") == 1
+    assert lines[0].startswith(f"{len(entries)} store requests through the cassette: ")
+    assert lines[-1].endswith("1x GET /demo/index.php?route=product/search&search=never @")
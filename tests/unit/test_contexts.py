@@ -0,0 +1,198 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import (NoSuchElementException, StaleElementReferenceException,
+                                        WebDriverException)
+from selenium.webdriver import ChromeOptions
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from framework import contexts
+from framework.matrix import BrowserConfig
+
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+
+
+def frame(opcode, payload, fin=True):
+    """An unmasked server frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", (0x80 if fin else 0) | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", (0x80 if fin else 0) | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", (0x80 if fin else 0) | opcode, 127, length)
+    return header + payload
+
+
+async def client_frame(reader):
+    """(opcode, unmasked payload) of the next frame the client sent."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+
+async def fake_devtools(reader, writer, seen):
+    """Answers two commands out of order: the second in fragments after a ping, the first with an error."""
+    request = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    key = next(line.split(":", 1)[1].strip() for line in request.split("\r\n")
+               if line.lower().startswith("sec-websocket-key"))
+    seen.append(any(line.lower().startswith("origin:") for line in request.split("\r\n")))
+    accept = base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+    writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1"))
+    first, second = [json.loads((await client_frame(reader))[1]) for _ in range(2)]
+    seen.extend([first, second])
+    big = json.dumps({"id": second["id"], "result": {"data": "x" * 70000}}).encode()
+    writer.write(frame(OP_PING, b"hi"))
+    # 16-bit length, then 64-bit length in a continuation frame
+    writer.write(frame(OP_TEXT, big[:300], fin=False) + frame(OP_CONTINUATION, big[300:]))
+    writer.write(frame(OP_TEXT, json.dumps({"method": "Page.frameStoppedLoading", "sessionId": "S",
+                                            "params": {"frameId": "F"}}).encode()))
+    writer.write(frame(OP_TEXT, json.dumps({"id": first["id"], "error": {"message": "no"}}).encode()))
+    seen.append(await client_frame(reader))
+    writer.write(frame(OP_CLOSE, struct.pack("!H", 1000)))
+    await writer.drain()
+
+
+def test_devtools_commands_share_one_websocket():
+    async def scenario():
+        seen = []
+        server = await asyncio.start_server(lambda r, w: fake_devtools(r, w, seen), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        browser = await contexts.CdpBrowser.connect(f"ws://127.0.0.1:{port}/devtools/browser/1")
+        with browser.events("S", "Page.frameStoppedLoading") as stopped:
+            refused, big = await asyncio.gather(browser.send("Target.createBrowserContext"),
+                                                browser.send("Page.captureScreenshot", {"format": "png"}, "S"),
+                                                return_exceptions=True)
+            event = await asyncio.wait_for(stopped.get(), 5)
+        await asyncio.wait_for(browser.closed, 5)
+        late = await asyncio.gather(browser.send("Target.getTargets", timeout=1), return_exceptions=True)
+        await browser.close()
+        server.close()
+        return seen, refused, big, event, late[0]
+
+    seen, refused, big, event, late = asyncio.run(scenario())
+    assert seen[0] is False                 # no Origin header, or DevTools refuses the socket
+    assert [message["method"] for message in seen[1:3]] == ["Target.createBrowserContext", "Page.captureScreenshot"]
+    assert seen[2]["sessionId"] == "S" and seen[2]["params"] == {"format": "png"}
+    assert isinstance(refused, contexts.CdpError) and str(refused) == "no"
+    assert big == {"data": "x" * 70000}
+    assert event == {"frameId": "F"}
+    assert seen[3] == (OP_PONG, b"hi")
+    assert isinstance(late, contexts.CdpError)
+
+
+class FakeContext:
+    context_id = "context-1"
+    target_id = "target-1"
+
+    def __init__(self):
+        self.calls = []
+
+    async def navigate(self, url):
+        self.calls.append(("navigate", url))
+
+    async def traverse(self, delta):
+        self.calls.append(("traverse", delta))
+
+    async def call(self, script, args=(), asynchronous=False, timeout=None):
+        self.calls.append(("call", args, asynchronous))
+        if script == contexts.FIND_SCRIPT:
+            return [] if args[1] == "#missing" else [{contexts.ELEMENT_KEY: "element-1"}]
+        return {"answer": 42, "element": args[0]} if args else 42
+
+    async def click(self, element):
+        raise contexts.StaleElement("element is not attached to the page document")
+
+    async def command(self, method, params=None):
+        return {"method": method, "params": params}
+
+
+class FakeShared:
+    name = "chrome"
+    version = "130.0"
+
+    def run(self, coroutine, timeout=None):
+        return asyncio.run(coroutine)
+
+
+def test_webdriver_commands_become_context_calls():
+    context = FakeContext()
+    driver = WebDriver(command_executor=contexts.ContextExecutor(FakeShared(), context), options=ChromeOptions())
+    assert driver.session_id == "context-1" and driver.caps["browserName"] == "chrome"
+    driver.get("https://store.test/")
+    driver.back()
+    assert context.calls == [("navigate", "https://store.test/"), ("traverse", -1)]
+
+    element = driver.find_element(By.ID, "logo")
+    assert element.id == "element-1"
+    assert context.calls[-1] == ("call", ["css selector", '[id="logo"]', None], False)
+    with pytest.raises(NoSuchElementException):
+        driver.find_element(By.CSS_SELECTOR, "#missing")
+    with pytest.raises(StaleElementReferenceException):
+        element.click()
+
+    # Elements go into scripts as references and come back as WebElements
+    result = driver.execute_script("return arguments[0];", element)
+    assert result["answer"] == 42 and result["element"].id == "element-1"
+    assert context.calls[-1] == ("call", [{contexts.ELEMENT_KEY: "element-1"}], False)
+    assert driver.execute_async_script("arguments[0](42);") == 42
+    assert context.calls[-1] == ("call", [], True)
+    assert driver.execute_cdp_cmd("Emulation.setLocaleOverride", {"locale": "de-DE"}) == \
+        {"method": "Emulation.setLocaleOverride", "params": {"locale": "de-DE"}}
+    assert driver.window_handles == ["target-1"]
+    with pytest.raises(WebDriverException, match="not available on a browsing context"):
+        driver.fullscreen_window()
+
+
+def item(name, argnames, marked=True, browser_config=None):
+    params = {"browser_config": browser_config} if browser_config is not None else None
+    return SimpleNamespace(
+        nodeid=name, _fixtureinfo=SimpleNamespace(argnames=tuple(argnames)),
+        get_closest_marker=lambda marker: object() if marked and marker == contexts.MARKER else None,
+        **({"callspec": SimpleNamespace(params=params)} if params is not None else {}),
+    )
+
+
+def test_read_only_tests_on_chromium_are_picked():
+    firefox = BrowserConfig("firefox", "desktop", 1920, 1080, "en-GB", 100)
+    edge = BrowserConfig("edge", "tablet", 768, 1024, "de-DE", 125)
+    assert contexts.is_candidate(item("a", ["driver", "base_url"]))
+    assert contexts.is_candidate(item("b", ["matrix_driver", "base_url", "browser_config", "visual_check"],
+                                      browser_config=edge))
+    assert not contexts.is_candidate(item("c", ["matrix_driver", "browser_config"], browser_config=firefox))
+    assert not contexts.is_candidate(item("d", ["driver", "base_url"], marked=False))
+    # Fixtures with state of their own (sessions, probes) keep a test on a leased browser
+    assert not contexts.is_candidate(item("e", ["logged_in_driver"]))
+    assert not contexts.is_candidate(item("f", ["driver", "perf_probe"]))
+    assert not contexts.is_candidate(item("g", ["base_url"]))
+
+
+def test_summary_compares_the_batch_with_one_test_per_browser():
+    entries = [{"test": f"t{index}", "browser": "chrome", "contexts": 3, "batch": "1-1", "seconds": seconds,
+                "wall": 5.0} for index, seconds in enumerate((4.0, 5.0, 3.0, 3.0))]
+    lines = contexts.summary_lines(entries, {"t0": 3.0, "t1": 4.0, "t2": 2.5, "t3": 2.5},
+                                   {"edge": "ContextsUnsupported: edge has no DevTools endpoint (debuggerAddress)"})
+    assert lines == [
+        "chrome: 4 read-only tests on 3 browsing contexts of one browser in 5.0s wall "
+        "(15.0s of test time, 3.0 running at once on average)",
+        "  one test per browser they take 12.0s (history medians): 2.4x the throughput",
+        "edge: no browsing contexts (ContextsUnsupported: edge has no DevTools endpoint (debuggerAddress)); "
+        "its read-only tests ran one per browser",
+    ]
+    assert contexts.summary_lines(entries, {"t0": 3.0})[1] == \
+        "  no duration history for 3 of them; one at a time they would take at most 15.0s: 3.0x the throughput"
@@ -0,0 +1,77 @@
+import pytest
+
+from framework.covering import covering_array, full_product, uncovered
+from framework.matrix import BrowserConfig, apply_config, plan_matrix
+
+PARAMETERS = {
+    "browser": ["chrome", "firefox", "edge"],
+    "device": ["desktop", "tablet", "mobile", "large-desktop"],
+    "orientation": ["landscape", "portrait"],
+    "locale": ["en-GB", "de-DE", "ja-JP"],
+    "zoom": [100, 125],
+}
+
+
+def landscape_desktops(row):
+    return not (row.get("device") in ("desktop", "large-desktop") and row.get("orientation") == "portrait")
+
+
+@pytest.mark.parametrize("strength", [2, 3])
+def test_covering_array_covers_every_combination(strength):
+    rows = covering_array(PARAMETERS, strength)
+    assert uncovered(rows, PARAMETERS, strength) == []
+    assert len(rows) < len(full_product(PARAMETERS))
+
+
+def test_pairwise_is_far_smaller_than_the_full_product():
+    rows = covering_array(PARAMETERS, 2, landscape_desktops)
+    assert uncovered(rows, PARAMETERS, 2, landscape_desktops) == []
+    assert all(landscape_desktops(row) for row in rows)
+    assert len(full_product(PARAMETERS, landscape_desktops)) == 108
+    assert len(rows) <= 16
+
+
+def test_strength_at_least_parameter_count_is_the_full_product():
+    parameters = {"a": [1, 2], "b": ["x", "y", "z"]}
+    assert len(covering_array(parameters, 3)) == 6
+
+
+def test_plan_groups_configurations_by_browser():
+    plan = plan_matrix(["chrome", "firefox"], locales=["en-GB", "de-DE"], zooms=[100, 125])
+    browsers = [config.browser for config in plan.configs]
+    assert browsers == sorted(browsers, key=["chrome", "firefox"].index)
+    assert plan.launches(max_uses=25) == 2
+    assert plan.launches(max_uses=1) == len(plan.configs)
+    assert len(plan.configs) < plan.full_size
+
+
+def test_plan_limits_viewports_to_the_marker():
+    plan = plan_matrix(["chrome"], ["mobile-landscape", "tablet"], coverage="full")
+    assert {config.viewport for config in plan.configs} == {"mobile-landscape", "tablet"}
+    assert plan.full_size == len(plan.configs) == 2
+
+
+def test_plan_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        plan_matrix(["safari"])
+    with pytest.raises(ValueError):
+        plan_matrix(["chrome"], ["watch"])
+
+
+def test_config_name_and_css_width():
+    config = BrowserConfig("chrome", "tablet", 768, 1024, "de-DE", 125)
+    assert str(config) == "chrome-tablet-de-DE-125%"
+    assert config.css_width == 614
+    assert str(BrowserConfig("chrome", "tablet", 768, 1024)) == "chrome-tablet"
+
+
+class SizedOnlyDriver:
+    def set_window_size(self, width, height):
+        self.size = (width, height)
+
+
+def test_apply_config_reports_what_needs_cdp():
+    driver = SizedOnlyDriver()
+    assert apply_config(driver, BrowserConfig("firefox", "mobile", 375, 667)) == []
+    assert apply_config(driver, BrowserConfig("firefox", "mobile", 375, 667, "ja-JP", 125)) == ["locale", "zoom"]
+    assert driver.size == (375, 667)
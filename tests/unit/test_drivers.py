@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from framework.drivers import DriverResolutionError, DriverResolver, parse_driver_paths
+
+
+@pytest.fixture
+def driver_binary(tmp_path):
+    path = tmp_path / "chromedriver"
+    path.write_text("")
+    return str(path)
+
+
+def make_resolver(tmp_path, driver_binary, version="131.0.6778", **kwargs):
+    installs = []
+
+    def installer(browser):
+        installs.append(browser)
+        return driver_binary
+
+    resolver = DriverResolver(
+        cache_dir=str(tmp_path / "cache"),
+        version_lookup=lambda browser: version,
+        installer=installer,
+        **kwargs,
+    )
+    return resolver, installs
+
+
+def test_first_resolution_downloads_and_locks(tmp_path, driver_binary):
+    resolver, installs = make_resolver(tmp_path, driver_binary)
+    assert resolver.resolve("chrome") == driver_binary
+    assert installs == ["chrome"]
+    lock = json.loads((tmp_path / "cache" / "drivers.lock.json").read_text())
+    assert lock["chrome@131.0.6778"]["path"] == driver_binary
+    assert resolver.resolutions["chrome"].source == "download"
+
+
+def test_resolution_is_memoized_per_session(tmp_path, driver_binary):
+    resolver, installs = make_resolver(tmp_path, driver_binary)
+    resolver.resolve("chrome")
+    resolver.resolve("chrome")
+    assert installs == ["chrome"]
+
+
+def test_lockfile_hit_skips_installer(tmp_path, driver_binary):
+    make_resolver(tmp_path, driver_binary)[0].resolve("chrome")
+    resolver, installs = make_resolver(tmp_path, driver_binary)
+    assert resolver.resolve("chrome") == driver_binary
+    assert installs == []
+    assert resolver.resolutions["chrome"].source == "lockfile"
+
+
+def test_new_browser_version_misses_lockfile(tmp_path, driver_binary):
+    make_resolver(tmp_path, driver_binary)[0].resolve("chrome")
+    resolver, installs = make_resolver(tmp_path, driver_binary, version="132.0.1")
+    resolver.resolve("chrome")
+    assert installs == ["chrome"]
+
+
+def test_offline_without_cache_fails_clearly(tmp_path, driver_binary):
+    resolver, installs = make_resolver(tmp_path, driver_binary, offline=True)
+    with pytest.raises(DriverResolutionError, match="--driver-path chrome=PATH"):
+        resolver.resolve("chrome")
+    assert installs == []
+
+
+def test_offline_uses_provisioned_binary(tmp_path, driver_binary):
+    resolver, installs = make_resolver(
+        tmp_path, driver_binary, offline=True, provisioned={"chrome": driver_binary}
+    )
+    assert resolver.resolve("chrome") == driver_binary
+    assert resolver.resolutions["chrome"].source == "provisioned"
+
+
+def test_unknown_version_falls_back_to_newest_entry(tmp_path, driver_binary):
+    make_resolver(tmp_path, driver_binary)[0].resolve("chrome")
+    resolver, installs = make_resolver(tmp_path, driver_binary, version=None, offline=True)
+    assert resolver.resolve("chrome") == driver_binary
+
+
+def test_parse_driver_paths():
+    assert parse_driver_paths(["chrome=/opt/cd", "edge=/opt/ed"]) == {"chrome": "/opt/cd", "edge": "/opt/ed"}
+    with pytest.raises(ValueError):
+        parse_driver_paths(["safari=/opt/sd"])
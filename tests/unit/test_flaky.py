@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from framework import flaky
+from framework.history import HistoryStore
+
+TESTS_DIR = Path(__file__).resolve().parent.parent
+
+SUITE = '''
+import os
+from pathlib import Path
+
+ATTEMPTS = Path(os.environ["FLAKY_ATTEMPTS"])
+
+
+def test_passes_on_a_rerun():
+    attempts = int(ATTEMPTS.read_text()) if ATTEMPTS.exists() else 0
+    ATTEMPTS.write_text(str(attempts + 1))
+    assert attempts, "HomePage.show_all_desktops not found"
+
+
+def test_always_fails():
+    assert 1 == 2
+
+
+def test_passes():
+    pass
+'''
+
+
+def runs(*outcomes):
+    return [(outcome, 1.0, None) for outcome in outcomes]
+
+
+def test_flake_score_separates_flaky_from_broken():
+    assert flaky.flake_score(runs("passed") * 10) == 0.0
+    # Broke once and stayed broken: one flip
+    assert flaky.flake_score(runs("failed", "failed", "failed", "passed", "passed")) == 0.2
+    assert flaky.flake_score(runs("passed", "failed", "passed", "skipped", "failed")) == 0.75
+    assert flaky.flake_score(runs("flaky", "passed", "passed", "passed")) == 0.25
+    assert flaky.is_broken(runs("failed", "skipped", "failed", "failed", "passed"))
+    assert not flaky.is_broken(runs("failed", "failed"))
+
+
+def test_retry_budget_covers_expected_spurious_failures():
+    assert flaky.retry_budget([0.0] * 50) == flaky.MIN_BUDGET
+    # 20 tests at 0.25: 5 expected, SD ~1.94
+    assert flaky.retry_budget([0.25] * 20) == 9
+
+
+def test_failure_site_prefers_the_timed_out_wait():
+    crash = SimpleNamespace(message="assert 1 == 2", path="/x/test_04.py", lineno=56)
+    report = SimpleNamespace(longrepr=SimpleNamespace(reprcrash=crash))
+    assert flaky.failure_site(report) == "AssertionError at test_04.py:56"
+    assert flaky.failure_site(report, [("HomePage.cart", 0.1, True), ("ProductPage.alert", 10.0, False)]) == \
+        "wait ProductPage.alert"
+    crash.message = "LookupError: CategoryPage.compare_buttons[0] is not on the page"
+    assert flaky.failure_site(report) == "locator CategoryPage.compare_buttons"
+
+
+def test_reruns_then_quarantine(tmp_path):
+    (tmp_path / "test_suite.py").write_text(SUITE)
+    history = tmp_path / "history.sqlite3"
+
+    def run():
+        return subprocess.run(
+            [sys.executable, "-m", "pytest", "-p", "conftest", "-p", "no:cacheprovider", str(tmp_path),
+             f"--history={history}", "--retry-budget=3", "--rootdir", str(tmp_path)],
+            cwd=TESTS_DIR, capture_output=True, text=True,
+            env=dict(os.environ, FLAKY_ATTEMPTS=str(tmp_path / "attempts")),
+        )
+
+    result = run()
+    assert result.returncode == 1, result.stdout
+    assert "3 reruns in fresh browsers (retry budget 3, used up): 1 of 2 failed tests passed on a rerun" \
+        in result.stdout
+    assert "1x  locator HomePage.show_all_desktops  (1 tests)" in result.stdout
+    store = HistoryStore(history)
+    assert {nodeid.split("::")[1]: entries[0][0] for nodeid, entries in store.recent().items()} == \
+        {"test_passes_on_a_rerun": "flaky", "test_always_fails": "failed", "test_passes": "passed"}
+
+    # A test that keeps flipping is quarantined: it still runs, but no longer fails the run
+    for outcome in ("failed", "passed", "failed", "passed"):
+        store.append_run([("test_suite.py::test_always_fails", outcome, 0.0, 0.1, 0.0, None, False)])
+    store.close()
+    result = run()
+    assert result.returncode == 0, result.stdout
+    assert "1 quarantined (flake score >= 0.30), 1 of them failed and were reported as xfail" in result.stdout
+    assert "1x  AssertionError at test_suite.py:15  (1 tests)" in result.stdout
+    store = HistoryStore(history)
+    assert store.recent(["test_suite.py::test_always_fails"])["test_suite.py::test_always_fails"][0][0] == "failed"
+    store.close()
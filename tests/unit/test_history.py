@@ -0,0 +1,71 @@
+import sqlite3
+
+from framework.history import HistoryStore, median_durations, regression, schedule
+
+
+def test_store_is_append_only_and_newest_first(tmp_path):
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    store.append_run([("t::a", "passed", 0.1, 2.0, 0.1, 40, False), ("t::b", "passed", 0.0, 1.0, 0.0, None, False)])
+    store.append_run([("t::a", "failed", 0.1, 5.0, 0.1, 90, False)])
+    store.close()
+
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    assert store.runs() == 2
+    history = store.recent()
+    assert [outcome for outcome, _, _ in history["t::a"]] == ["failed", "passed"]
+    assert history["t::a"][1] == ("passed", 2.2, 40)
+    assert list(store.recent(["t::b"])) == ["t::b"]
+
+
+def test_shared_context_runs_count_for_outcomes_not_durations(tmp_path):
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    store.append_run([("t::a", "passed", 0.0, 2.0, 0.0, None, False), ("t::b", "passed", 0.0, 1.0, 0.0, None, False)])
+    for _ in range(5):
+        store.append_run([("t::a", "passed", 0.0, 8.0, 0.0, None, True), ("t::b", "failed", 0.0, 4.0, 0.0, None, True)])
+    history = store.recent()
+    store.close()
+    assert [outcome for outcome, _, _ in history["t::b"]] == ["failed"] * 5 + ["passed"]
+    # Medians (sharding, the --contexts baseline) and regressions only see solo runs
+    assert median_durations(history) == {"t::a": 2.0, "t::b": 1.0}
+    assert median_durations({"t::c": [("passed", None, None)]}) == {}
+    assert regression(9.0, history["t::a"][:5]) is None      # five shared-context runs: no baseline
+
+
+def test_databases_without_the_contexts_column_are_upgraded(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    old = sqlite3.connect(str(path))
+    old.executescript("""
+        CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL NOT NULL, workers INTEGER NOT NULL);
+        CREATE TABLE results (run_id INTEGER NOT NULL, nodeid TEXT NOT NULL, outcome TEXT NOT NULL,
+                              setup REAL NOT NULL, call REAL NOT NULL, teardown REAL NOT NULL, commands INTEGER);
+        INSERT INTO runs (started, workers) VALUES (0, 0);
+        INSERT INTO results VALUES (1, 't::a', 'passed', 0, 3.0, 0, NULL);
+    """)
+    old.close()
+    store = HistoryStore(path)
+    store.append_run([("t::a", "passed", 0.0, 9.0, 0.0, None, True)])
+    assert median_durations(store.recent()) == {"t::a": 3.0}
+    store.close()
+
+
+def test_schedule_failed_first_then_longest_first():
+    history = {
+        "checkout": [("passed", 60.0, None)],
+        "flaky": [("failed", 1.0, None), ("passed", 1.0, None)],
+        "fixed": [("passed", 2.0, None), ("failed", 2.0, None)],
+        "search": [("passed", 5.0, None)],
+    }
+    order = schedule(["search", "fixed", "new", "checkout", "flaky"], history)
+    assert order[0] == "flaky"
+    assert order[1] == "checkout"
+    # Unknown tests sit at the median of the known ones
+    assert order.index("new") < order.index("fixed")
+
+
+def test_regression_needs_history_and_a_real_slowdown():
+    stable = [("passed", seconds, None) for seconds in (2.0, 2.1, 1.9, 2.0, 2.2, 2.05)]
+    assert regression(9.0, stable[:4]) is None           # too few runs to judge
+    assert regression(2.4, stable) is None               # within the noise
+    assert regression(4.0, stable) is not None
+    # Failed runs are not part of the baseline
+    assert regression(4.0, stable + [("failed", 10.0, None)] * 10) is not None
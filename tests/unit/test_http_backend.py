@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from framework import scenarios
+from framework.http_backend import PageParser, StoreClient, make_adapter
+from framework.standin import StandInServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def adapter():
+    adapter = make_adapter()
+    yield adapter
+    adapter.close()
+
+
+@pytest.fixture
+def client(server, adapter):
+    client = StoreClient(server.base_url, adapter=adapter)
+    yield client
+    client.close()
+
+
+def parse(html):
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def test_parser_reads_alerts_inputs_and_links():
+    parser = parse(
+        '<title>Cart</title><div id="content"><div class="alert alert-success">Success: <a href="x">MacBook</a> '
+        'added!</div><input name="quantity[43]" value="2"><a href="p">MacBook <b>Air</b></a><br></div>'
+    )
+    assert parser.title == "Cart"
+    assert parser.alerts == [("success", "Success: MacBook added!")]
+    assert parser.inputs == {"quantity[43]": "2"}
+    assert ("MacBook Air", "p") in parser.links
+    assert "content" in parser.ids
+
+
+@pytest.mark.parametrize("scenario", [
+    scenarios.cart_lifecycle,
+    scenarios.session_timeout,
+    scenarios.protected_page_redirect,
+    scenarios.failed_login,
+])
+def test_scenarios_pass_against_standin(client, scenario):
+    assert scenario(client)
+
+
+def test_zero_quantity_adds_nothing(client):
+    client.add_to_cart(43, 0)
+    assert client.alerts("success")
+    assert client.cart_items() == {}
+
+
+def test_clients_share_the_pool_but_not_the_session(server, adapter):
+    first, second = StoreClient(server.base_url, adapter=adapter), StoreClient(server.base_url, adapter=adapter)
+    first.add_to_cart(43)
+    assert first.cart_items() and second.cart_items() == {}
+    assert first.session.get_adapter(server.base_url) is second.session.get_adapter(server.base_url)
+
+
+def test_scenarios_are_cheap_enough_to_repeat(server, adapter):
+    start = time.perf_counter()
+    for _ in range(50):
+        client = StoreClient(server.base_url, adapter=adapter)
+        scenarios.cart_lifecycle(client)
+    # Roughly 8 requests each; a browser would need seconds per run
+    assert time.perf_counter() - start < 10
+
+
+def test_fork_copies_the_session_and_then_diverges(client):
+    client.add_to_cart(scenarios.MACBOOK)
+    clone = client.fork()
+    assert clone.cart_items() == client.cart_items()
+    clone.remove(next(iter(clone.cart_items())))
+    assert clone.cart_items() == {}
+    assert list(client.cart_items().values()) == [1]
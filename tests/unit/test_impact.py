@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+from selenium.webdriver.remote.command import Command
+
+from framework import impact
+from framework.standin import StandInServer
+
+HTML = """<html><head><title>Cart</title></head><body>
+<div id="logo"><a href="http://store/demo/index.php?route=common/home">Your Store</a></div>
+<div id="content"><h1>Shopping Cart</h1>
+<ul class="list-unstyled"><li>Brand</li><li>Code</li><li>In Stock</li></ul>
+<form><input type="text" name="quantity[7]" value="2"><button type="submit" class="btn btn-primary">Update</button></form>
+<p>Your shopping cart is empty!</p>
+<a href="#">Checkout</a></div></body></html>"""
+
+
+def test_page_key_keeps_content_params_only():
+    assert impact.page_key("http://store/index.php?route=product/product&product_id=43&language=en-gb") == \
+        "route=product/product&product_id=43"
+    assert impact.page_key("http://store/demo/") == "route=common/home"
+    assert impact.page_key("about:blank") is None
+
+
+def test_locators_match_server_html():
+    root = impact.parse_document(HTML)
+
+    def count(by, selector):
+        nodes = impact.select(root, by, selector)
+        return None if nodes is None else len(nodes)
+
+    assert count("id", "logo") == 1
+    assert count("css selector", "input[name^='quantity']") == 1
+    assert count("css selector", "#content > h1") == 1
+    assert count("css selector", ".list-unstyled li:nth-child(3)") == 1
+    assert count("css selector", "form button[type='submit'].btn-primary") == 1
+    assert count("css selector", '[id="logo"] a, h1') == 2
+    assert count("link text", "Checkout") == 1
+    assert count("xpath", "//*[contains(text(), 'Your shopping cart is empty!')]") == 1
+    # Outside the subset: fingerprinted as the whole body
+    assert count("css selector", "li:first-child") is None
+    assert count("xpath", "//div[@id='content']") is None
+
+
+def test_fingerprint_covers_only_the_matched_subtree():
+    locators = [["id", "logo"], ["css selector", ".list-unstyled li:nth-child(3)"]]
+    before = impact.fingerprint_page(200, HTML, "http://store/demo/", locators)
+    restock = impact.fingerprint_page(200, HTML.replace("In Stock", "Out Of Stock"), "http://store/demo/", locators)
+    moved = impact.fingerprint_page(200, HTML.replace("http://store/demo", "http://127.0.0.1:9/demo"),
+                                    "http://127.0.0.1:9/demo/", locators)
+    assert before["id=logo"] == restock["id=logo"]
+    assert before["css selector=.list-unstyled li:nth-child(3)"] != \
+        restock["css selector=.list-unstyled li:nth-child(3)"]
+    assert moved == before
+
+
+def test_standin_fingerprints_are_stable_across_runs():
+    pages = {"route=product/product&product_id=43": [["id", "button-cart"], ["tag name", "h1"]]}
+    runs = []
+    for _ in range(2):
+        with StandInServer() as server:
+            runs.append(impact.fetch_fingerprints(server.base_url, pages))
+    assert runs[0] == runs[1]
+    assert runs[0]["route=product/product&product_id=43"]["status"] == "200"
+
+
+def test_index_reasons_and_round_trip(tmp_path):
+    index = impact.ImpactIndex(tmp_path / "index.json", "fw", {
+        "t::a": {"outcome": "passed", "module": "m1", "pages": {"route=checkout/cart": {"status": "200", "id=x": "1"}}},
+        "t::b": {"outcome": "failed", "module": "m1", "pages": {}},
+        "t::c": {"outcome": "passed", "module": "m1", "pages": {}},
+    })
+    index.save()
+    index = impact.ImpactIndex.load(tmp_path / "index.json")
+    current = {"route=checkout/cart": {"status": "200", "id=x": "1"}}
+    assert index.reason("t::a", "m1", current) is None
+    assert index.reason("t::a", "m2", current) == "module changed"
+    assert index.reason("t::a", "m1", {"route=checkout/cart": {"status": "200", "id=x": "2"}}) == \
+        "route=checkout/cart changed"
+    assert index.reason("t::b", "m1", current) == "last run failed"
+    assert index.reason("t::c", "m1", current) == "no pages recorded"
+    assert index.reason("t::new", "m1", current) == "new"
+    assert index.locators(["t::a", "t::b"]) == {"route=checkout/cart": [["id", "x"]]}
+
+
+class FakeDriver:
+    def execute(self, command, params=None):
+        return {"value": None}
+
+
+def test_record_collects_pages_and_raw_lookups():
+    request = SimpleNamespace(config=SimpleNamespace(getoption=lambda name: "record"),
+                              node=SimpleNamespace(user_properties=[]))
+    driver = FakeDriver()
+    with impact.record(request, driver):
+        driver.execute(Command.GET, {"url": "http://store/index.php?route=checkout/cart"})
+        driver.execute(Command.FIND_ELEMENT, {"using": "css selector", "value": "#content"})
+        impact.touch("http://store/index.php?route=product/product&product_id=43", "id", "button-cart")
+    impact.touch("http://store/", "id", "logo")    # not recording any more
+    assert "execute" not in driver.__dict__
+    assert request.node.user_properties == [(impact.PROPERTY, {
+        "route=checkout/cart": [["css selector", "#content"]],
+        "route=product/product&product_id=43": [["id", "button-cart"]],
+    })]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from framework.load import (
+    AsyncConnectionPool, Histogram, LoadProfile, LoadReport, VirtualUser, cart_flow, response_json, run_load,
+    write_report,
+)
+from framework.standin import StandInServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+def test_histogram_percentiles_within_precision():
+    histogram = Histogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert histogram.count == 1000
+    assert histogram.max == 1.0 and histogram.min == 0.001
+    for pct, expected in ((50, 0.5), (90, 0.9), (99, 0.99)):
+        assert abs(histogram.percentile(pct) - expected) <= expected * 2 / histogram.sub_buckets
+    # Constant memory: far fewer buckets than samples
+    assert len(histogram.counts) < 300
+
+
+def test_histogram_merge_and_distribution():
+    first, second = Histogram(), Histogram()
+    for value in (0.001, 0.002):
+        first.record(value)
+    second.record(0.5)
+    first.merge(second)
+    assert first.count == 3 and first.max == 0.5 and first.min == 0.001
+    assert sum(count for _, count in first.distribution()) == 3
+
+
+def test_profile_windows_first_in_last_out():
+    profile = LoadProfile(4, ramp_up=4, hold=10, ramp_down=4)
+    windows = [profile.window(index) for index in range(4)]
+    assert [start for start, _ in windows] == [0, 1, 2, 3]
+    assert [stop for _, stop in windows] == [18, 17, 16, 15]
+    assert profile.duration == 18
+    assert LoadProfile.parse(20, "1,2,3") == LoadProfile(20, 1.0, 2.0, 3.0)
+    with pytest.raises(ValueError):
+        LoadProfile.parse(20, "1,2")
+
+
+def test_virtual_users_keep_sessions_and_share_connections(server):
+    async def scenario():
+        pool = AsyncConnectionPool(limit=2)
+        report = LoadReport(LoadProfile(2))
+        users = [VirtualUser(server.base_url, pool, report) for _ in range(2)]
+        await asyncio.gather(*(cart_flow(user) for user in users))
+        cart = await users[0].transaction("cart-view", "GET", "checkout/cart")
+        pool.close()
+        return pool, report, users, cart
+
+    pool, report, users, cart = asyncio.run(scenario())
+    assert users[0].cookies != users[1].cookies
+    assert not report.errors
+    # cart_flow removes what it added; the redirect after cart-update was followed
+    assert b'name="quantity[' not in cart.body
+    assert pool.opened <= 2 and pool.reused >= report.total - 2
+
+
+def test_failed_checks_count_as_errors(server):
+    async def scenario():
+        pool = AsyncConnectionPool()
+        report = LoadReport(LoadProfile(1))
+        user = VirtualUser(server.base_url, pool, report)
+        response = await user.transaction("add-to-cart", "POST", "checkout/cart/add", {"product_id": 999999},
+                                          check=lambda response: "error" not in response_json(response))
+        pool.close()
+        return report, response
+
+    report, response = asyncio.run(scenario())
+    assert response.status == 200
+    assert report.errors["add-to-cart"] == 1
+
+
+@pytest.mark.parametrize("answer", [
+    b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\ntruncated",     # readexactly: IncompleteReadError
+    b"garbage\r\n\r\n",                                                # no status code to split out
+])
+def test_broken_responses_count_as_errors(answer):
+    async def broken(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(answer)
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        upstream = await asyncio.start_server(broken, "127.0.0.1", 0)
+        pool = AsyncConnectionPool()
+        report = LoadReport(LoadProfile(1))
+        user = VirtualUser(f"http://127.0.0.1:{upstream.sockets[0].getsockname()[1]}/", pool, report)
+        response = await user.transaction("home", "GET", "common/home")
+        pool.close()
+        upstream.close()
+        return report, response
+
+    report, response = asyncio.run(scenario())
+    assert isinstance(response, Exception)
+    assert report.errors["home"] == 1
+
+
+def test_run_load_ramps_users_and_writes_report(server, tmp_path):
+    report = run_load(server.base_url, LoadProfile(3, ramp_up=0.2, hold=0.3, ramp_down=0.2))
+    assert report.peak_users == 3
+    assert report.iterations > 0 and report.throughput > 0
+    assert {"add-to-cart", "checkout-confirm", "wishlist-add"} <= set(report.histograms)
+    assert not report.errors
+    path = tmp_path / "load.json"
+    write_report(path, [report])
+    data = json.loads(path.read_text())[0]
+    assert data["transactions"]["add-to-cart"]["count"] == report.histograms["add-to-cart"].count
+    assert any("wishlist-add" in line for line in report.summary_lines())
@@ -0,0 +1,139 @@
+import pytest
+
+from framework.model import ForkUnsupported, StateMachine, Transition, build_prefix_tree, execute, generate_paths
+
+
+class Counter:
+    """Backend whose state is a single integer; fork optionally unsupported."""
+
+    def __init__(self, forkable=True):
+        self.value = 0
+        self.forkable = forkable
+        self.actions = 0
+
+    def fork(self):
+        if not self.forkable:
+            raise ForkUnsupported()
+        copy = Counter()
+        copy.value = self.value
+        return copy
+
+
+def step(delta):
+    def action(backend, context):
+        backend.value += delta
+        backend.actions += 1
+    return action
+
+
+def reset(backend, context):
+    backend.value = 0
+
+
+def value_matches(backend, context):
+    assert backend.value == context["value"]
+
+
+def model():
+    def add(delta):
+        return lambda ctx: {"value": ctx["value"] + delta}
+    return StateMachine(
+        "counter",
+        initial="Zero",
+        context={"value": 0},
+        transitions=[
+            Transition("inc", "Zero", "One", step(1), effect=add(1)),
+            Transition("dec", "One", "Zero", step(-1), effect=add(-1)),
+            Transition("inc", "One", "Many", step(1), effect=add(1)),
+            Transition("inc", "Many", "Many", step(1), guard=lambda ctx: ctx["value"] < 3, effect=add(1)),
+            Transition("reset", "Many", "Zero", reset, effect=lambda ctx: {"value": 0}),
+        ],
+        invariants={"Zero": lambda backend, ctx: None, "One": value_matches, "Many": value_matches},
+    )
+
+
+def covered(plan, requirement):
+    keys = [t.key for t in requirement]
+    return any(
+        [t.key for t in path[i:i + len(keys)]] == keys
+        for path in plan.paths for i in range(len(path))
+    )
+
+
+@pytest.mark.parametrize("criterion", ["all-states", "all-transitions", "1-switch"])
+def test_generated_paths_meet_criterion(criterion):
+    machine = model()
+    plan = generate_paths(machine, criterion)
+    if criterion == "all-transitions":
+        assert all(covered(plan, [t]) for t in machine.transitions)
+    if criterion == "1-switch":
+        feasible = [list(pair) for pair in machine.switch_pairs() if list(pair) not in plan.infeasible]
+        assert all(covered(plan, pair) for pair in feasible)
+    assert {t.target for path in plan.paths for t in path} | {machine.initial} == set(machine.states)
+
+
+def test_guard_makes_pairs_infeasible_instead_of_failing():
+    plan = generate_paths(model(), "1-switch")
+    keys = [[t.name for t in req] for req in plan.infeasible]
+    # inc, inc on Many needs value < 3 twice, from value 2
+    assert ["inc", "inc"] in keys
+
+
+def test_unknown_criterion():
+    with pytest.raises(ValueError):
+        generate_paths(model(), "all-paths")
+
+
+def test_duplicate_transitions_rejected():
+    with pytest.raises(ValueError):
+        StateMachine("dup", "A", [Transition("go", "A", "B", None), Transition("go", "A", "B", None)])
+
+
+def test_prefix_tree_shares_common_prefixes():
+    a, b, c = (Transition(name, "S", "S", None) for name in "abc")
+    root = build_prefix_tree([[a, b], [a, c]])
+    assert len(root.children) == 1
+    assert [node.transition for node in root.children[0].children] == [b, c]
+
+
+def test_execute_forks_at_branches_and_checks_invariants():
+    machine = model()
+    plan = generate_paths(machine, "1-switch")
+    report = execute(machine, plan, Counter)
+    assert report.visited_states == set(machine.states)
+    assert len(report.covered_transitions) == len(machine.transitions)
+    assert report.replayed_actions == 0
+    assert report.executed_actions == sum(len(path) for path in plan.paths) - _shared(plan.paths)
+    assert report.saved_actions > 0
+
+
+def test_execute_replays_prefix_when_fork_unsupported():
+    machine = model()
+    plan = generate_paths(machine, "1-switch")
+    report = execute(machine, plan, lambda: Counter(forkable=False))
+    assert report.forks == 0
+    if len(plan.paths) > 1:
+        assert report.replayed_actions > 0
+    assert len(report.covered_transitions) == len(machine.transitions)
+
+
+def test_invariant_failures_propagate():
+    machine = model()
+    broken = StateMachine(
+        "broken", machine.initial, machine.transitions,
+        invariants={"One": lambda backend, ctx: pytest.fail("One is broken")}, context={"value": 0},
+    )
+    with pytest.raises(pytest.fail.Exception):
+        execute(broken, generate_paths(broken), Counter)
+
+
+def _shared(paths):
+    """Transitions saved by running common prefixes once."""
+    seen, shared = set(), 0
+    for path in paths:
+        for depth in range(1, len(path) + 1):
+            prefix = tuple(t.key for t in path[:depth])
+            if prefix in seen:
+                shared += 1
+            seen.add(prefix)
+    return shared
@@ -0,0 +1,162 @@
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from framework import network
+from framework.standin import StandInServer
+
+
+@pytest.fixture
+def layer(tmp_path):
+    layer = network.NetworkLayer(str(tmp_path), mode="stub-images")
+    yield layer
+    layer.close()
+
+
+def fake_request(visual=False):
+    return SimpleNamespace(node=SimpleNamespace(
+        user_properties=[], get_closest_marker=lambda name: object() if visual and name == "visual" else None))
+
+
+def test_cache_stores_each_body_once_and_expires(tmp_path):
+    cache = network.AssetCache(str(tmp_path))
+    cache.put("https://cdn.example.test/a.css", "text/css", b"body{}")
+    cache.put("https://cdn.example.test/a.css?v=2", "text/css", b"body{}")
+    assert len(list((tmp_path / "objects").rglob("*"))) == 2       # one shard directory, one object
+    assert cache.get("https://cdn.example.test/a.css") == ("text/css", b"body{}")
+    cache.save()
+
+    # Another process's additions are merged, not overwritten
+    other = network.AssetCache(str(tmp_path))
+    other.put("https://cdn.example.test/b.js", "text/javascript", b"1;")
+    other.save()
+    again = network.AssetCache(str(tmp_path), max_age=0)
+    assert again.get("https://cdn.example.test/a.css") is None     # too old
+    assert again.size("https://cdn.example.test/b.js") == 2
+    assert len(again._index) == 3
+
+
+def test_policy(layer):
+    layer.cache.put("https://store.example.test/catalog/view/theme/stylesheet.css", "text/css", b"x")
+    decide = layer.decide
+    assert decide("GET", "https://ssl.google-analytics.com/ga.js", "Script")[0] == "block"
+    assert decide("GET", "https://store.example.test/catalog/view/theme/stylesheet.css", "Stylesheet")[0] == "cache"
+    assert decide("GET", "https://store.example.test/catalog/view/javascript/common.js", "Script")[0] == "fetch"
+    assert decide("GET", "https://store.example.test/index.php?route=common/home", "Document")[0] == "pass"
+    assert decide("GET", "http://127.0.0.1:8080/demo/catalog/view/common.js", "Script")[0] == "pass"
+    assert decide("GET", "https://store.example.test/image/catalog/macbook.jpg", "Image")[0] == "fetch"
+    layer.stub_images = True
+    assert decide("GET", "https://store.example.test/image/catalog/macbook.jpg", "Image") == \
+        ("stub", ("image/gif", network.PLACEHOLDER_GIF))
+
+
+def test_proxy_applies_the_policy(layer):
+    host, port = layer.proxy_address()
+    session = requests.Session()
+    session.trust_env = False
+    session.proxies = {"http": f"http://{host}:{port}", "https": f"http://{host}:{port}"}
+    layer.cache.put("http://cdn.example.test/app.css", "text/css", b"body{}")
+    request = fake_request()
+    with StandInServer() as server, layer.record(request):
+        assert "Your Store" in session.get(server.base_url).text
+        image = session.get(server.base_url + "image/catalog/product-43.png")
+        assert image.content == network.PLACEHOLDER_GIF
+        assert session.get("http://cdn.example.test/app.css").content == b"body{}"
+        assert session.get("http://www.google-analytics.com/analytics.js").status_code == 403
+        with pytest.raises(requests.exceptions.ProxyError):
+            session.get("https://stats.g.doubleclick.net/collect")
+    session.close()
+    (name, entries), = request.node.user_properties
+    assert name == network.PROPERTY
+    assert [entry["action"] for entry in entries] == ["stub", "cache", "block", "block"]
+
+
+class TwoCookies(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Set-Cookie", "OCSESSID=abc; path=/")
+        self.send_header("Set-Cookie", "language=en-gb; path=/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_proxy_relays_each_set_cookie_header(layer):
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), TwoCookies)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    host, port = layer.proxy_address()
+    session = requests.Session()
+    session.trust_env = False
+    session.proxies = {"http": f"http://{host}:{port}"}
+    try:
+        with layer.record(fake_request()):
+            response = session.get(f"http://127.0.0.1:{upstream.server_address[1]}/")
+    finally:
+        session.close()
+        upstream.shutdown()
+        upstream.server_close()
+    assert response.raw.headers.getlist("Set-Cookie") == ["OCSESSID=abc; path=/", "language=en-gb; path=/"]
+
+
+def test_visual_tests_keep_real_images(layer):
+    with layer.record(fake_request(visual=True)):
+        assert layer.decide("GET", "https://store.example.test/image/catalog/a.jpg", "Image")[0] == "fetch"
+    assert not layer.stub_images
+
+
+class FakeConnection:
+    def __init__(self, body=b""):
+        self.sent = []
+        self.body = body
+
+    def send(self, method, params=None, session_id=None, callback=None):
+        self.sent.append((method, params))
+        if method == "Fetch.getResponseBody":
+            callback({"body": base64.b64encode(self.body).decode(), "base64Encoded": True}, None)
+
+
+def paused(url, kind="Stylesheet", **response):
+    return dict({"requestId": "interception-job-1.0", "resourceType": kind,
+                 "request": {"url": url, "method": "GET"}}, **response)
+
+
+def test_cdp_interceptor_fills_then_serves_the_cache(layer):
+    url = "https://store.example.test/catalog/view/theme/stylesheet.css"
+    interceptor = network.CdpInterceptor(driver=None, layer=layer)
+    interceptor.connection = FakeConnection(b"body{}")
+    layer.entries = []
+
+    interceptor._paused(paused(url), "session")
+    interceptor._paused(paused(url, responseStatusCode=200,
+                               responseHeaders=[{"name": "Content-Type", "value": "text/css"}]), "session")
+    assert [method for method, _ in interceptor.connection.sent] == \
+        ["Fetch.continueRequest", "Fetch.getResponseBody", "Fetch.continueRequest"]
+    assert layer.cache.get(url) == ("text/css", b"body{}")
+
+    interceptor.connection.sent.clear()
+    interceptor._paused(paused(url), "session")
+    interceptor._paused(paused("https://www.googletagmanager.com/gtm.js", kind="Script"), "session")
+    (fulfill, params), (fail, failed) = interceptor.connection.sent
+    assert fulfill == "Fetch.fulfillRequest" and base64.b64decode(params["body"]) == b"body{}"
+    assert fail == "Fetch.failRequest" and failed["errorReason"] == "BlockedByClient"
+    assert [(entry["action"], entry["bytes"]) for entry in layer.entries] == \
+        [("fetch", 6), ("cache", 6), ("block", None)]
+
+
+def test_summary_lines():
+    entries = [
+        {"url": "https://s/a.css", "type": "Stylesheet", "action": "cache", "ms": 0.4, "bytes": 2048},
+        {"url": "https://s/b.js", "type": "Script", "action": "fetch", "ms": 120.0, "bytes": 900},
+        {"url": "https://s/c.js", "type": "Script", "action": "fetch", "ms": 40.0, "bytes": 100},
+        {"url": "https://ad/x.js", "type": "Script", "action": "block", "ms": 0.1, "bytes": None},
+    ]
+    lines = network.summary_lines(entries)
+    assert lines[0] == ("4 intercepted requests: 1 from the asset cache (2 KB saved), "
+                        "2 fetched, p50 40ms, p95 120ms, 1 blocked")
+    assert lines[2].endswith("https://s/b.js")
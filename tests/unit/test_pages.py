@@ -0,0 +1,158 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+
+from framework.commands import CommandCounter, PROPERTY, summary_lines
+from framework.pages import HomePage, ProductPage
+
+
+class FakeElement:
+    def __init__(self, driver, name, stale=False):
+        self.driver = driver
+        self.name = name
+        self.stale = stale
+
+    def _command(self, command):
+        self.driver.execute(command, {"element": self.name})
+        if self.stale:
+            raise StaleElementReferenceException(self.name)
+
+    def click(self):
+        self._command("clickElement")
+
+    def clear(self):
+        self._command("clearElement")
+
+    def send_keys(self, text):
+        self._command("sendKeysToElement")
+
+
+class FakeDriver:
+    """
+    Serves canned snapshots: ``pages`` is a list of {locator name: [state
+    values]} dicts, one per snapshot taken (the last one repeats).
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.commands = []
+        self.stale_first = set()
+
+    def execute(self, command, params=None):
+        self.commands.append(command)
+
+    def get(self, url):
+        self.execute("get", {"url": url})
+
+    def _next_page(self):
+        return self.pages.pop(0) if len(self.pages) > 1 else self.pages[0]
+
+    def execute_script(self, script, *args):
+        self.execute("executeScript")
+        return self._raw(self._next_page(), args[0])
+
+    def execute_async_script(self, script, args, slice_ms, immediate, in_page):
+        """Evaluates the in-page conditions the page objects send, in Python."""
+        self.execute("executeAsyncScript")
+        page = self._next_page()
+        states = None
+        if "locator" in args:
+            name = next(name for name, locator in args["specs"].items() if locator == args["locator"])
+            states = page.get(name, [])
+        elif "text" in args:
+            states = [state for state in page.get("links", []) if args["text"] in state[1]]
+        met = bool(states) and (not args.get("visible") and not args.get("clickable") or states[0][0])
+        return {"met": in_page and met, "waited": 0, "value": self._raw(page, args["specs"])}
+
+    def _raw(self, page, specs):
+        elements = {}
+        for name in specs:
+            elements[name] = []
+            for displayed, text, attrs in page.get(name, []):
+                element = FakeElement(self, name, stale=name in self.stale_first)
+                self.stale_first.discard(name)
+                elements[name].append([element, displayed, True, text, "", attrs])
+        return {"title": "Your Store", "url": "http://store/", "elements": elements}
+
+
+def shown(text="", **attrs):
+    return (True, text, attrs)
+
+
+def test_reads_share_one_snapshot():
+    driver = FakeDriver([{
+        "logo": [shown()], "search": [shown()], "menu": [shown()],
+        "images": [shown(alt="a"), shown(alt=None)],
+        "links": [shown("Home"), shown("", **{"aria-label": "Cart"})],
+    }])
+    home = HomePage(driver, "http://store").open()
+    assert home.wait_for("logo").displayed
+    assert home.is_displayed("search") and home.is_displayed("menu")
+    assert home.wait_for_all("images")
+    assert [img.attributes["alt"] for img in home.states("images")] == ["a", None]
+    assert [link.text or link.attributes["aria-label"] for link in home.states("links")] == ["Home", "Cart"]
+    assert home.title == "Your Store"
+    assert driver.commands == ["get", "executeAsyncScript"]
+
+
+def test_wait_snapshots_only_once_the_condition_holds():
+    driver = FakeDriver([{}, {}, {"success_alert": [shown("Success")]}])
+    product = ProductPage(driver, "http://store")
+    assert product.wait_for("success_alert").text == "Success"
+    assert driver.commands == ["executeAsyncScript"] * 3
+    assert product.snapshots == 1
+
+
+def test_wait_uses_clean_cached_snapshot_without_a_round_trip():
+    driver = FakeDriver([{"logo": [shown()], "links": [shown("MacBook Air")]}])
+    home = HomePage(driver, "http://store")
+    home.snapshot()
+    assert home.wait_for("logo").displayed
+    assert home.wait_for_link("MacBook").text == "MacBook Air"
+    assert driver.commands == ["executeScript"]
+
+
+def test_actions_reuse_handles_and_mark_reads_dirty():
+    driver = FakeDriver([{"quantity": [shown()], "add_to_cart": [shown()]}])
+    product = ProductPage(driver, "http://store").open(product_id=43)
+    product.add_to_cart(quantity="2")
+    assert driver.commands == ["get", "executeAsyncScript", "clearElement", "sendKeysToElement", "clickElement"]
+    product.is_displayed("add_to_cart")
+    assert driver.commands[-1] == "executeScript"
+
+
+def test_stale_handle_triggers_one_reread():
+    driver = FakeDriver([{"add_to_cart": [shown()]}])
+    driver.stale_first.add("add_to_cart")
+    product = ProductPage(driver, "http://store")
+    product.click("add_to_cart")
+    assert driver.commands == ["executeScript", "clickElement", "executeScript", "clickElement"]
+
+
+def test_missing_element_raises_lookup_error():
+    product = ProductPage(FakeDriver([{}]), "http://store")
+    with pytest.raises(LookupError):
+        product.click("add_to_cart")
+
+
+def test_command_counter_counts_and_detaches():
+    driver = FakeDriver([{}])
+    counter = CommandCounter(driver)
+    counter.attach()
+    driver.get("http://store")
+    ProductPage(driver, "http://store").snapshot()
+    counter.detach()
+    driver.get("http://store")
+    assert counter.total == 2
+    assert counter.commands == {"get": 1, "executeScript": 1}
+    assert "execute" not in driver.__dict__
+
+
+def test_summary_lines_reads_report_properties():
+    class Report:
+        def __init__(self, nodeid, value):
+            self.nodeid = nodeid
+            self.user_properties = [(PROPERTY, value)]
+
+    lines = summary_lines([Report("a", 4), Report("b", 10), object()])
+    assert lines[0] == "14 commands over 2 browser tests (7.0 per test)"
+    assert lines[1].endswith("b")
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from framework.matrix import build_matrix
+from framework import parallel
+from framework.parallel import ShardingPlugin, balance_shards
+
+TESTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_shards_balanced_by_duration_not_count():
+    durations = {"checkout": 60.0, "a": 10.0, "b": 10.0, "c": 10.0, "d": 10.0, "e": 10.0}
+    shards, loads = balance_shards(list(durations), durations, 2)
+    assert ["checkout"] in shards
+    assert sorted(loads) == [50.0, 60.0]
+
+
+def test_unknown_tests_use_median_duration():
+    shards, loads = balance_shards(["new", "old1", "old2"], {"old1": 2.0, "old2": 4.0}, 3)
+    assert sorted(loads) == [2.0, 3.0, 4.0]
+
+
+def test_shards_keep_collection_order():
+    nodeids = ["t1", "t2", "t3", "t4"]
+    shards, _ = balance_shards(nodeids, {}, 2)
+    for shard in shards:
+        assert shard == sorted(shard, key=nodeids.index)
+
+
+def test_matrix_is_browser_by_viewport():
+    configs = build_matrix(["chrome", "firefox"], ["tablet", "mobile"])
+    assert [str(config) for config in configs] == [
+        "chrome-tablet", "chrome-mobile", "firefox-tablet", "firefox-mobile",
+    ]
+    assert (configs[0].width, configs[0].height) == (768, 1024)
+
+
+def test_matrix_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        build_matrix(["safari"])
+    with pytest.raises(ValueError):
+        build_matrix(["chrome"], ["watch"])
+
+
+def test_workers_merge_into_one_report(tmp_path):
+    report = tmp_path / "report.xml"
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", str(TESTS_DIR / "unit" / "test_pool.py"),
+         "--workers=2", f"--junitxml={report}", "-p", "no:cacheprovider"],
+        cwd=TESTS_DIR.parent, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout
+    assert "[worker 1]" in result.stdout
+    assert 'tests="8"' in report.read_text()
+
+
+class FakeCache:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def mkdir(self, name):
+        path = self.directory / "d" / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+def controller_config(tmp_path, **options):
+    options = dict({"--workers": 2, "--worker-nodes": None, "--worker-results": None,
+                    "--visual-baselines": None}, **options)
+    return SimpleNamespace(getoption=options.__getitem__, option=SimpleNamespace(), rootpath=tmp_path,
+                           invocation_params=SimpleNamespace(args=("tests",), dir=tmp_path),
+                           cache=FakeCache(tmp_path / ".pytest_cache"))
+
+
+def test_workers_get_the_controllers_cache_locations(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(parallel.subprocess, "Popen", lambda args, **kwargs: started.append(args))
+    *_, log = ShardingPlugin(controller_config(tmp_path))._start_worker(0, ["t::a"], str(tmp_path))
+    log.close()
+    args, = started
+    assert "-p" in args and "no:cacheprovider" in args
+    assert f"--visual-baselines={tmp_path / '.pytest_cache' / 'd' / 'opencart' / 'visual-baselines'}" in args
+    assert f"--worker-auth={tmp_path / 'auth.json'}" in args
@@ -0,0 +1,157 @@
+import itertools
+import re
+
+import pytest
+import requests
+
+from framework.pages import BasePage
+from framework.partitions import (
+    FORMS, MATRIX_SCRIPT, PROPERTY, FieldSpec, FormSpec, generate_cases, is_valid, run_matrix, summary_lines,
+)
+from framework.scenarios import MALICIOUS_INPUTS
+from framework.standin import StandInServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+class HttpFormDriver:
+    """
+    Honours MATRIX_SCRIPT's contract over plain HTTP: baseline plus case
+    value, mirrored and ticked fields, no cookies, field error read from the
+    ``.form-group`` (HTML) or the ``error`` object (JSON), amount taken from
+    the leading number of the ``taken`` key.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.unique = itertools.count()
+
+    def execute_async_script(self, script, form, cases):
+        assert script == MATRIX_SCRIPT
+        self.calls += 1
+        return [self.submit(form, case) for case in cases]
+
+    def submit(self, form, case):
+        unique = str(next(self.unique))
+        values = dict(form["baseline"], **{case["field"]: case["value"]})
+        values = {name: str(value).replace("{unique}", unique) for name, value in values.items()}
+        values.update({name: values[source] for name, source in form["mirror"].items()})
+        values.update({name: "1" for name in form["checked"]})
+        if form["url"].endswith("checkout/cart/add"):
+            values["product_id"] = "43"      # the hidden input in #product
+        if form["method"] == "GET":
+            response = requests.get(form["url"], params=values)
+        else:
+            response = requests.post(form["url"], data=values)
+        result = {"id": case["id"], "status": response.status_code, "sent": len(case["value"]), "injected": False}
+        if "json" in response.headers.get("Content-Type", ""):
+            data = response.json()
+            error = data.get("error")
+            result.update(rejected=bool(error), message=str(error) if error else None)
+            if form["taken"]:
+                taken = re.match(r"-?\d+", str(data.get(form["taken"], "")))
+                result["taken"] = int(taken.group(0)) if taken else None
+        else:
+            match = re.search(r'name="%s".*?</div>' % re.escape(case["field"]), response.text, re.S)
+            error = match and re.search(r'class="text-danger">([^<]*)', match.group(0))
+            result.update(rejected=bool(error), message=error.group(1) if error else None,
+                          injected=any(payload in response.text for payload in MALICIOUS_INPUTS if "<" in payload))
+        return result
+
+
+class LoadedPage(BasePage):
+    def __init__(self, base_url):
+        super().__init__(HttpFormDriver(), base_url)
+
+
+def test_boundaries_follow_the_spec():
+    cases = generate_cases(FormSpec("f", "form", "x", fields=(FieldSpec("name", min=3, max=32),)))
+    bva = {case.label: case for case in cases if case.technique == "BVA"}
+    assert [len(bva[label].value) for label in ("min-1 (2 chars)", "min (3 chars)", "min+1 (4 chars)",
+                                                "max-1 (31 chars)", "max (32 chars)", "max+1 (33 chars)")] \
+        == [2, 3, 4, 31, 32, 33]
+    assert {label: case.valid for label, case in bva.items()} == {
+        "min-1 (2 chars)": False, "min (3 chars)": True, "min+1 (4 chars)": True,
+        "max-1 (31 chars)": True, "max (32 chars)": True, "max+1 (33 chars)": False}
+    assert {case.value for case in cases if case.label == "malicious"} == set(MALICIOUS_INPUTS)
+    assert len({case.id for case in cases}) == len(cases)
+
+
+def test_number_partitions_and_deduplication():
+    cases = generate_cases(FormSpec("q", "#product", "x", fields=(FieldSpec("quantity", "number", 1, 10),)))
+    values = [case.value for case in cases]
+    assert len(values) == len(set(values))
+    assert {case.value: case.valid for case in cases if case.technique == "BVA"} == {
+        "0": False, "1": True, "2": True, "9": True, "10": True, "11": False}
+    assert not any(case.valid for case in cases if case.label in ("negative", "decimal", "non-numeric", "empty"))
+
+
+def test_oracle_trims_and_checks_kinds():
+    assert not is_valid(FieldSpec("name", min=1, max=5), "   ")
+    assert is_valid(FieldSpec("search", min=0, max=5, required=False), "")
+    assert is_valid(FieldSpec("email", "email"), "bva.{unique}@example.com")
+    assert not is_valid(FieldSpec("email", "email"), "user@example")
+    assert not is_valid(FieldSpec("code", pattern=r"[A-Z]{3}"), "ab1")
+
+
+@pytest.mark.parametrize("name", sorted(FORMS))
+def test_generated_verdicts_match_the_standin(server, name):
+    page = LoadedPage(server.base_url)
+    report = run_matrix(page, FORMS[name], batch_size=10)
+    assert not report.failures, "\n".join(report.table_lines(report.failures))
+    assert report.script_calls == page.driver.calls == -(-len(report.verdicts) // 10)
+
+
+def test_quantity_is_cast_not_rejected(server):
+    report = run_matrix(LoadedPage(server.base_url), FORMS["quantity"])
+    actual = {verdict.case.value: verdict.actual for verdict in report.verdicts}
+    assert [actual[value] for value in ("0", "1", "1000", "-5", "1.5", "abc")] == \
+        ["ignored", "accepted", "accepted", "ignored", "defaulted", "ignored"]
+    assert not report.failures
+
+
+def test_taking_a_different_amount_fails_the_case(server):
+    form = FORMS["quantity"]
+    cases = [case for case in generate_cases(form) if case.value in ("2", "-5")]
+    page = LoadedPage(server.base_url)
+    page.driver.execute_async_script = lambda script, arguments, batch: [
+        {"id": case.id, "status": 200, "sent": 1, "rejected": False, "message": None, "injected": False,
+         "taken": 999 if case.valid else -5}
+        for case in cases
+    ]
+    report = run_matrix(page, form, cases=cases)
+    assert [(verdict.actual, verdict.passed) for verdict in report.verdicts] == \
+        [("took 999", False), ("took -5", False)]
+
+
+def test_injected_markup_fails_the_case(server):
+    form = FORMS["search"]
+    case = next(case for case in generate_cases(form) if case.value.startswith("<script>"))
+    page = LoadedPage(server.base_url)
+    page.driver.execute_async_script = lambda script, arguments, cases: [
+        {"id": case.id, "status": 200, "sent": 5, "rejected": False, "message": None, "injected": True}
+    ]
+    report = run_matrix(page, form, cases=[case])
+    assert report.failures and report.failures[0].injected
+    assert "payload rendered as markup" in report.table_lines()[1]
+
+
+def test_summary_lists_failures_from_report_properties(server):
+    page = LoadedPage(server.base_url)
+    form = FORMS["quantity"]
+    report = run_matrix(page, form)
+    broken = report.as_property()
+    broken["cases"][0][9] = False      # as if quantity-001 had been accepted
+
+    class Report:
+        user_properties = [(PROPERTY, broken)]
+
+    lines = summary_lines([Report()])
+    assert lines[0].startswith(f"{len(report.verdicts)} generated cases on 1 loaded forms")
+    assert "1 failed" in lines[1]
+    assert any("quantity-001" in line and "FAIL" in line for line in lines)
+    assert len(summary_lines([Report()], verbose=True)) == len(lines) + len(report.verdicts) - 1
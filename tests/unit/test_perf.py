@@ -0,0 +1,105 @@
+from selenium.webdriver.remote.command import Command
+
+from framework import perf
+from framework.commands import CommandCounter
+
+
+def page(url, document, load=800.0, **metrics):
+    sample = {"document": document, "url": url, "ttfb": 50.0, "dom_content_loaded": 400.0, "load": load,
+              "fcp": 300.0, "lcp": None, "long_tasks": None, "long_task_ms": None, "resources": 3,
+              "transfer_kb": 12.5, "window": [1920, 1080]}
+    sample.update(metrics)
+    return sample
+
+
+class FakeDriver:
+    """Serves the current page's timing and, with CDP, the pages left by clicking."""
+
+    def __init__(self, pages, left=()):
+        self.pages = list(pages)
+        self.left = list(left)
+        self.commands = []
+
+    @property
+    def current(self):
+        return self.pages[0]
+
+    def execute(self, command, params=None):
+        self.commands.append(command)
+        if command == Command.GET:
+            self.pages.pop(0)
+            return {"value": None}
+        if command == Command.W3C_EXECUTE_SCRIPT:
+            if params["script"] == perf.DRAIN_SCRIPT:
+                return {"value": self.left}
+            return {"value": self.current}
+        return {"value": {"identifier": "1"}}
+
+    def get(self, url):
+        self.execute(Command.GET, {"url": url})
+
+
+class FakeChromeDriver(FakeDriver):
+    def execute_cdp_cmd(self, cmd, params):
+        raise AssertionError("probe should bypass wrappers")
+
+
+def test_route_and_viewport_tags():
+    assert perf.route_of("http://store/index.php?route=checkout/cart") == "checkout/cart"
+    assert perf.route_of("http://store/") == "common/home"
+    assert perf.viewport_of([768, 1024]) == "tablet"
+    assert perf.viewport_of([800, 600]) == "800x600"
+
+
+def test_budgets_merge_route_overrides():
+    assert perf.budget_for("checkout/checkout")["load"] == 6000
+    assert perf.budget_for("common/home")["fcp"] == 2500
+    assert perf.budget_for("product/product") == perf.ROUTE_BUDGETS["*"]
+    slow = dict(page("http://store/", 1, load=7000.0), route="common/home")
+    assert perf.violations(slow) == ["common/home load 7000ms > 5000ms"]
+
+
+def test_percentiles_and_aggregation():
+    assert perf.percentile([5, 1, 3, 2, 4], 50) == 3
+    assert perf.percentile(list(range(1, 101)), 95) == 95
+    samples = [dict(page("u", i, load=float(i)), route="r", browser="chrome", viewport="desktop")
+               for i in range(1, 101)]
+    stats = perf.aggregate(samples)[("r", "chrome", "desktop")]["load"]
+    assert (stats["n"], stats["p50"], stats["p95"], stats["p99"]) == (100, 50.0, 95.0, 99.0)
+    assert "lcp" not in perf.aggregate(samples)[("r", "chrome", "desktop")]
+
+
+def test_probe_samples_before_each_get_without_cdp():
+    home = page("http://store/", 1)
+    cart = page("http://store/index.php?route=checkout/cart", 2)
+    driver = FakeDriver([home, cart, cart])
+    probe = perf.PerfProbe(driver, "firefox", None)
+    probe.start()
+    driver.get("http://store/index.php?route=checkout/cart")
+    probe.sample()
+    samples = probe.stop()
+    assert [(s["route"], s["viewport"]) for s in samples] == [("common/home", "desktop"), ("checkout/cart", "desktop")]
+    assert "execute" not in driver.__dict__
+
+
+def test_probe_drains_pages_left_by_clicking_with_cdp():
+    driver = FakeChromeDriver([page("http://store/index.php?route=checkout/cart", 3)],
+                              left=[page("http://store/", 1), page("http://store/index.php?route=product/product", 2)])
+    counter = CommandCounter(driver)
+    counter.attach()
+    probe = perf.PerfProbe(driver, "chrome", "desktop")
+    probe.start()
+    samples = probe.stop()
+    counter.detach()
+    assert [s["route"] for s in samples] == ["common/home", "product/product", "checkout/cart"]
+    # Probe traffic is not charged to the test's command count
+    assert counter.total == 0
+
+
+def test_summary_lists_percentiles_and_violations():
+    samples = [dict(page("http://store/", i, load=load), route="common/home", browser="chrome", viewport="desktop")
+               for i, load in enumerate([900.0, 1100.0, 6200.0])]
+    lines = perf.summary_lines(samples)
+    assert lines[0] == "3 page samples (ms, p50/p95/p99)"
+    assert "common/home [chrome, desktop] n=3" in lines[1] and "load 1100/6200/6200" in lines[1]
+    assert lines[-1] == "  common/home load 6200ms > 5000ms"
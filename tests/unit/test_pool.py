@@ -0,0 +1,151 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from framework.pool import DriverPool, DriverPools
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_handle = handle
+
+
+class FakeDriver:
+    """Records the calls the pool makes instead of driving a browser."""
+
+    def __init__(self):
+        self.calls = []
+        self.crashed = False
+        self.window_handles = ["main"]
+        self.current_handle = "main"
+        self.switch_to = FakeSwitchTo(self)
+
+    def _check(self):
+        if isinstance(self.crashed, Exception):
+            raise self.crashed
+        if self.crashed:
+            raise WebDriverException("browser is gone")
+
+    @property
+    def current_url(self):
+        self._check()
+        return "about:blank"
+
+    def _record(self, name, *args):
+        self._check()
+        self.calls.append((name,) + args)
+
+    def execute_script(self, script):
+        self._record("execute_script")
+
+    def delete_all_cookies(self):
+        self._record("delete_all_cookies")
+
+    def set_window_size(self, width, height):
+        self._record("set_window_size", width, height)
+
+    def get(self, url):
+        self._record("get", url)
+
+    def close(self):
+        self.window_handles.remove(self.current_handle)
+
+    def quit(self):
+        self.calls.append(("quit",))
+
+
+def make_pool(**kwargs):
+    launched = []
+
+    def factory():
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    return DriverPool("fake", factory, **kwargs), launched
+
+
+def test_lease_reuses_warm_driver():
+    pool, launched = make_pool()
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+    assert first is second
+    assert len(launched) == 1
+    assert pool.stats["leases"] == 2
+
+
+def test_release_resets_browser_state():
+    pool, launched = make_pool()
+    with pool.lease() as driver:
+        driver.window_handles.append("popup")
+        driver.set_window_size(375, 667)
+        driver.calls.clear()
+    names = [call[0] for call in driver.calls]
+    assert names == ["execute_script", "delete_all_cookies", "set_window_size", "get"]
+    assert ("set_window_size", 1920, 1080) in driver.calls
+    assert ("get", "about:blank") in driver.calls
+    assert driver.window_handles == ["main"]
+
+
+def test_driver_recycled_after_max_uses():
+    pool, launched = make_pool(max_uses=2)
+    for _ in range(3):
+        with pool.lease():
+            pass
+    assert len(launched) == 2
+    assert ("quit",) in launched[0].calls
+    assert pool.stats["recycled"] == 1
+
+
+def test_crashed_driver_is_replaced():
+    pool, launched = make_pool()
+    with pool.lease() as driver:
+        driver.crashed = True
+    with pool.lease() as replacement:
+        pass
+    assert replacement is not driver
+    assert pool.stats["recycled"] == 1
+
+
+def test_dead_driver_process_does_not_lose_the_slot():
+    pool, launched = make_pool(size=1)
+    pooled = pool.acquire()
+    # chromedriver itself is gone: the client cannot even connect
+    pooled.driver.crashed = ConnectionRefusedError(111, "Connection refused")
+    pooled.driver.quit = pooled.driver._check
+    pool.release(pooled)
+    replacement = pool.acquire(timeout=0.01)
+    assert replacement is not pooled and len(launched) == 2
+    assert pool.stats["recycled"] == 1
+
+
+def test_fresh_lease_replaces_the_warm_driver():
+    pool, launched = make_pool()
+    with pool.lease() as driver:
+        pass
+    with pool.lease(fresh=True) as rerun:
+        pass
+    assert rerun is not driver and ("quit",) in driver.calls
+    with pool.lease() as warm:
+        assert warm is rerun
+    assert pool.stats["recycled"] == 1
+
+
+def test_pool_size_limits_concurrent_leases():
+    pool, launched = make_pool(size=1)
+    pooled = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(pooled)
+    assert pool.acquire(timeout=0.01) is pooled
+
+
+def test_pools_are_created_per_browser():
+    pools = DriverPools({"a": FakeDriver, "b": FakeDriver})
+    with pools.lease("a") as a, pools.lease("b") as b:
+        assert a is not b
+    assert len(pools.summary_lines()) == 2
+    pools.close()
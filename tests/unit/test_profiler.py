@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from framework import profiler
+from framework.waits import WaitEngine
+
+
+class FakeDriver:
+    def execute(self, command, params=None):
+        return {"value": {"met": True, "waited": 0, "value": True}}
+
+    def execute_async_script(self, script, *args):
+        return self.execute("executeAsyncScript")["value"]
+
+
+def profile_test():
+    request = SimpleNamespace(node=SimpleNamespace(user_properties=[]))
+    driver = FakeDriver()
+    with profiler.profile_commands(request, driver):
+        driver.execute("findElement")
+        WaitEngine(driver).wait("alert", value="return true;", check="return true;")
+    assert "execute" not in driver.__dict__
+    (name, profile), = request.node.user_properties
+    assert name == profiler.PROPERTY
+    return profile
+
+
+def test_commands_carry_caller_stack_and_wait_flag():
+    profile = profile_test()
+    (find, _, _, caller, index, in_wait), wait_command = profile["commands"]
+    assert find == "findElement" and not in_wait
+    assert caller.startswith("unit/test_profiler.py:")
+    assert profile["stacks"][index][-1] == "profile_test"
+    assert wait_command[0] == "executeAsyncScript" and wait_command[5]
+    assert "WaitEngine.wait" in profile["stacks"][wait_command[4]]
+    assert [label for label, _, _, _ in profile["waits"]] == ["alert"]
+
+    browser, waited, other, count = profiler.breakdown(profile)
+    assert count == 2 and browser <= profile["wall"] and waited >= wait_command[2]
+    assert any(stack.endswith("WaitEngine.wait;FakeDriver.execute_async_script;executeAsyncScript") for stack in profiler.flame(profile))
+
+
+def test_summary_and_trace_export():
+    profiles = {"test_a.py::test_one": [profile_test()], "test_b.py::test_two": [profile_test(), profile_test()]}
+    lines = profiler.summary_lines(profiles, verbose=True)
+    assert lines[0].startswith("6 commands over 2 browser tests")
+    assert any("findElement  unit/test_profiler.py:" in line for line in lines)
+
+    events = profiler.trace_events(profiles)
+    tracks = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert len(tracks) == 2
+    assert {event["cat"] for event in events if event["ph"] == "X"} == {"test", "wait", "command"}
+    assert all(event["ts"] >= 0 for event in events if event["ph"] == "X")
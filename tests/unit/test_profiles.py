@@ -0,0 +1,47 @@
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from framework import profiles
+
+
+def test_profiles_configure_real_options():
+    chrome = profiles.configure_chromium(webdriver.ChromeOptions(), profiles.PROFILES["fast-headless"])
+    assert "--headless=new" in chrome.arguments and "--no-sandbox" in chrome.arguments
+    headed = profiles.configure_chromium(webdriver.ChromeOptions(), profiles.PROFILES["headed-debug"])
+    assert headed.arguments == list(profiles.BASE_CHROMIUM)
+    firefox = profiles.configure_firefox(webdriver.FirefoxOptions(), profiles.PROFILES["visual-fidelity"])
+    assert "-headless" in firefox.arguments
+    assert firefox.preferences["layout.css.devPixelsPerPx"] == "1.0"
+
+
+class FakeDriver:
+    def __init__(self, log):
+        self.log = log
+
+    def get(self, url):
+        self.log.append(("get", url))
+
+    def execute_script(self, script):
+        self.log.append("command")
+
+    def quit(self):
+        self.log.append("quit")
+
+
+def test_benchmark_launches_fresh_browsers_and_ranks_profiles():
+    log = []
+    fast = profiles.benchmark("fast-headless", "chrome", lambda: FakeDriver(log), "http://store/", rounds=2,
+                              commands=3)
+    assert log.count("quit") == 2 and log.count("command") == 6
+    assert fast.error is None and fast.command_p95 >= fast.command_p50
+
+    def broken():
+        raise WebDriverException("session not created\nstacktrace")
+
+    failed = profiles.benchmark("headed-debug", "chrome", broken, "http://store/")
+    assert failed.error == "Message: session not created"
+
+    slow = fast._replace(profile="visual-fidelity", cold_start=fast.cold_start + 1)
+    lines = profiles.summary_lines([slow, failed, fast])
+    assert "failed: Message: session not created" in lines[2]
+    assert lines[-1].startswith("fastest chrome profile on this machine: fast-headless")
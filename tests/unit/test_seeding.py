@@ -0,0 +1,70 @@
+import pytest
+
+from framework.auth import AuthSessions
+from framework.http_backend import SESSION_COOKIE, StoreClient
+from framework.seeding import PRECONDITIONS, Seed, Seeder
+from framework.standin import StandInServer
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+def cart(client):
+    return sorted(client.cart_items().items())
+
+
+@pytest.mark.parametrize("endpoint", [None, False], ids=["seed endpoint", "HTTP posts"])
+def test_both_channels_build_the_same_cart(server, endpoint):
+    seeder = Seeder(server.base_url)
+    seeder.endpoint = endpoint
+    client = StoreClient(server.base_url)
+    channel = seeder.seed_client(client, Seed(cart=((43, 2), (40, 1))))
+    assert channel == ("seed endpoint" if endpoint is None else "HTTP posts")
+    assert cart(client) == [("40", 1), ("43", 2)]
+    assert seeder.requests == (1 if endpoint is None else 2)
+
+
+def test_logged_in_wishlist_is_emptied(server):
+    auth = AuthSessions(server.base_url)
+    owner = StoreClient(server.base_url)
+    auth.login_client(owner)
+    owner.add_to_wishlist(43)
+    assert owner.wishlist_product_ids() == [43]
+
+    seeder = Seeder(server.base_url, auth=auth)
+    seeder.endpoint = False
+    client = StoreClient(server.base_url)
+    seeder.seed_client(client, PRECONDITIONS["logged-in with empty wishlist"].seed)
+    assert client.is_logged_in()
+    assert owner.wishlist_product_ids() == []
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url):
+        self.calls.append(("get", url))
+
+    def add_cookie(self, cookie):
+        self.calls.append(("add_cookie", cookie["name"], cookie["value"]))
+
+
+def test_seed_driver_injects_the_session_and_lands_on_the_route(server):
+    seeder = Seeder(server.base_url)
+    driver = FakeDriver()
+    seeder.seed_driver(driver, "cart with MacBook x2")
+    (_, name, session_id), (_, url) = driver.calls[1:]
+    assert name == SESSION_COOKIE
+    assert url.endswith("route=checkout/cart")
+
+    client = StoreClient(server.base_url)
+    client.session.cookies.set(SESSION_COOKIE, session_id)
+    assert cart(client) == [("43", 2)]
+    assert seeder.summary_lines() == ["1 preconditions seeded (1 via seed endpoint) in 1 HTTP requests"]
+
+    with pytest.raises(KeyError, match="Unknown precondition"):
+        seeder.seed_driver(driver, "cart with nothing")
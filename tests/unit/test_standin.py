@@ -0,0 +1,122 @@
+import time
+
+import pytest
+import requests
+
+from framework.standin import StandInServer, StandInStore
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture
+def http(server):
+    session = requests.Session()
+    session.base = server.base_url
+    return session
+
+
+def route(http, name, **params):
+    query = "".join(f"&{key}={value}" for key, value in params.items())
+    return f"{http.base}/index.php?route={name}{query}"
+
+
+def add_macbook(http, quantity=1):
+    return http.post(route(http, "checkout/cart/add"), data={"product_id": 43, "quantity": quantity}).json()
+
+
+@pytest.mark.parametrize("name, params, markers", [
+    ("common/home", {}, ['id="logo"', 'id="search"', "btn-light", 'id="menu"', "Desktops", "Show All Desktops"]),
+    ("product/product", {"product_id": 43}, ['id="input-quantity"', 'id="button-cart"', "title=\"Add to Wish List\"", "<h1>MacBook</h1>"]),
+    ("product/category", {"path": 20}, ['class="product-thumb"', "title=\"Compare this Product\""]),
+    ("product/search", {"search": "MacBook"}, ["MacBook Air", "MacBook Pro"]),
+    ("account/login", {}, ['id="input-email"', 'id="input-password"', 'type="submit"', ">Continue</a>"]),
+    ("account/register", {}, ['id="input-firstname"', 'id="input-lastname"', 'id="input-password"']),
+    ("information/contact", {}, ['id="input-name"', 'id="input-email"', 'id="input-enquiry"']),
+])
+def test_routes_serve_opencart_selectors(http, name, params, markers):
+    response = http.get(route(http, name, **params))
+    assert response.status_code == 200
+    for marker in markers:
+        assert marker in response.text
+
+
+def test_double_slash_from_base_url_is_accepted(http):
+    assert http.get(http.base + "/index.php?route=common/home").status_code == 200
+
+
+def test_add_to_cart_casts_quantity_like_opencart(http):
+    # Nothing is rejected: the quantity is cast to int and added to the line
+    assert add_macbook(http, 0)["total"] == "0 item(s) - $0.00"
+    assert add_macbook(http, "abc")["total"] == "0 item(s) - $0.00"
+    assert add_macbook(http, "1.5")["total"] == "1 item(s) - $602.00"
+    assert add_macbook(http, 1000)["total"] == "1001 item(s) - $602,602.00"
+    assert add_macbook(http, "-1001")["total"] == "0 item(s) - $0.00"
+    assert "Your shopping cart is empty!" in http.get(route(http, "checkout/cart")).text
+
+
+def test_cart_update_and_remove(http):
+    add_macbook(http)
+    page = http.post(route(http, "checkout/cart/edit"), data={"quantity[43]": "2"})
+    assert "alert-success" in page.text
+    assert "$1,204.00" in page.text
+    http.post(route(http, "checkout/cart/remove"), data={"key": "43"})
+    assert "Your shopping cart is empty!" in http.get(route(http, "checkout/cart")).text
+
+
+def test_clearing_cookies_starts_an_empty_session(http):
+    add_macbook(http)
+    http.cookies.clear()
+    assert "Your shopping cart is empty!" in http.get(route(http, "checkout/cart")).text
+
+
+def test_protected_pages_redirect_to_login(http):
+    assert "route=account/login" in http.get(route(http, "account/account")).url
+
+
+def test_failed_login_shows_danger_alert(http):
+    page = http.post(route(http, "account/login"), data={"email": "wrong@email.com", "password": "wrongpass"})
+    assert "alert-danger" in page.text
+
+
+def test_register_then_login(http):
+    form = {"firstname": "A" * 32, "lastname": "B", "email": "bva@example.com", "telephone": "0123",
+            "password": "ValidPass123", "confirm": "ValidPass123", "agree": "1"}
+    assert "route=account/success" in http.post(route(http, "account/register"), data=form).url
+    http.cookies.clear()
+    page = http.post(route(http, "account/login"), data={"email": "bva@example.com", "password": "ValidPass123"})
+    assert "My Account" in page.text
+
+
+def test_register_rejects_33_character_name(http):
+    form = {"firstname": "A" * 33, "lastname": "B", "email": "long@example.com", "telephone": "0123",
+            "password": "abcd", "confirm": "abcd", "agree": "1"}
+    page = http.post(route(http, "account/register"), data=form)
+    assert "First Name must be between 1 and 32 characters!" in page.text
+
+
+def test_guest_checkout_places_order(http, server):
+    add_macbook(http)
+    details = {"firstname": "John", "lastname": "Doe", "email": "john@example.com", "telephone": "0123",
+               "address_1": "1 Main St", "city": "Town", "postcode": "1000", "country": "BE"}
+    assert http.post(route(http, "checkout/guest/save"), data=details).json() == {}
+    assert http.post(route(http, "checkout/payment_method/save"), data={"agree": "1"}).json() == {}
+    redirect = http.post(route(http, "checkout/confirm")).json()["redirect"]
+    assert "checkout/success" in redirect
+    assert server.store.orders[-1]["lines"] == [(43, 1)]
+
+
+def test_guest_wishlist_asks_for_login(http):
+    message = http.post(route(http, "account/wishlist/add"), data={"product_id": 43}).json()["success"]
+    assert "login" in message
+
+
+def test_sessions_expire_after_lifetime():
+    store = StandInStore(session_lifetime=0.01)
+    session = store.session(None)
+    session.cart["43"] = [43, 1]
+    time.sleep(0.02)
+    assert store.session(session.session_id).cart == {}
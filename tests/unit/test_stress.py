@@ -0,0 +1,87 @@
+import time
+
+import pytest
+import requests
+
+from framework import scenarios
+from framework.http_backend import StoreClient
+from framework.standin import Faults, StandInServer
+from framework.stress import STRESS_PRODUCT_IDS, StressLimits, StressRun, TimedStoreClient, Window, run_stress
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+def test_dropped_connections_fail_the_request(server):
+    server.store.faults = Faults(drop_rate=1.0)
+    client = StoreClient(server.base_url)
+    with pytest.raises(requests.ConnectionError):
+        client.cart_items()
+    server.store.faults = None
+    assert client.cart_items() == {}
+
+
+def test_expired_sessions_lose_the_cart(server):
+    client = StoreClient(server.base_url)
+    client.add_to_cart(scenarios.MACBOOK)
+    server.store.faults = Faults(expire_rate=1.0)
+    assert client.cart_items() == {}
+
+
+def test_slow_responses_are_delayed(server):
+    server.store.faults = Faults(slow_rate=1.0, slow_seconds=0.2)
+    client = StoreClient(server.base_url)
+    start = time.perf_counter()
+    client.cart()
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_timed_client_records_requests_and_scenario_runs(server):
+    run = StressRun(server.base_url, {}, pool_size=2)
+    client = TimedStoreClient(server.base_url, run, adapter=run.adapter)
+    assert scenarios.cart_stress(client, STRESS_PRODUCT_IDS[:5]) == ["Empty Cart", "5 Items"]
+    # One cart read before, five adds, one cart read after
+    assert run.window.histogram.count == 7
+    assert run.window.errors == 0
+    run.stop()
+
+
+def test_window_health_uses_error_rate_and_p95():
+    window = Window()
+    for _ in range(19):
+        window.record(0.01, True)
+    window.record(0.01, False, "checkout/cart/add: 500")
+    assert window.result(5, StressLimits(0.05, 0.1)).healthy
+    assert not window.result(5, StressLimits(0.01, 0.1)).healthy
+    assert not window.result(5, StressLimits(0.05, 0.005)).healthy
+    # A failed scenario is an error without a latency sample
+    window.record(None, False, "TC-005 cart: AssertionError")
+    assert window.histogram.count == 20 and window.errors == 2
+    assert window.failures == {"checkout/cart/add: 500": 1, "TC-005 cart: AssertionError": 1}
+
+
+def test_stress_finds_the_knee_and_recovers(server):
+    injected = []
+
+    def inject(faults):
+        injected.append(faults)
+        # Every request holds the store for 5 ms: capacity is ~200 req/s
+        server.store.faults = faults or Faults(service_time=0.005)
+
+    inject(None)
+    injected.clear()
+    report = run_stress(
+        server.base_url, start_users=1, step_users=7, max_users=50, step_seconds=1.0,
+        limits=StressLimits(0.05, 0.05), scenario_map={"TC-005 cart": scenarios.cart_lifecycle},
+        faults=Faults(service_time=0.005, drop_rate=0.2), inject=inject, fault_seconds=1.0,
+    )
+    assert report.knee is not None and report.breaking is not None
+    assert report.knee.users < report.breaking.users <= 50
+    assert report.breaking.p95 > 0.05
+    assert report.fault_phase.users == report.knee.users and report.fault_phase.errors > 0
+    assert injected[-1] is None
+    assert report.recovered
+    assert any("knee" in line for line in report.summary_lines())
@@ -0,0 +1,142 @@
+import base64
+import itertools
+import struct
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from framework import visual
+from framework.pages import HomePage
+
+
+def encode_png(width, height, channels, pixel):
+    """An 8-bit PNG with every row filter type in turn; ``pixel(x, y)`` returns the samples."""
+    colour = {1: 0, 3: 2, 4: 6}[channels]
+    rows, previous = [], bytes(width * channels)
+    for y in range(height):
+        row = bytes(sample for x in range(width) for sample in pixel(x, y))
+        method = y % 5
+        filtered = bytearray(row)
+        for i in range(len(row)):
+            left = row[i - channels] if i >= channels else 0
+            up, corner = previous[i], previous[i - channels] if i >= channels else 0
+            if method == 1:
+                filtered[i] = (row[i] - left) & 0xFF
+            elif method == 2:
+                filtered[i] = (row[i] - up) & 0xFF
+            elif method == 3:
+                filtered[i] = (row[i] - ((left + up) >> 1)) & 0xFF
+            elif method == 4:
+                estimate = left + up - corner
+                pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - corner)
+                filtered[i] = (row[i] - (left if pa <= pb and pa <= pc else up if pb <= pc else corner)) & 0xFF
+        rows.append(bytes([method]) + bytes(filtered))
+        previous = row
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (visual.PNG_SIGNATURE + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colour, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows))) + chunk(b"IEND", b""))
+
+
+def test_decode_png_undoes_every_filter():
+    def pixel(x, y):
+        return (x * 7 % 256, y * 13 % 256, (x * y) % 256, 255 - x)
+    width, height, channels, rows = visual.decode_png(encode_png(23, 11, 4, pixel))
+    assert (width, height, channels) == (23, 11, 4)
+    assert all(bytes(rows[y]) == bytes(s for x in range(23) for s in pixel(x, y)) for y in range(11))
+    with pytest.raises(ValueError):
+        visual.decode_png(b"GIF89a")
+
+
+def test_hash_and_pixel_diff():
+    gradient = bytearray(x * 8 for y in range(16) for x in range(32))
+    assert visual.difference_hash(gradient, 32, 16) == "f" * 16
+    flipped = bytearray(255 - value for value in gradient)
+    assert visual.hamming(visual.difference_hash(gradient, 32, 16), visual.difference_hash(flipped, 32, 16)) == 64
+    touched = bytearray(gradient)
+    touched[0] = 200
+    assert visual.pixel_diff(gradient, touched) == 1 / len(gradient)
+    assert visual.resize(bytearray([0, 100, 200, 100]), 2, 2, 1, 1) == bytearray([100])
+    assert visual.mask(bytearray([9] * 16), 4, 4, [[2, 2, 2, 2]], 1.0)[10:12] == bytes(2)
+
+
+class FakeDriver:
+    """A 320x180 viewport; no CDP, so no screenshots."""
+
+    def __init__(self, box_x=40, logo=(10, 10, 100, 40), scroll_width=320):
+        self.box_x = box_x
+        self.logo = list(logo)
+        self.scroll_width = scroll_width
+        self.scripts = []
+
+    def execute_script(self, script, specs, masks):
+        self.scripts.append(sorted(specs))
+        return {"url": "http://store/", "viewport": [320, 180], "scroll_width": self.scroll_width,
+                "boxes": {"logo": self.logo, "search": [120, 10, 180, 30], "menu": None},
+                "overflow": [["div.banner", self.scroll_width]] if self.scroll_width > 320 else [],
+                "masks": [[0, 160, 320, 20]]}
+
+
+SHOTS = itertools.count(1)
+
+
+class FakeChromeDriver(FakeDriver):
+    """Screenshots are a dark box at ``box_x`` on a white page, over a masked banner that never repeats."""
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Page.captureScreenshot" and params["clip"]["scale"] == 0.5
+        banner = next(SHOTS) * 17
+
+        def pixel(x, y):
+            if y >= 80:
+                return ((x + banner) % 256, banner % 256, 0)
+            if self.box_x <= x < self.box_x + 30 and 20 <= y < 60:
+                return (30, 30, 30)
+            return (255, 255, 255)
+        return {"data": base64.b64encode(encode_png(160, 90, 3, pixel)).decode()}
+
+
+def fake_request():
+    return SimpleNamespace(node=SimpleNamespace(user_properties=[]))
+
+
+def test_first_run_records_then_hash_matches(tmp_path):
+    engine = visual.VisualEngine(str(tmp_path))
+    page = SimpleNamespace(LOCATORS=HomePage.LOCATORS)
+    request = fake_request()
+    key = ("fast-headless", "chrome-mobile")
+
+    first = engine.check(request, FakeChromeDriver(), key, page)
+    assert first.status == "new" and first.passed
+    assert first.key == ("fast-headless", "chrome-mobile", "common/home")
+    assert sorted(path.name for path in (tmp_path / "fast-headless" / "chrome-mobile").iterdir()) == \
+        ["common-home.grey", "common-home.json"]
+
+    driver = FakeChromeDriver()
+    again = engine.check(request, driver, key, page)
+    assert driver.scripts == [sorted(visual.LANDMARKS)]
+    assert (again.status, again.distance, again.changed) == ("match", 0, None)
+    assert [value["status"] for name, value in request.node.user_properties] == ["new", "match"]
+
+
+def test_pixel_diff_layout_and_overflow(tmp_path):
+    engine = visual.VisualEngine(str(tmp_path))
+    page = SimpleNamespace(LOCATORS=HomePage.LOCATORS)
+    key = ("fast-headless", "chrome-mobile")
+    engine.check(fake_request(), FakeChromeDriver(), key, page)
+
+    moved = engine.check(fake_request(), FakeChromeDriver(box_x=100, logo=(10, 10, 100, 60)), key, page)
+    assert moved.status == "changed" and moved.distance > 0 and moved.changed > visual.MAX_CHANGED
+    assert moved.layout_changes == ["logo moved [10, 10, 100, 40] -> [10, 10, 100, 60]"]
+    assert not moved.passed
+
+    wide = engine.check(fake_request(), FakeDriver(scroll_width=410), key, page)
+    assert wide.status == "layout" and not wide.layout_changes
+    assert wide.overflow == ["page is 410px wide in a 320px viewport: div.banner (right edge 410px)"]
+
+    lines = visual.summary_lines([result.as_property() for result in (moved, wide)])
+    assert lines[0].startswith("2 layout checks (1 changed, 1 layout); 1 compared with their baseline in ")
+    assert lines[2] == "  fast-headless/chrome-mobile/common/home: page is 410px wide in a 320px viewport: " \
+                       "div.banner (right edge 410px)"
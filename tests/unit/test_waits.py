@@ -0,0 +1,68 @@
+import pytest
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from framework import waits
+from framework.waits import PROPERTY, WaitEngine, summary_lines
+
+
+class ScriptedDriver:
+    """Answers execute_async_script from a list of results (exceptions are raised)."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+
+    def execute_async_script(self, script, args, slice_ms, immediate, in_page):
+        self.calls.append((immediate, in_page))
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def answer(value, met=False):
+    return {"met": met, "waited": 0, "value": value}
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(waits, "FIRST_INTERVAL", 0.001)
+    monkeypatch.setattr(waits, "MAX_INTERVAL", 0.002)
+
+
+def test_in_page_condition_returns_on_first_met_answer():
+    driver = ScriptedDriver([answer("early"), answer("done", met=True)])
+    assert WaitEngine(driver).wait("alert", value="", check="return true;") == "done"
+    assert driver.calls == [(False, True), (False, True)]
+    assert waits.RECORDS[-1].label == "alert" and waits.RECORDS[-1].met
+
+
+def test_python_condition_reads_first_then_waits_for_signals():
+    driver = ScriptedDriver([answer(1), answer(2), answer(3)])
+    assert WaitEngine(driver).wait("count", value="", accept=lambda value: value >= 3) is True
+    assert driver.calls == [(True, False), (False, False), (False, False)]
+
+
+def test_navigation_falls_back_to_polling():
+    unloaded = JavascriptException("document unloaded while waiting for result")
+    driver = ScriptedDriver([unloaded, unloaded, answer("new page", met=True)])
+    assert WaitEngine(driver).wait("navigation", value="", check="return true;") == "new page"
+    assert waits.RECORDS[-1].fallbacks == 2
+
+
+def test_timeout_is_recorded_and_raised():
+    driver = ScriptedDriver([answer(None)])
+    with pytest.raises(TimeoutException, match="never"):
+        WaitEngine(driver, timeout=0.05).wait("never", value="", check="return false;")
+    assert not waits.RECORDS[-1].met
+
+
+def test_summary_lines_aggregate_per_label():
+    class Report:
+        def __init__(self, values):
+            self.user_properties = [(PROPERTY, values)]
+
+    lines = summary_lines([Report([("Cart.alert", 0.25, True), ("Home.logo", 0.01, True)]),
+                           Report([("Cart.alert", 0.5, False)])])
+    assert lines[0] == "3 waits blocked 0.76s in total"
+    assert "Cart.alert" in lines[1] and "1 timed out" in lines[1]